@@ -33,6 +33,11 @@ FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID", "rexa-engage")
 NOTION_CLIENT_ID = os.getenv("NOTION_CLIENT_ID")
 NOTION_CLIENT_SECRET = os.getenv("NOTION_CLIENT_SECRET")
 NOTION_REDIRECT_URI = os.getenv("NOTION_REDIRECT_URI", "http://localhost:3000/api/notion/callback")
+NOTION_IMPORT_BATCH_PAGES = int(os.getenv("NOTION_IMPORT_BATCH_PAGES", 20))  # database pages embedded + stored together
+NOTION_REQUESTS_PER_SECOND = float(os.getenv("NOTION_REQUESTS_PER_SECOND", 3))  # Notion's average limit per integration token
+NOTION_FETCH_CONCURRENCY = int(os.getenv("NOTION_FETCH_CONCURRENCY", 4))  # pages fetched at once
+NOTION_MAX_RETRIES = int(os.getenv("NOTION_MAX_RETRIES", 5))  # on 429 / 5xx / connection errors
+NOTION_MAX_BLOCK_DEPTH = int(os.getenv("NOTION_MAX_BLOCK_DEPTH", 8))  # levels of nested blocks (toggles, columns, lists) read
 
 # Google OAuth Configuration (for Google Sheets)
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -56,3 +61,106 @@ ALLOWED_ORIGINS.append("*")
 # API Configuration
 API_HOST = os.getenv("HOST", "0.0.0.0")
 API_PORT = int(os.getenv("PORT", 8001))
+
+# Query Embedding Cache Configuration
+# Caches Voyage AI query embeddings keyed by (model, input_type, normalized text)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 2048))
+QUERY_EMBEDDING_CACHE_TTL = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", 86400))  # seconds
+QUERY_EMBEDDING_CACHE_PATH = os.getenv("QUERY_EMBEDDING_CACHE_PATH", "")  # SQLite file; empty = in-memory only
+
+# Semantic Response Cache Configuration
+# Reuses a previous answer for the same agent when a new query is semantically close enough
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))  # cosine similarity
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 3600))  # seconds
+SEMANTIC_CACHE_MAX_ENTRIES_PER_AGENT = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES_PER_AGENT", 256))
+
+# Context Assembly Configuration
+# Token budget for retrieved context when the model has no "context_token_budget" in LLMService.AVAILABLE_MODELS
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 3000))
+
+# LLM Client Pool Configuration
+# Chat model clients are cached per (provider, model, streaming) and share keep-alive HTTP connections
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 20))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 60))  # seconds
+LLM_PREWARM_MODELS = [model.strip() for model in os.getenv("LLM_PREWARM_MODELS", "gpt-5-mini,gemini-2.5-flash").split(",") if model.strip()]
+
+# Logging & Tracing Configuration
+# Hot-path debug output is only produced at LOG_LEVEL=DEBUG; spans are sampled per request
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+TRACE_SPAN_LEVEL = os.getenv("TRACE_SPAN_LEVEL", "INFO")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 1.0))
+TRACE_ROUTE_SAMPLE_RATES = os.getenv("TRACE_ROUTE_SAMPLE_RATES", "/api/ai/chat=0.1,/api/ai/chat/stream=0.1")  # route prefix=rate, comma separated
+
+# Document Embedding Cache Configuration
+# Content-addressed store keyed by (model, sha256(chunk text)) so unchanged chunks are never re-embedded
+# Opt-in: point it at a persistent volume - on an ephemeral container filesystem the file is lost on every deploy
+DOCUMENT_EMBEDDING_CACHE_PATH = os.getenv("DOCUMENT_EMBEDDING_CACHE_PATH", "")  # SQLite file; empty = disabled
+DOCUMENT_EMBEDDING_CACHE_MAX_MB = int(os.getenv("DOCUMENT_EMBEDDING_CACHE_MAX_MB", 1024))
+DOCUMENT_EMBEDDING_CACHE_DTYPE = os.getenv("DOCUMENT_EMBEDDING_CACHE_DTYPE", "float32")  # float32 | int8
+
+# Voyage AI Document Embedding Batching
+# Chunks are grouped into requests by estimated token count and sent a few at a time with retries
+VOYAGE_EMBED_CONCURRENCY = int(os.getenv("VOYAGE_EMBED_CONCURRENCY", 4))  # batches in flight per call
+VOYAGE_EMBED_MAX_RETRIES = int(os.getenv("VOYAGE_EMBED_MAX_RETRIES", 5))  # on 429 / 5xx / connection errors
+VOYAGE_BATCH_MAX_ITEMS = int(os.getenv("VOYAGE_BATCH_MAX_ITEMS", 1000))  # API limit per request
+VOYAGE_BATCH_TOKEN_RATIO = float(os.getenv("VOYAGE_BATCH_TOKEN_RATIO", 0.8))  # headroom for tokenizer differences
+
+# Qdrant Upload Configuration
+# Points are upserted in batches sized by payload bytes, several in flight; only the last batch waits for indexing
+QDRANT_UPLOAD_BATCH_BYTES = int(os.getenv("QDRANT_UPLOAD_BATCH_BYTES", 4 * 1024 * 1024))  # well under Qdrant's 32 MB request limit
+QDRANT_UPLOAD_BATCH_MAX_POINTS = int(os.getenv("QDRANT_UPLOAD_BATCH_MAX_POINTS", 256))
+QDRANT_UPLOAD_PARALLELISM = int(os.getenv("QDRANT_UPLOAD_PARALLELISM", 4))  # upserts in flight per item
+QDRANT_BULK_WINDOW_CHUNKS = int(os.getenv("QDRANT_BULK_WINDOW_CHUNKS", 1000))  # chunks embedded + uploaded at a time by bulk stores
+
+# Shared Work Executor
+# CPU-bound parsing, chunking and tokenisation run in worker processes and blocking SDK calls in threads, never on the
+# event loop. Work goes through named queues with concurrency limits; chat work is started before waiting ingestion work
+WORK_PROCESS_WORKERS = int(os.getenv("WORK_PROCESS_WORKERS", max(1, min(4, (os.cpu_count() or 2) - 1))))  # 0 = CPU work in threads
+WORK_THREAD_WORKERS = int(os.getenv("WORK_THREAD_WORKERS", 16))  # blocking calls; ingestion may use half of them
+WORK_QUEUE_LIMITS = os.getenv("WORK_QUEUE_LIMITS", "")  # per-queue concurrency overrides, e.g. "ingest=4,pdf=2"
+
+# PDF / Upload Ingestion
+# Uploads are spooled to disk; PDF pages are extracted by the work executor's processes and streamed into chunk/embed/upsert
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", max(1, min(4, (os.cpu_count() or 2) - 1))))  # page ranges extracted at once
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 8))  # pages per worker task
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None  # None = system temp dir
+
+# Background Ingestion Jobs
+# Long imports run in a worker pool; jobs (including request parameters and uploaded files) are persisted
+# under INGESTION_JOBS_DIR so an interrupted job resumes after a restart
+INGESTION_JOBS_DIR = os.getenv("INGESTION_JOBS_DIR", "ingestion_jobs")  # empty = in-memory only, no resume
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 2))
+INGESTION_JOB_RETENTION_HOURS = int(os.getenv("INGESTION_JOB_RETENTION_HOURS", 72))
+
+# Website Crawler Configuration
+# Breadth-first, same-origin crawl seeded from sitemap.xml; pages are chunked and stored as they arrive.
+# Pages are fetched over plain HTTP and only rendered in the browser when they look client-side rendered
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", 8))  # pages in flight per crawl
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv("CRAWL_PER_HOST_CONCURRENCY", 2))
+CRAWL_PER_HOST_DELAY_MS = int(os.getenv("CRAWL_PER_HOST_DELAY_MS", 250))  # minimum gap between requests to one host
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", 5))  # link hops from the start URL
+CRAWL_PAGE_TIMEOUT = float(os.getenv("CRAWL_PAGE_TIMEOUT", 30))
+CRAWL_HTTP_MAX_CONNECTIONS = int(os.getenv("CRAWL_HTTP_MAX_CONNECTIONS", 32))  # pooled HTTP connections shared by all crawls
+CRAWL_HTTP_MAX_KEEPALIVE = int(os.getenv("CRAWL_HTTP_MAX_KEEPALIVE", 16))
+CRAWL_RESPECT_ROBOTS = os.getenv("CRAWL_RESPECT_ROBOTS", "true").lower() == "true"
+CRAWL_JS_MIN_TEXT_CHARS = int(os.getenv("CRAWL_JS_MIN_TEXT_CHARS", 200))  # less text over plain HTTP = try the browser
+CRAWL_JS_HOST_ESCALATIONS = int(os.getenv("CRAWL_JS_HOST_ESCALATIONS", 2))  # browser-only pages before a host skips the HTTP attempt
+
+# Website Re-crawl Scheduler
+# Stored websites are re-crawled on an interval with conditional GETs; only pages whose content hash changed are re-ingested
+RECRAWL_ENABLED = os.getenv("RECRAWL_ENABLED", "true").lower() == "true"
+RECRAWL_POLL_SECONDS = int(os.getenv("RECRAWL_POLL_SECONDS", 300))  # how often due websites are looked up
+RECRAWL_MAX_CONCURRENT_SITES = int(os.getenv("RECRAWL_MAX_CONCURRENT_SITES", 2))  # across scheduled and manual re-crawls
+RECRAWL_DEFAULT_INTERVAL_HOURS = float(os.getenv("RECRAWL_DEFAULT_INTERVAL_HOURS", 24))  # 0 = newly scraped websites aren't re-crawled
+
+# Headless Browser Pool (Crawl4AI)
+# Browsers are launched once at startup and shared by all scrapes; each is recycled after a number of pages
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", 1))  # 0 = no browser, HTTP scraping only
+BROWSER_POOL_CONTEXTS = int(os.getenv("BROWSER_POOL_CONTEXTS", 4))  # pages rendered at once per browser
+BROWSER_POOL_MAX_PAGES = int(os.getenv("BROWSER_POOL_MAX_PAGES", 200))  # recycle a browser after this many pages
+BROWSER_POOL_MEMORY_LIMIT_MB = int(os.getenv("BROWSER_POOL_MEMORY_LIMIT_MB", 1536))  # all browser processes; 0 = no limit
+BROWSER_POOL_HEALTH_INTERVAL = float(os.getenv("BROWSER_POOL_HEALTH_INTERVAL", 30))  # seconds
+BROWSER_POOL_RETRY_SECONDS = float(os.getenv("BROWSER_POOL_RETRY_SECONDS", 300))  # after a failed launch, scrape over HTTP until then
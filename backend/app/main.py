@@ -4,9 +4,21 @@ Main FastAPI application with modular structure
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.config import ALLOWED_ORIGINS, API_HOST, API_PORT
-from app.routers import health_router, knowledge_router, ai_router, review_router, email_router, scraping_router, firestore_router, faq_router, notion_router, google_sheets_router, upload_router, calendly_router, zendesk_router, whatsapp_router
+from app.config import ALLOWED_ORIGINS, API_HOST, API_PORT, LLM_PREWARM_MODELS
+from app.services.tracing import configure_logging, TracingMiddleware
+
+# Structured logging must be in place before the services below log their startup
+configure_logging()
+
+from app.routers import health_router, knowledge_router, ai_router, review_router, email_router, scraping_router, firestore_router, faq_router, notion_router, google_sheets_router, upload_router, calendly_router, zendesk_router, whatsapp_router, ingestion_router
 from app.services.qdrant_service import qdrant_service
+from app.services.llm_service import llm_service
+from app.services.ingestion_jobs import ingestion_jobs
+from app.services.recrawl_scheduler import recrawl_scheduler
+from app.services.browser_pool import browser_pool
+from app.services.scraping_service import scraper
+from app.services.notion_service import notion_service
+from app.services.work_executor import work_executor
 
 # Create FastAPI app
 app = FastAPI(
@@ -24,6 +36,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Root span per request (added last so it wraps CORS and every route)
+app.add_middleware(TracingMiddleware)
+
 # Include routers
 app.include_router(health_router.router)
 app.include_router(knowledge_router.router)
@@ -39,6 +54,7 @@ app.include_router(upload_router.router)
 app.include_router(calendly_router.router)
 app.include_router(zendesk_router.router)
 app.include_router(whatsapp_router.router)
+app.include_router(ingestion_router.router)
 
 
 @app.on_event("startup")
@@ -52,6 +68,21 @@ async def startup_event():
         print("✅ CORS middleware configured")
         print("✅ All routers loaded")
         
+        # Build cached LLM clients and open pooled connections before the first chat
+        await llm_service.prewarm(LLM_PREWARM_MODELS)
+        
+        # Spawn the work executor's processes for parsing, chunking and extraction
+        work_executor.start()
+        
+        # Launch the shared headless browsers for scraping in the background
+        await browser_pool.start()
+        
+        # Background ingestion workers (resumes jobs interrupted by the last shutdown)
+        await ingestion_jobs.start()
+        
+        # Periodic change-only re-crawls of stored websites
+        await recrawl_scheduler.start()
+        
         # Note: Qdrant service is initialized on-demand to avoid startup failures
         print("🚀 Modular Qdrant Knowledge Base API started successfully")
         print("💡 Qdrant will connect on-demand when first used")
@@ -62,6 +93,18 @@ async def startup_event():
         print("⚠️ Continuing startup despite errors...")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop ingestion workers and release pooled connections, browsers and work executor pools on shutdown"""
+    await recrawl_scheduler.stop()
+    await ingestion_jobs.stop()
+    await browser_pool.stop()
+    await scraper.aclose()
+    await notion_service.aclose()
+    await llm_service.aclose()
+    work_executor.shutdown()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -17,6 +17,7 @@ class KnowledgeBaseItem(BaseModel):
     fileName: Optional[str] = None
     fileUrl: Optional[str] = None
     fileSize: Optional[int] = None
+    jobId: Optional[str] = None  # Set when processing_status is "queued"
 
 
 class SearchRequest(BaseModel):
@@ -33,6 +34,7 @@ class DocumentUploadResponse(BaseModel):
     fileUrl: Optional[str] = None
     fileName: Optional[str] = None
     fileSize: Optional[int] = None
+    jobId: Optional[str] = None  # Set when processing_status is "queued"
 
 
 # AI Models
@@ -4,12 +4,15 @@ AI and chat router for RAG pipeline
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 import json
+import logging
 import time
 
 from app.models import ChatRequest, AIResponse
 from app.services.ai_service import ai_service
 from app.services.llm_service import llm_service
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
 
@@ -19,7 +22,10 @@ async def ai_chat_response(request: ChatRequest):
     try:
         identifier = request.agentId or request.widgetId
         identifier_type = "Agent" if request.agentId else "Widget"
-        print(f"📨 AI Chat Request - {identifier_type}: {identifier}, Business: {request.businessId}, Message: {request.message[:50]}...")
+        logger.debug(
+            "📨 AI Chat Request - %s: %s, Business: %s, Message: %s...",
+            identifier_type, identifier, request.businessId, request.message[:50]
+        )
 
         result = await ai_service.generate_ai_response(
             request.message,
@@ -29,11 +35,11 @@ async def ai_chat_response(request: ChatRequest):
             request.customerHandover
         )
 
-        print(f"✅ AI Response - Success: {result.success}, Confidence: {result.confidence}, Sources: {len(result.sources)}")
+        logger.debug("✅ AI Response - Success: %s, Confidence: %s, Sources: %s", result.success, result.confidence, len(result.sources))
 
         return result
     except Exception as e:
-        print(f"Error generating AI response: {e}")
+        logger.exception("❌ Error generating AI response: %s", e)
         return AIResponse(
             success=False,
             response=f"I'm sorry, I encountered an error while processing your request. Please try again or contact support.",
@@ -51,7 +57,7 @@ async def ai_chat_response_stream(request: ChatRequest):
         try:
             identifier = request.agentId or request.widgetId
             identifier_type = "Agent" if request.agentId else "Widget"
-            print(f"📨 Streaming AI Chat Request - {identifier_type}: {identifier}, Message: {request.message[:50]}...")
+            logger.debug("📨 Streaming AI Chat Request - %s: %s, Message: %s...", identifier_type, identifier, request.message[:50])
 
             # Track timing
             start_time = time.time()
@@ -72,7 +78,7 @@ async def ai_chat_response_stream(request: ChatRequest):
             yield f"data: {json.dumps({'done': True, 'total_time': total_time})}\n\n"
 
         except Exception as e:
-            print(f"Error in streaming response: {e}")
+            logger.exception("❌ Error in streaming response: %s", e)
             error_data = {
                 "error": True,
                 "message": str(e),
@@ -101,7 +107,7 @@ async def get_available_models():
             "models": models
         }
     except Exception as e:
-        print(f"Error getting available models: {e}")
+        logger.error("❌ Error getting available models: %s", e)
         return {
             "success": False,
             "error": str(e),
@@ -10,6 +10,7 @@ import uuid
 
 from app.services.qdrant_service import qdrant_service
 from app.services.firestore_service import firestore_service
+from app.services.work_executor import work_executor
 
 logger = logging.getLogger(__name__)
 
@@ -31,73 +32,105 @@ class FAQRequest(BaseModel):
         extra = "allow"
 
 
+class FAQBatchRequest(BaseModel):
+    faqs: List[FAQRequest]
+    embedding_provider: str = "voyage"
+    embedding_model: str = "voyage-3"
+
+
+def _faq_item(request: FAQRequest) -> Dict[str, Any]:
+    """Knowledge item for one FAQ, with its Qdrant id (the given item_id / Firestore doc ID, or a new one)"""
+    workspace_id = request.metadata.get('workspace_id', '') or request.metadata.get('business_id', '')
+    tags = request.metadata.get('tags', [])
+    
+    # Format FAQ content for better searchability
+    faq_content = f"Question: {request.question}\n\nAnswer: {request.answer}"
+    
+    # Create rich metadata for Qdrant
+    faq_metadata = {
+        **({'agent_id': request.agent_id, 'agentId': request.agent_id} if request.agent_id else {}),
+        **({'widget_id': request.widget_id, 'widgetId': request.widget_id} if request.widget_id else {}),
+        'workspaceId': workspace_id,
+        'workspace_id': workspace_id,
+        'title': request.title,
+        'question': request.question,
+        'answer': request.answer,
+        'type': 'faq',
+        'tags': tags,
+        'char_count': len(faq_content),
+        'word_count': len(faq_content.split()),
+        'created_at': str(int(time.time())),
+        **request.metadata
+    }
+    
+    # Use provided item_id (Firestore doc ID) or generate unique ID
+    if hasattr(request, 'item_id') and request.item_id:
+        faq_id = request.item_id
+    else:
+        base_owner = request.agent_id or request.widget_id or 'unknown'
+        faq_id = f"faq_{base_owner}_{uuid.uuid4().hex[:12]}_{int(time.time())}"
+    
+    return {
+        'id': faq_id,
+        'workspaceId': workspace_id,
+        **({'agentId': request.agent_id} if request.agent_id else {}),
+        **({'widgetId': request.widget_id} if request.widget_id else {}),
+        'title': request.title,
+        'content': faq_content,
+        'type': 'faq',
+        **faq_metadata
+    }
+
+
+def _store_faq_record(request: FAQRequest, item: Dict[str, Any], vector_id: str) -> Dict[str, Any]:
+    """Store the FAQ in Firestore for tracking"""
+    return firestore_service.store_faq({
+        'faq_id': item['id'],
+        'vector_id': vector_id,
+        **({'agent_id': request.agent_id} if request.agent_id else {}),
+        **({'widget_id': request.widget_id} if request.widget_id else {}),
+        'workspace_id': item['workspace_id'],
+        'title': request.title,
+        'question': request.question,
+        'answer': request.answer,
+        'tags': item['tags'],
+        'char_count': item['char_count'],
+        'word_count': item['word_count'],
+        'type': 'faq',
+        'metadata': request.metadata
+    })
+
+
 @router.post("/store-faq")
 async def store_faq(request: FAQRequest):
     """
     Store FAQ (Question & Answer) to Pinecone and Firestore
     """
     try:
-        workspace_id = request.metadata.get('workspace_id', '') or request.metadata.get('business_id', '')
-        tags = request.metadata.get('tags', [])
+        knowledge_item = _faq_item(request)
+        faq_id = knowledge_item['id']
+        faq_content = knowledge_item['content']
         
         logger.info("\n" + "="*100)
         logger.info(f"💬 STORING FAQ")
         logger.info(f"   Question: {request.question[:60]}...")
-        logger.info(f"   Workspace ID: {workspace_id}")
+        logger.info(f"   Workspace ID: {knowledge_item['workspace_id']}")
         logger.info(f"   Agent ID: {request.agent_id}")
         if request.widget_id:
             logger.info(f"   Widget ID: {request.widget_id}")
         logger.info("="*100 + "\n")
         
-        # Format FAQ content for better searchability
-        faq_content = f"Question: {request.question}\n\nAnswer: {request.answer}"
-        
-        # Create rich metadata for Qdrant
-        faq_metadata = {
-            **({'agent_id': request.agent_id, 'agentId': request.agent_id} if request.agent_id else {}),
-            **({'widget_id': request.widget_id, 'widgetId': request.widget_id} if request.widget_id else {}),
-            'workspaceId': workspace_id,
-            'workspace_id': workspace_id,
-            'title': request.title,
-            'question': request.question,
-            'answer': request.answer,
-            'type': 'faq',
-            'tags': tags,
-            'char_count': len(faq_content),
-            'word_count': len(faq_content.split()),
-            'created_at': str(int(time.time())),
-            **request.metadata
-        }
-        
-        # Use provided item_id (Firestore doc ID) or generate unique ID
-        if hasattr(request, 'item_id') and request.item_id:
-            faq_id = request.item_id
-            logger.info(f"   Using provided item_id: {faq_id}")
-        else:
-            base_owner = request.agent_id or request.widget_id or 'unknown'
-            faq_id = f"faq_{base_owner}_{uuid.uuid4().hex[:12]}_{int(time.time())}"
-            logger.info(f"   Generated new ID: {faq_id}")
-        
         logger.info(f"📝 Storing to Qdrant with embeddings: {request.embedding_provider}/{request.embedding_model}")
         logger.info(f"   FAQ ID: {faq_id}")
         logger.info(f"   Content Length: {len(faq_content)} chars")
         
         # Set embedding provider and model
-        qdrant_service.set_embedding_provider(request.embedding_provider, request.embedding_model)
+        await work_executor.run("ingest", qdrant_service.set_embedding_provider, request.embedding_provider, request.embedding_model)
         
         # Store in Qdrant with specified provider and model
-        result = qdrant_service.store_knowledge_item({
-            'id': faq_id,
-            'workspaceId': workspace_id,
-            **({'agentId': request.agent_id} if request.agent_id else {}),
-            **({'widgetId': request.widget_id} if request.widget_id else {}),
-            'title': request.title,
-            'content': faq_content,
-            'type': 'faq',
-            **faq_metadata
-        })
-        
-        if not result['success']:
+        result = await work_executor.run("ingest", qdrant_service.store_knowledge_items_bulk, [knowledge_item])
+        
+        if not result['success'] or result['failed_items']:
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to store FAQ in Pinecone: {result.get('error', 'Unknown error')}"
@@ -109,23 +142,7 @@ async def store_faq(request: FAQRequest):
         # Store in Firestore for tracking
         logger.info(f"\n💾 Storing to Firestore...")
         
-        firestore_data = {
-            'faq_id': faq_id,
-            'vector_id': result.get('vector_id', faq_id),
-            **({'agent_id': request.agent_id} if request.agent_id else {}),
-            **({'widget_id': request.widget_id} if request.widget_id else {}),
-            'workspace_id': workspace_id,
-            'title': request.title,
-            'question': request.question,
-            'answer': request.answer,
-            'tags': tags,
-            'char_count': len(faq_content),
-            'word_count': len(faq_content.split()),
-            'type': 'faq',
-            'metadata': request.metadata
-        }
-        
-        firestore_result = firestore_service.store_faq(firestore_data)
+        firestore_result = await work_executor.run("ingest", _store_faq_record, request, knowledge_item, result.get('vector_id', faq_id))
         
         if firestore_result['success']:
             logger.info(f"   ✅ Stored to Firestore")
@@ -167,3 +184,57 @@ async def store_faq(request: FAQRequest):
             detail=f"Internal server error: {str(e)}"
         )
 
+
+@router.post("/store-faqs")
+async def store_faqs(request: FAQBatchRequest):
+    """
+    Store many FAQs at once: one embedding pass and parallel upserts for the whole batch
+    """
+    try:
+        if not request.faqs:
+            raise HTTPException(status_code=400, detail="No FAQs to store")
+        
+        items = [_faq_item(faq) for faq in request.faqs]
+        logger.info(f"💬 Storing {len(items)} FAQs with embeddings: {request.embedding_provider}/{request.embedding_model}")
+        
+        await work_executor.run("ingest", qdrant_service.set_embedding_provider, request.embedding_provider, request.embedding_model)
+        result = await work_executor.run("ingest", qdrant_service.store_knowledge_items_bulk, items)
+        
+        failed_items = set(result['failed_items'])
+        stored = []
+        for faq, item in zip(request.faqs, items):
+            if item['id'] in failed_items:
+                continue
+            firestore_result = await work_executor.run("ingest", _store_faq_record, faq, item, item['id'])
+            stored.append({
+                'faq_id': item['id'],
+                'vector_id': item['id'],
+                'question': faq.question,
+                'title': faq.title,
+                'chunks_created': len(result['item_point_ids'].get(item['id'], [])),
+                'firestore_stored': firestore_result['success']
+            })
+        
+        logger.info(f"🎉 Stored {len(stored)}/{len(items)} FAQs")
+        
+        return {
+            'success': True,
+            'message': f'Stored {len(stored)} of {len(items)} FAQs',
+            'data': {
+                'stored': stored,
+                'failed': [item['id'] for item in items if item['id'] in failed_items],
+                'chunks_created': result['chunks_created'],
+                'embedding_seconds': result['embedding_seconds'],
+                'upload_seconds': result['upload_seconds']
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"\n❌ Error storing FAQs: {str(e)}\n")
+        logger.exception(e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
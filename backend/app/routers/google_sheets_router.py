@@ -6,9 +6,12 @@ from fastapi.responses import RedirectResponse
 from typing import Optional
 from pydantic import BaseModel
 import urllib.parse
+import uuid
 
 from app.services.google_sheets_service import google_sheets_service
 from app.services.qdrant_service import qdrant_service
+from app.services.ingestion_jobs import ingestion_jobs, IngestionJob
+from app.services.work_executor import work_executor
 from app.config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI
 
 
@@ -32,6 +35,7 @@ class GoogleSheetsRefreshTokenRequest(BaseModel):
 class GoogleSheetsImportRequest(BaseModel):
     access_token: str
     spreadsheet_id: str
+    item_id: Optional[str] = None  # Re-sync an earlier import incrementally
     sheet_name: Optional[str] = None
     agent_id: Optional[str] = None
     widget_id: Optional[str] = None
@@ -39,6 +43,7 @@ class GoogleSheetsImportRequest(BaseModel):
     embedding_provider: Optional[str] = "voyage"
     embedding_model: Optional[str] = "voyage-3"
     metadata: Optional[dict] = {}
+    background: bool = False  # Queue an ingestion job and return its id immediately
 
 
 @router.get("/oauth/authorize")
@@ -198,8 +203,28 @@ async def refresh_token(request: GoogleSheetsRefreshTokenRequest):
 
 @router.post("/import-sheet")
 async def import_sheet(request: GoogleSheetsImportRequest):
-    """Import a Google Sheet to knowledge base"""
+    """
+    Import a Google Sheet to knowledge base
+    With background=true the import runs as an ingestion job; poll /api/ingestion/jobs/{job_id}
+    """
+    if request.background:
+        job = ingestion_jobs.enqueue("google-sheet", request.dict())
+        return {
+            "success": True,
+            "message": "Google Sheet import queued",
+            "job_id": job.id,
+            "status": job.status
+        }
+
+    return await work_executor.run("ingest", _import_sheet, request)
+
+
+def _import_sheet(request: GoogleSheetsImportRequest, job: Optional[IngestionJob] = None) -> dict:
+    """Fetch a sheet and store it (blocking; run off the event loop)"""
     try:
+        if job:
+            ingestion_jobs.set_stage(job, "extract", units_total=1, units_done=0)
+
         print(f"📥 Importing Google Sheet: {request.spreadsheet_id}")
 
         # Fetch sheet data from Google Sheets API
@@ -219,9 +244,8 @@ async def import_sheet(request: GoogleSheetsImportRequest):
         if not content or not content.strip():
             raise HTTPException(status_code=400, detail="Sheet has no content to import")
 
-        # Generate unique item ID
-        import uuid
-        item_id = f"gsheet-{uuid.uuid4().hex[:8]}"
+        # Generate unique item ID (or reuse the one being re-synced)
+        item_id = request.item_id or f"gsheet-{uuid.uuid4().hex[:8]}"
 
         # Support both agent-based and widget-based patterns
         workspace_id = request.metadata.get("workspace_id") or request.metadata.get("business_id", "unknown")
@@ -233,6 +257,7 @@ async def import_sheet(request: GoogleSheetsImportRequest):
             **({'widgetId': request.widget_id} if request.widget_id else {}),
             "title": title,
             "content": content,
+            "chunks": sheet_data["chunks"],  # whole rows under a repeated header
             "type": "google_sheets",
             "googleSheetId": request.spreadsheet_id,
             "sheetName": sheet_data.get("sheet_name"),
@@ -257,11 +282,15 @@ async def import_sheet(request: GoogleSheetsImportRequest):
             if not qdrant_service.embeddings:
                 raise HTTPException(status_code=500, detail="OpenAI embeddings not initialized")
 
-        # Store in Qdrant (with both dense and sparse vectors)
-        result = qdrant_service.store_knowledge_item(
-            knowledge_item,
+        # Store in Qdrant (with both dense and sparse vectors); a re-sync only embeds changed chunks
+        if job:
+            ingestion_jobs.set_stage(job, "chunk")
+        result = qdrant_service.store_knowledge_items_bulk(
+            [knowledge_item],
             request.embedding_provider,
-            request.embedding_model
+            request.embedding_model,
+            ingestion_jobs.embed_progress(job) if job else None,
+            sync=bool(request.item_id)
         )
 
         return {
@@ -271,6 +300,7 @@ async def import_sheet(request: GoogleSheetsImportRequest):
             "title": title,
             "content": content,
             "chunks_created": result.get("chunks_created", 0),
+            **({key: result[key] for key in ("added", "kept", "removed")} if request.item_id else {}),
             "rows_count": sheet_data.get("rows_count", 0),
             "url": knowledge_item["url"]
         }
@@ -280,3 +310,19 @@ async def import_sheet(request: GoogleSheetsImportRequest):
     except Exception as e:
         print(f"❌ Error importing Google Sheet: {e}")
         raise HTTPException(status_code=500, detail=f"Error importing sheet: {str(e)}")
+
+
+async def run_sheet_import_job(job: IngestionJob) -> dict:
+    """
+    Ingestion job for /import-sheet with background=true
+    The item id is fixed when the job starts, so a resumed import is synced rather than duplicated
+    """
+    request = GoogleSheetsImportRequest(**job.params)
+    request.item_id = request.item_id or f"gsheet-{job.id[:8]}"
+    result = await work_executor.run("ingest", _import_sheet, request, job)
+    ingestion_jobs.complete_unit(job, 1)
+    # Sheet content is already in Qdrant; keep the persisted job result small
+    return {key: value for key, value in result.items() if key != "content"}
+
+
+ingestion_jobs.register_handler("google-sheet", run_sheet_import_job)
@@ -2,9 +2,17 @@
 Health check and testing router
 """
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
 
 from app.services.qdrant_service import qdrant_service
 from app.services.openrouter_service import openrouter_service
+from app.services.llm_service import llm_service
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.document_embedding_cache import document_embedding_cache
+from app.services.response_cache import response_cache
+from app.services.metrics_service import metrics
+from app.services.browser_pool import browser_pool
+from app.services.work_executor import work_executor
 
 router = APIRouter(tags=["health"])
 
@@ -33,7 +41,15 @@ async def health_check():
             "services": {
                 "qdrant": qdrant_status,
                 "embeddings": embeddings_status,
-                "openrouter": "available"
+                "openrouter": "available",
+                "browser_pool": browser_pool.get_stats(),
+                "work_executor": work_executor.get_stats()
+            },
+            "caches": {
+                "query_embeddings": query_embedding_cache.get_stats(),
+                "document_embeddings": document_embedding_cache.get_stats(),
+                "semantic_responses": response_cache.get_stats(),
+                "llm_clients": llm_service.get_client_stats()
             }
         }
     except Exception as e:
@@ -49,6 +65,12 @@ async def health_check():
         }
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Chat pipeline stage latencies and counters in Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @router.post("/api/test-qdrant")
 async def test_qdrant_connection():
     """Test Qdrant connection by checking collection stats"""
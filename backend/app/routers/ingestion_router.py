@@ -0,0 +1,78 @@
+"""
+Ingestion job status router
+Jobs are created by the import endpoints when called with background=true
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import asyncio
+import json
+
+from app.services.ingestion_jobs import ingestion_jobs, TERMINAL_STATUSES
+
+router = APIRouter(prefix="/api/ingestion", tags=["ingestion"])
+
+# How often the progress stream checks a job for changes (seconds)
+EVENT_POLL_INTERVAL = 0.5
+# Comment line sent when nothing changed for a while, so proxies keep the stream open
+KEEPALIVE_INTERVAL = 15.0
+
+
+@router.get("/jobs")
+async def list_jobs(workspace_id: Optional[str] = None, agent_id: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    """Recent ingestion jobs of a workspace and/or agent, newest first"""
+    if not workspace_id and not agent_id:
+        raise HTTPException(status_code=400, detail="workspace_id or agent_id is required")
+    jobs = ingestion_jobs.list_jobs(workspace_id=workspace_id, agent_id=agent_id, status=status, limit=limit)
+    return {
+        "success": True,
+        "jobs": [job.to_dict() for job in jobs]
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, current stage and progress of an ingestion job"""
+    job = ingestion_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return {
+        "success": True,
+        **job.to_dict()
+    }
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events with the job state every time it changes, until it completes or fails"""
+    if not ingestion_jobs.get(job_id):
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+
+    async def generate():
+        last_version = None
+        idle = 0.0
+        while True:
+            job = ingestion_jobs.get(job_id)
+            if job is None:
+                return
+            if job.version != last_version:
+                last_version = job.version
+                idle = 0.0
+                yield f"data: {json.dumps(job.to_dict())}\n\n"
+            elif idle >= KEEPALIVE_INTERVAL:
+                idle = 0.0
+                yield ": keepalive\n\n"
+            if job.status in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+            idle += EVENT_POLL_INTERVAL
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -2,13 +2,20 @@
 Knowledge base router for Qdrant operations
 """
 from fastapi import APIRouter, HTTPException, File, UploadFile, Form
-from typing import Optional
+from typing import Iterator, Optional
 import json
+import os
+import shutil
+import tempfile
 import uuid
 
 from app.models import KnowledgeBaseItem, SearchRequest, DocumentUploadResponse
 from app.services.qdrant_service import qdrant_service
 from app.services.r2_service import r2_service
+from app.services.ingestion_jobs import ingestion_jobs, IngestionJob
+from app.services.pdf_extraction import pdf_extractor
+from app.services.work_executor import work_executor
+from app.config import UPLOAD_SPOOL_DIR
 
 router = APIRouter(prefix="/api/knowledge-base", tags=["knowledge-base"])
 
@@ -19,14 +26,141 @@ async def store_knowledge_item(item: KnowledgeBaseItem, embedding_model: str = "
     try:
         # Set embedding model if provided
         if embedding_model:
-            qdrant_service.set_embedding_model(embedding_model)
+            await work_executor.run("ingest", qdrant_service.set_embedding_model, embedding_model)
         
-        result = qdrant_service.store_knowledge_item(item.dict())
+        result = await work_executor.run("ingest", qdrant_service.store_knowledge_item, item.dict())
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/sync")
+async def sync_knowledge_item(item: KnowledgeBaseItem):
+    """
+    Re-ingest an existing knowledge base item incrementally
+    Only new chunks are embedded, vanished chunks are deleted and unchanged ones are left alone
+    """
+    try:
+        result = await work_executor.run("ingest", qdrant_service.sync_knowledge_item, item.dict())
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _spool_upload(file: UploadFile) -> str:
+    """Copy an upload to a temporary file in pieces (blocking); returns its path, which the caller removes"""
+    suffix = os.path.splitext(file.filename or "")[1]
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=UPLOAD_SPOOL_DIR) as spool:
+        shutil.copyfileobj(file.file, spool, 1024 * 1024)
+    return spool.name
+
+
+def _pdf_sections(path: str, filename: str, job: Optional[IngestionJob] = None) -> Iterator[str]:
+    """Text of each PDF page, extracted in worker processes and yielded as pages complete"""
+    pages = 0
+    characters = 0
+    for _, text in pdf_extractor.iter_pages(path):
+        pages += 1
+        characters += len(text)
+        if job:
+            ingestion_jobs.update_progress(job, pages_extracted=pages)
+        yield text
+    print(f"📄 PDF processed: {filename}, extracted {characters} characters from {pages} pages")
+
+
+def _text_sections(path: str, filename: str) -> Iterator[str]:
+    """Text file contents in 1 MB pieces"""
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        while True:
+            piece = f.read(1024 * 1024)
+            if not piece:
+                break
+            yield piece
+    print(f"📝 Text file processed: {filename}")
+
+
+def _process_upload_file(path: str, filename: str, content_type: Optional[str], document_type: str,
+                         workspace_id: Optional[str], agent_id: Optional[str], job: Optional[IngestionJob] = None):
+    """
+    Store a spooled upload in R2 and prepare its text; returns (sections, file_info, file_url)
+    sections yields the text a page (PDF) or a piece (text file) at a time and reads the file while it is consumed
+    """
+    file_info = {
+        "fileName": filename,
+        "fileSize": os.path.getsize(path),
+        "contentType": content_type or ("application/pdf" if document_type == "pdf" else "text/plain")
+    }
+    
+    # Upload to R2 storage
+    file_url = None
+    with open(path, "rb") as f:
+        r2_result = r2_service.upload_file(
+            file_content=f,
+            filename=filename,
+            content_type=file_info["contentType"],
+            workspace_id=workspace_id,
+            agent_id=agent_id
+        )
+    
+    if r2_result["success"]:
+        file_url = r2_result["file_url"]
+        print(f"📦 File uploaded to R2: {file_url}")
+    else:
+        print(f"⚠️ R2 upload failed: {r2_result.get('error')}")
+    
+    sections = _pdf_sections(path, filename, job) if document_type == "pdf" else _text_sections(path, filename)
+    return sections, file_info, file_url
+
+
+def _store_upload_file(knowledge_item: dict, sections: Iterator[str], document_type: str, embedding_provider: Optional[str],
+                       embedding_model: Optional[str], progress_callback=None, sync: bool = False) -> dict:
+    """Chunk, embed and upsert an uploaded file's text as it is extracted (blocking)"""
+    try:
+        return qdrant_service.store_knowledge_item_stream(
+            knowledge_item, sections, embedding_provider, embedding_model, progress_callback, sync=sync
+        )
+    except ValueError:
+        kind = "this PDF" if document_type == "pdf" else "this file"
+        raise HTTPException(status_code=400, detail=f"No text could be extracted from {kind}")
+
+
+def _build_upload_item(item_id: str, parsed_metadata: dict, widget_id: Optional[str], agent_id: Optional[str], title: str,
+                       document_type: str, content: str, file_info: dict, file_url: Optional[str]) -> dict:
+    """Knowledge base item for an uploaded document"""
+    return {
+        "id": item_id,
+        "workspaceId": parsed_metadata.get("workspace_id", "unknown"),
+        **({'widgetId': widget_id} if widget_id else {}),
+        **({'agentId': agent_id} if agent_id else {}),
+        "title": title,
+        "content": content,
+        "type": document_type,
+        "fileName": file_info.get("fileName"),
+        "fileSize": file_info.get("fileSize"),
+        **({'fileUrl': file_url} if file_url else {})
+    }
+
+
+def _prepare_embeddings(embedding_provider: Optional[str], embedding_model: Optional[str]):
+    """Switch to the requested embedding provider/collection and make sure it is usable"""
+    if not qdrant_service.qdrant_client:
+        raise HTTPException(status_code=500, detail="Qdrant client not initialized")
+    
+    # Set embedding provider and model from request (widget configuration)
+    if embedding_provider and embedding_model:
+        print(f"🔄 Using embeddings: {embedding_provider}/{embedding_model}")
+        qdrant_service.set_embedding_provider(embedding_provider, embedding_model)
+    
+    # Check if embeddings are ready
+    if embedding_provider == "voyage":
+        if not qdrant_service.voyage_service.client:
+            raise HTTPException(status_code=500, detail="Voyage AI embeddings not initialized")
+    else:
+        if not qdrant_service.embeddings:
+            raise HTTPException(status_code=500, detail="OpenAI embeddings not initialized")
+
+
 @router.post("/upload")
 async def upload_document(
     widget_id: Optional[str] = Form(None),
@@ -38,7 +172,8 @@ async def upload_document(
     file: Optional[UploadFile] = File(None),
     embedding_provider: Optional[str] = Form("voyage"),
     embedding_model: Optional[str] = Form("voyage-3"),
-    item_id: Optional[str] = Form(None)  # NEW: Accept Firestore document ID
+    item_id: Optional[str] = Form(None),  # NEW: Accept Firestore document ID
+    background: bool = Form(False)  # Queue an ingestion job and return its id immediately
 ):
     """Upload and process documents (text or PDF) to knowledge base"""
     try:
@@ -57,106 +192,65 @@ async def upload_document(
             item_id = f"upload-{uuid.uuid4().hex[:8]}"
             print(f"   Generated new ID: {item_id}")
         
-        # Process content based on document type
-        final_content = content or ""
-        file_info = {}
-        
-        file_url = None
-        
-        if file and document_type == "pdf":
-            # Read and process PDF file
-            file_content = await file.read()
-            file_info = {
-                "fileName": file.filename,
-                "fileSize": len(file_content),
-                "contentType": file.content_type or "application/pdf"
-            }
-            
-            # Upload to R2 storage
-            r2_result = r2_service.upload_file(
-                file_content=file_content,
-                filename=file.filename,
-                content_type=file_info["contentType"],
-                workspace_id=parsed_metadata.get("workspace_id"),
-                agent_id=agent_id
-            )
-            
-            if r2_result["success"]:
-                file_url = r2_result["file_url"]
-                print(f"📦 File uploaded to R2: {file_url}")
-            else:
-                print(f"⚠️ R2 upload failed: {r2_result.get('error')}")
-            
-            # Extract text from PDF
-            extracted_text = qdrant_service.extract_text_from_pdf(file_content)
-            final_content = extracted_text
-            
-            print(f"📄 PDF processed: {file.filename}, extracted {len(extracted_text)} characters")
+        has_file = file is not None and document_type in ("pdf", "text")
+        # The upload is copied to disk in pieces and read from there - never held in memory whole
+        spool_path = await work_executor.run("ingest", _spool_upload, file) if has_file else None
         
-        elif file and document_type == "text":
-            # Handle text file upload
-            file_content = await file.read()
-            file_info = {
-                "fileName": file.filename,
-                "fileSize": len(file_content),
-                "contentType": file.content_type or "text/plain"
-            }
+        try:
+            if background:
+                file_size = os.path.getsize(spool_path) if has_file else None
+                job = ingestion_jobs.enqueue(
+                    "upload",
+                    {
+                        "item_id": item_id,
+                        "widget_id": widget_id,
+                        "agent_id": agent_id,
+                        "title": title,
+                        "document_type": document_type,
+                        "content": content,
+                        "metadata": parsed_metadata,
+                        "file_name": file.filename if has_file else None,
+                        "content_type": file.content_type if has_file else None,
+                        "embedding_provider": embedding_provider,
+                        "embedding_model": embedding_model
+                    },
+                    files={file.filename: spool_path} if has_file else None
+                )
+                return DocumentUploadResponse(
+                    success=True,
+                    message=f"Document '{title}' queued for processing",
+                    id=item_id,
+                    processing_status="queued",
+                    fileName=file.filename if has_file else None,
+                    fileSize=file_size,
+                    jobId=job.id
+                )
             
-            # Upload to R2 storage
-            r2_result = r2_service.upload_file(
-                file_content=file_content,
-                filename=file.filename,
-                content_type=file_info["contentType"],
-                workspace_id=parsed_metadata.get("workspace_id"),
-                agent_id=agent_id
-            )
+            await work_executor.run("ingest", _prepare_embeddings, embedding_provider, embedding_model)
             
-            if r2_result["success"]:
-                file_url = r2_result["file_url"]
-                print(f"📦 File uploaded to R2: {file_url}")
+            if has_file:
+                # Pages are extracted, chunked, embedded and upserted as a stream
+                sections, file_info, file_url = await work_executor.run(
+                    "ingest", _process_upload_file, spool_path, file.filename, file.content_type, document_type,
+                    parsed_metadata.get("workspace_id"), agent_id
+                )
+                knowledge_item = _build_upload_item(
+                    item_id, parsed_metadata, widget_id, agent_id, title, document_type, "", file_info, file_url
+                )
+                result = await work_executor.run(
+                    "ingest", _store_upload_file, knowledge_item, sections, document_type, embedding_provider, embedding_model
+                )
             else:
-                print(f"⚠️ R2 upload failed: {r2_result.get('error')}")
-            
-            try:
-                final_content = file_content.decode('utf-8')
-            except UnicodeDecodeError:
-                final_content = file_content.decode('utf-8', errors='ignore')
-            
-            print(f"📝 Text file processed: {file.filename}")
-        
-        # Create knowledge base item
-        knowledge_item = {
-            "id": item_id,
-            "workspaceId": parsed_metadata.get("workspace_id", "unknown"),
-            **({'widgetId': widget_id} if widget_id else {}),
-            **({'agentId': agent_id} if agent_id else {}),
-            "title": title,
-            "content": final_content,
-            "type": document_type,
-            "fileName": file_info.get("fileName"),
-            "fileSize": file_info.get("fileSize"),
-            **({'fileUrl': file_url} if file_url else {})
-        }
-        
-        # Store in Qdrant
-        if not qdrant_service.qdrant_client:
-            raise HTTPException(status_code=500, detail="Qdrant client not initialized")
-        
-        # Set embedding provider and model from request (widget configuration)
-        if embedding_provider and embedding_model:
-            print(f"🔄 Using embeddings: {embedding_provider}/{embedding_model}")
-            qdrant_service.set_embedding_provider(embedding_provider, embedding_model)
-        
-        # Check if embeddings are ready
-        if embedding_provider == "voyage":
-            if not qdrant_service.voyage_service.client:
-                raise HTTPException(status_code=500, detail="Voyage AI embeddings not initialized")
-        else:
-            if not qdrant_service.embeddings:
-                raise HTTPException(status_code=500, detail="OpenAI embeddings not initialized")
-        
-        # Use Qdrant service to store
-        result = qdrant_service.store_knowledge_item(knowledge_item, embedding_provider, embedding_model)
+                file_info = {}
+                file_url = None
+                knowledge_item = _build_upload_item(
+                    item_id, parsed_metadata, widget_id, agent_id, title, document_type, content or "", file_info, file_url
+                )
+                result = await work_executor.run("ingest", qdrant_service.store_knowledge_item, knowledge_item, embedding_provider, embedding_model)
+            print(f"⚡ Embedded {result['chunks_created']} chunks for '{title}' ({result.get('chunks_per_second')} chunks/s)")
+        finally:
+            if spool_path and os.path.exists(spool_path):
+                os.remove(spool_path)
         
         return DocumentUploadResponse(
             success=True,
@@ -168,11 +262,62 @@ async def upload_document(
             fileSize=file_info.get("fileSize")
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error uploading document: {e}")
         raise HTTPException(status_code=500, detail=f"Error uploading document: {str(e)}")
 
 
+async def run_upload_job(job: IngestionJob) -> dict:
+    """Ingestion job for /upload?background=true: extract -> chunk -> embed -> upsert"""
+    params = job.params
+    ingestion_jobs.set_stage(job, "extract", units_total=1, units_done=0)
+    await work_executor.run("ingest", _prepare_embeddings, params.get("embedding_provider"), params.get("embedding_model"))
+    progress = ingestion_jobs.embed_progress(job)
+    
+    # An interrupted run may have stored part of the document already - sync picks up where it stopped
+    file_path = (params.get("files") or {}).get(params.get("file_name") or "")
+    if file_path:
+        sections, file_info, file_url = await work_executor.run(
+            "ingest", _process_upload_file, file_path, params["file_name"], params.get("content_type"),
+            params["document_type"], params["metadata"].get("workspace_id"), params.get("agent_id"), job
+        )
+        knowledge_item = _build_upload_item(
+            params["item_id"], params["metadata"], params.get("widget_id"), params.get("agent_id"), params["title"],
+            params["document_type"], "", file_info, file_url
+        )
+        result = await work_executor.run(
+            "ingest", _store_upload_file, knowledge_item, sections, params["document_type"], params.get("embedding_provider"),
+            params.get("embedding_model"), progress, job.resumed
+        )
+    else:
+        file_info = {}
+        file_url = None
+        knowledge_item = _build_upload_item(
+            params["item_id"], params["metadata"], params.get("widget_id"), params.get("agent_id"), params["title"],
+            params["document_type"], params.get("content") or "", file_info, file_url
+        )
+        ingestion_jobs.set_stage(job, "chunk")
+        store = qdrant_service.sync_knowledge_item if job.resumed else qdrant_service.store_knowledge_item
+        result = await work_executor.run(
+            "ingest", store, knowledge_item, params.get("embedding_provider"), params.get("embedding_model"), progress
+        )
+    ingestion_jobs.complete_unit(job, 1)
+    
+    return {
+        "id": params["item_id"],
+        "title": params["title"],
+        "fileUrl": file_url,
+        "fileName": file_info.get("fileName"),
+        "fileSize": file_info.get("fileSize"),
+        **{key: result.get(key) for key in ("chunks_created", "embedding_cache_hits", "chunks_per_second", "points_per_second")}
+    }
+
+
+ingestion_jobs.register_handler("upload", run_upload_job)
+
+
 @router.post("/search")
 async def search_knowledge_base(request: SearchRequest):
     """Search knowledge base using semantic search"""
@@ -3,13 +3,17 @@ Notion integration router with OAuth support
 """
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import RedirectResponse
-from typing import Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from pydantic import BaseModel
+import asyncio
 import urllib.parse
+import uuid
 
 from app.services.notion_service import notion_service
 from app.services.qdrant_service import qdrant_service
-from app.config import NOTION_CLIENT_ID, NOTION_CLIENT_SECRET, NOTION_REDIRECT_URI
+from app.services.ingestion_jobs import ingestion_jobs, IngestionJob
+from app.services.work_executor import work_executor
+from app.config import NOTION_CLIENT_ID, NOTION_CLIENT_SECRET, NOTION_REDIRECT_URI, NOTION_IMPORT_BATCH_PAGES
 
 
 router = APIRouter(prefix="/api/notion", tags=["notion"])
@@ -27,6 +31,7 @@ class NotionSearchRequest(BaseModel):
 class NotionImportRequest(BaseModel):
     api_key: str
     page_id: str
+    item_id: Optional[str] = None  # Re-sync an earlier import incrementally
     widget_id: Optional[str] = None
     agent_id: Optional[str] = None
     title: Optional[str] = None
@@ -44,6 +49,7 @@ class NotionDatabaseImportRequest(BaseModel):
     embedding_provider: Optional[str] = "voyage"
     embedding_model: Optional[str] = "voyage-3"
     metadata: Optional[dict] = {}
+    background: bool = False  # Queue an ingestion job and return its id immediately
 
 
 class NotionOAuthCallbackRequest(BaseModel):
@@ -102,7 +108,7 @@ async def handle_oauth_callback(request: NotionOAuthCallbackRequest):
             )
 
         # Exchange code for token
-        token_result = notion_service.exchange_code_for_token(
+        token_result = await notion_service.exchange_code_for_token(
             code=request.code,
             client_id=NOTION_CLIENT_ID,
             client_secret=NOTION_CLIENT_SECRET,
@@ -148,7 +154,7 @@ async def handle_oauth_callback(request: NotionOAuthCallbackRequest):
 async def test_notion_connection(request: NotionTestRequest):
     """Test Notion API connection"""
     try:
-        result = notion_service.test_connection(request.api_key)
+        result = await notion_service.test_connection(request.api_key)
         
         if result["success"]:
             return {
@@ -169,7 +175,7 @@ async def test_notion_connection(request: NotionTestRequest):
 async def search_notion_pages(request: NotionSearchRequest):
     """Search for pages in Notion workspace"""
     try:
-        result = notion_service.search_pages(request.api_key, request.query)
+        result = await notion_service.search_pages(request.api_key, request.query)
         
         if result["success"]:
             return {
@@ -193,71 +199,15 @@ async def import_notion_page(request: NotionImportRequest):
         print(f"📥 Importing Notion page: {request.page_id}")
         
         # Fetch page content from Notion
-        page_data = notion_service.get_page_content(request.api_key, request.page_id)
+        page_data = await notion_service.get_page_content(request.api_key, request.page_id)
         
         if not page_data.get("success"):
             raise HTTPException(status_code=400, detail=page_data.get("error", "Failed to fetch page"))
         
-        # Prepare knowledge base item
-        title = request.title or page_data["title"]
-        content = page_data["content"]
-        
-        if not content or not content.strip():
+        if not page_data["content"] or not page_data["content"].strip():
             raise HTTPException(status_code=400, detail="Page has no content to import")
         
-        # Generate unique item ID
-        import uuid
-        item_id = f"notion-{uuid.uuid4().hex[:8]}"
-        
-        # Support both agent-based and widget-based patterns
-        workspace_id = request.metadata.get("workspace_id") or request.metadata.get("business_id", "unknown")
-
-        knowledge_item = {
-            "id": item_id,
-            "workspaceId": workspace_id,
-            **({'agentId': request.agent_id} if request.agent_id else {}),
-            **({'widgetId': request.widget_id} if request.widget_id else {}),
-            "title": title,
-            "content": content,
-            "type": "notion",
-            "notionPageId": request.page_id,
-            "notionUrl": page_data.get("url"),
-            "blocksCount": page_data.get("blocks_count", 0)
-        }
-        
-        # Check Qdrant client
-        if not qdrant_service.qdrant_client:
-            raise HTTPException(status_code=500, detail="Qdrant client not initialized")
-        
-        # Set embedding provider and model
-        if request.embedding_provider and request.embedding_model:
-            print(f"🔄 Using embeddings: {request.embedding_provider}/{request.embedding_model}")
-            qdrant_service.set_embedding_provider(request.embedding_provider, request.embedding_model)
-        
-        # Verify embeddings are ready
-        if request.embedding_provider == "voyage":
-            if not qdrant_service.voyage_service.client:
-                raise HTTPException(status_code=500, detail="Voyage AI embeddings not initialized")
-        else:
-            if not qdrant_service.embeddings:
-                raise HTTPException(status_code=500, detail="OpenAI embeddings not initialized")
-        
-        # Store in Qdrant (with both dense and sparse vectors)
-        result = qdrant_service.store_knowledge_item(
-            knowledge_item,
-            request.embedding_provider,
-            request.embedding_model
-        )
-        
-        return {
-            "success": True,
-            "message": f"Notion page '{title}' imported successfully",
-            "id": item_id,
-            "title": title,
-            "content": content,
-            "chunks_created": result.get("chunks_created", 0),
-            "url": page_data.get("url")
-        }
+        return await work_executor.run("ingest", _store_page, request, page_data)
         
     except HTTPException:
         raise
@@ -266,14 +216,171 @@ async def import_notion_page(request: NotionImportRequest):
         raise HTTPException(status_code=500, detail=f"Error importing page: {str(e)}")
 
 
+def _page_item(request: NotionImportRequest, page_data: dict, item_id: str) -> dict:
+    """Knowledge base item for a fetched Notion page"""
+    # Support both agent-based and widget-based patterns
+    workspace_id = request.metadata.get("workspace_id") or request.metadata.get("business_id", "unknown")
+    
+    return {
+        "id": item_id,
+        "workspaceId": workspace_id,
+        **({'agentId': request.agent_id} if request.agent_id else {}),
+        **({'widgetId': request.widget_id} if request.widget_id else {}),
+        "title": request.title or page_data["title"],
+        "content": page_data["content"],
+        "type": "notion",
+        "notionPageId": request.page_id,
+        "notionUrl": page_data.get("url"),
+        "blocksCount": page_data.get("blocks_count", 0)
+    }
+
+
+def _prepare_embeddings(embedding_provider: Optional[str], embedding_model: Optional[str]):
+    """Select the embedding provider/model once per import and check it is ready"""
+    # Check Qdrant client
+    if not qdrant_service.qdrant_client:
+        raise HTTPException(status_code=500, detail="Qdrant client not initialized")
+    
+    # Set embedding provider and model
+    if embedding_provider and embedding_model:
+        print(f"🔄 Using embeddings: {embedding_provider}/{embedding_model}")
+        qdrant_service.set_embedding_provider(embedding_provider, embedding_model)
+    
+    # Verify embeddings are ready
+    if embedding_provider == "voyage":
+        if not qdrant_service.voyage_service.client:
+            raise HTTPException(status_code=500, detail="Voyage AI embeddings not initialized")
+    else:
+        if not qdrant_service.embeddings:
+            raise HTTPException(status_code=500, detail="OpenAI embeddings not initialized")
+
+
+def _store_page(request: NotionImportRequest, page_data: dict) -> dict:
+    """Store a fetched Notion page (blocking; run off the event loop)"""
+    # Generate unique item ID (or reuse the one being re-synced)
+    item_id = request.item_id or f"notion-{uuid.uuid4().hex[:8]}"
+    knowledge_item = _page_item(request, page_data, item_id)
+    
+    _prepare_embeddings(request.embedding_provider, request.embedding_model)
+    
+    # Store in Qdrant (with both dense and sparse vectors); a re-sync only embeds changed chunks
+    result = qdrant_service.store_knowledge_items_bulk(
+        [knowledge_item],
+        request.embedding_provider,
+        request.embedding_model,
+        sync=bool(request.item_id)
+    )
+    
+    return {
+        "success": True,
+        "message": f"Notion page '{knowledge_item['title']}' imported successfully",
+        "id": item_id,
+        "title": knowledge_item["title"],
+        "content": knowledge_item["content"],
+        "chunks_created": result.get("chunks_created", 0),
+        **({key: result[key] for key in ("added", "kept", "removed")} if request.item_id else {}),
+        "url": page_data.get("url")
+    }
+
+
+async def _fetch_batches(request: NotionDatabaseImportRequest, pages: List[dict], first: int = 0) -> AsyncIterator[Tuple[int, List[dict], List[dict]]]:
+    """
+    (start, pages, page contents) for each batch of NOTION_IMPORT_BATCH_PAGES database pages from `first` on
+    Each page is fetched once, concurrently; the next batch is fetched while the caller stores this one
+    """
+    starts = list(range(first, len(pages), NOTION_IMPORT_BATCH_PAGES))
+    
+    def fetch(start: int) -> asyncio.Task:
+        return asyncio.create_task(notion_service.get_pages_content(request.api_key, pages[start:start + NOTION_IMPORT_BATCH_PAGES]))
+    
+    next_fetch = fetch(starts[0]) if starts else None
+    try:
+        for index, start in enumerate(starts):
+            page_contents = await next_fetch
+            next_fetch = fetch(starts[index + 1]) if index + 1 < len(starts) else None
+            yield start, pages[start:start + NOTION_IMPORT_BATCH_PAGES], page_contents
+    finally:
+        if next_fetch:
+            next_fetch.cancel()
+
+
+def _import_database_pages(request: NotionDatabaseImportRequest, pages: List[dict], page_contents: List[dict],
+                           item_ids: List[str]) -> Tuple[List[dict], List[dict]]:
+    """
+    Store a batch of fetched database pages with one bulk embed/upsert (blocking; run off the event loop)
+    Returns (imported_pages, failed_pages)
+    """
+    items = []
+    imported_pages = []
+    failed_pages = []
+    for page, page_data, item_id in zip(pages, page_contents, item_ids):
+        page_request = NotionImportRequest(
+            api_key=request.api_key,
+            page_id=page["id"],
+            item_id=item_id,
+            widget_id=request.widget_id,
+            agent_id=request.agent_id,
+            title=page["title"],
+            metadata=request.metadata
+        )
+        if not page_data.get("success"):
+            failed_pages.append({"page_id": page["id"], "title": page["title"], "error": page_data.get("error", "Failed to fetch page")})
+        elif not page_data["content"] or not page_data["content"].strip():
+            failed_pages.append({"page_id": page["id"], "title": page["title"], "error": "Page has no content to import"})
+        else:
+            items.append((page, page_data, _page_item(page_request, page_data, item_id)))
+    
+    if not items:
+        return imported_pages, failed_pages
+    
+    # Items keep their ids across a resumed job, so storing a batch again is synced rather than duplicated
+    try:
+        result = qdrant_service.store_knowledge_items_bulk(
+            [item for _, _, item in items],
+            request.embedding_provider,
+            request.embedding_model,
+            sync=True
+        )
+    except Exception as e:
+        failed_pages.extend({"page_id": page["id"], "title": page["title"], "error": str(e)} for page, _, _ in items)
+        return imported_pages, failed_pages
+    
+    for page, page_data, item in items:
+        if item["id"] in result["failed_items"]:
+            failed_pages.append({"page_id": page["id"], "title": page["title"], "error": "Upload to Qdrant failed"})
+            continue
+        imported_pages.append({
+            "success": True,
+            "message": f"Notion page '{item['title']}' imported successfully",
+            "id": item["id"],
+            "title": item["title"],
+            "content": item["content"],
+            "chunks_created": len(result["item_point_ids"].get(item["id"], [])),
+            "url": page_data.get("url")
+        })
+    return imported_pages, failed_pages
+
+
 @router.post("/import-database")
 async def import_notion_database(request: NotionDatabaseImportRequest):
-    """Import all pages from a Notion database"""
+    """
+    Import all pages from a Notion database
+    With background=true the import runs as an ingestion job; poll /api/ingestion/jobs/{job_id}
+    """
+    if request.background:
+        job = ingestion_jobs.enqueue("notion-database", request.dict())
+        return {
+            "success": True,
+            "message": "Notion database import queued",
+            "job_id": job.id,
+            "status": job.status
+        }
+    
     try:
         print(f"📊 Importing Notion database: {request.database_id}")
         
-        # Fetch database content
-        db_data = notion_service.get_database_content(request.api_key, request.database_id)
+        # List the database's pages (their content is fetched batch by batch below)
+        db_data = await notion_service.query_database(request.api_key, request.database_id)
         
         if not db_data.get("success"):
             raise HTTPException(status_code=400, detail=db_data.get("error", "Failed to fetch database"))
@@ -283,34 +390,23 @@ async def import_notion_database(request: NotionDatabaseImportRequest):
         if not pages:
             raise HTTPException(status_code=400, detail="Database has no pages to import")
         
-        # Import each page
+        await work_executor.run("ingest", _prepare_embeddings, request.embedding_provider, request.embedding_model)
+        
+        # Import the pages a batch at a time, each batch with one bulk embed/upsert
         imported_pages = []
         failed_pages = []
         
-        for page in pages:
-            try:
-                import_result = await import_notion_page(NotionImportRequest(
-                    api_key=request.api_key,
-                    page_id=page["id"],
-                    widget_id=request.widget_id,
-                    agent_id=request.agent_id,
-                    title=page["title"],
-                    embedding_provider=request.embedding_provider,
-                    embedding_model=request.embedding_model,
-                    metadata=request.metadata
-                ))
-                imported_pages.append(import_result)
-            except Exception as e:
-                failed_pages.append({
-                    "page_id": page["id"],
-                    "title": page["title"],
-                    "error": str(e)
-                })
+        async for _, batch, page_contents in _fetch_batches(request, pages):
+            imported, failed = await work_executor.run(
+                "ingest", _import_database_pages, request, batch, page_contents, [f"notion-{uuid.uuid4().hex[:8]}" for _ in batch]
+            )
+            imported_pages.extend(imported)
+            failed_pages.extend(failed)
         
         return {
             "success": True,
             "message": f"Imported {len(imported_pages)} pages from Notion database",
-            "total_pages": db_data.get("total_pages", 0),
+            "total_pages": len(pages),
             "imported": len(imported_pages),
             "failed": len(failed_pages),
             "imported_pages": imported_pages,
@@ -323,3 +419,49 @@ async def import_notion_database(request: NotionDatabaseImportRequest):
         print(f"❌ Error importing Notion database: {e}")
         raise HTTPException(status_code=500, detail=f"Error importing database: {str(e)}")
 
+
+async def run_database_import_job(job: IngestionJob) -> dict:
+    """
+    Ingestion job for /import-database with background=true
+    One unit per page, stored in batches; each page gets an item id derived from the job so a resumed batch is synced, not duplicated
+    """
+    request = NotionDatabaseImportRequest(**job.params)
+    checkpoint = job.checkpoint
+    
+    pages = checkpoint.get("pages")
+    if pages is None:
+        ingestion_jobs.set_stage(job, "extract")
+        db_data = await notion_service.query_database(request.api_key, request.database_id)
+        if not db_data.get("success"):
+            raise Exception(db_data.get("error", "Failed to fetch database"))
+        pages = db_data["pages"]
+        if not pages:
+            raise Exception("Database has no pages to import")
+        ingestion_jobs.complete_unit(job, 0, pages=pages, imported_pages=[], failed_pages=[])
+    
+    imported_pages = checkpoint.get("imported_pages", [])
+    failed_pages = checkpoint.get("failed_pages", [])
+    ingestion_jobs.set_stage(job, "embed", units_total=len(pages), units_done=checkpoint.get("units_done", 0))
+    
+    await work_executor.run("ingest", _prepare_embeddings, request.embedding_provider, request.embedding_model)
+    
+    # One unit per page, checkpointed after each batch of pages is stored
+    async for start, batch, page_contents in _fetch_batches(request, pages, checkpoint.get("units_done", 0)):
+        item_ids = [f"notion-{uuid.uuid5(uuid.NAMESPACE_URL, job.id + page['id']).hex[:8]}" for page in batch]
+        imported, failed = await work_executor.run("ingest", _import_database_pages, request, batch, page_contents, item_ids)
+        # Page content is already in Qdrant; keep the persisted job result small
+        imported_pages.extend({key: value for key, value in page.items() if key != "content"} for page in imported)
+        failed_pages.extend(failed)
+        ingestion_jobs.complete_unit(job, start + len(batch), imported_pages=imported_pages, failed_pages=failed_pages)
+    
+    return {
+        "message": f"Imported {len(imported_pages)} pages from Notion database",
+        "total_pages": len(pages),
+        "imported": len(imported_pages),
+        "failed": len(failed_pages),
+        "imported_pages": imported_pages,
+        "failed_pages": failed_pages
+    }
+
+
+ingestion_jobs.register_handler("notion-database", run_database_import_job)
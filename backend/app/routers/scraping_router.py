@@ -3,13 +3,19 @@ Clean and simple router for website scraping using Crawl4AI
 """
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import json
 import logging
+import os
 import time
 
-from app.services.scraping_service import scraper
+from app.config import RECRAWL_DEFAULT_INTERVAL_HOURS, QDRANT_BULK_WINDOW_CHUNKS
+from app.services.scraping_service import scraper, website_chunk_item, website_record_id
 from app.services.qdrant_service import qdrant_service
 from app.services.firestore_service import firestore_service
+from app.services.ingestion_jobs import ingestion_jobs, IngestionJob
+from app.services.recrawl_scheduler import recrawl_scheduler
+from app.services.work_executor import work_executor
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +31,9 @@ class WebsiteScrapingRequest(BaseModel):
     title: str
     metadata: Optional[Dict[str, Any]] = {}
     embedding_model: str = "text-embedding-3-large"
+    max_pages: int = 50  # Pages to crawl, starting from url and its sitemap
+    background: bool = False  # Queue an ingestion job and return its id immediately
+    recrawl_interval_hours: Optional[float] = None  # Re-crawl for changes this often; None = default, 0 = never
 
     class Config:
         extra = "allow"
@@ -40,186 +49,276 @@ async def scrape_website(request: WebsiteScrapingRequest):
     2. Splits content into chunks
     3. Stores chunks in Qdrant with embeddings
     4. Saves metadata to Firestore
+
+    With background=true the work runs as an ingestion job; poll /api/ingestion/jobs/{job_id}
     """
+    if request.background:
+        job = ingestion_jobs.enqueue("scrape-website", request.dict())
+        return {
+            'success': True,
+            'message': 'Website scraping queued',
+            'data': {
+                'url': request.url,
+                'title': request.title,
+                'job_id': job.id,
+                'status': job.status
+            }
+        }
+
     try:
-        logger.info(f"Starting website scraping for: {request.url}")
+        return await _scrape_and_store(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in scrape_website: {str(e)}")
+        logger.exception(e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
+async def _scrape_and_store(request: WebsiteScrapingRequest, job: Optional[IngestionJob] = None) -> Dict[str, Any]:
+    """Crawl the website, store each page's chunks in bulk as pages arrive and record the website; a job checkpoints after each page"""
+    logger.info(f"Starting website scraping for: {request.url}")
+
+    checkpoint = job.checkpoint if job else {}
+    stored_chunks = []
+    failed_chunks = []
+    # Resolved once for the whole scrape and passed to every store call (concurrent scrapes and
+    # re-crawls must not race on the service-wide model)
+    embedding_provider, embedding_model = qdrant_service.resolve_embedding_model(request.embedding_model)
+
+    async def store_chunks(first: int, chunks: List[Dict[str, Any]], total: Optional[int] = None):
+        """Store chunks first, first + 1, ... with one bulk embed/upsert; a job checkpoints once they are stored"""
+        last = first + len(chunks) - 1
+        items = [website_chunk_item(request.dict(), chunk, i) for i, chunk in enumerate(chunks, first)]
+        try:
+            # Store in Qdrant (unchanged chunks from an earlier scrape are kept as-is)
+            result = await work_executor.run(
+                "ingest", qdrant_service.store_knowledge_items_bulk, items, embedding_provider, embedding_model, sync=True
+            )
+            failed_items = set(result.get('failed_items', []))
+
+            for i, chunk, item in zip(range(first, last + 1), chunks, items):
+                if item['id'] in failed_items:
+                    failed_chunks.append({'chunk_index': i, 'error': 'Upload to Qdrant failed'})
+                    continue
+                point_ids = result['item_point_ids'].get(item['id']) or []
+                stored_chunks.append({
+                    'vector_id': point_ids[0] if point_ids else f"{item['id']}_stored",
+                    'chunk_index': chunk.get('chunk_index', i - 1),
+                    'source_url': chunk.get('source_url', request.url),
+                    'source_title': chunk.get('source_title', request.title),
+                    'char_count': chunk.get('char_count'),
+                    'word_count': chunk.get('word_count'),
+                    'content_preview': chunk['text'][:150] + '...'
+                })
 
-        # Scrape the website using Crawl4AI
+            logger.info(f"✅ [{first}-{last}/{total or '?'}] Stored {len(chunks) - len(failed_items)} chunks to Qdrant")
+
+        except Exception as e:
+            failed_chunks.extend({'chunk_index': i, 'error': str(e)} for i in range(first, last + 1))
+            logger.error(f"❌ [{first}-{last}/{total or '?'}] Error: {str(e)}")
+
+        if job:
+            ingestion_jobs.complete_unit(job, last, stored_chunks=stored_chunks, failed_chunks=failed_chunks)
+
+    scrape_path = os.path.join(ingestion_jobs.job_dir(job), "scrape.json") if job else None
+    if scrape_path and os.path.exists(scrape_path):
+        # A resumed job reuses the pages crawled by its earlier run and skips the chunks it already stored
+        with open(scrape_path) as f:
+            scraping_result = json.load(f)
+        chunks = scraping_result.get('chunks', [])
+        stored_chunks.extend(checkpoint.get('stored_chunks', []))
+        failed_chunks.extend(checkpoint.get('failed_chunks', []))
+        ingestion_jobs.set_stage(job, "embed", units_total=len(chunks), units_done=checkpoint.get('units_done', 0))
+
+        done = checkpoint.get('units_done', 0)
+        for start in range(done, len(chunks), QDRANT_BULK_WINDOW_CHUNKS):
+            await store_chunks(start + 1, chunks[start:start + QDRANT_BULK_WINDOW_CHUNKS], len(chunks))
+    else:
+        if job:
+            # An interrupted crawl starts over; chunks it already stored are matched by content hash and kept
+            ingestion_jobs.complete_unit(job, 0, stored_chunks=[], failed_chunks=[])
+            ingestion_jobs.set_stage(job, "extract")
+
+        # Chunks are stored while the crawl continues
+        crawl_start = time.time()
+        processed = 0
+        pages_stored = 0
+
+        async def store_page(page: Dict[str, Any]):
+            nonlocal processed, pages_stored
+            if page['chunks']:
+                first = processed + 1
+                processed += len(page['chunks'])
+                await store_chunks(first, page['chunks'])
+            pages_stored += 1
+            if job:
+                elapsed = time.time() - crawl_start
+                ingestion_jobs.set_stage(
+                    job, "embed",
+                    units_total=processed,
+                    pages_crawled=pages_stored,
+                    pages_per_second=round(pages_stored / elapsed, 2) if elapsed > 0 else None
+                )
+
+        # Crawl the website (Crawl4AI with HTTP fallback)
         scraping_result = await scraper.scrape_website(
             url=request.url,
-            title=request.title
+            max_pages=request.max_pages,
+            title=request.title,
+            on_page=store_page
         )
 
-        if not scraping_result['success']:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to scrape website: {scraping_result.get('error', 'Unknown error')}"
-            )
-
+        if scrape_path and scraping_result.get('success'):
+            with open(scrape_path, "w") as f:
+                json.dump(scraping_result, f, default=str)
         chunks = scraping_result.get('chunks', [])
 
-        if not chunks:
-            raise HTTPException(
-                status_code=400,
-                detail="No content chunks created from website"
-            )
+    if not scraping_result['success']:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to scrape website: {scraping_result.get('error', 'Unknown error')}"
+        )
 
-        logger.info(f"Successfully scraped website: {len(chunks)} chunks created")
+    if not chunks:
+        raise HTTPException(
+            status_code=400,
+            detail="No content chunks created from website"
+        )
+
+    logger.info(f"Successfully scraped website: {scraping_result.get('successful_pages', 1)} pages, {len(chunks)} chunks created")
 
-        # Store chunks in Qdrant
-        stored_chunks = []
-        failed_chunks = []
+    if not stored_chunks:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to store any chunks in Qdrant. Errors: {failed_chunks[:3]}"
+        )
 
-        for i, chunk in enumerate(chunks, 1):
-            try:
-                # Prepare metadata
-                chunk_metadata = {
+    logger.info(f"Stored {len(stored_chunks)} chunks successfully in Qdrant")
+
+    # Store in Firestore for tracking
+    try:
+        firestore_result = await work_executor.run("ingest", firestore_service.store_scraped_website, {
+            'document_id': website_record_id(request.dict()),
+            'url': request.url,
+            'agent_id': request.agent_id,
+            'widget_id': request.widget_id,
+            'workspace_id': request.workspace_id,
+            'title': request.title,
+            'content': scraping_result.get('content', '')[:10000],  # Store preview
+            'total_pages': scraping_result.get('total_pages', 1),
+            'successful_pages': scraping_result.get('successful_pages', 1),
+            'total_word_count': scraping_result.get('total_word_count', 0),
+            'total_char_count': scraping_result.get('total_char_count', 0),
+            'chunks_created': len(stored_chunks),
+            'metadata': request.metadata,
+            'embedding_model': request.embedding_model,
+            'max_pages': request.max_pages,
+            'pages': scraping_result.get('pages', []),
+            'recrawl_interval_hours': (
+                RECRAWL_DEFAULT_INTERVAL_HOURS if request.recrawl_interval_hours is None else request.recrawl_interval_hours
+            )
+        })
+
+        logger.info(f"Firestore storage result: {firestore_result}")
+
+        # Store chunk metadata
+        if stored_chunks:
+            chunks_for_firestore = []
+            for chunk in stored_chunks:
+                chunks_for_firestore.append({
                     'agent_id': request.agent_id,
                     'widget_id': request.widget_id,
                     'workspace_id': request.workspace_id,
-                    'title': request.title,
+                    'vector_id': chunk['vector_id'],
+                    'chunk_index': chunk['chunk_index'],
+                    'source_url': chunk['source_url'],
+                    'source_title': chunk['source_title'],
+                    'char_count': chunk['char_count'],
+                    'word_count': chunk['word_count'],
+                    'content_preview': chunk['content_preview'],
                     'url': request.url,
-                    'source_url': chunk.get('source_url', request.url),
-                    'source_title': chunk.get('source_title', request.title),
-                    'chunk_index': chunk.get('chunk_index', i - 1),
-                    'total_chunks': len(chunks),
-                    'char_count': chunk.get('char_count', len(chunk['text'])),
-                    'word_count': chunk.get('word_count', len(chunk['text'].split())),
-                    'type': 'website',
-                    'scraped_at': str(int(time.time())),
-                    **request.metadata
-                }
-
-                # Generate unique vector ID
-                vector_id = f"{request.workspace_id or request.widget_id}_{chunk.get('id', i)}_{int(time.time())}"
-
-                # Set embedding model
-                qdrant_service.set_embedding_model(request.embedding_model)
-
-                # Store in Qdrant
-                result = qdrant_service.store_knowledge_item({
-                    'id': vector_id,
-                    'businessId': request.workspace_id or request.metadata.get('business_id', ''),
-                    'widgetId': request.widget_id or '',
-                    'agentId': request.agent_id or '',
-                    'workspaceId': request.workspace_id or '',
                     'title': request.title,
-                    'content': chunk['text'],
-                    'type': 'website',
-                    **chunk_metadata
+                    'metadata': request.metadata
                 })
 
-                if result.get('success'):
-                    # Get the first point_id or generate one from the result
-                    point_ids = result.get('point_ids', [])
-                    vector_id = point_ids[0] if point_ids else f"{vector_id}_stored"
-
-                    stored_chunks.append({
-                        'vector_id': vector_id,
-                        'chunk_index': chunk.get('chunk_index', i - 1),
-                        'source_url': chunk.get('source_url', request.url),
-                        'source_title': chunk.get('source_title', request.title),
-                        'char_count': chunk.get('char_count'),
-                        'word_count': chunk.get('word_count'),
-                        'content_preview': chunk['text'][:150] + '...'
-                    })
-
-                    logger.info(f"✅ [{i}/{len(chunks)}] Stored chunk to Qdrant")
-                else:
-                    failed_chunks.append({
-                        'chunk_index': i,
-                        'error': result.get('error', result.get('message', 'Unknown error'))
-                    })
-                    logger.warning(f"⚠️  [{i}/{len(chunks)}] Failed to store: {result.get('error', result.get('message'))}")
-
-            except Exception as e:
-                failed_chunks.append({
-                    'chunk_index': i,
-                    'error': str(e)
-                })
-                logger.error(f"❌ [{i}/{len(chunks)}] Error: {str(e)}")
-                continue
+            firestore_chunks_result = await work_executor.run("ingest", firestore_service.store_knowledge_chunks, chunks_for_firestore)
+            logger.info(f"Stored {len(chunks_for_firestore)} chunk records in Firestore")
 
-        if not stored_chunks:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to store any chunks in Qdrant. Errors: {failed_chunks[:3]}"
-            )
+    except Exception as e:
+        logger.warning(f"Firestore storage failed (non-critical): {str(e)}")
+
+    # Return success response
+    return {
+        'success': True,
+        'message': f'Website scraped and stored successfully',
+        'data': {
+            'url': request.url,
+            'title': request.title,
+            'total_pages': scraping_result.get('total_pages', 1),
+            'successful_pages': scraping_result.get('successful_pages', 1),
+            'total_word_count': scraping_result.get('total_word_count', 0),
+            'total_char_count': scraping_result.get('total_char_count', 0),
+            'chunks_created': len(stored_chunks),
+            'chunks_failed': len(failed_chunks),
+            'elapsed_time': scraping_result.get('elapsed_time', 0),
+            'pages_per_second': scraping_result.get('pages_per_second'),
+            'pages': scraping_result.get('pages', []),
+            'chunks': stored_chunks[:10]  # First 10 for preview
+        }
+    }
 
-        logger.info(f"Stored {len(stored_chunks)} chunks successfully in Qdrant")
 
-        # Store in Firestore for tracking
-        try:
-            firestore_result = firestore_service.store_scraped_website({
-                'url': request.url,
-                'agent_id': request.agent_id,
-                'widget_id': request.widget_id,
-                'workspace_id': request.workspace_id,
-                'title': request.title,
-                'content': scraping_result.get('content', '')[:10000],  # Store preview
-                'total_pages': scraping_result.get('total_pages', 1),
-                'successful_pages': scraping_result.get('successful_pages', 1),
-                'total_word_count': scraping_result.get('total_word_count', 0),
-                'total_char_count': scraping_result.get('total_char_count', 0),
-                'chunks_created': len(stored_chunks),
-                'metadata': request.metadata
-            })
-
-            logger.info(f"Firestore storage result: {firestore_result}")
-
-            # Store chunk metadata
-            if stored_chunks:
-                chunks_for_firestore = []
-                for chunk in stored_chunks:
-                    chunks_for_firestore.append({
-                        'agent_id': request.agent_id,
-                        'widget_id': request.widget_id,
-                        'workspace_id': request.workspace_id,
-                        'vector_id': chunk['vector_id'],
-                        'chunk_index': chunk['chunk_index'],
-                        'source_url': chunk['source_url'],
-                        'source_title': chunk['source_title'],
-                        'char_count': chunk['char_count'],
-                        'word_count': chunk['word_count'],
-                        'content_preview': chunk['content_preview'],
-                        'url': request.url,
-                        'title': request.title,
-                        'metadata': request.metadata
-                    })
-
-                firestore_chunks_result = firestore_service.store_knowledge_chunks(chunks_for_firestore)
-                logger.info(f"Stored {len(chunks_for_firestore)} chunk records in Firestore")
+async def run_scrape_job(job: IngestionJob) -> Dict[str, Any]:
+    """Ingestion job for /scrape-website with background=true"""
+    response = await _scrape_and_store(WebsiteScrapingRequest(**job.params), job)
+    return response['data']
 
-        except Exception as e:
-            logger.warning(f"Firestore storage failed (non-critical): {str(e)}")
 
-        # Return success response
-        return {
-            'success': True,
-            'message': f'Website scraped and stored successfully',
-            'data': {
-                'url': request.url,
-                'title': request.title,
-                'total_pages': scraping_result.get('total_pages', 1),
-                'successful_pages': scraping_result.get('successful_pages', 1),
-                'total_word_count': scraping_result.get('total_word_count', 0),
-                'total_char_count': scraping_result.get('total_char_count', 0),
-                'chunks_created': len(stored_chunks),
-                'chunks_failed': len(failed_chunks),
-                'elapsed_time': scraping_result.get('elapsed_time', 0),
-                'chunks': stored_chunks[:10]  # First 10 for preview
-            }
+ingestion_jobs.register_handler("scrape-website", run_scrape_job)
+
+
+@router.post("/recrawl/{website_id}")
+async def recrawl_website(website_id: str):
+    """
+    Queue a re-crawl of a scraped website now, ahead of its schedule
+    Only pages that changed since the last crawl are re-embedded; poll /api/ingestion/jobs/{job_id}
+    """
+    record = await work_executor.run("ingest", firestore_service.get_scraped_website, website_id)
+    if not record:
+        raise HTTPException(status_code=404, detail=f"Scraped website {website_id} not found")
+
+    # Owner ids let the job be listed for its workspace and agent
+    job = ingestion_jobs.enqueue("recrawl-website", {
+        'website_id': website_id,
+        **{key: record.get(key) for key in ('workspace_id', 'agent_id', 'widget_id')}
+    })
+    return {
+        'success': True,
+        'message': 'Website re-crawl queued',
+        'data': {
+            'website_id': website_id,
+            'job_id': job.id,
+            'status': job.status
         }
+    }
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error in scrape_website: {str(e)}")
-        logger.exception(e)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Internal server error: {str(e)}"
-        )
+
+async def run_recrawl_job(job: IngestionJob) -> Dict[str, Any]:
+    """Ingestion job for /recrawl/{website_id}"""
+    record = await work_executor.run("ingest", firestore_service.get_scraped_website, job.params['website_id'])
+    if not record:
+        raise ValueError(f"Scraped website {job.params['website_id']} not found")
+    result = await recrawl_scheduler.recrawl_website(record, job)
+    if not result.get('success'):
+        raise RuntimeError(result.get('error', 'Re-crawl failed'))
+    return result
+
+
+ingestion_jobs.register_handler("recrawl-website", run_recrawl_job)
 
 
 @router.get("/scraping-status")
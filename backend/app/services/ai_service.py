@@ -2,15 +2,24 @@
 AI and chat service for RAG pipeline using LangChain (OpenAI & Gemini) with Voyage AI Reranker
 Optimized with parallel processing and smart reranking
 """
+import logging
 import os
-import asyncio
+import re
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.services.qdrant_service import qdrant_service
 from app.services.llm_service import llm_service
 from app.services.reranker_service import reranker_service
+from app.services.response_cache import response_cache
+from app.services.query_embedding_cache import normalize_query_text
+from app.services.context_assembler import context_assembler
+from app.services.tracing import tracer
+from app.services.metrics_service import RERANK_LATENCY, RERANK_SKIPS, GREETING_SHORT_CIRCUITS, CACHE_HITS, CHAT_LATENCY
+from app.services.work_executor import work_executor
 from app.models import AIConfig, AIResponse
 
+logger = logging.getLogger(__name__)
+
 
 class AIService:
     def __init__(self):
@@ -49,11 +58,11 @@ class AIService:
             return True
         
         top_score = search_results[0].get("score", 0.0)
-        print(f"🎯 Top result score: {top_score:.4f} (threshold: {threshold})")
+        logger.debug("🎯 Top result score: %.4f (threshold: %s)", top_score, threshold)
         
         # OPTIMIZED: Lower threshold from 0.8 to 0.7 to skip reranking more often
         if top_score >= threshold:
-            print(f"✅ Skipping reranking - top result confidence is high ({top_score:.4f} >= {threshold})")
+            logger.debug("✅ Skipping reranking - top result confidence is high (%.4f >= %s)", top_score, threshold)
             return True
         
         # OPTIMIZED: Also skip if top 2 results have very similar scores (clear winner)
@@ -61,11 +70,32 @@ class AIService:
             second_score = search_results[1].get("score", 0.0)
             score_diff = top_score - second_score
             if score_diff >= 0.15:  # Top result is significantly better
-                print(f"✅ Skipping reranking - clear winner (diff: {score_diff:.4f})")
+                logger.debug("✅ Skipping reranking - clear winner (diff: %.4f)", score_diff)
                 return True
         
         return False
 
+    async def _embed_for_response_cache(self, message: str, embedding_model: str) -> Optional[List[float]]:
+        """
+        Embed the normalized message for the semantic response cache
+        Not the search-expanded query: _preprocess_query maps distinct questions (any "price" question, say) to one
+        expansion string. Messages without typo corrections or expansions embed the same text as hybrid search,
+        so the search still reuses this embedding via the query cache.
+        """
+        if not response_cache.enabled:
+            return None
+        try:
+            return await qdrant_service.voyage_service.aembed_query(normalize_query_text(message), embedding_model)
+        except Exception as e:
+            logger.warning("⚠️ Semantic cache lookup skipped (embedding failed): %s", e)
+            return None
+
+    def _cached_tokens(self, cached: Dict[str, Any]) -> List[str]:
+        """Token sequence to replay for a cached answer (word chunks if it came from the non-streaming path)"""
+        if cached.get("tokens"):
+            return cached["tokens"]
+        return re.findall(r"\S+\s*", cached["response"].get("response", ""))
+
     def _get_optimal_reranker_model(self, query_complexity: str) -> str:
         """FORCED to always return rerank-2.5-lite regardless of complexity"""
         return "rerank-2.5-lite"  # Always use rerank-2.5-lite
@@ -75,38 +105,31 @@ class AIService:
         try:
             # Classify query complexity for optimization decisions
             query_complexity = self._classify_query_complexity(query)
-            print(f"🔍 Query complexity: {query_complexity}")
+            logger.debug("🔍 Query complexity: %s", query_complexity)
             
             if not qdrant_service.qdrant_client:
-                print("⚠️ Qdrant client not initialized - cannot retrieve RAG context")
+                logger.warning("⚠️ Qdrant client not initialized - cannot retrieve RAG context")
                 return []
             
             # Set the embedding provider and model dynamically based on agent config
-            print(f"🔄 Setting embeddings to: {embedding_provider}/{embedding_model}")
-            qdrant_service.set_embedding_provider(embedding_provider, embedding_model)
+            # (first call may create the collection/indexes over the network, so keep it off the event loop)
+            logger.debug("🔄 Setting embeddings to: %s/%s", embedding_provider, embedding_model)
+            await work_executor.run("chat", qdrant_service.set_embedding_provider, embedding_provider, embedding_model)
             
             # Check if embeddings are ready based on provider
             if embedding_provider == "voyage":
-                if not qdrant_service.voyage_service.client:
-                    print("⚠️ Voyage AI not initialized - cannot retrieve RAG context")
+                if not qdrant_service.voyage_service.async_client:
+                    logger.warning("⚠️ Voyage AI not initialized - cannot retrieve RAG context")
                     return []
             else:
                 if not qdrant_service.embeddings:
-                    print("⚠️ OpenAI embeddings not initialized - cannot retrieve RAG context")
+                    logger.warning("⚠️ OpenAI embeddings not initialized - cannot retrieve RAG context")
                     return []
             
-            print(f"\n🔍 OPTIMIZED RAG RETRIEVAL:")
-            print(f"   Agent ID: {agent_id}")
-            print(f"   Business ID: {business_id}")
-            print(f"   Query: '{query}'")
-            print(f"   Query Complexity: {query_complexity}")
-            print(f"   Max Docs: {max_docs}")
-            print(f"   Embedding Provider: {embedding_provider}")
-            print(f"   Embedding Model: {embedding_model}")
-            
-            # PARALLEL PHASE 1: Embedding + Search Preparation
-            print(f"🚀 Phase 1: Parallel embedding + search preparation...")
-            phase1_start = time.time()
+            logger.debug(
+                "🔍 OPTIMIZED RAG RETRIEVAL - agent: %s, business: %s, complexity: %s, max docs: %s, embeddings: %s/%s, query: '%s'",
+                agent_id, business_id, query_complexity, max_docs, embedding_provider, embedding_model, query
+            )
             
             # Get more candidates for better reranking (but optimize based on complexity)
             # OPTIMIZED: Reduce candidates to speed up retrieval
@@ -117,80 +140,57 @@ class AIService:
             else:
                 initial_limit = max_docs * 2  # Still optimized for complex queries
             
-            print(f"   📥 Hybrid search: retrieving {initial_limit} candidates...")
-            
-            # Execute search (this already includes embedding internally)
-            search_result = qdrant_service.search_knowledge_base(
-                query=query,
-                agent_id=agent_id,
-                limit=initial_limit
-            )
-            
-            phase1_time = time.time() - phase1_start
-            print(f"✅ Phase 1 completed in {phase1_time:.3f}s")
+            # PHASE 1: Hybrid search (this already includes embedding internally)
+            with tracer.span("rag.search", limit=initial_limit, complexity=query_complexity) as search_span:
+                search_result = await qdrant_service.asearch_knowledge_base(
+                    query=query,
+                    agent_id=agent_id,
+                    limit=initial_limit
+                )
+                search_type = search_result.get("search_type", "unknown")
+                initial_results = search_result.get("results", [])
+                search_span.set(search_type=search_type, candidates=len(initial_results))
             
             if not search_result.get("success"):
-                print(f"❌ Search failed: {search_result.get('error')}")
+                logger.error("❌ Search failed: %s", search_result.get('error'))
                 return []
             
-            initial_results = search_result.get("results", [])
-            search_type = search_result.get("search_type", "unknown")
-            
-            print(f"\n📊 SEARCH RESULTS:")
-            print(f"   Search Type: {search_type}")
-            print(f"   Candidates Found: {len(initial_results)}")
-            if search_type == "hybrid_rrf":
-                print(f"   ✅ Using: Dense (semantic) + BM42 (keywords) + RRF Fusion")
-            
             if len(initial_results) == 0:
-                print("\n⚠️ WARNING: No documents found in knowledge base!")
-                print(f"   Make sure you have added knowledge base items for agentId: {agent_id}")
+                logger.info("⚠️ No documents found in knowledge base for agentId: %s", agent_id)
                 return []
             
-            # PARALLEL PHASE 2: Smart Reranking Decision
-            print(f"\n🚀 Phase 2: Smart reranking decision...")
-            phase2_start = time.time()
-            
-            # Smart reranking logic
+            # PHASE 2: Smart reranking decision
             should_skip_rerank = self._should_skip_reranking(initial_results, threshold=0.8)
             optimal_reranker = self._get_optimal_reranker_model(query_complexity)
             
-            if should_skip_rerank or not reranker_enabled or len(initial_results) <= 1 or not reranker_service.client:
+            if should_skip_rerank or not reranker_enabled or len(initial_results) <= 1 or not reranker_service.async_client:
                 # Skip reranking - use original order
-                print(f"📋 Skipping reranking:")
-                print(f"   - High confidence: {should_skip_rerank}")
-                print(f"   - Reranker enabled: {reranker_enabled}")
-                print(f"   - Results count: {len(initial_results)}")
-                print(f"   - Reranker available: {reranker_service.client is not None}")
+                RERANK_SKIPS.inc(model=optimal_reranker, search_type=search_type)
+                logger.debug(
+                    "📋 Skipping reranking - high confidence: %s, reranker enabled: %s, results: %s, reranker available: %s",
+                    should_skip_rerank, reranker_enabled, len(initial_results), reranker_service.async_client is not None
+                )
                 
-                context_docs = []
-                for idx, result in enumerate(initial_results[:max_docs]):
-                    print(f"\n   📄 Document {idx + 1}:")
-                    print(f"      Score: {result.get('score', 0):.4f}")
-                    print(f"      Title: {result.get('metadata', {}).get('title', 'Unknown')}")
-                    print(f"      Preview: {result.get('content', '')[:100]}...")
-                    
-                    context_docs.append({
+                context_docs = [
+                    {
                         "content": result.get("content", ""),
                         "metadata": result.get("metadata", {}),
                         "score": result.get("score", 0.0)
-                    })
+                    }
+                    for result in initial_results[:max_docs]
+                ]
             else:
                 # Perform smart reranking with optimal model
-                print(f"\n🔄 SMART RERANKING:")
-                print(f"   Model: {optimal_reranker} (optimized for {query_complexity} queries)")
-                print(f"   Documents: {len(initial_results)} → {max_docs}")
-                
-                # Extract document texts for reranking
                 doc_texts = [result.get("content", "") for result in initial_results]
                 
-                # Rerank documents with optimal model
-                reranked = reranker_service.rerank(
-                    query=query,
-                    documents=doc_texts,
-                    top_k=max_docs,
-                    model=optimal_reranker
-                )
+                with tracer.span("rag.rerank", model=optimal_reranker, documents=len(doc_texts), top_k=max_docs), \
+                        RERANK_LATENCY.time(model=optimal_reranker):
+                    reranked = await reranker_service.arerank(
+                        query=query,
+                        documents=doc_texts,
+                        top_k=max_docs,
+                        model=optimal_reranker
+                    )
                 
                 # Map reranked results back to original results with metadata
                 context_docs = []
@@ -202,157 +202,52 @@ class AIService:
                         "score": original_result.get("score", 0.0),
                         "rerank_score": rerank_result["relevance_score"]
                     })
-                
-                print(f"\n✅ SMART RERANKING COMPLETE:")
-                print(f"   Final documents: {len(context_docs)}")
-                for idx, doc in enumerate(context_docs):
-                    print(f"\n   📄 Document {idx + 1}:")
-                    print(f"      Vector Score: {doc.get('score', 0):.4f}")
-                    print(f"      Rerank Score: {doc.get('rerank_score', 0):.4f} ⭐")
-                    print(f"      Title: {doc.get('metadata', {}).get('title', 'Unknown')}")
-                    print(f"      Preview: {doc.get('content', '')[:100]}...")
-            
-            phase2_time = time.time() - phase2_start
-            total_time = phase1_time + phase2_time
-            
-            print(f"\n⚡ OPTIMIZATION SUMMARY:")
-            print(f"   Phase 1 (Search): {phase1_time:.3f}s")
-            print(f"   Phase 2 (Rerank): {phase2_time:.3f}s")
-            print(f"   Total Time: {total_time:.3f}s")
-            print(f"   Query Complexity: {query_complexity}")
-            print(f"   Reranker Used: {optimal_reranker if not should_skip_rerank and reranker_enabled else 'None (skipped)'}")
-            
-            return context_docs
-            
-        except Exception as e:
-            print(f"\n❌ ERROR in optimized RAG context: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
-        """Get relevant context from Qdrant for RAG"""
-        try:
-            if not qdrant_service.qdrant_client:
-                print("⚠️ Qdrant client not initialized - cannot retrieve RAG context")
-                return []
             
-            # Set the embedding provider and model dynamically based on agent config
-            print(f"🔄 Setting embeddings to: {embedding_provider}/{embedding_model}")
-            qdrant_service.set_embedding_provider(embedding_provider, embedding_model)
-            
-            # Check if embeddings are ready based on provider
-            if embedding_provider == "voyage":
-                if not qdrant_service.voyage_service.client:
-                    print("⚠️ Voyage AI not initialized - cannot retrieve RAG context")
-                    return []
-            else:
-                if not qdrant_service.embeddings:
-                    print("⚠️ OpenAI embeddings not initialized - cannot retrieve RAG context")
-                    return []
-            
-            print(f"\n🔍 RAG RETRIEVAL DEBUG:")
-            print(f"   Agent ID: {agent_id}")
-            print(f"   Business ID: {business_id}")
-            print(f"   Query: '{query}'")
-            print(f"   Max Docs: {max_docs}")
-            print(f"   Embedding Provider: {embedding_provider}")
-            print(f"   Embedding Model: {embedding_model}")
-            
-            # Step 1: HYBRID SEARCH - Get initial results from Qdrant
-            # Uses Dense (semantic) + BM42 Sparse (keywords) with RRF Fusion
-            initial_limit = max_docs * 3  # Get 3x more for better reranking
-            print(f"   📥 Hybrid search: retrieving {initial_limit} fused candidates...")
-            
-            search_result = qdrant_service.search_knowledge_base(
-                query=query,
-                agent_id=agent_id,
-                limit=initial_limit
-            )
-            
-            if not search_result.get("success"):
-                print(f"❌ Search failed: {search_result.get('error')}")
-                return []
-            
-            initial_results = search_result.get("results", [])
-            search_type = search_result.get("search_type", "unknown")
-            
-            print(f"\n📊 HYBRID RETRIEVAL RESULTS:")
-            print(f"   Search Type: {search_type}")
-            print(f"   Candidates Found: {len(initial_results)}")
-            if search_type == "hybrid_rrf":
-                print(f"   ✅ Using: Dense (semantic) + BM42 (keywords) + RRF Fusion")
-            
-            if len(initial_results) == 0:
-                print("\n⚠️ WARNING: No documents found in knowledge base!")
-                print(f"   Make sure you have added knowledge base items for agentId: {agent_id}")
-                return []
-            
-            # Step 2: Rerank results using Voyage AI rerank-2.5 (if enabled)
-            if reranker_enabled and len(initial_results) > 1 and reranker_service.client:
-                print(f"\n🔄 RERANKING {len(initial_results)} documents with {reranker_model}...")
-                
-                # Extract document texts for reranking
-                doc_texts = [result.get("content", "") for result in initial_results]
-                
-                # Rerank documents
-                reranked = reranker_service.rerank(
-                    query=query,
-                    documents=doc_texts,
-                    top_k=max_docs,
-                    model=reranker_model
-                )
-                
-                # Map reranked results back to original results with metadata
-                context_docs = []
-                for rerank_result in reranked:
-                    original_result = initial_results[rerank_result["index"]]
-                    context_docs.append({
-                        "content": original_result.get("content", ""),
-                        "metadata": original_result.get("metadata", {}),
-                        "score": original_result.get("score", 0.0),
-                        "rerank_score": rerank_result["relevance_score"]  # Add rerank score
-                    })
-                
-                print(f"\n✅ RERANKING COMPLETE:")
-                print(f"   Final documents: {len(context_docs)}")
+            if logger.isEnabledFor(logging.DEBUG):
                 for idx, doc in enumerate(context_docs):
-                    print(f"\n   📄 Document {idx + 1}:")
-                    print(f"      Vector Score: {doc.get('score', 0):.4f}")
-                    print(f"      Rerank Score: {doc.get('rerank_score', 0):.4f} ⭐")
-                    print(f"      Title: {doc.get('metadata', {}).get('title', 'Unknown')}")
-                    print(f"      Preview: {doc.get('content', '')[:150]}...")
-                
-            else:
-                # No reranker available or only 1 result - use original order
-                print(f"\n📋 Skipping reranking (reranker: {reranker_service.client is not None}, results: {len(initial_results)})")
-                context_docs = []
-                for idx, result in enumerate(initial_results[:max_docs]):
-                    print(f"\n   Document {idx + 1}:")
-                    print(f"      Score: {result.get('score', 0):.4f}")
-                    print(f"      Metadata: {result.get('metadata', {})}")
-                    print(f"      Content Preview: {result.get('content', '')[:200]}...")
-                    
-                    context_docs.append({
-                        "content": result.get("content", ""),
-                        "metadata": result.get("metadata", {}),
-                        "score": result.get("score", 0.0)
-                    })
+                    logger.debug(
+                        "📄 Document %s: score=%.4f rerank=%s title='%s' preview=%s...",
+                        idx + 1, doc.get("score", 0), doc.get("rerank_score"),
+                        doc.get("metadata", {}).get("title", "Unknown"), doc.get("content", "")[:100]
+                    )
             
             return context_docs
             
         except Exception as e:
-            print(f"\n❌ ERROR getting RAG context: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ ERROR in optimized RAG context: %s", e)
             return []
 
+    @staticmethod
+    def is_uncertain_response(message: str, response: str) -> bool:
+        """Whether the AI said it doesn't know (only checked for messages that seem like actual questions)"""
+        message_lower = message.lower().strip()
+        is_substantive_question = (
+            "?" in message or
+            message_lower.startswith(("what", "how", "when", "where", "why", "who", "can", "could", "would", "is", "are", "do", "does")) or
+            len(message.split()) > 3
+        )
+        
+        uncertainty_phrases = [
+            "i'm not sure about that",
+            "i don't know",
+            "not sure about that",
+            "don't have information about",
+            "cannot find information",
+            "not in my knowledge base",
+            "not available in my knowledge"
+        ]
+        
+        response_lower = response.lower()
+        return is_substantive_question and any(phrase in response_lower for phrase in uncertainty_phrases)
+
     def calculate_confidence(self, response: str, sources: List[dict]) -> float:
         """Calculate confidence score based on response, sources, and rerank scores"""
         try:
             # Start with good confidence if we have sources
             base_confidence = 0.7 if len(sources) > 0 else 0.3
             
-            print(f"\n📊 CONFIDENCE CALCULATION:")
-            print(f"   Base: {base_confidence} (sources: {len(sources)})")
+            logger.debug("📊 CONFIDENCE CALCULATION:")
+            logger.debug("Base: %s (sources: %s)", base_confidence, len(sources))
             
             # Check if we have rerank scores (indicates reranker was used)
             has_rerank = len(sources) > 0 and sources[0].get('rerank_score') is not None
@@ -360,45 +255,45 @@ class AIService:
             if has_rerank:
                 # Use rerank scores for better confidence
                 avg_rerank_score = sum(s.get('rerank_score', 0) for s in sources) / len(sources)
-                print(f"   🎯 Rerank scores available!")
-                print(f"   Average Rerank Score: {avg_rerank_score:.4f}")
-                print(f"   Top Rerank Score: {sources[0].get('rerank_score', 0):.4f}")
+                logger.debug("🎯 Rerank scores available!")
+                logger.debug("Average Rerank Score: %.4f", avg_rerank_score)
+                logger.debug("Top Rerank Score: %.4f", sources[0].get('rerank_score', 0))
                 
                 # Rerank scores are very reliable - use them heavily
                 if avg_rerank_score > 0.8:
                     base_confidence = 0.95
-                    print(f"   🌟 Excellent rerank score → confidence: {base_confidence:.2f}")
+                    logger.debug("🌟 Excellent rerank score → confidence: %.2f", base_confidence)
                 elif avg_rerank_score > 0.6:
                     base_confidence = 0.85
-                    print(f"   ✅ Good rerank score → confidence: {base_confidence:.2f}")
+                    logger.debug("✅ Good rerank score → confidence: %.2f", base_confidence)
                 elif avg_rerank_score > 0.4:
                     base_confidence = 0.75
-                    print(f"   👍 Decent rerank score → confidence: {base_confidence:.2f}")
+                    logger.debug("👍 Decent rerank score → confidence: %.2f", base_confidence)
                 else:
                     base_confidence = 0.60
-                    print(f"   ⚠️ Low rerank score → confidence: {base_confidence:.2f}")
+                    logger.debug("⚠️ Low rerank score → confidence: %.2f", base_confidence)
             else:
                 # Traditional confidence calculation (no reranker)
                 # Boost confidence based on number of sources
                 if len(sources) > 1:
                     source_boost = min((len(sources) - 1) * 0.1, 0.2)
                     base_confidence += source_boost
-                    print(f"   + Extra Sources ({len(sources)}): +{source_boost:.2f} → {base_confidence:.2f}")
+                    logger.debug("+ Extra Sources (%s): +%.2f → %.2f", len(sources), source_boost, base_confidence)
                 
                 # Check source relevance scores
                 if len(sources) > 0:
                     avg_score = sum(s.get('score', 0) for s in sources) / len(sources)
-                    print(f"   Average Vector Score: {avg_score:.4f}")
+                    logger.debug("Average Vector Score: %.4f", avg_score)
                     
                     # If similarity score is very low, it might be weak matches
                     if avg_score < 0.1:
-                        print(f"   ⚠️ Very low similarity scores")
+                        logger.debug("⚠️ Very low similarity scores")
                         base_confidence = 0.60
             
             # Boost for comprehensive responses
             if len(response) > 100:
                 base_confidence += 0.05
-                print(f"   + Comprehensive Response: +0.05 → {base_confidence:.2f}")
+                logger.debug("+ Comprehensive Response: +0.05 → %.2f", base_confidence)
             
             # Only reduce confidence for STRONG uncertainty in the response
             strong_uncertainty_phrases = [
@@ -417,13 +312,13 @@ class AIService:
             
             # Skip confidence check if response is our own fallback message
             if "let me connect you with" in response_lower:
-                print(f"   ⚠️ Detected fallback message - setting confidence to 0")
+                logger.debug("⚠️ Detected fallback message - setting confidence to 0")
                 return 0.0
             
             for phrase in strong_uncertainty_phrases:
                 if phrase in response_lower:
                     base_confidence -= 0.4
-                    print(f"   - Uncertainty phrase '{phrase}': -0.40 → {base_confidence:.2f}")
+                    logger.debug("- Uncertainty phrase '%s': -0.40 → %.2f", phrase, base_confidence)
                     uncertainty_found = True
                     break
             
@@ -431,16 +326,40 @@ class AIService:
             final_confidence = max(0.0, min(1.0, base_confidence))
             
             if not uncertainty_found:
-                print(f"   ✅ No uncertainty detected in response")
-            print(f"   📊 Final Confidence: {final_confidence:.2f}")
+                logger.debug("✅ No uncertainty detected in response")
+            logger.debug("📊 Final Confidence: %.2f", final_confidence)
             
             return final_confidence
             
         except Exception as e:
-            print(f"❌ Error calculating confidence: {e}")
+            logger.error("❌ Error calculating confidence: %s", e)
             return 0.5
 
     async def generate_ai_response(self, message: str, agent_id: str, ai_config: AIConfig, business_id: str = None, customer_handover = None) -> AIResponse:
+        """Generate AI response using OpenRouter with RAG pipeline (records end-to-end latency)"""
+        start_time = time.perf_counter()
+        with tracer.span("chat", agent_id=agent_id, model=ai_config.model, stream=False) as span:
+            response = await self._generate_ai_response(message, agent_id, ai_config, business_id, customer_handover)
+            mode = "cache_hit" if response.metadata.get("cache_hit") else response.metadata.get("mode", "error")
+            span.set(mode=mode, sources=len(response.sources), confidence=response.confidence)
+        CHAT_LATENCY.observe(time.perf_counter() - start_time, model=ai_config.model, mode=mode)
+        return response
+
+    @staticmethod
+    def _build_sources(docs: List[dict]) -> List[dict]:
+        """Response sources for the documents that made it into the context"""
+        return [
+            {
+                "content": doc["content"][:200] + "..." if len(doc["content"]) > 200 else doc["content"],
+                "metadata": doc["metadata"],
+                "title": doc["metadata"].get("title", "Unknown"),
+                "type": doc["metadata"].get("type", "text"),
+                "score": doc["score"]
+            }
+            for doc in docs
+        ]
+
+    async def _generate_ai_response(self, message: str, agent_id: str, ai_config: AIConfig, business_id: str = None, customer_handover = None) -> AIResponse:
         """Generate AI response using OpenRouter with RAG pipeline"""
         try:
             if not ai_config.enabled:
@@ -486,25 +405,21 @@ class AIService:
             
             # Skip RAG for greetings and simple conversational messages
             if is_greeting or (is_simple_conversational and len(message.split()) <= 4):
-                print(f"\n{'='*60}")
-                print(f"💬 SIMPLE MESSAGE DETECTED - SKIPPING RAG/VECTOR SEARCH")
-                print(f"{'='*60}")
-                print(f"   Message: '{message}'")
-                print(f"   Type: {'Greeting' if is_greeting else 'Conversational'}")
-                print(f"   💰 COST SAVING: Skipping embeddings API and Qdrant search")
-                print(f"{'='*60}\n")
+                logger.debug("💬 Simple %s message - skipping RAG/vector search", 'greeting' if is_greeting else 'conversational')
+                GREETING_SHORT_CIRCUITS.inc(model=ai_config.model)
                 
                 # Generate direct response without RAG
-                result = self.llm_service.generate_response(
-                    message=message,
-                    model=ai_config.model,
-                    temperature=ai_config.temperature,
-                    max_tokens=ai_config.maxTokens,
-                    system_prompt=self.llm_service.get_system_prompt_text(
-                        getattr(ai_config, 'systemPrompt', 'support'),
-                        getattr(ai_config, 'customSystemPrompt', '')
+                with tracer.span("llm.generate", model=ai_config.model, rag=False):
+                    result = await self.llm_service.agenerate_response(
+                        message=message,
+                        model=ai_config.model,
+                        temperature=ai_config.temperature,
+                        max_tokens=ai_config.maxTokens,
+                        system_prompt=self.llm_service.get_system_prompt_text(
+                            getattr(ai_config, 'systemPrompt', 'support'),
+                            getattr(ai_config, 'customSystemPrompt', '')
+                        )
                     )
-                )
                 
                 if result["success"]:
                     return AIResponse(
@@ -526,12 +441,13 @@ class AIService:
             
             if not ai_config.ragEnabled:
                 # Direct LLM response without RAG
-                result = self.llm_service.generate_response(
-                    message=message,
-                    model=ai_config.model,
-                    temperature=ai_config.temperature,
-                    max_tokens=ai_config.maxTokens
-                )
+                with tracer.span("llm.generate", model=ai_config.model, rag=False):
+                    result = await self.llm_service.agenerate_response(
+                        message=message,
+                        model=ai_config.model,
+                        temperature=ai_config.temperature,
+                        max_tokens=ai_config.maxTokens
+                    )
                 
                 if result["success"]:
                     return AIResponse(
@@ -552,126 +468,100 @@ class AIService:
                         metadata={"error": result["error"]}
                     )
             
-            # RAG-enabled response
-            print(f"\n{'='*60}")
-            print(f"🤖 RAG-ENABLED AI RESPONSE")
-            print(f"{'='*60}")
-            print(f"   Agent ID: {agent_id}")
-            print(f"   Business ID: {business_id}")
-            print(f"   Model: {ai_config.model}")
-            print(f"   User Question: {message}")
-            print(f"   RAG Config: maxDocs={ai_config.maxRetrievalDocs}, threshold={ai_config.confidenceThreshold}")
-            
             # FORCE Voyage AI usage - ignore config settings
             embedding_provider = "voyage"
             embedding_model = "voyage-3-large"
             reranker_enabled = getattr(ai_config, 'rerankerEnabled', True)
             reranker_model = "rerank-2.5-lite"  # FORCED: Always use rerank-2.5-lite
             
-            print(f"   🎯 Reranker: {'Enabled' if reranker_enabled else 'Disabled'} ({reranker_model})")
-            
-            context_docs = await self.get_rag_context_optimized(
-                agent_id, 
-                business_id, 
-                message, 
-                ai_config.maxRetrievalDocs, 
-                embedding_provider, 
-                embedding_model,
-                reranker_enabled,
-                reranker_model
+            # RAG-enabled response
+            logger.debug(
+                "🤖 RAG response: agent=%s business=%s model=%s maxDocs=%s threshold=%s reranker=%s",
+                agent_id, business_id, ai_config.model, ai_config.maxRetrievalDocs,
+                ai_config.confidenceThreshold, reranker_model if reranker_enabled else "disabled"
             )
             
+            # SEMANTIC CACHE: reuse a previous answer to a near-identical question for this agent
+            cache_fingerprint = response_cache.config_fingerprint(ai_config)
+            cache_generation = response_cache.generation(agent_id)
+            # Questions that hybrid search collapses into one expansion ("price", "location", ...) only match verbatim
+            cache_exact = qdrant_service.is_expanded_query(message)
+            with tracer.span("cache.lookup", cache="semantic_response") as cache_span:
+                query_embedding = await self._embed_for_response_cache(message, embedding_model)
+                cached = response_cache.lookup(
+                    agent_id, cache_fingerprint, query_embedding, query=message, exact=cache_exact
+                ) if query_embedding is not None else None
+                cache_span.set(hit=bool(cached))
+            if cached:
+                CACHE_HITS.inc(cache="semantic_response", model=ai_config.model)
+                logger.debug("⚡ Semantic cache hit (similarity: %.4f) - matched: '%s'", cached['similarity'], cached['query'])
+                cached_response = cached["response"]
+                cached_response["metadata"] = {
+                    **cached_response.get("metadata", {}),
+                    "cache_hit": True,
+                    "cache_similarity": cached["similarity"]
+                }
+                return AIResponse(**cached_response)
+            
+            with tracer.span("rag.retrieve", agent_id=agent_id) as retrieve_span:
+                context_docs = await self.get_rag_context_optimized(
+                    agent_id, 
+                    business_id, 
+                    message, 
+                    ai_config.maxRetrievalDocs, 
+                    embedding_provider, 
+                    embedding_model,
+                    reranker_enabled,
+                    reranker_model
+                )
+                retrieve_span.set(documents=len(context_docs))
+            
             # CRITICAL: Check if we got any context
             if len(context_docs) == 0:
-                error_msg = f"""
-❌ CRITICAL ERROR: NO KNOWLEDGE BASE CONTEXT RETRIEVED!
-   
-   This means:
-   1. No documents found in Qdrant for agentId: {agent_id}
-   2. Knowledge base might be empty
-   3. Similarity search returned no matches
-   
-   SOLUTION: 
-   - Add knowledge base items via Dashboard → Knowledge Base
-   - Ensure items have agentId: {agent_id}
-   - Verify Qdrant collection has data
-   
-   AI will respond with fallback message.
-"""
-                print(error_msg)
-            
-            # Format context for the model
-            context_text = ""
-            sources = []
-            for doc in context_docs:
-                context_text += f"{doc['content']}\n\n"
-                sources.append({
-                    "content": doc["content"][:200] + "..." if len(doc["content"]) > 200 else doc["content"],
-                    "metadata": doc["metadata"],
-                    "title": doc["metadata"].get("title", "Unknown"),
-                    "type": doc["metadata"].get("type", "text"),
-                    "score": doc["score"]
-                })
-            
-            print(f"\n📝 CONTEXT RETRIEVED FOR AI:")
-            print(f"   Total Sources: {len(sources)}")
-            print(f"   Context Length: {len(context_text)} chars")
-            if len(sources) > 0:
-                print(f"   ✅ Top Source: '{sources[0]['title']}' (score: {sources[0]['score']:.4f})")
-                print(f"   Preview: {sources[0]['content'][:150]}...")
-            else:
-                print(f"   ⚠️ WARNING: No context available - AI will respond without knowledge base!")
-            print(f"{'='*60}\n")
+                logger.warning(
+                    "❌ No knowledge base context retrieved for agentId %s - knowledge base may be empty "
+                    "or nothing matched; AI will respond with fallback message",
+                    agent_id
+                )
+            
+            # Merge adjacent chunks, strip overlaps and pack into the model's token budget
+            with tracer.span("context.assemble", candidates=len(context_docs)) as assemble_span:
+                assembled = context_assembler.assemble(context_docs, ai_config.model)
+                assemble_span.set(**assembled["stats"])
+            context_text = assembled["context_text"]
+            context_stats = assembled["stats"]
+            sources = self._build_sources(assembled["documents"])
+            
+            if sources:
+                logger.debug(
+                    "📝 Context: %s sources, %s chars, %s/%s tokens (saved %s), top '%s' (%.4f)",
+                    len(sources), len(context_text), context_stats['tokens_used'], context_stats['token_budget'],
+                    context_stats['tokens_saved'], sources[0]['title'], sources[0]['score']
+                )
             
             # Generate response with context and system prompt
-            result = self.llm_service.generate_rag_response(
-                message=message,
-                context=context_text,
-                model=ai_config.model,
-                temperature=ai_config.temperature,
-                max_tokens=ai_config.maxTokens,
-                system_prompt_type=getattr(ai_config, 'systemPrompt', 'support'),
-                custom_system_prompt=getattr(ai_config, 'customSystemPrompt', '')
-            )
+            with tracer.span("llm.generate", model=ai_config.model, rag=True) as llm_span:
+                result = await self.llm_service.agenerate_rag_response(
+                    message=message,
+                    context=context_text,
+                    model=ai_config.model,
+                    temperature=ai_config.temperature,
+                    max_tokens=ai_config.maxTokens,
+                    system_prompt_type=getattr(ai_config, 'systemPrompt', 'support'),
+                    custom_system_prompt=getattr(ai_config, 'customSystemPrompt', '')
+                )
+                llm_span.set(success=result["success"])
             
             if result["success"]:
                 ai_response = result["content"]
-                
-                print(f"\n🤖 OpenRouter Response:")
-                print(f"   Length: {len(ai_response)} chars")
-                print(f"   Preview: {ai_response[:200]}...")
-                
-                # Get message lower for all checks
-                message_lower = message.lower().strip()
+                logger.debug("🤖 LLM response: %s chars", len(ai_response))
                 
                 # Check if AI is uncertain/doesn't know (only for substantive questions)
-                # Only check uncertainty for messages that seem like actual questions
-                is_substantive_question = (
-                    "?" in message or
-                    message_lower.startswith(("what", "how", "when", "where", "why", "who", "can", "could", "would", "is", "are", "do", "does")) or
-                    len(message.split()) > 3
-                )
-                
-                uncertainty_phrases = [
-                    "i'm not sure about that",
-                    "i don't know",
-                    "not sure about that",
-                    "don't have information about",
-                    "cannot find information",
-                    "not in my knowledge base",
-                    "not available in my knowledge"
-                ]
-                
-                response_lower = ai_response.lower()
-                
-                # Only check for uncertainty if this was a substantive question
-                is_uncertain = is_substantive_question and any(phrase in response_lower for phrase in uncertainty_phrases)
+                is_uncertain = self.is_uncertain_response(message, ai_response)
                 
                 # If AI is uncertain and smart fallback is enabled, provide better response
                 if is_uncertain and customer_handover and customer_handover.enabled and customer_handover.smartFallbackEnabled:
-                    print(f"\n🔄 UNCERTAINTY DETECTED - Smart Fallback Enabled")
-                    print(f"   Handover enabled: {customer_handover.enabled}")
-                    print(f"   Smart fallback: {customer_handover.smartFallbackEnabled}")
+                    logger.debug("🔄 Uncertainty detected - offering handover (smart fallback enabled)")
                     
                     # Create a friendly fallback response
                     fallback_response = "I'm not sure about that from my current knowledge base. "
@@ -688,6 +578,7 @@ class AIService:
                             "model": ai_config.model,
                             "sources_count": len(sources),
                             "agent_id": agent_id,
+                            "context": context_stats,
                             "uncertainty_detected": True,
                             "handover_offered": True,
                             "smart_fallback": True
@@ -695,7 +586,7 @@ class AIService:
                     )
                 elif is_uncertain:
                     # No handover available, just be honest
-                    print(f"\n⚠️ UNCERTAINTY DETECTED - No handover available")
+                    logger.debug("🔄 Uncertainty detected - no handover available")
                     
                     fallback_response = "I'm not sure about that from my current knowledge base. "
                     fallback_response += "Is there anything else I can help you with?"
@@ -711,6 +602,7 @@ class AIService:
                             "model": ai_config.model,
                             "sources_count": len(sources),
                             "agent_id": agent_id,
+                            "context": context_stats,
                             "uncertainty_detected": True,
                             "handover_offered": False
                         }
@@ -719,21 +611,18 @@ class AIService:
                 # Calculate confidence for normal responses
                 confidence = self.calculate_confidence(ai_response, sources)
                 
-                print(f"\n🎯 Fallback Decision:")
-                print(f"   Confidence: {confidence:.2f}")
-                print(f"   Threshold: {ai_config.confidenceThreshold}")
-                print(f"   Sources: {len(sources)}")
-                print(f"   Fallback enabled: {ai_config.fallbackToHuman}")
-                
                 # Determine if should fallback to human
                 should_fallback = (
                     confidence < ai_config.confidenceThreshold or
                     len(sources) == 0
                 ) and ai_config.fallbackToHuman
                 
-                print(f"   → Should fallback: {should_fallback}")
+                logger.debug(
+                    "🎯 Fallback decision: confidence=%.2f threshold=%s sources=%s enabled=%s -> %s",
+                    confidence, ai_config.confidenceThreshold, len(sources), ai_config.fallbackToHuman, should_fallback
+                )
                 
-                return AIResponse(
+                final_response = AIResponse(
                     success=True,
                     response=ai_response,
                     confidence=confidence,
@@ -743,9 +632,19 @@ class AIService:
                         "mode": "rag_openrouter",
                         "model": ai_config.model,
                         "sources_count": len(sources),
-                        "agent_id": agent_id
+                        "agent_id": agent_id,
+                        "context": context_stats
                     }
                 )
+                
+                # Only confident, grounded answers are worth replaying
+                if query_embedding is not None and sources and not should_fallback:
+                    response_cache.put(
+                        agent_id, cache_fingerprint, message, query_embedding,
+                        final_response.dict(), generation=cache_generation, exact=cache_exact
+                    )
+                
+                return final_response
             else:
                 return AIResponse(
                     success=False,
@@ -757,7 +656,7 @@ class AIService:
                 )
             
         except Exception as e:
-            print(f"Error generating AI response: {e}")
+            logger.exception("❌ Error generating AI response: %s", e)
             return AIResponse(
                 success=False,
                 response=f"I'm sorry, I encountered an error while processing your request. Please try again or contact support.",
@@ -768,7 +667,17 @@ class AIService:
             )
     async def generate_ai_response_stream(self, message: str, agent_id: str, ai_config: AIConfig, business_id: str = None, customer_handover = None):
         """Generate AI response using streaming with timing metrics"""
-        import time
+        with tracer.span("chat", agent_id=agent_id, model=ai_config.model, stream=True) as span:
+            events = 0
+            async for event in self._generate_ai_response_stream(message, agent_id, ai_config, business_id, customer_handover):
+                if event["type"] == "content":
+                    events += 1
+                elif event["type"] == "complete":
+                    span.set(content_events=events, sources=len(event.get("sources", [])), **event.get("metrics", {}))
+                yield event
+
+    async def _generate_ai_response_stream(self, message: str, agent_id: str, ai_config: AIConfig, business_id: str = None, customer_handover = None):
+        """Streaming pipeline behind generate_ai_response_stream"""
 
         try:
             start_time = time.time()
@@ -803,6 +712,7 @@ class AIService:
             )
 
             if is_greeting:
+                GREETING_SHORT_CIRCUITS.inc(model=ai_config.model)
                 yield {
                     "type": "status",
                     "message": "Detected greeting - responding directly",
@@ -832,6 +742,7 @@ class AIService:
                         }
 
                 # Send completion
+                CHAT_LATENCY.observe(time.time() - start_time, model=ai_config.model, mode="conversational_stream")
                 yield {
                     "type": "complete",
                     "confidence": 0.95,
@@ -860,16 +771,60 @@ class AIService:
                 reranker_enabled = getattr(ai_config, 'rerankerEnabled', True)
                 reranker_model = "rerank-2.5-lite"  # FORCED: Always use rerank-2.5-lite
 
-                context_docs = await self.get_rag_context_optimized(
-                    agent_id,
-                    business_id,
-                    message,
-                    ai_config.maxRetrievalDocs,
-                    embedding_provider,
-                    embedding_model,
-                    reranker_enabled,
-                    reranker_model
-                )
+                # SEMANTIC CACHE: replay a previous answer to a near-identical question
+                cache_fingerprint = response_cache.config_fingerprint(ai_config)
+                cache_generation = response_cache.generation(agent_id)
+                cache_exact = qdrant_service.is_expanded_query(message)
+                with tracer.span("cache.lookup", cache="semantic_response") as cache_span:
+                    query_embedding = await self._embed_for_response_cache(message, embedding_model)
+                    cached = response_cache.lookup(
+                        agent_id, cache_fingerprint, query_embedding, query=message, exact=cache_exact
+                    ) if query_embedding is not None else None
+                    cache_span.set(hit=bool(cached))
+
+                if cached:
+                    CACHE_HITS.inc(cache="semantic_response", model=ai_config.model)
+                    yield {
+                        "type": "status",
+                        "message": "Found cached answer",
+                        "timestamp": time.time() - start_time
+                    }
+
+                    for token in self._cached_tokens(cached):
+                        yield {
+                            "type": "content",
+                            "content": token,
+                            "timestamp": time.time() - start_time
+                        }
+
+                    CHAT_LATENCY.observe(time.time() - start_time, model=ai_config.model, mode="cache_hit")
+                    yield {
+                        "type": "complete",
+                        "confidence": cached["response"].get("confidence", 0.85),
+                        "sources": cached["response"].get("sources", []),
+                        "metrics": {
+                            "total_time": time.time() - start_time,
+                            "retrieval_time": 0,
+                            "llm_time": 0,
+                            "sources_count": len(cached["response"].get("sources", [])),
+                            "cache_hit": True,
+                            "cache_similarity": cached["similarity"]
+                        }
+                    }
+                    return
+
+                with tracer.span("rag.retrieve", agent_id=agent_id) as retrieve_span:
+                    context_docs = await self.get_rag_context_optimized(
+                        agent_id,
+                        business_id,
+                        message,
+                        ai_config.maxRetrievalDocs,
+                        embedding_provider,
+                        embedding_model,
+                        reranker_enabled,
+                        reranker_model
+                    )
+                    retrieve_span.set(documents=len(context_docs))
 
                 retrieval_time = time.time() - retrieval_start
 
@@ -880,18 +835,13 @@ class AIService:
                     "metrics": {"retrieval_time": retrieval_time}
                 }
 
-                # Format context
-                context_text = ""
-                sources = []
-                for doc in context_docs:
-                    context_text += f"{doc['content']}\n\n"
-                    sources.append({
-                        "content": doc["content"][:200] + "..." if len(doc["content"]) > 200 else doc["content"],
-                        "metadata": doc["metadata"],
-                        "title": doc["metadata"].get("title", "Unknown"),
-                        "type": doc["metadata"].get("type", "text"),
-                        "score": doc["score"]
-                    })
+                # Merge adjacent chunks, strip overlaps and pack into the model's token budget
+                with tracer.span("context.assemble", candidates=len(context_docs)) as assemble_span:
+                    assembled = context_assembler.assemble(context_docs, ai_config.model)
+                    assemble_span.set(**assembled["stats"])
+                context_text = assembled["context_text"]
+                context_stats = assembled["stats"]
+                sources = self._build_sources(assembled["documents"])
 
                 # Step 2: LLM Generation
                 llm_start = time.time()
@@ -901,32 +851,70 @@ class AIService:
                     "timestamp": time.time() - start_time
                 }
 
-                # Stream the LLM response
-                async for chunk in self.llm_service.generate_rag_response_stream(
-                    message=message,
-                    context=context_text,
-                    model=ai_config.model,
-                    temperature=ai_config.temperature,
-                    max_tokens=ai_config.maxTokens,
-                    system_prompt_type=getattr(ai_config, 'systemPrompt', 'support'),
-                    custom_system_prompt=getattr(ai_config, 'customSystemPrompt', '')
-                ):
-                    if "content" in chunk:
-                        yield {
-                            "type": "content",
-                            "content": chunk["content"],
-                            "timestamp": time.time() - start_time
-                        }
-                    elif "error" in chunk:
-                        yield {
-                            "type": "error",
-                            "message": chunk["error"]
-                        }
+                # Stream the LLM response (tokens are kept for the semantic cache)
+                streamed_tokens = []
+                stream_failed = False
+                with tracer.span("llm.stream", model=ai_config.model, rag=True) as llm_span:
+                    async for chunk in self.llm_service.generate_rag_response_stream(
+                        message=message,
+                        context=context_text,
+                        model=ai_config.model,
+                        temperature=ai_config.temperature,
+                        max_tokens=ai_config.maxTokens,
+                        system_prompt_type=getattr(ai_config, 'systemPrompt', 'support'),
+                        custom_system_prompt=getattr(ai_config, 'customSystemPrompt', '')
+                    ):
+                        if "content" in chunk:
+                            streamed_tokens.append(chunk["content"])
+                            yield {
+                                "type": "content",
+                                "content": chunk["content"],
+                                "timestamp": time.time() - start_time
+                            }
+                        elif "error" in chunk:
+                            stream_failed = True
+                            yield {
+                                "type": "error",
+                                "message": chunk["error"]
+                            }
+                    llm_span.set(tokens=len(streamed_tokens), failed=stream_failed)
 
                 llm_time = time.time() - llm_start
                 total_time = time.time() - start_time
 
+                # Same gate as the non-streaming path: uncertain or low-confidence answers are never replayed
+                streamed_response = "".join(streamed_tokens)
+                if (query_embedding is not None and sources and streamed_tokens and not stream_failed
+                        and not self.is_uncertain_response(message, streamed_response)):
+                    confidence = self.calculate_confidence(streamed_response, sources)
+                    should_fallback = confidence < ai_config.confidenceThreshold and ai_config.fallbackToHuman
+                    if not should_fallback:
+                        response_cache.put(
+                            agent_id,
+                            cache_fingerprint,
+                            message,
+                            query_embedding,
+                            AIResponse(
+                                success=True,
+                                response=streamed_response,
+                                confidence=confidence,
+                                sources=sources,
+                                shouldFallbackToHuman=should_fallback,
+                                metadata={
+                                    "mode": "rag_stream",
+                                    "model": ai_config.model,
+                                    "sources_count": len(sources),
+                                    "agent_id": agent_id,
+                                    "context": context_stats
+                                }
+                            ).dict(),
+                            tokens=streamed_tokens,
+                            generation=cache_generation,
+                            exact=cache_exact
+                        )
+
                 # Send completion with metrics
+                CHAT_LATENCY.observe(total_time, model=ai_config.model, mode="rag_stream")
                 yield {
                     "type": "complete",
                     "confidence": 0.85,
@@ -935,7 +923,9 @@ class AIService:
                         "total_time": total_time,
                         "retrieval_time": retrieval_time,
                         "llm_time": llm_time,
-                        "sources_count": len(sources)
+                        "sources_count": len(sources),
+                        "context_tokens_used": context_stats["tokens_used"],
+                        "context_tokens_saved": context_stats["tokens_saved"]
                     }
                 }
             else:
@@ -971,6 +961,7 @@ class AIService:
                 llm_time = time.time() - llm_start
                 total_time = time.time() - start_time
 
+                CHAT_LATENCY.observe(total_time, model=ai_config.model, mode="direct_stream")
                 yield {
                     "type": "complete",
                     "confidence": 0.7,
@@ -983,7 +974,7 @@ class AIService:
                 }
 
         except Exception as e:
-            print(f"Error in streaming response: {e}")
+            logger.exception("❌ Error in streaming response: %s", e)
             yield {
                 "type": "error",
                 "message": str(e)
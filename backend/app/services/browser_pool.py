@@ -0,0 +1,276 @@
+"""
+Process-wide pool of headless browsers for Crawl4AI
+Launching Chromium takes seconds and hundreds of MB, so a few AsyncWebCrawler instances are started
+once (at app startup) and shared by every scrape. Each browser serves a limited number of pages at a
+time, is recycled after a number of pages, and is relaunched when it disconnects or when the pool's
+browser processes grow past the memory ceiling.
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Set
+
+import psutil
+
+from app.config import (
+    BROWSER_POOL_SIZE, BROWSER_POOL_CONTEXTS, BROWSER_POOL_MAX_PAGES, BROWSER_POOL_MEMORY_LIMIT_MB,
+    BROWSER_POOL_HEALTH_INTERVAL, BROWSER_POOL_RETRY_SECONDS
+)
+from app.services.metrics_service import BROWSER_LAUNCH_LATENCY, BROWSER_RECYCLES
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserUnavailable(Exception):
+    """No pooled browser can be used right now (disabled, or launching failed)"""
+
+
+class _PooledBrowser:
+    def __init__(self, index: int):
+        self.index = index
+        self.crawler = None
+        self.pids: Set[int] = set()  # driver processes started for this browser (Chromium runs under them)
+        self.active = 0
+        self.pages = 0
+        self.launched_at: Optional[float] = None
+        self.draining = False  # finish in-flight pages, then recycle
+
+    @property
+    def ready(self) -> bool:
+        return self.crawler is not None and not self.draining
+
+    def connected(self) -> bool:
+        try:
+            browser = self.crawler.crawler_strategy.browser_manager.browser
+        except AttributeError:
+            return True
+        return browser is None or browser.is_connected()
+
+    def rss_bytes(self) -> int:
+        total = 0
+        for pid in self.pids:
+            try:
+                process = psutil.Process(pid)
+                for member in [process, *process.children(recursive=True)]:
+                    total += member.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
+
+
+class BrowserPool:
+    """Shared Crawl4AI browsers with per-browser concurrency, recycling and health checks"""
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        contexts_per_browser: int = BROWSER_POOL_CONTEXTS,
+        max_pages_per_browser: int = BROWSER_POOL_MAX_PAGES,
+        memory_limit_mb: int = BROWSER_POOL_MEMORY_LIMIT_MB,
+        health_interval: float = BROWSER_POOL_HEALTH_INTERVAL,
+        retry_seconds: float = BROWSER_POOL_RETRY_SECONDS
+    ):
+        self.size = max(0, size)
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_pages_per_browser = max_pages_per_browser
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        self.health_interval = health_interval
+        self.retry_seconds = retry_seconds
+
+        self._browsers = [_PooledBrowser(i) for i in range(self.size)]
+        self._capacity = asyncio.Semaphore(max(1, self.size * self.contexts_per_browser))
+        self._changed = asyncio.Condition()
+        self._launch_lock = asyncio.Lock()
+        self._launch_failed_at: Optional[float] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._health_task: Optional[asyncio.Task] = None
+        self._pages_served = 0
+
+    @property
+    def available(self) -> bool:
+        """Whether a scrape should try the browser at all (False: go straight to HTTP)"""
+        if not self.size:
+            return False
+        if any(browser.crawler for browser in self._browsers):
+            return True
+        return self._launch_failed_at is None or time.monotonic() - self._launch_failed_at >= self.retry_seconds
+
+    async def start(self):
+        """Pre-launch every browser in the background and start health checks"""
+        if not self.size or self._health_task:
+            return
+        self._spawn(self._prelaunch())
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        """Close all browsers; launches in progress are allowed to finish first so they can be closed"""
+        if self._health_task:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        async with self._launch_lock:
+            for browser in self._browsers:
+                await self._close(browser)
+
+    @asynccontextmanager
+    async def crawler(self):
+        """
+        Check out a launched AsyncWebCrawler for one page
+        Raises BrowserUnavailable when the pool is disabled or no browser could be launched
+        """
+        if not self.available:
+            raise BrowserUnavailable("Headless browser pool unavailable")
+
+        async with self._capacity:
+            browser = await self._checkout()
+            try:
+                yield browser.crawler
+            finally:
+                await self._checkin(browser)
+
+    async def _checkout(self) -> _PooledBrowser:
+        while True:
+            async with self._changed:
+                candidates = [b for b in self._browsers if b.ready and b.active < self.contexts_per_browser]
+                if candidates:
+                    browser = min(candidates, key=lambda b: b.active)
+                    browser.active += 1
+                    return browser
+                if any(b.crawler for b in self._browsers):
+                    await self._changed.wait()
+                    continue
+
+            # Nothing running: launch on demand (shielded, so a cancelled scrape doesn't abort a launch half-way)
+            await asyncio.shield(self._spawn(self._launch_missing()))
+            if not any(b.crawler for b in self._browsers):
+                raise BrowserUnavailable("Headless browser could not be launched")
+
+    async def _checkin(self, browser: _PooledBrowser):
+        async with self._changed:
+            browser.active -= 1
+            browser.pages += 1
+            self._pages_served += 1
+            if self.max_pages_per_browser and browser.pages >= self.max_pages_per_browser and not browser.draining:
+                self._drain(browser, "max_pages")
+            if browser.draining and browser.active == 0:
+                self._spawn(self._recycle(browser))
+            self._changed.notify_all()
+
+    def _drain(self, browser: _PooledBrowser, reason: str):
+        browser.draining = True
+        BROWSER_RECYCLES.inc(reason=reason)
+        logger.info("♻️ Recycling browser %s (%s, %s pages)", browser.index, reason, browser.pages)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _prelaunch(self):
+        await self._launch_missing()
+        launched = sum(1 for browser in self._browsers if browser.crawler)
+        if launched:
+            logger.info("🌐 Browser pool ready: %s/%s browsers, %s pages each", launched, self.size, self.contexts_per_browser)
+
+    async def _launch_missing(self):
+        async with self._launch_lock:
+            for browser in self._browsers:
+                if browser.crawler is None:
+                    if not await self._launch(browser):
+                        break
+
+    async def _launch(self, browser: _PooledBrowser) -> bool:
+        start = time.perf_counter()
+        children_before = {child.pid for child in psutil.Process().children()}
+        try:
+            from crawl4ai import AsyncWebCrawler, BrowserConfig
+            crawler = AsyncWebCrawler(config=BrowserConfig(headless=True, verbose=False))
+            await crawler.start()
+        except Exception as e:
+            self._launch_failed_at = time.monotonic()
+            logger.warning("⚠️ Could not launch headless browser (retrying in %ss): %s", self.retry_seconds, str(e).splitlines()[0])
+            return False
+
+        browser.crawler = crawler
+        browser.pids = {child.pid for child in psutil.Process().children()} - children_before
+        browser.pages = 0
+        browser.draining = False
+        browser.launched_at = time.monotonic()
+        self._launch_failed_at = None
+        BROWSER_LAUNCH_LATENCY.observe(time.perf_counter() - start)
+        async with self._changed:
+            self._changed.notify_all()
+        return True
+
+    async def _close(self, browser: _PooledBrowser):
+        crawler, browser.crawler = browser.crawler, None
+        browser.pids = set()
+        if crawler:
+            try:
+                await crawler.close()
+            except Exception as e:
+                logger.warning("⚠️ Could not close browser %s: %s", browser.index, e)
+
+    async def _recycle(self, browser: _PooledBrowser):
+        async with self._launch_lock:
+            if not browser.draining or browser.active:
+                return  # already recycled by an earlier call
+            await self._close(browser)
+            browser.draining = False
+            await self._launch(browser)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error("❌ Browser pool health check failed: %s", e)
+
+    async def check_health(self):
+        """Recycle disconnected browsers, enforce the memory ceiling and retry failed launches"""
+        async with self._changed:
+            for browser in self._browsers:
+                if browser.crawler and not browser.draining and not browser.connected():
+                    self._drain(browser, "disconnected")
+
+            if self.memory_limit_bytes:
+                usage = {browser.index: browser.rss_bytes() for browser in self._browsers if browser.ready}
+                if sum(usage.values()) > self.memory_limit_bytes:
+                    largest = self._browsers[max(usage, key=usage.get)]
+                    self._drain(largest, "memory")
+
+            for browser in self._browsers:
+                if browser.draining and browser.active == 0:
+                    self._spawn(self._recycle(browser))
+
+        if any(browser.crawler is None for browser in self._browsers) and self.available and not self._launch_lock.locked():
+            self._spawn(self._launch_missing())
+
+    def get_stats(self) -> Dict[str, Any]:
+        browsers: List[Dict[str, Any]] = [
+            {
+                "running": browser.crawler is not None,
+                "active_pages": browser.active,
+                "pages_served": browser.pages,
+                "draining": browser.draining,
+                "rss_mb": round(browser.rss_bytes() / (1024 * 1024), 1),
+                "uptime_seconds": round(time.monotonic() - browser.launched_at) if browser.crawler else None
+            }
+            for browser in self._browsers
+        ]
+        return {
+            "size": self.size,
+            "contexts_per_browser": self.contexts_per_browser,
+            "available": self.available,
+            "pages_served": self._pages_served,
+            "memory_limit_mb": self.memory_limit_bytes // (1024 * 1024),
+            "browsers": browsers
+        }
+
+
+# Global browser pool instance
+browser_pool = BrowserPool()
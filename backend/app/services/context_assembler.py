@@ -0,0 +1,196 @@
+"""
+Context assembly for RAG prompts
+Merges adjacent chunks of the same knowledge item (stripping the splitter overlap)
+and packs the result into a per-model token budget before the LLM call
+"""
+import logging
+from typing import Dict, Any, List, Optional
+
+from app.config import CONTEXT_TOKEN_BUDGET
+from app.services.llm_service import LLMService
+
+logger = logging.getLogger(__name__)
+
+# RecursiveCharacterTextSplitter in store_knowledge_item uses chunk_overlap=300;
+# search a little further since the overlap snaps to separator boundaries
+MAX_CHUNK_OVERLAP_CHARS = 400
+MIN_CHUNK_OVERLAP_CHARS = 20
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Load the tiktoken encoding once (None if tiktoken or its BPE file is unavailable)"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning("⚠️ tiktoken encoding unavailable, estimating tokens from characters: %s", e)
+            _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Token count for a chunk (cl100k_base, or ~4 chars per token as a fallback)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+
+def find_chunk_overlap(previous: str, following: str) -> int:
+    """Length of the longest suffix of `previous` that is also a prefix of `following`"""
+    longest = min(len(previous), len(following), MAX_CHUNK_OVERLAP_CHARS)
+    for size in range(longest, MIN_CHUNK_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:size]):
+            return size
+    return 0
+
+
+class ContextAssembler:
+    """Builds the context text handed to the LLM from retrieved documents"""
+
+    def __init__(self, default_budget: int = 3000):
+        self.default_budget = default_budget
+
+    def get_budget(self, model: str) -> int:
+        """Context token budget for a model (AVAILABLE_MODELS entry, else the configured default)"""
+        model_config = LLMService.AVAILABLE_MODELS.get(model, {})
+        return model_config.get("context_token_budget", self.default_budget)
+
+    @staticmethod
+    def _doc_tokens(doc: Dict[str, Any]) -> int:
+        """Token count stored at ingestion, counted on the fly for older points"""
+        token_count = doc.get("metadata", {}).get("tokenCount")
+        if isinstance(token_count, int):
+            return token_count
+        return count_tokens(doc.get("content", ""))
+
+    def _build_blocks(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Group documents by itemId and merge runs of consecutive chunkIndex values
+        Each block keeps the rank of its best document so relevance order is preserved
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        blocks = []
+
+        for rank, doc in enumerate(docs):
+            metadata = doc.get("metadata", {})
+            item_id = metadata.get("itemId")
+            chunk_index = metadata.get("chunkIndex")
+            entry = {"rank": rank, "doc": doc, "chunk_index": chunk_index, "tokens": self._doc_tokens(doc)}
+            if item_id is None or not isinstance(chunk_index, int):
+                blocks.append(self._new_block(entry))
+                continue
+            groups.setdefault(item_id, []).append(entry)
+
+        for entries in groups.values():
+            entries.sort(key=lambda entry: entry["chunk_index"])
+            block = None
+            for entry in entries:
+                if block is not None and entry["chunk_index"] == block["last_chunk_index"]:
+                    # Same chunk retrieved twice (e.g. dense + fallback) - keep the first copy
+                    block["rank"] = min(block["rank"], entry["rank"])
+                    block["tokens_original"] += entry["tokens"]
+                    block["duplicates"] += 1
+                    continue
+                if block is not None and entry["chunk_index"] == block["last_chunk_index"] + 1:
+                    self._append_chunk(block, entry)
+                    continue
+                block = self._new_block(entry)
+                blocks.append(block)
+
+        blocks.sort(key=lambda block: block["rank"])
+        return blocks
+
+    @staticmethod
+    def _new_block(entry: Dict[str, Any]) -> Dict[str, Any]:
+        doc = entry["doc"]
+        return {
+            "rank": entry["rank"],
+            "content": doc.get("content", ""),
+            "tokens": entry["tokens"],
+            "tokens_original": entry["tokens"],
+            "last_chunk_index": entry["chunk_index"],
+            "docs": [doc],
+            "merged": 0,
+            "duplicates": 0
+        }
+
+    @staticmethod
+    def _append_chunk(block: Dict[str, Any], entry: Dict[str, Any]):
+        """Append the next chunk of the same item, dropping the text it repeats from the previous one"""
+        text = entry["doc"].get("content", "")
+        overlap = find_chunk_overlap(block["content"], text)
+        remainder = text[overlap:]
+
+        # Scale the precomputed count instead of re-tokenizing at query time
+        overlap_tokens = round(entry["tokens"] * overlap / len(text)) if text else 0
+        separator = "" if overlap else "\n"
+
+        block["content"] = f"{block['content']}{separator}{remainder}"
+        block["tokens"] += entry["tokens"] - overlap_tokens
+        block["tokens_original"] += entry["tokens"]
+        block["last_chunk_index"] = entry["chunk_index"]
+        block["rank"] = min(block["rank"], entry["rank"])
+        block["docs"].append(entry["doc"])
+        block["merged"] += 1
+
+    def assemble(self, docs: List[Dict[str, Any]], model: str, budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Build the prompt context for `docs` (already in relevance order)
+
+        Returns the context text, the documents that made it in (for sources)
+        and token accounting for the response metadata.
+        """
+        budget = budget if budget is not None else self.get_budget(model)
+        blocks = self._build_blocks(docs)
+
+        tokens_original = sum(block["tokens_original"] for block in blocks)
+        tokens_used = 0
+        included_blocks = []
+        dropped_docs = 0
+
+        for block in blocks:
+            if tokens_used + block["tokens"] <= budget:
+                included_blocks.append(block)
+                tokens_used += block["tokens"]
+            elif not included_blocks:
+                # Never send an empty context - keep the head of the best block
+                keep_chars = int(len(block["content"]) * budget / block["tokens"]) if block["tokens"] else 0
+                included_blocks.append({**block, "content": block["content"][:keep_chars]})
+                tokens_used += budget
+            else:
+                dropped_docs += len(block["docs"])
+
+        context_text = "".join(f"{block['content']}\n\n" for block in included_blocks)
+        # Sources stay in relevance order, whichever block their chunk was merged into
+        ranks = {id(doc): rank for rank, doc in enumerate(docs)}
+        included_docs = sorted(
+            (doc for block in included_blocks for doc in block["docs"]),
+            key=lambda doc: ranks[id(doc)]
+        )
+
+        return {
+            "context_text": context_text,
+            "documents": included_docs,
+            "stats": {
+                "token_budget": budget,
+                "tokens_original": tokens_original,
+                "tokens_used": tokens_used,
+                "tokens_saved": max(0, tokens_original - tokens_used),
+                "chunks_merged": sum(block["merged"] for block in blocks),
+                "duplicates_removed": sum(block["duplicates"] for block in blocks),
+                "documents_dropped": dropped_docs
+            }
+        }
+
+
+# Global assembler instance
+context_assembler = ContextAssembler(default_budget=CONTEXT_TOKEN_BUDGET)
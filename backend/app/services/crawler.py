@@ -0,0 +1,357 @@
+"""
+Breadth-first website crawler
+Crawls one origin from a start URL, seeding the frontier from sitemap.xml (and sitemaps listed in
+robots.txt), with a cap on pages in flight, per-host politeness (concurrency + minimum delay, or
+the robots.txt Crawl-delay) and deduplication by canonical URL and by page content hash.
+
+Fetching a single page is delegated to the caller (WebsiteScraper), so the crawler only decides
+what to fetch and when. Pages are handed to `on_page` as they are fetched, from a bounded queue,
+so chunking and embedding overlap with the rest of the crawl. On a re-crawl the fetcher may answer
+a known page with {"not_modified": True} (conditional GET) or {"gone": True} (404/410); those are
+recorded, not handed on, and don't count against max_pages.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change page content
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|msclkid|mc_cid|mc_eid|ref|_ga|_hsenc|_hsmi)$", re.IGNORECASE)
+# Links to these are never HTML pages
+_SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".bmp", ".mp4", ".mp3", ".wav",
+    ".avi", ".mov", ".zip", ".gz", ".tar", ".rar", ".7z", ".exe", ".dmg", ".css", ".js", ".json",
+    ".xml", ".rss", ".atom", ".woff", ".woff2", ".ttf", ".eot", ".doc", ".docx", ".xls", ".xlsx",
+    ".ppt", ".pptx", ".csv"
+)
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_SITEMAP_NAMESPACE = re.compile(r"^\{[^}]+\}")
+# Nested sitemap indexes followed at most this deep
+_MAX_SITEMAP_DEPTH = 2
+
+PageFetcher = Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+TextFetcher = Callable[[str], Awaitable[Optional[str]]]
+PageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Canonical form of an http(s) URL, or None for anything that isn't a crawlable page
+    Lowercases scheme and host, drops default ports, fragments, tracking parameters and trailing
+    slashes (except the root), and sorts the query string.
+    """
+    try:
+        url = urljoin(base, url.strip()) if base else url.strip()
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, _DEFAULT_PORTS[scheme]) else f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if path != "/" and path.endswith("/"):
+        path = path.rstrip("/")
+    if path.lower().endswith(_SKIPPED_EXTENSIONS):
+        return None
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(key)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def origin_of(url: str) -> str:
+    """scheme://host[:port] of a normalized URL, with a leading www. ignored"""
+    parts = urlsplit(url)
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return f"{parts.scheme}://{host}"
+
+
+def content_fingerprint(content: str) -> str:
+    """Hash of whitespace-normalized page text, for spotting the same page under different URLs"""
+    return hashlib.sha256(" ".join(content.split()).encode("utf-8")).hexdigest()
+
+
+def parse_sitemap(xml_text: str) -> Tuple[List[str], List[str]]:
+    """(page URLs, nested sitemap URLs) from a sitemap or sitemap index"""
+    try:
+        root = ElementTree.fromstring(xml_text.strip().encode("utf-8"))
+    except ElementTree.ParseError:
+        return [], []
+
+    is_index = _SITEMAP_NAMESPACE.sub("", root.tag) == "sitemapindex"
+    locations = [
+        element.text.strip()
+        for element in root.iter()
+        if _SITEMAP_NAMESPACE.sub("", element.tag) == "loc" and element.text
+    ]
+    return ([], locations) if is_index else (locations, [])
+
+
+class HostPoliteness:
+    """Per-host concurrency limit and minimum delay between request starts"""
+
+    def __init__(self, concurrency: int, delay_seconds: float):
+        self.concurrency = max(1, concurrency)
+        self.delay_seconds = delay_seconds
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._delays: Dict[str, float] = {}
+
+    def set_delay(self, host: str, delay_seconds: float):
+        """Override the delay for one host (robots.txt Crawl-delay)"""
+        self._delays[host] = max(self.delay_seconds, delay_seconds)
+
+    def slot(self, host: str) -> "_HostSlot":
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.concurrency)
+            self._locks[host] = asyncio.Lock()
+        return _HostSlot(self, host)
+
+    async def _wait_turn(self, host: str):
+        async with self._locks[host]:
+            now = time.monotonic()
+            start = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = start + self._delays.get(host, self.delay_seconds)
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class _HostSlot:
+    def __init__(self, politeness: HostPoliteness, host: str):
+        self._politeness = politeness
+        self._host = host
+
+    async def __aenter__(self):
+        await self._politeness._semaphores[self._host].acquire()
+        await self._politeness._wait_turn(self._host)
+
+    async def __aexit__(self, *exc_info):
+        self._politeness._semaphores[self._host].release()
+
+
+class SiteCrawler:
+    """Bounded-concurrency BFS over one origin"""
+
+    def __init__(
+        self,
+        fetch_page: PageFetcher,
+        fetch_text: TextFetcher,
+        max_pages: int = 50,
+        concurrency: int = 8,
+        per_host_concurrency: int = 2,
+        per_host_delay: float = 0.25,
+        max_depth: int = 5,
+        respect_robots: bool = True,
+        user_agent: str = "*"
+    ):
+        self.fetch_page = fetch_page
+        self.fetch_text = fetch_text
+        self.max_pages = max(1, max_pages)
+        self.concurrency = max(1, concurrency)
+        self.max_depth = max_depth
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self.politeness = HostPoliteness(per_host_concurrency, per_host_delay)
+
+        self._origin = ""
+        self._robots: Optional[RobotFileParser] = None
+        self._seen_urls: Set[str] = set()
+        self._seen_content: Set[str] = set()
+        self._claimed = 0  # pages fetched or being fetched, counted against max_pages
+        self.stats = {"fetched": 0, "failed": 0, "duplicates": 0, "skipped_robots": 0, "not_modified": 0, "gone": 0}
+        self.not_modified_urls: List[str] = []
+        self.gone_urls: List[str] = []
+
+    def _in_scope(self, url: str) -> bool:
+        return origin_of(url) == self._origin
+
+    def _allowed(self, url: str) -> bool:
+        if not self._robots:
+            return True
+        try:
+            return self._robots.can_fetch(self.user_agent, url)
+        except Exception:
+            return True
+
+    async def _load_robots(self, start_url: str) -> List[str]:
+        """Parse robots.txt; returns the sitemaps it lists"""
+        text = await self.fetch_text(urljoin(start_url, "/robots.txt"))
+        if not text:
+            return []
+        parser = RobotFileParser()
+        parser.parse(text.splitlines())
+        if self.respect_robots:
+            self._robots = parser
+            delay = parser.crawl_delay(self.user_agent)
+            if delay:
+                self.politeness.set_delay(urlsplit(start_url).netloc, float(delay))
+        return list(parser.site_maps() or [])
+
+    async def _sitemap_urls(self, start_url: str, extra_sitemaps: List[str]) -> List[str]:
+        """Same-origin page URLs from sitemap.xml and any sitemaps named in robots.txt"""
+        pending = [(url, 0) for url in dict.fromkeys([urljoin(start_url, "/sitemap.xml"), *extra_sitemaps])]
+        visited: Set[str] = set()
+        pages: List[str] = []
+        limit = self.max_pages * 4
+
+        while pending and len(pages) < limit:
+            sitemap_url, depth = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            text = await self.fetch_text(sitemap_url)
+            if not text:
+                continue
+            page_urls, nested = parse_sitemap(text)
+            pages.extend(page_urls)
+            if depth < _MAX_SITEMAP_DEPTH:
+                pending.extend((url, depth + 1) for url in nested)
+
+        return pages[:limit]
+
+    def _enqueue(self, frontier: asyncio.Queue, url: Optional[str], depth: int):
+        if not url or url in self._seen_urls or depth > self.max_depth or not self._in_scope(url):
+            return
+        # No point queueing far more URLs than can ever be fetched
+        if len(self._seen_urls) >= self.max_pages * 20:
+            return
+        if not self._allowed(url):
+            self.stats["skipped_robots"] += 1
+            self._seen_urls.add(url)
+            return
+        self._seen_urls.add(url)
+        frontier.put_nowait((url, depth))
+
+    async def crawl(self, start_url: str, on_page: PageHandler, seed_urls: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Crawl from start_url, awaiting on_page(page) for every new page; returns crawl stats
+        seed_urls (e.g. the pages found by an earlier crawl) are queued alongside the sitemap
+        """
+        start_time = time.perf_counter()
+        start = normalize_url(start_url)
+        if not start:
+            raise ValueError(f"Not a crawlable URL: {start_url}")
+        self._origin = origin_of(start)
+
+        frontier: asyncio.Queue = asyncio.Queue()
+        pages: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        self._enqueue(frontier, start, 0)
+
+        sitemaps = await self._load_robots(start)
+        sitemap_urls = await self._sitemap_urls(start, sitemaps)
+        for url in [*(seed_urls or []), *sitemap_urls]:
+            self._enqueue(frontier, normalize_url(url), 1)
+        logger.info("🗺️ Crawl of %s seeded with %s sitemap URLs", self._origin, len(sitemap_urls))
+
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    if self._claimed >= self.max_pages:
+                        continue
+                    self._claimed += 1
+                    page = await self._fetch(url)
+                    if page is None:
+                        self._claimed -= 1
+                        continue
+                    if page.get("not_modified") or page.get("gone"):
+                        (self.not_modified_urls if page.get("not_modified") else self.gone_urls).append(url)
+                        self._claimed -= 1
+                        continue
+
+                    fingerprint = content_fingerprint(page["content"])
+                    if fingerprint in self._seen_content:
+                        self.stats["duplicates"] += 1
+                        self._claimed -= 1
+                        continue
+                    self._seen_content.add(fingerprint)
+                    self.stats["fetched"] += 1
+
+                    for link in page.get("links", []):
+                        self._enqueue(frontier, normalize_url(link, page["url"]), depth + 1)
+                    await pages.put(page)
+                finally:
+                    frontier.task_done()
+
+        async def consumer():
+            while True:
+                page = await pages.get()
+                try:
+                    await on_page(page)
+                except Exception as e:
+                    logger.error("❌ Failed to process crawled page %s: %s", page.get("url"), e)
+                finally:
+                    pages.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        consumer_task = asyncio.create_task(consumer())
+        try:
+            await frontier.join()
+            await pages.join()
+        finally:
+            for task in [*workers, consumer_task]:
+                task.cancel()
+            await asyncio.gather(*workers, consumer_task, return_exceptions=True)
+
+        elapsed = time.perf_counter() - start_time
+        pages_per_second = self.stats["fetched"] / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            "🕸️ Crawled %s pages from %s in %.1fs (%.2f pages/s, %s unchanged, %s failed, %s duplicates)",
+            self.stats["fetched"], self._origin, elapsed, pages_per_second, self.stats["not_modified"],
+            self.stats["failed"], self.stats["duplicates"]
+        )
+        return {
+            **self.stats,
+            "discovered": len(self._seen_urls),
+            "not_modified_urls": self.not_modified_urls,
+            "gone_urls": self.gone_urls,
+            "sitemap_urls": len(sitemap_urls),
+            "elapsed_time": elapsed,
+            "pages_per_second": round(pages_per_second, 2)
+        }
+
+    async def _fetch(self, url: str) -> Optional[Dict[str, Any]]:
+        """Fetch one page under the host's politeness limits; None when it failed or has no text"""
+        host = urlsplit(url).netloc
+        try:
+            async with self.politeness.slot(host):
+                page = await self.fetch_page(url)
+        except Exception as e:
+            logger.warning("⚠️ Failed to crawl %s: %s", url, e)
+            self.stats["failed"] += 1
+            return None
+
+        if page and (page.get("not_modified") or page.get("gone")):
+            self.stats["not_modified" if page.get("not_modified") else "gone"] += 1
+            return page
+
+        if not page or not page.get("content", "").strip():
+            self.stats["failed"] += 1
+            return None
+
+        # Redirects and <link rel="canonical"> point at the URL that identifies the page
+        for alias in (page.get("url"), page.get("canonical_url")):
+            alias = normalize_url(alias, url) if alias else None
+            if alias and self._in_scope(alias):
+                self._seen_urls.add(alias)
+        page["url"] = normalize_url(page.get("url") or url, url) or url
+        return page
@@ -0,0 +1,236 @@
+"""
+Content-addressed cache for document (chunk) embeddings
+Keyed by (model, sha256 of the chunk text) and stored in a local SQLite file, so re-importing an
+unchanged Notion page, URL or PDF only sends new or edited chunks to Voyage AI.
+Vectors are stored as float32 blobs, or int8 with a per-vector scale (4x smaller);
+the least recently used entries are evicted once the file grows past its size limit.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import DOCUMENT_EMBEDDING_CACHE_PATH, DOCUMENT_EMBEDDING_CACHE_MAX_MB, DOCUMENT_EMBEDDING_CACHE_DTYPE
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_LOOKUP_BATCH = 500
+# Evict down to this fraction of the limit so eviction doesn't run on every insert
+_EVICTION_TARGET = 0.9
+# Fixed per-row overhead (key, scale, timestamps) added to the blob size when accounting
+_ROW_OVERHEAD_BYTES = 96
+
+
+def content_hash(text: str) -> str:
+    """sha256 of the chunk text (hex) - the cache key and the chunk's identity in Qdrant payloads"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_embedding(embedding: Sequence[float], dtype: str):
+    """Pack an embedding into (blob, scale); int8 uses symmetric per-vector quantization"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    if dtype == "int8":
+        peak = float(np.abs(vector).max()) if vector.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        return np.round(vector / scale).astype(np.int8).tobytes(), scale
+    return vector.tobytes(), 1.0
+
+
+def decode_embedding(blob: bytes, dtype: str, scale: float) -> List[float]:
+    """Inverse of encode_embedding"""
+    if dtype == "int8":
+        return (np.frombuffer(blob, dtype=np.int8).astype(np.float32) * scale).tolist()
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+
+class DocumentEmbeddingCache:
+    """Persistent (model, content hash) -> embedding store with size-based LRU eviction"""
+
+    def __init__(self, db_path: str = "", max_bytes: int = 1024 * 1024 * 1024, dtype: str = "float32"):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.dtype = dtype if dtype in ("float32", "int8") else "float32"
+        self._db = None
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._entries = 0  # kept in step with the table so get_stats never scans it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._initialize()
+
+    def _initialize(self):
+        """Open (or create) the SQLite store"""
+        if not self.db_path:
+            return
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS document_embeddings ("
+                "model TEXT NOT NULL, content_hash TEXT NOT NULL, dtype TEXT NOT NULL, "
+                "scale REAL NOT NULL, embedding BLOB NOT NULL, size INTEGER NOT NULL, "
+                "last_used REAL NOT NULL, PRIMARY KEY (model, content_hash)) WITHOUT ROWID"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS document_embeddings_last_used ON document_embeddings (last_used)"
+            )
+            self._db.commit()
+            self._entries, self._total_bytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM document_embeddings"
+            ).fetchone()
+            logger.info("✅ Document embedding cache at %s (%.1f MB, %s)", self.db_path, self._total_bytes / 1e6, self.dtype)
+        except Exception as e:
+            logger.warning("⚠️ Could not open document embedding cache (%s): %s", self.db_path, e)
+            self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._db is not None
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Embeddings for the content hashes that are cached (missing hashes are simply absent)"""
+        if not self.enabled or not hashes:
+            return {}
+
+        unique_hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            try:
+                for start in range(0, len(unique_hashes), _LOOKUP_BATCH):
+                    batch = unique_hashes[start:start + _LOOKUP_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._db.execute(
+                        f"SELECT content_hash, dtype, scale, embedding FROM document_embeddings "
+                        f"WHERE model = ? AND content_hash IN ({placeholders})",
+                        (model, *batch)
+                    ).fetchall()
+                    for chunk_hash, dtype, scale, blob in rows:
+                        found[chunk_hash] = decode_embedding(blob, dtype, scale)
+
+                if found:
+                    now = time.time()
+                    self._db.executemany(
+                        "UPDATE document_embeddings SET last_used = ? WHERE model = ? AND content_hash = ?",
+                        [(now, model, chunk_hash) for chunk_hash in found]
+                    )
+                    self._db.commit()
+            except Exception as e:
+                logger.warning("⚠️ Document embedding cache read failed: %s", e)
+                return {}
+
+            self.hits += len(found)
+            self.misses += len(unique_hashes) - len(found)
+        return found
+
+    def put_many(self, model: str, hashes: List[str], embeddings: List[List[float]]):
+        """Store embeddings for the given content hashes, evicting old entries past the size limit"""
+        if not self.enabled or not hashes:
+            return
+
+        now = time.time()
+        rows = []
+        for chunk_hash, embedding in zip(hashes, embeddings):
+            blob, scale = encode_embedding(embedding, self.dtype)
+            rows.append((model, chunk_hash, self.dtype, scale, blob, len(blob) + _ROW_OVERHEAD_BYTES, now))
+        # A hash repeated within the call is one row (the last one wins, as with INSERT OR REPLACE)
+        rows = list({row[1]: row for row in rows}.values())
+
+        with self._lock:
+            try:
+                # Replacing an existing row must not count it (or its size) twice
+                replaced_rows = 0
+                replaced = 0
+                for start in range(0, len(rows), _LOOKUP_BATCH):
+                    batch = [row[1] for row in rows[start:start + _LOOKUP_BATCH]]
+                    placeholders = ",".join("?" * len(batch))
+                    count, size = self._db.execute(
+                        f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM document_embeddings "
+                        f"WHERE model = ? AND content_hash IN ({placeholders})",
+                        (model, *batch)
+                    ).fetchone()
+                    replaced_rows += count
+                    replaced += size
+
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO document_embeddings "
+                    "(model, content_hash, dtype, scale, embedding, size, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._db.commit()
+                self._total_bytes += sum(row[5] for row in rows) - replaced
+                self._entries += len(rows) - replaced_rows
+
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+            except Exception as e:
+                logger.warning("⚠️ Document embedding cache write failed: %s", e)
+
+    def _evict(self):
+        """Delete least recently used rows until the store is under the eviction target (lock held)"""
+        target = int(self.max_bytes * _EVICTION_TARGET)
+        while self._total_bytes > target:
+            rows = self._db.execute(
+                "SELECT model, content_hash, size FROM document_embeddings ORDER BY last_used LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                self._entries = 0
+                break
+
+            doomed = []
+            for model, chunk_hash, size in rows:
+                doomed.append((model, chunk_hash))
+                self._total_bytes -= size
+                if self._total_bytes <= target:
+                    break
+
+            self._db.executemany(
+                "DELETE FROM document_embeddings WHERE model = ? AND content_hash = ?",
+                doomed
+            )
+            self._db.commit()
+            self._entries -= len(doomed)
+            self.evictions += len(doomed)
+
+        logger.info("🧹 Document embedding cache evicted down to %.1f MB (%s evictions total)", self._total_bytes / 1e6, self.evictions)
+
+    def clear(self):
+        """Drop every cached embedding"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM document_embeddings")
+            self._db.commit()
+            self._total_bytes = 0
+            self._entries = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizing info (running totals - no query, safe on the event loop)"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "path": self.db_path,
+            "dtype": self.dtype,
+            "entries": self._entries,
+            "size_mb": round(self._total_bytes / 1e6, 2),
+            "max_mb": round(self.max_bytes / 1e6, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Global cache instance
+document_embedding_cache = DocumentEmbeddingCache(
+    db_path=DOCUMENT_EMBEDDING_CACHE_PATH,
+    max_bytes=DOCUMENT_EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+    dtype=DOCUMENT_EMBEDDING_CACHE_DTYPE
+)
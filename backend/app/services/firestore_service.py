@@ -5,7 +5,7 @@ import os
 import json
 import logging
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import firebase_admin
 from firebase_admin import credentials, firestore
 from app.config import FIREBASE_PROJECT_ID
@@ -57,7 +57,11 @@ class FirestoreService:
             self.db = None
     
     def store_scraped_website(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Store scraped website data in Firestore"""
+        """
+        Store scraped website data in Firestore
+        With a document_id the record is written under that id, so re-scraping a site replaces its
+        record; pages (url, validators, content hash, chunk ids) and recrawl_interval_hours drive re-crawls
+        """
         try:
             if not self.db:
                 return {
@@ -78,19 +82,31 @@ class FirestoreService:
                 "chunks_created": data.get("chunks_created", 0),
                 "scraped_at": datetime.utcnow(),
                 "metadata": data.get("metadata", {}),
-                "status": "completed"
+                "status": "completed",
+                "agent_id": data.get("agent_id"),
+                "workspace_id": data.get("workspace_id"),
+                "embedding_model": data.get("embedding_model"),
+                "max_pages": data.get("max_pages"),
+                "pages": data.get("pages", []),
+                "recrawl_interval_hours": data.get("recrawl_interval_hours", 0),
+                "last_crawled_at": datetime.utcnow(),
+                "next_crawl_at": self._next_crawl_at(data.get("recrawl_interval_hours", 0))
             }
             
             # Store in the 'scraped_websites' collection
             collection_ref = self.db.collection("scraped_websites")
-            doc_ref = collection_ref.add(doc_data)
+            if data.get("document_id"):
+                collection_ref.document(data["document_id"]).set(doc_data)
+                document_id = data["document_id"]
+            else:
+                document_id = collection_ref.add(doc_data)[1].id
             
-            logger.info(f"✅ Stored scraped website data in Firestore: {doc_ref[1].id}")
+            logger.info(f"✅ Stored scraped website data in Firestore: {document_id}")
             
             return {
                 "success": True,
                 "message": "Scraped website data stored in Firestore successfully",
-                "document_id": doc_ref[1].id,
+                "document_id": document_id,
                 "collection": "scraped_websites"
             }
             
@@ -102,6 +118,68 @@ class FirestoreService:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _next_crawl_at(interval_hours: Optional[float]) -> Optional[datetime]:
+        """When a website is due for its next re-crawl; None when re-crawling is off"""
+        return datetime.utcnow() + timedelta(hours=interval_hours) if interval_hours else None
+
+    def get_scraped_website(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """One scraped_websites record (with its id), or None"""
+        if not self.db:
+            return None
+        try:
+            doc = self.db.collection("scraped_websites").document(document_id).get()
+            if not doc.exists:
+                return None
+            return {**doc.to_dict(), "id": doc.id}
+        except Exception as e:
+            logger.error(f"❌ Error retrieving scraped website {document_id}: {str(e)}")
+            return None
+
+    def get_websites_due_for_recrawl(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """scraped_websites records whose next_crawl_at has passed, most overdue first"""
+        if not self.db:
+            return []
+        try:
+            query = (
+                self.db.collection("scraped_websites")
+                .where("next_crawl_at", "<=", datetime.utcnow())
+                .order_by("next_crawl_at")
+                .limit(limit)
+            )
+            return [{**doc.to_dict(), "id": doc.id} for doc in query.stream()]
+        except Exception as e:
+            logger.error(f"❌ Error querying websites due for re-crawl: {str(e)}")
+            return []
+
+    def update_scraped_website(self, document_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Update fields of a scraped_websites record; a recrawl_interval_hours field also reschedules it"""
+        try:
+            if not self.db:
+                return {
+                    "success": False,
+                    "message": "Firestore not available",
+                    "error": "Firestore client not initialized"
+                }
+
+            if "recrawl_interval_hours" in fields:
+                fields = {**fields, "next_crawl_at": self._next_crawl_at(fields["recrawl_interval_hours"])}
+            self.db.collection("scraped_websites").document(document_id).update(fields)
+
+            return {
+                "success": True,
+                "message": "Scraped website record updated",
+                "document_id": document_id
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Error updating scraped website {document_id}: {str(e)}")
+            return {
+                "success": False,
+                "message": "Failed to update in Firestore",
+                "error": str(e)
+            }
+
     def store_knowledge_chunks(self, chunks_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Store knowledge chunks metadata in Firestore"""
         try:
@@ -3,9 +3,11 @@ Google Sheets integration service
 Handles OAuth and data fetching from Google Sheets
 """
 import requests
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import base64
 
+from app.services.work_executor import work_executor
+
 
 class GoogleSheetsService:
     def __init__(self):
@@ -215,6 +217,7 @@ class GoogleSheetsService:
                 "sheets": ["Sheet1", "Sheet2", ...],
                 "data": [[row1], [row2], ...],
                 "content": "formatted text content",
+                "chunks": ["formatted text of a group of rows", ...],
                 "error": "..." (if failed)
             }
         """
@@ -262,8 +265,8 @@ class GoogleSheetsService:
             data_result = data_response.json()
             values = data_result.get("values", [])
 
-            # Convert data to formatted text content
-            content = self._format_sheet_data_as_text(title, target_sheet, values)
+            # Convert data to formatted text content (CPU work on large sheets: done in a work executor process)
+            content, chunks = work_executor.call("sheets", self._format_sheet_data, title, target_sheet, values)
 
             return {
                 "success": True,
@@ -271,6 +274,7 @@ class GoogleSheetsService:
                 "sheets": sheets,
                 "data": values,
                 "content": content,
+                "chunks": chunks,
                 "rows_count": len(values),
                 "sheet_name": target_sheet
             }
@@ -281,6 +285,20 @@ class GoogleSheetsService:
                 "error": f"Error fetching spreadsheet data: {str(e)}"
             }
 
+    def _format_sheet_data(
+        self,
+        spreadsheet_title: str,
+        sheet_name: str,
+        data: List[List[str]]
+    ) -> Tuple[str, List[str]]:
+        """
+        Formatted text content and row chunks of a sheet
+        """
+        return (
+            self._format_sheet_data_as_text(spreadsheet_title, sheet_name, data),
+            self._format_sheet_data_as_chunks(spreadsheet_title, sheet_name, data)
+        )
+
     def _format_sheet_data_as_text(
         self,
         spreadsheet_title: str,
@@ -312,6 +330,44 @@ class GoogleSheetsService:
 
         return "\n".join(lines)
 
+    def _format_sheet_data_as_chunks(
+        self,
+        spreadsheet_title: str,
+        sheet_name: str,
+        data: List[List[str]],
+        max_chars: int = 1500
+    ) -> List[str]:
+        """
+        Format spreadsheet data as chunks of whole rows for embedding
+        Every chunk starts with the sheet heading and the header row, so each one reads as a table on its own
+        """
+        if len(data) < 2:
+            return [self._format_sheet_data_as_text(spreadsheet_title, sheet_name, data)]
+
+        headers = data[0]
+        heading = "\n".join([
+            f"# {spreadsheet_title}",
+            f"## Sheet: {sheet_name}",
+            "",
+            "| " + " | ".join(str(h) for h in headers) + " |",
+            "|" + "|".join(["---"] * len(headers)) + "|"
+        ])
+
+        chunks = []
+        rows: List[str] = []
+        size = len(heading)
+        for row in data[1:]:
+            padded_row = row + [""] * (len(headers) - len(row))
+            line = "| " + " | ".join(str(cell) for cell in padded_row[:len(headers)]) + " |"
+            if rows and size + len(line) + 1 > max_chars:
+                chunks.append(heading + "\n" + "\n".join(rows))
+                rows = []
+                size = len(heading)
+            rows.append(line)
+            size += len(line) + 1
+        chunks.append(heading + "\n" + "\n".join(rows))
+        return chunks
+
 
 # Create singleton instance
 google_sheets_service = GoogleSheetsService()
@@ -0,0 +1,241 @@
+"""
+Fast HTML to markdown extraction for scraped pages
+Parses with lxml (libxml2), strips boilerplate, picks the main content block and writes markdown
+straight from the lxml tree. Pure CPU work with no I/O, so callers run it off the event loop.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+import lxml.html
+from lxml import etree
+
+from app.config import CRAWL_JS_MIN_TEXT_CHARS
+
+# Never part of the page text
+_BOILERPLATE_TAGS = (
+    'script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript', 'svg', 'template',
+    'button', 'select', 'canvas', 'object', 'embed'
+)
+# class / id of page furniture inside the content block
+_BOILERPLATE_ATTR_RE = re.compile(
+    r'(^|[\s_-])(cookies?|consent|banner|breadcrumbs?|sidebar|share|sharing|social|newsletter|subscribe|'
+    r'popup|modal|advert|ads|promo|related|comments?|skip-link|navbar|menu|toolbar|pagination)($|[\s_-])',
+    re.IGNORECASE
+)
+_CONTENT_CLASSES = ('content', 'main-content', 'post-content', 'article-content')
+
+# Client-side rendering hints: root elements of SPA frameworks, and <noscript> "enable JavaScript" notices
+_SPA_ROOT_XPATH = (
+    '//*[@id="root" or @id="app" or @id="__next" or @id="__nuxt" or @id="___gatsby" or @id="svelte" or @id="q-app"]'
+    ' | //app-root | //*[@ng-app] | //*[@ng-version] | //*[@data-reactroot] | //*[@data-v-app]'
+)
+_NOSCRIPT_HINT_RE = re.compile(r'(enable|requires?|turn on|need|without)\W+(\w+\W+){0,4}javascript', re.IGNORECASE)
+
+_BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'body', 'dd', 'details', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section',
+    'summary', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul', 'br', 'header', 'footer', 'center'
+}
+_WHITESPACE_RE = re.compile(r'\s+')
+_LINE_BREAK = '\x00'
+
+
+def javascript_hint(document) -> Optional[str]:
+    """Why an unstripped page looks client-side rendered (noscript notice or empty SPA root), or None"""
+    for noscript in document.iter('noscript'):
+        if _NOSCRIPT_HINT_RE.search(noscript.text_content()):
+            return 'noscript'
+    for root in document.xpath(_SPA_ROOT_XPATH):
+        if len(_WHITESPACE_RE.sub(' ', root.text_content()).strip()) < CRAWL_JS_MIN_TEXT_CHARS:
+            return 'spa-shell'
+    return None
+
+
+def extract_page(html, title: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Title, markdown content, links, canonical URL and JavaScript hint of an HTML document
+
+    Args:
+        html: Page body (bytes, so lxml can honour the declared encoding, or str)
+        title: Optional title override
+
+    Returns:
+        {title, content, links, canonical_url, javascript_hint}
+    """
+    document = lxml.html.document_fromstring(html)
+
+    # Links are collected before navigation is stripped - they are how the crawl finds pages
+    links = document.xpath('//a/@href')
+    canonical = document.xpath('//link[@rel="canonical"]/@href')
+    hint = javascript_hint(document)
+
+    if not title:
+        title_text = document.findtext('.//title')
+        title = title_text.strip() if title_text and title_text.strip() else 'Untitled'
+
+    for element in list(document.iter(*_BOILERPLATE_TAGS)):
+        if element.getparent() is not None:
+            element.drop_tree()
+
+    main = _main_content(document)
+    if main is None:
+        raise Exception("Could not find main content on page")
+    _strip_page_furniture(main)
+
+    return {
+        'title': title,
+        'content': to_markdown(main),
+        'links': [str(link) for link in links],
+        'canonical_url': str(canonical[0]) if canonical else None,
+        'javascript_hint': hint
+    }
+
+
+def _main_content(document):
+    """<main>, else the largest <article>, else [role=main] or a content-classed div, else <body>"""
+    main = document.find('.//main')
+    if main is not None:
+        return main
+    articles = document.findall('.//article')
+    if articles:
+        return max(articles, key=lambda article: len(article.text_content()))
+    role_main = document.xpath('//*[@role="main"]')
+    if role_main:
+        return role_main[0]
+    for element in document.iter('div'):
+        if set((element.get('class') or '').split()) & set(_CONTENT_CLASSES):
+            return element
+    return document.find('.//body')
+
+
+def _strip_page_furniture(main):
+    """Drop cookie banners, share bars, related links etc. unless they hold most of the text"""
+    main_length = len(main.text_content()) or 1
+    for element in list(main.iter(etree.Element)):
+        if element is main or element.getparent() is None:
+            continue
+        marker = f"{element.get('class') or ''} {element.get('id') or ''}"
+        if marker.strip() and _BOILERPLATE_ATTR_RE.search(marker) and len(element.text_content()) < main_length / 2:
+            element.drop_tree()
+
+
+def to_markdown(root) -> str:
+    """Markdown for an lxml element: ATX headings, lists, links, emphasis, code, quotes and tables"""
+    lines: List[str] = []
+    try:
+        _render_children(root, lines, '')
+    except RecursionError:
+        # Pathologically nested markup: keep the text
+        lines = root.text_content().splitlines()
+    return '\n\n'.join(line.rstrip() for line in lines if line.strip())
+
+
+def _tag(element) -> Optional[str]:
+    return element.tag.lower() if isinstance(element.tag, str) else None
+
+
+def _flush(buffer: List[str], lines: List[str], prefix: str):
+    for part in ''.join(buffer).split(_LINE_BREAK):
+        text = _WHITESPACE_RE.sub(' ', part).strip()
+        if text:
+            lines.append(prefix + text)
+    buffer.clear()
+
+
+def _render_children(element, lines: List[str], prefix: str):
+    """Block-level rendering: inline runs become lines, block children render themselves"""
+    buffer = [element.text or '']
+    for child in element:
+        tag = _tag(child)
+        if tag in _BLOCK_TAGS:
+            _flush(buffer, lines, prefix)
+            _render_block(child, tag, lines, prefix)
+        elif tag is not None:
+            buffer.append(_inline(child))
+        buffer.append(child.tail or '')
+    _flush(buffer, lines, prefix)
+
+
+def _render_block(element, tag: str, lines: List[str], prefix: str):
+    if tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+        text = _WHITESPACE_RE.sub(' ', _inline_children(element).replace(_LINE_BREAK, ' ')).strip()
+        if text:
+            lines.append(f"{prefix}{'#' * int(tag[1])} {text}")
+    elif tag == 'pre':
+        code = element.text_content().strip('\n')
+        if code.strip():
+            lines.append(f"{prefix}```")
+            lines.extend(prefix + line for line in code.splitlines())
+            lines.append(f"{prefix}```")
+    elif tag in ('ul', 'ol'):
+        _render_list(element, tag == 'ol', lines, prefix)
+    elif tag == 'blockquote':
+        _render_children(element, lines, prefix + '> ')
+    elif tag == 'table':
+        _render_table(element, lines, prefix)
+    elif tag == 'hr':
+        lines.append(f"{prefix}---")
+    elif tag != 'br':
+        _render_children(element, lines, prefix)
+
+
+def _render_list(element, ordered: bool, lines: List[str], prefix: str):
+    index = int(element.get('start') or 1) if ordered and (element.get('start') or '').isdigit() else 1
+    for item in element:
+        if _tag(item) != 'li':
+            continue
+        marker = f"{index}. " if ordered else '* '
+        index += 1
+        item_lines: List[str] = []
+        _render_children(item, item_lines, '')
+        if not item_lines:
+            continue
+        lines.append(prefix + marker + item_lines[0])
+        lines.extend(prefix + '  ' + line for line in item_lines[1:])
+
+
+def _render_table(element, lines: List[str], prefix: str):
+    rows = [
+        [_WHITESPACE_RE.sub(' ', _inline_children(cell).replace(_LINE_BREAK, ' ')).strip().replace('|', '\\|')
+         for cell in row if _tag(cell) in ('td', 'th')]
+        for row in element.iter('tr')
+    ]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return
+    width = max(len(row) for row in rows)
+    for i, row in enumerate(rows):
+        lines.append(prefix + '| ' + ' | '.join(row + [''] * (width - len(row))) + ' |')
+        if i == 0:
+            lines.append(prefix + '|' + ' --- |' * width)
+
+
+def _inline_children(element) -> str:
+    parts = [element.text or '']
+    for child in element:
+        if _tag(child) is not None:
+            parts.append(_inline(child))
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def _inline(element) -> str:
+    tag = _tag(element)
+    if tag == 'br':
+        return _LINE_BREAK
+    if tag == 'img':
+        alt = (element.get('alt') or '').strip()
+        return f"![{alt}]({element.get('src')})" if alt and element.get('src') else alt
+    text = _inline_children(element)
+    stripped = text.strip()
+    if not stripped:
+        return text
+    if tag == 'a' and element.get('href') and not element.get('href').startswith(('#', 'javascript:')):
+        return f"[{stripped}]({element.get('href')})"
+    if tag in ('strong', 'b'):
+        return f"**{stripped}**"
+    if tag in ('em', 'i'):
+        return f"*{stripped}*"
+    if tag == 'code':
+        return f"`{stripped}`"
+    return text
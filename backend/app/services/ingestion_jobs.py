@@ -0,0 +1,382 @@
+"""
+Background ingestion jobs
+Long imports (uploads, website scrapes, Notion databases, Google Sheets) are enqueued and run by a
+small pool of asyncio workers, so the HTTP request returns a job id immediately and chat traffic
+keeps the API workers. Jobs move through extract -> chunk -> embed -> upsert stages and report progress.
+
+Jobs, their parameters and any uploaded files are persisted under INGESTION_JOBS_DIR. A job works
+through a list of units (pages, chunks, items) and checkpoints after each one; on restart unfinished jobs
+are re-queued and skip the completed units. Credentials (Notion API keys, Google OAuth tokens) are kept in
+memory only: a job that needed them and was interrupted by a restart fails and has to be re-submitted. A unit that was interrupted mid-way is re-run through
+sync_knowledge_item, whose deterministic point ids and the embedding cache make it pick up after the
+last uploaded batch.
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from app.config import INGESTION_JOBS_DIR, INGESTION_WORKERS, INGESTION_JOB_RETENTION_HOURS
+from app.services.metrics_service import INGESTION_JOBS, INGESTION_JOB_LATENCY
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Job parameters that are never written to the job store
+CREDENTIAL_PARAMS = ("api_key", "access_token", "refresh_token", "client_secret")
+
+
+@dataclass
+class IngestionJob:
+    """A queued or running ingestion and its progress"""
+    id: str
+    kind: str
+    params: Dict[str, Any]
+    status: str = "queued"  # queued | running | completed | failed
+    stage: str = "queued"  # extract | chunk | embed | upsert | done
+    progress: Dict[str, Any] = field(default_factory=dict)
+    checkpoint: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    version: int = 0  # bumped on every change, for progress streams
+
+    @property
+    def resumed(self) -> bool:
+        """True when an earlier run of this job was interrupted"""
+        return self.attempts > 1
+
+    def belongs_to(self, workspace_id: Optional[str] = None, agent_id: Optional[str] = None) -> bool:
+        """Whether the job imports into the given workspace and/or agent (widget ids count as agent ids)"""
+        params = self.params
+        if workspace_id and workspace_id not in (params.get("workspace_id"), (params.get("metadata") or {}).get("workspace_id")):
+            return False
+        if agent_id and agent_id not in (params.get("agent_id"), params.get("widget_id")):
+            return False
+        return bool(workspace_id or agent_id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view (parameters may hold credentials and are never returned)"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+JobHandler = Callable[[IngestionJob], Awaitable[Dict[str, Any]]]
+
+
+class IngestionJobService:
+    """Persistent job queue with a bounded asyncio worker pool"""
+
+    def __init__(self, jobs_dir: str = "", workers: int = 2, retention_hours: int = 72):
+        self.jobs_dir = jobs_dir
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_hours * 3600
+        self._handlers: Dict[str, JobHandler] = {}
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._db = None
+        self._lock = threading.Lock()
+        self._initialize()
+
+    def _initialize(self):
+        """Open (or create) the job store"""
+        if not self.jobs_dir:
+            return
+        try:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(self.jobs_dir, "jobs.sqlite3"), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ingestion_jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, stage TEXT NOT NULL, "
+                "params TEXT NOT NULL, progress TEXT NOT NULL, checkpoint TEXT NOT NULL, result TEXT, "
+                "error TEXT, attempts INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._strip_stored_credentials()
+        except Exception as e:
+            logger.warning("⚠️ Could not open ingestion job store (%s), jobs will not survive a restart: %s", self.jobs_dir, e)
+            self._db = None
+
+    def register_handler(self, kind: str, handler: JobHandler):
+        """Handlers are registered by the routers that own each import type"""
+        self._handlers[kind] = handler
+
+    # ------------------------------------------------------------------ persistence
+
+    @staticmethod
+    def _stored_params(params: Dict[str, Any]) -> Dict[str, Any]:
+        """Job parameters as persisted: credentials are left out, only their names are kept"""
+        stored = {key: value for key, value in params.items() if key not in CREDENTIAL_PARAMS}
+        withheld = sorted(key for key in params if key in CREDENTIAL_PARAMS)
+        if withheld:
+            stored["withheld_credentials"] = withheld
+        return stored
+
+    def _strip_stored_credentials(self):
+        """Rewrite rows persisted before credentials were left out of the job store"""
+        rows = self._db.execute("SELECT id, params FROM ingestion_jobs").fetchall()
+        for job_id, params in rows:
+            params = json.loads(params)
+            if any(key in params for key in CREDENTIAL_PARAMS):
+                self._db.execute(
+                    "UPDATE ingestion_jobs SET params = ? WHERE id = ?",
+                    (json.dumps(self._stored_params(params)), job_id)
+                )
+        self._db.commit()
+
+    def _save(self, job: IngestionJob):
+        if not self._db:
+            return
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO ingestion_jobs "
+                    "(id, kind, status, stage, params, progress, checkpoint, result, error, attempts, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job.id, job.kind, job.status, job.stage, json.dumps(self._stored_params(job.params)), json.dumps(dict(job.progress)),
+                        json.dumps(job.checkpoint), json.dumps(job.result) if job.result is not None else None,
+                        job.error, job.attempts, job.created_at, job.updated_at
+                    )
+                )
+                self._db.commit()
+            except Exception as e:
+                logger.warning("⚠️ Could not persist ingestion job %s: %s", job.id, e)
+
+    def _load_unfinished(self) -> List[IngestionJob]:
+        """Jobs that were queued or running when the process stopped"""
+        if not self._db:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, kind, status, stage, params, progress, checkpoint, attempts, created_at, updated_at "
+                "FROM ingestion_jobs WHERE status NOT IN (?, ?) ORDER BY created_at",
+                TERMINAL_STATUSES
+            ).fetchall()
+        return [
+            IngestionJob(
+                id=row[0], kind=row[1], status=row[2], stage=row[3], params=json.loads(row[4]),
+                progress=json.loads(row[5]), checkpoint=json.loads(row[6]), attempts=row[7],
+                created_at=row[8], updated_at=row[9]
+            )
+            for row in rows
+        ]
+
+    def _load(self, job_id: str) -> Optional[IngestionJob]:
+        if not self._db:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, kind, status, stage, progress, checkpoint, result, error, attempts, created_at, updated_at "
+                "FROM ingestion_jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return IngestionJob(
+            id=row[0], kind=row[1], params={}, status=row[2], stage=row[3], progress=json.loads(row[4]),
+            checkpoint=json.loads(row[5]), result=json.loads(row[6]) if row[6] else None, error=row[7],
+            attempts=row[8], created_at=row[9], updated_at=row[10]
+        )
+
+    def _prune(self):
+        """Forget finished jobs past the retention period"""
+        if not self._db:
+            return
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM ingestion_jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*TERMINAL_STATUSES, cutoff)
+            )
+            self._db.commit()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in TERMINAL_STATUSES and job.updated_at < cutoff]:
+            del self._jobs[job_id]
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir or os.path.join(tempfile.gettempdir(), "ingestion_jobs"), job_id)
+
+    def job_dir(self, job: IngestionJob) -> str:
+        """Directory for a job's spooled input files"""
+        path = self._job_path(job.id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    # ------------------------------------------------------------------ queue
+
+    async def start(self):
+        """Re-queue unfinished jobs and start the workers (called on app startup)"""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._prune()
+
+        for job in self._load_unfinished():
+            self._jobs[job.id] = job
+            if job.params.get("withheld_credentials"):
+                # The credentials this job needs were never persisted
+                job.status = "failed"
+                job.error = "Interrupted by a restart; credentials are not stored, so the import has to be submitted again"
+                self._touch(job, persist=True)
+                INGESTION_JOBS.inc(kind=job.kind, status=job.status)
+                shutil.rmtree(self._job_path(job.id), ignore_errors=True)
+                logger.warning("⚠️ Ingestion job %s (%s) cannot resume without its credentials", job.id, job.kind)
+                continue
+            job.status = "queued"
+            self._queue.put_nowait(job.id)
+            logger.info("🔁 Resuming ingestion job %s (%s) from checkpoint %s", job.id, job.kind, job.checkpoint)
+
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info("✅ Ingestion workers started (%s)", self.workers)
+
+    async def stop(self):
+        """Cancel the workers; running jobs stay persisted as running and resume on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def enqueue(self, kind: str, params: Dict[str, Any], files: Optional[Dict[str, Union[bytes, str]]] = None) -> IngestionJob:
+        """Persist a job (and spool its files: bytes are written, a str is the path of a spooled file to move in) and hand it to the workers"""
+        if kind not in self._handlers:
+            raise ValueError(f"No ingestion handler registered for {kind}")
+        if self._queue is None:
+            raise RuntimeError("Ingestion workers are not running")
+
+        job = IngestionJob(id=uuid.uuid4().hex, kind=kind, params=dict(params))
+        for name, content in (files or {}).items():
+            path = os.path.join(self.job_dir(job), os.path.basename(name))
+            if isinstance(content, str):
+                shutil.move(content, path)
+            else:
+                with open(path, "wb") as f:
+                    f.write(content)
+            job.params.setdefault("files", {})[name] = path
+
+        self._jobs[job.id] = job
+        self._save(job)
+        self._queue.put_nowait(job.id)
+        logger.info("📥 Queued ingestion job %s (%s)", job.id, kind)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id) or self._load(job_id)
+
+    def list_jobs(self, workspace_id: Optional[str] = None, agent_id: Optional[str] = None,
+                  status: Optional[str] = None, limit: int = 50) -> List[IngestionJob]:
+        """Recent jobs of a workspace and/or agent, newest first"""
+        jobs = sorted(
+            (job for job in self._jobs.values() if job.belongs_to(workspace_id, agent_id)),
+            key=lambda job: job.created_at, reverse=True
+        )
+        if status:
+            jobs = [job for job in jobs if job.status == status]
+        return jobs[:limit]
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            try:
+                if job:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: IngestionJob):
+        handler = self._handlers.get(job.kind)
+        job.status = "running"
+        job.attempts += 1
+        job.error = None
+        self._touch(job, persist=True)
+        start = time.perf_counter()
+
+        try:
+            if handler is None:
+                raise ValueError(f"No ingestion handler registered for {job.kind}")
+            job.result = await handler(job)
+            job.status = "completed"
+            job.stage = "done"
+            logger.info("✅ Ingestion job %s (%s) completed in %.1fs", job.id, job.kind, time.perf_counter() - start)
+        except asyncio.CancelledError:
+            # Shutdown: leave the job as running so it resumes on the next start
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = getattr(e, "detail", None) or str(e)
+            logger.error("❌ Ingestion job %s (%s) failed: %s", job.id, job.kind, job.error)
+
+        INGESTION_JOBS.inc(kind=job.kind, status=job.status)
+        INGESTION_JOB_LATENCY.observe(time.perf_counter() - start, kind=job.kind)
+        self._touch(job, persist=True)
+        # Spooled inputs are only needed to resume
+        shutil.rmtree(self._job_path(job.id), ignore_errors=True)
+
+    # ------------------------------------------------------------------ progress (used by handlers)
+
+    def _touch(self, job: IngestionJob, persist: bool = False):
+        job.updated_at = time.time()
+        job.version += 1
+        if persist:
+            self._save(job)
+
+    def set_stage(self, job: IngestionJob, stage: str, **progress):
+        """Enter a pipeline stage (persisted)"""
+        job.stage = stage
+        job.progress.update(progress)
+        self._touch(job, persist=True)
+
+    def update_progress(self, job: IngestionJob, **progress):
+        """In-memory progress update; safe to call from worker threads"""
+        job.progress.update(progress)
+        self._touch(job)
+
+    def complete_unit(self, job: IngestionJob, units_done: int, **checkpoint):
+        """Checkpoint after a unit (page, chunk, item) is fully stored"""
+        job.checkpoint.update(units_done=units_done, **checkpoint)
+        job.progress["units_done"] = units_done
+        self._touch(job, persist=True)
+
+    def embed_progress(self, job: IngestionJob) -> Callable[[int, int, float], None]:
+        """progress_callback for the qdrant_service store/sync methods that tracks the embed/upsert stages"""
+        def callback(embedded: int, total: int, elapsed: float):
+            job.stage = "upsert" if embedded >= total else "embed"
+            self.update_progress(
+                job,
+                chunks_embedded=embedded,
+                chunks_total=total,
+                chunks_per_second=round(embedded / elapsed, 1) if elapsed > 0 else None
+            )
+        return callback
+
+
+# Global job service instance
+ingestion_jobs = IngestionJobService(
+    jobs_dir=INGESTION_JOBS_DIR,
+    workers=INGESTION_WORKERS,
+    retention_hours=INGESTION_JOB_RETENTION_HOURS
+)
@@ -1,12 +1,28 @@
 """
 LLM service using LangChain for OpenAI and Gemini models
 """
-from typing import Dict, Any, Optional, List
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
+
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
-from app.config import OPENAI_API_KEY, GOOGLE_API_KEY
+from app.config import (
+    OPENAI_API_KEY,
+    GOOGLE_API_KEY,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_MAX_KEEPALIVE,
+    LLM_HTTP_KEEPALIVE_EXPIRY
+)
+from app.services.metrics_service import LLM_TTFT, LLM_LATENCY
+
+OPENAI_API_BASE_URL = "https://api.openai.com/v1"
+
+logger = logging.getLogger(__name__)
 
 
 class LLMService:
@@ -20,28 +36,32 @@ class LLMService:
             "name": "GPT-5 Mini",
             "description": "Latest OpenAI model - Mini",
             "max_tokens": 16385,
-            "supports_streaming": True
+            "supports_streaming": True,
+            "context_token_budget": 3000
         },
         "gpt-5-nano": {
             "provider": "openai",
             "name": "GPT-5 Nano",
             "description": "Latest OpenAI model - Nano",
             "max_tokens": 16385,
-            "supports_streaming": True
+            "supports_streaming": True,
+            "context_token_budget": 2000
         },
         "gpt-4.1-mini": {
             "provider": "openai",
             "name": "GPT-4.1 Mini",
             "description": "Fast and affordable",
             "max_tokens": 16385,
-            "supports_streaming": True
+            "supports_streaming": True,
+            "context_token_budget": 3000
         },
         "gpt-4.1-nano": {
             "provider": "openai",
             "name": "GPT-4.1 Nano",
             "description": "Ultra-fast and efficient",
             "max_tokens": 16385,
-            "supports_streaming": True
+            "supports_streaming": True,
+            "context_token_budget": 2000
         },
         # Google Gemini Models
         "gemini-2.5-flash-lite": {
@@ -49,21 +69,24 @@ class LLMService:
             "name": "Gemini 2.5 Flash-Lite",
             "description": "Ultra-fast Gemini model",
             "max_tokens": 8192,
-            "supports_streaming": True
+            "supports_streaming": True,
+            "context_token_budget": 2000
         },
         "gemini-2.5-flash": {
             "provider": "google",
             "name": "Gemini 2.5 Flash",
             "description": "Fast and efficient",
             "max_tokens": 8192,
-            "supports_streaming": True
+            "supports_streaming": True,
+            "context_token_budget": 3000
         },
         "gemini-2.5-pro": {
             "provider": "google",
             "name": "Gemini 2.5 Pro",
             "description": "Most capable Gemini",
             "max_tokens": 8192,
-            "supports_streaming": True
+            "supports_streaming": True,
+            "context_token_budget": 4000
         }
     }
 
@@ -73,19 +96,27 @@ class LLMService:
 
         # Validate API keys
         if not self.openai_api_key or self.openai_api_key == "your-openai-api-key-here":
-            print("⚠️ OpenAI API key not configured")
+            logger.warning("⚠️ OpenAI API key not configured")
             self.openai_available = False
         else:
-            print("✅ OpenAI API key configured")
+            logger.info("✅ OpenAI API key configured")
             self.openai_available = True
 
         if not self.google_api_key or self.google_api_key == "your-google-api-key-here":
-            print("⚠️ Google API key not configured")
+            logger.warning("⚠️ Google API key not configured")
             self.google_available = False
         else:
-            print("✅ Google API key configured")
+            logger.info("✅ Google API key configured")
             self.google_available = True
 
+        # Chat model instances cached per (provider, model, streaming)
+        self._llm_clients: Dict[Tuple[str, str, bool], Any] = {}
+        self._clients_lock = threading.Lock()
+        self._openai_http_client: Optional[httpx.Client] = None
+        self._openai_async_http_client: Optional[httpx.AsyncClient] = None
+        self.client_pool_hits = 0
+        self.client_pool_misses = 0
+
     def get_available_models(self) -> List[Dict[str, Any]]:
         """Get list of available models based on configured API keys"""
         available = []
@@ -104,25 +135,32 @@ class LLMService:
 
         return available
 
-    def _get_llm_instance(self, model: str, temperature: float = 0.7, max_tokens: int = 500, streaming: bool = False):
-        """Get LangChain LLM instance based on model"""
-        model_config = self.AVAILABLE_MODELS.get(model)
-
-        if not model_config:
-            raise ValueError(f"Model {model} not supported. Available models: {list(self.AVAILABLE_MODELS.keys())}")
-
-        provider = model_config["provider"]
+    def _get_openai_http_clients(self) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """Keep-alive HTTP clients shared by every OpenAI model instance"""
+        if self._openai_http_client is None:
+            limits = httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY
+            )
+            timeout = httpx.Timeout(30.0, connect=10.0)
+            self._openai_http_client = httpx.Client(limits=limits, timeout=timeout)
+            self._openai_async_http_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+        return self._openai_http_client, self._openai_async_http_client
 
+    def _create_llm_client(self, provider: str, model: str, streaming: bool):
+        """Create the LangChain chat model for (provider, model, streaming) - per-call settings are bound later"""
         if provider == "openai":
             if not self.openai_available:
                 raise ValueError("OpenAI API key not configured")
 
+            http_client, http_async_client = self._get_openai_http_clients()
             return ChatOpenAI(
                 model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
                 streaming=streaming,
                 api_key=self.openai_api_key,
+                http_client=http_client,
+                http_async_client=http_async_client,
                 timeout=30,  # Add timeout for faster failure
                 max_retries=1  # Reduce retries for faster response
             )
@@ -133,8 +171,6 @@ class LLMService:
 
             return ChatGoogleGenerativeAI(
                 model=model,
-                temperature=temperature,
-                max_tokens=max_tokens,
                 streaming=streaming,
                 google_api_key=self.google_api_key,
                 timeout=30,  # Add timeout for faster failure
@@ -144,6 +180,93 @@ class LLMService:
         else:
             raise ValueError(f"Unknown provider: {provider}")
 
+    def _get_llm_client(self, model: str, streaming: bool = False):
+        """Get the cached LangChain chat model for a model, creating it on first use"""
+        model_config = self.AVAILABLE_MODELS.get(model)
+
+        if not model_config:
+            raise ValueError(f"Model {model} not supported. Available models: {list(self.AVAILABLE_MODELS.keys())}")
+
+        key = (model_config["provider"], model, streaming)
+
+        with self._clients_lock:
+            client = self._llm_clients.get(key)
+            if client is not None:
+                self.client_pool_hits += 1
+                return client
+
+            client = self._create_llm_client(model_config["provider"], model, streaming)
+            self._llm_clients[key] = client
+            self.client_pool_misses += 1
+            return client
+
+    @staticmethod
+    def _supports_temperature(model: str) -> bool:
+        """
+        Whether the model accepts a custom temperature
+        gpt-5 reasoning models (not gpt-5-chat) and the o-series reject anything but the default. ChatOpenAI's
+        constructor drops the setting for them, but bound call kwargs skip that validator.
+        """
+        model_lower = model.lower()
+        if model_lower.startswith("gpt-5"):
+            return "chat" in model_lower
+        return not (len(model_lower) > 1 and model_lower[0] == "o" and model_lower[1].isdigit())
+
+    def _get_llm_instance(self, model: str, temperature: float = 0.7, max_tokens: int = 500, streaming: bool = False):
+        """Get LangChain LLM instance based on model (cached client with this call's temperature/max_tokens bound)"""
+        client = self._get_llm_client(model, streaming)
+
+        if self.AVAILABLE_MODELS[model]["provider"] == "google":
+            return client.bind(temperature=temperature, max_output_tokens=max_tokens)
+        if not self._supports_temperature(model):
+            return client.bind(max_tokens=max_tokens)
+        return client.bind(temperature=temperature, max_tokens=max_tokens)
+
+    async def prewarm(self, models: List[str]):
+        """Create cached clients for the given models and open pooled connections ahead of the first chat"""
+        warmed = []
+        for model in models:
+            if model not in self.AVAILABLE_MODELS:
+                logger.warning("⚠️ Skipping LLM pre-warm for unknown model: %s", model)
+                continue
+            try:
+                for streaming in (False, True):
+                    self._get_llm_client(model, streaming)
+                warmed.append(model)
+            except Exception as e:
+                logger.warning("⚠️ LLM pre-warm failed for %s: %s", model, e)
+
+        # Any response (even 401/404) leaves a TLS connection in the keep-alive pool
+        if self._openai_async_http_client is not None:
+            try:
+                await self._openai_async_http_client.head(OPENAI_API_BASE_URL)
+            except Exception as e:
+                logger.warning("⚠️ OpenAI connection pre-warm failed: %s", e)
+
+        if warmed:
+            logger.info("🔥 LLM clients pre-warmed: %s", ", ".join(warmed))
+
+    async def aclose(self):
+        """Close the shared HTTP clients"""
+        if self._openai_async_http_client is not None:
+            await self._openai_async_http_client.aclose()
+        if self._openai_http_client is not None:
+            self._openai_http_client.close()
+        with self._clients_lock:
+            self._llm_clients.clear()
+        self._openai_http_client = None
+        self._openai_async_http_client = None
+
+    def get_client_stats(self) -> Dict[str, Any]:
+        """Client pool hit/miss counters"""
+        total = self.client_pool_hits + self.client_pool_misses
+        return {
+            "cached_clients": len(self._llm_clients),
+            "hits": self.client_pool_hits,
+            "misses": self.client_pool_misses,
+            "hit_rate": round(self.client_pool_hits / total, 4) if total else 0.0
+        }
+
     def get_system_prompt_text(self, prompt_type: str, custom_prompt: str = "") -> str:
         """Get system prompt text based on preset type"""
         presets = {
@@ -159,66 +282,21 @@ class LLMService:
 
         return presets.get(prompt_type, presets["support"])
 
-    def generate_response(
-        self,
-        message: str,
-        model: str = "gpt-5-mini",
-        temperature: float = 0.7,
-        max_tokens: int = 500,
-        system_prompt: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Generate AI response"""
-        try:
-            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=False)
-
-            messages = []
-            if system_prompt:
-                messages.append(SystemMessage(content=system_prompt))
-            messages.append(HumanMessage(content=message))
-
-            print(f"🤖 LLM Request - Model: {model}, Message: {message[:50]}...")
-
-            response = llm.invoke(messages)
-            content = response.content
-
-            print(f"✅ LLM Response - Length: {len(content)} chars")
-
-            return {
-                "success": True,
-                "content": content,
-                "model": model,
-                "provider": self.AVAILABLE_MODELS[model]["provider"]
-            }
-
-        except Exception as e:
-            print(f"❌ LLM Error: {e}")
-            return {
-                "success": False,
-                "error": str(e),
-                "content": None
-            }
-
-    def generate_rag_response(
+    def _build_rag_messages(
         self,
         message: str,
         context: str,
-        model: str = "gpt-5-mini",
-        temperature: float = 0.7,
-        max_tokens: int = 500,
         system_prompt_type: str = "support",
         custom_system_prompt: str = ""
-    ) -> Dict[str, Any]:
-        """Generate AI response with RAG context"""
-        try:
-            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=False)
-
-            # Get base system prompt
-            base_system_prompt = self.get_system_prompt_text(system_prompt_type, custom_system_prompt)
-
-            # Create RAG-aware system prompt
-            # CRITICAL: RAG instructions must come FIRST to ensure knowledge base is prioritized
-            if context and context.strip():
-                system_prompt = f"""━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    ) -> List[Any]:
+        """Build the system + user messages for a RAG request"""
+        # Get base system prompt
+        base_system_prompt = self.get_system_prompt_text(system_prompt_type, custom_system_prompt)
+
+        # Create RAG-aware system prompt
+        # CRITICAL: RAG instructions must come FIRST to ensure knowledge base is prioritized
+        if context and context.strip():
+            system_prompt = f"""━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 🚨🚨🚨 CRITICAL: KNOWLEDGE BASE PRIORITY 🚨🚨🚨
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -264,8 +342,8 @@ YOU MUST USE THIS INFORMATION TO ANSWER USER QUESTIONS.
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 {base_system_prompt}"""
-            else:
-                system_prompt = f"""{base_system_prompt}
+        else:
+            system_prompt = f"""{base_system_prompt}
 
 You are a helpful AI assistant, but you currently don't have access to the knowledge base.
 
@@ -280,31 +358,35 @@ INSTRUCTIONS:
 
 Be natural, friendly, and helpful:"""
 
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=message)
-            ]
-
-            print(f"\n{'='*60}")
-            print(f"🤖 SENDING TO LLM")
-            print(f"{'='*60}")
-            print(f"   Model: {model}")
-            print(f"   Provider: {self.AVAILABLE_MODELS[model]['provider']}")
-            print(f"   Temperature: {temperature}")
-            print(f"   Max Tokens: {max_tokens}")
-            print(f"   User Message: {message}")
-            print(f"   Context Included: {'Yes' if (context and context.strip()) else 'No'}")
-            print(f"{'='*60}\n")
-
-            response = llm.invoke(messages)
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=message)
+        ]
+
+    def generate_response(
+        self,
+        message: str,
+        model: str = "gpt-5-mini",
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        system_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Generate AI response"""
+        try:
+            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=False)
+
+            messages = []
+            if system_prompt:
+                messages.append(SystemMessage(content=system_prompt))
+            messages.append(HumanMessage(content=message))
+
+            logger.debug("🤖 LLM Request - Model: %s", model)
+
+            with LLM_LATENCY.time(model=model):
+                response = llm.invoke(messages)
             content = response.content
 
-            print(f"\n{'='*60}")
-            print(f"✅ RECEIVED FROM LLM")
-            print(f"{'='*60}")
-            print(f"   Response Length: {len(content)} chars")
-            print(f"   Response Preview: {content[:300]}...")
-            print(f"{'='*60}\n")
+            logger.debug("✅ LLM Response - Length: %s chars", len(content))
 
             return {
                 "success": True,
@@ -314,14 +396,14 @@ Be natural, friendly, and helpful:"""
             }
 
         except Exception as e:
-            print(f"❌ LLM Error: {e}")
+            logger.error("❌ LLM Error: %s", e)
             return {
                 "success": False,
                 "error": str(e),
                 "content": None
             }
 
-    async def generate_rag_response_stream(
+    def generate_rag_response(
         self,
         message: str,
         context: str,
@@ -330,93 +412,149 @@ Be natural, friendly, and helpful:"""
         max_tokens: int = 500,
         system_prompt_type: str = "support",
         custom_system_prompt: str = ""
-    ):
-        """Generate AI response with RAG context using streaming"""
+    ) -> Dict[str, Any]:
+        """Generate AI response with RAG context"""
         try:
-            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=True)
+            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=False)
 
-            # Get base system prompt
-            base_system_prompt = self.get_system_prompt_text(system_prompt_type, custom_system_prompt)
+            messages = self._build_rag_messages(message, context, system_prompt_type, custom_system_prompt)
 
-            # Create RAG-aware system prompt (same as non-streaming)
-            # CRITICAL: RAG instructions must come FIRST to ensure knowledge base is prioritized
-            if context and context.strip():
-                system_prompt = f"""━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-🚨🚨🚨 CRITICAL: KNOWLEDGE BASE PRIORITY 🚨🚨🚨
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+            logger.debug(
+                "🤖 SENDING TO LLM - Model: %s, Temperature: %s, Max Tokens: %s, Context Included: %s, User Message: %s",
+                model, temperature, max_tokens, bool(context and context.strip()), message
+            )
 
-YOU HAVE ACCESS TO A KNOWLEDGE BASE WITH RELEVANT INFORMATION.
-YOU MUST USE THIS INFORMATION TO ANSWER USER QUESTIONS.
+            with LLM_LATENCY.time(model=model):
+                response = llm.invoke(messages)
+            content = response.content
 
-===== KNOWLEDGE BASE (Available for Reference) =====
-{context}
-===== END OF KNOWLEDGE BASE =====
+            logger.debug("✅ RECEIVED FROM LLM - Length: %s chars", len(content))
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-📋 MANDATORY INSTRUCTIONS - READ FIRST 📋
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+            return {
+                "success": True,
+                "content": content,
+                "model": model,
+                "provider": self.AVAILABLE_MODELS[model]["provider"]
+            }
 
-1. **ALWAYS CHECK THE KNOWLEDGE BASE FIRST** for any question requiring information:
-   - Search through the KNOWLEDGE BASE above
-   - If you find ANY information (even partial matches):
-     → USE IT IMMEDIATELY to answer the question
-     → Be confident and provide the specific details from the KB
-     → Do NOT say "I'm not sure" if the information exists in the KB
-   
-2. Example: If user asks "give me emailid of VISHNU GOPAL V P":
-   - Search the KNOWLEDGE BASE for "VISHNU GOPAL V P"
-   - Find the email address in the KB
-   - Answer directly: "The email address is [email from KB]"
-   - DO NOT say "I'm not sure" if the email exists in the KB
+        except Exception as e:
+            logger.error("❌ LLM Error: %s", e)
+            return {
+                "success": False,
+                "error": str(e),
+                "content": None
+            }
 
-3. **ONLY** say "I'm not sure about that from my current knowledge base" if:
-   - You have searched the entire KNOWLEDGE BASE
-   - You found ZERO relevant information
-   - The question is completely unrelated to what's in the KB
+    async def agenerate_response(
+        self,
+        message: str,
+        model: str = "gpt-5-mini",
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        system_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Async variant of generate_response() - awaits the LLM instead of blocking the event loop"""
+        try:
+            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=False)
 
-4. For GREETINGS or CASUAL CONVERSATION:
-   - Respond naturally and warmly
-   - Be friendly and welcoming
-   - DO NOT mention the knowledge base
+            messages = []
+            if system_prompt:
+                messages.append(SystemMessage(content=system_prompt))
+            messages.append(HumanMessage(content=message))
 
-5. Be LIBERAL and CONFIDENT with the knowledge base:
-   - If the KB has related information, use it!
-   - Don't overthink - if it's in the KB, share it!
-   - Be specific and provide exact details from the KB
+            logger.debug("🤖 LLM Request - Model: %s", model)
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+            with LLM_LATENCY.time(model=model):
+                response = await llm.ainvoke(messages)
+            content = response.content
 
-{base_system_prompt}"""
-            else:
-                system_prompt = f"""{base_system_prompt}
+            logger.debug("✅ LLM Response - Length: %s chars", len(content))
 
-You are a helpful AI assistant, but you currently don't have access to the knowledge base.
+            return {
+                "success": True,
+                "content": content,
+                "model": model,
+                "provider": self.AVAILABLE_MODELS[model]["provider"]
+            }
 
-INSTRUCTIONS:
-1. If this is a GREETING or CASUAL CONVERSATION:
-   - Respond warmly and naturally
-   - Be friendly and welcoming
-   - Ask how you can help
+        except Exception as e:
+            logger.error("❌ LLM Error: %s", e)
+            return {
+                "success": False,
+                "error": str(e),
+                "content": None
+            }
 
-2. If this is a SPECIFIC QUESTION requiring knowledge:
-   - Politely say: "I don't have access to my knowledge base at the moment. Let me connect you with a team member who can help you with that."
+    async def agenerate_rag_response(
+        self,
+        message: str,
+        context: str,
+        model: str = "gpt-5-mini",
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        system_prompt_type: str = "support",
+        custom_system_prompt: str = ""
+    ) -> Dict[str, Any]:
+        """Async variant of generate_rag_response() - awaits the LLM instead of blocking the event loop"""
+        try:
+            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=False)
 
-Be natural, friendly, and helpful:"""
+            messages = self._build_rag_messages(message, context, system_prompt_type, custom_system_prompt)
+
+            logger.debug("🤖 LLM Request - Model: %s, Context Included: %s", model, bool(context and context.strip()))
+
+            with LLM_LATENCY.time(model=model):
+                response = await llm.ainvoke(messages)
+            content = response.content
+
+            logger.debug("✅ LLM Response - Length: %s chars", len(content))
+
+            return {
+                "success": True,
+                "content": content,
+                "model": model,
+                "provider": self.AVAILABLE_MODELS[model]["provider"]
+            }
+
+        except Exception as e:
+            logger.error("❌ LLM Error: %s", e)
+            return {
+                "success": False,
+                "error": str(e),
+                "content": None
+            }
+
+    async def generate_rag_response_stream(
+        self,
+        message: str,
+        context: str,
+        model: str = "gpt-5-mini",
+        temperature: float = 0.7,
+        max_tokens: int = 500,
+        system_prompt_type: str = "support",
+        custom_system_prompt: str = ""
+    ):
+        """Generate AI response with RAG context using streaming"""
+        try:
+            llm = self._get_llm_instance(model, temperature, max_tokens, streaming=True)
 
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=message)
-            ]
+            messages = self._build_rag_messages(message, context, system_prompt_type, custom_system_prompt)
 
-            print(f"🚀 Starting streaming response with model: {model} (provider: {self.AVAILABLE_MODELS[model]['provider']})")
+            logger.debug("🚀 Starting streaming response with model: %s", model)
 
             # Stream chunks using async streaming
+            stream_start = time.perf_counter()
+            first_token = True
             async for chunk in llm.astream(messages):
                 if chunk.content:
+                    if first_token:
+                        LLM_TTFT.observe(time.perf_counter() - stream_start, model=model)
+                        first_token = False
                     yield {"content": chunk.content}
+            LLM_LATENCY.observe(time.perf_counter() - stream_start, model=model)
 
         except Exception as e:
-            print(f"❌ Streaming error: {e}")
+            logger.error("❌ Streaming error: %s", e)
             yield {"error": str(e)}
 
 
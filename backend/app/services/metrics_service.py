@@ -0,0 +1,237 @@
+"""
+In-process metrics registry for the chat pipeline
+Histograms, counters and gauges with labels, rendered in the Prometheus text exposition format at /metrics
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Seconds - fine-grained at the low end for embed/search, long tail for LLM calls
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+    1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0
+)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class: a named metric with a fixed set of label names"""
+
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}"
+        ]
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}_total{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (p50/p95/p99 via histogram_quantile)"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[key] = series
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the wrapped block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.label_names, key, ("le", _format_value(upper_bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them for the /metrics endpoint"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry instance
+metrics = MetricsRegistry()
+
+# Chat pipeline stage latencies
+EMBED_LATENCY = metrics.histogram("rag_embed_seconds", "Query embedding latency", ["model"])
+SEARCH_LATENCY = metrics.histogram("rag_search_seconds", "Vector search latency", ["search_type"])
+RERANK_LATENCY = metrics.histogram("rag_rerank_seconds", "Reranking latency", ["model"])
+LLM_TTFT = metrics.histogram("llm_time_to_first_token_seconds", "Time until the first streamed LLM token", ["model"])
+LLM_LATENCY = metrics.histogram("llm_total_seconds", "Total LLM generation time", ["model"])
+CHAT_LATENCY = metrics.histogram("chat_end_to_end_seconds", "End-to-end chat response time", ["model", "mode"])
+
+# Chat pipeline events
+RERANK_SKIPS = metrics.counter("rag_rerank_skips", "Retrievals answered without reranking", ["model", "search_type"])
+GREETING_SHORT_CIRCUITS = metrics.counter("chat_greeting_short_circuits", "Messages answered without retrieval", ["model"])
+DENSE_FALLBACKS = metrics.counter("rag_fallback_to_dense", "Hybrid searches that fell back to dense-only search", ["model"])
+CACHE_HITS = metrics.counter("chat_cache_hits", "Cache hits on the chat path", ["cache", "model"])
+
+# Background ingestion
+INGESTION_JOBS = metrics.counter("ingestion_jobs", "Finished ingestion jobs", ["kind", "status"])
+INGESTION_JOB_LATENCY = metrics.histogram(
+    "ingestion_job_seconds", "Ingestion job run time", ["kind"],
+    buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+)
+
+EMBED_BATCH_LATENCY = metrics.histogram(
+    "ingest_embed_batch_seconds", "Document embedding request latency (one batch of chunks)", ["model"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+)
+
+# Headless browser pool
+BROWSER_RECYCLES = metrics.counter("browser_pool_recycles", "Pooled browsers closed and relaunched", ["reason"])
+BROWSER_LAUNCH_LATENCY = metrics.histogram(
+    "browser_pool_launch_seconds", "Headless browser launch time",
+    buckets=(0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+)
+
+# Shared work executor (utilisation per queue = rate(work_executor_busy_seconds_total) / queue limit)
+WORK_TASKS = metrics.counter("work_executor_tasks", "Finished work executor tasks", ["queue", "status"])
+WORK_BUSY_SECONDS = metrics.counter("work_executor_busy_seconds", "Worker time spent on each queue's tasks", ["queue"])
+WORK_ACTIVE = metrics.gauge("work_executor_active_tasks", "Tasks running per queue", ["queue"])
+WORK_WAITING = metrics.gauge("work_executor_waiting_tasks", "Tasks waiting for a worker per queue", ["queue"])
+WORK_QUEUE_WAIT = metrics.histogram("work_executor_wait_seconds", "Time tasks wait for a worker", ["queue"])
+WORK_RUN_TIME = metrics.histogram("work_executor_run_seconds", "Work executor task run time", ["queue"])
@@ -2,11 +2,62 @@
 Notion Integration Service
 Fetches and processes content from Notion workspaces
 Supports both OAuth and API key authentication
+
+Every call goes through one pooled async HTTP client. Requests on a token are spaced to Notion's rate limit
+and retried on 429 (after Retry-After), 5xx and dropped connections. List endpoints are followed through
+every cursor, and pages are read with all their nested blocks.
 """
-import requests
-from typing import List, Dict, Any, Optional
-import os
+import asyncio
 import base64
+import random
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+from app.config import NOTION_REQUESTS_PER_SECOND, NOTION_FETCH_CONCURRENCY, NOTION_MAX_RETRIES, NOTION_MAX_BLOCK_DEPTH
+
+# 429s, 5xx and dropped connections are worth retrying; bad input or auth errors are not
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Blocks whose children are pages of their own (imported separately), not part of the parent page's text
+_SEPARATE_PAGE_BLOCKS = ("child_page", "child_database")
+_LIST_BLOCKS = ("bulleted_list_item", "numbered_list_item", "to_do")
+
+# Tokens whose rate limit state is remembered (least recently used are forgotten first)
+_MAX_REMEMBERED_TOKENS = 1000
+
+
+class NotionAPIError(Exception):
+    """Error response from the Notion API that was not (or no longer) worth retrying"""
+
+
+class _RateLimiter:
+    """Spaces the requests made with one token to an average rate; a 429 holds back all of them"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._paused_until = 0.0
+
+    async def wait(self):
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            if time.monotonic() >= self._paused_until:
+                return
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
 
 
 class NotionService:
@@ -14,6 +65,8 @@ class NotionService:
         self.api_version = "2022-06-28"
         self.base_url = "https://api.notion.com/v1"
         self.oauth_base_url = "https://api.notion.com/v1/oauth"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiters: "OrderedDict[str, _RateLimiter]" = OrderedDict()
     
     def _get_headers(self, api_key: str) -> Dict[str, str]:
         """Get headers for Notion API requests (supports both OAuth tokens and API keys)"""
@@ -23,7 +76,120 @@ class NotionService:
             "Content-Type": "application/json"
         }
 
-    def exchange_code_for_token(
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, connect=10.0))
+        return self._client
+
+    async def aclose(self):
+        """Close pooled HTTP connections (app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _limiter(self, api_key: str) -> _RateLimiter:
+        limiter = self._limiters.get(api_key)
+        if limiter is None:
+            limiter = self._limiters[api_key] = _RateLimiter(NOTION_REQUESTS_PER_SECOND)
+            if len(self._limiters) > _MAX_REMEMBERED_TOKENS:
+                self._limiters.popitem(last=False)
+        self._limiters.move_to_end(api_key)
+        return limiter
+
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    @staticmethod
+    def _retry_after(response: httpx.Response, attempt: int) -> float:
+        try:
+            return max(0.0, float(response.headers["Retry-After"]))
+        except (KeyError, ValueError):
+            return NotionService._backoff_delay(attempt) + BACKOFF_BASE_SECONDS
+
+    async def _request(self, method: str, path: str, api_key: str, **kwargs) -> httpx.Response:
+        """One API request under the token's rate limit, retried on 429s, 5xx and dropped connections"""
+        limiter = self._limiter(api_key)
+        for attempt in range(NOTION_MAX_RETRIES + 1):
+            await limiter.wait()
+            try:
+                response = await self._http_client().request(
+                    method, f"{self.base_url}{path}", headers=self._get_headers(api_key), **kwargs
+                )
+            except httpx.TransportError as e:
+                if attempt == NOTION_MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"⚠️ Notion request failed ({type(e).__name__}), retry {attempt + 1}/{NOTION_MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code not in RETRYABLE_STATUS or attempt == NOTION_MAX_RETRIES:
+                return response
+            if response.status_code == 429:
+                # Rate limited: every request on this token waits, not just this one
+                delay = self._retry_after(response, attempt)
+                limiter.pause(delay)
+            else:
+                delay = self._backoff_delay(attempt)
+            print(f"⚠️ Notion API returned {response.status_code}, retry {attempt + 1}/{NOTION_MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _list_all(self, method: str, path: str, api_key: str, what: str, body: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Every result of a paginated list endpoint, following next_cursor until has_more is false"""
+        results = []
+        cursor = None
+        while True:
+            page = {"page_size": 100, **({"start_cursor": cursor} if cursor else {})}
+            if method == "GET":
+                response = await self._request(method, path, api_key, params=page)
+            else:
+                response = await self._request(method, path, api_key, json={**(body or {}), **page})
+            if response.status_code != 200:
+                raise NotionAPIError(f"Failed to fetch {what}: {response.status_code} - {response.text}")
+            data = response.json()
+            results.extend(data.get("results", []))
+            cursor = data.get("next_cursor")
+            if not data.get("has_more") or not cursor:
+                return results
+
+    async def _get_blocks(self, api_key: str, block_id: str, depth: int = 0) -> List[Dict[str, Any]]:
+        """All child blocks of a page or block, nested blocks under "children" (up to NOTION_MAX_BLOCK_DEPTH levels)"""
+        blocks = await self._list_all("GET", f"/blocks/{block_id}/children", api_key, "blocks")
+        parents = [
+            block for block in blocks
+            if block.get("has_children") and block.get("type") not in _SEPARATE_PAGE_BLOCKS
+        ]
+        if parents and depth < NOTION_MAX_BLOCK_DEPTH:
+            children = await asyncio.gather(*(self._get_blocks(api_key, block["id"], depth + 1) for block in parents))
+            for block, block_children in zip(parents, children):
+                block["children"] = block_children
+        return blocks
+
+    @staticmethod
+    def _count_blocks(blocks: List[Dict[str, Any]]) -> int:
+        return sum(1 + NotionService._count_blocks(block.get("children", [])) for block in blocks)
+
+    @staticmethod
+    def _page_title(page: Dict[str, Any], default: str) -> str:
+        """Plain text of a page's title property"""
+        for prop_value in (page.get("properties") or {}).values():
+            if prop_value.get("type") == "title" and prop_value.get("title"):
+                return prop_value["title"][0].get("plain_text", default)
+        return default
+
+    def _page_summary(self, page: Dict[str, Any], default_title: str = "Untitled") -> Dict[str, Any]:
+        """The page fields kept for listing and importing (a page object's properties can be large)"""
+        return {
+            "id": page.get("id"),
+            "title": self._page_title(page, default_title),
+            "url": page.get("url"),
+            "created_time": page.get("created_time"),
+            "last_edited_time": page.get("last_edited_time")
+        }
+
+    async def exchange_code_for_token(
         self,
         code: str,
         client_id: str,
@@ -40,7 +206,7 @@ class NotionService:
             encoded_credentials = base64.b64encode(credentials.encode()).decode()
 
             # Exchange code for token
-            response = requests.post(
+            response = await self._http_client().post(
                 f"{self.oauth_base_url}/token",
                 headers={
                     "Authorization": f"Basic {encoded_credentials}",
@@ -79,14 +245,10 @@ class NotionService:
                 "error": f"Error exchanging code for token: {str(e)}"
             }
     
-    def test_connection(self, api_key: str) -> Dict[str, Any]:
+    async def test_connection(self, api_key: str) -> Dict[str, Any]:
         """Test Notion API connection"""
         try:
-            response = requests.get(
-                f"{self.base_url}/users/me",
-                headers=self._get_headers(api_key),
-                timeout=10
-            )
+            response = await self._request("GET", "/users/me", api_key, timeout=10)
             
             if response.status_code == 200:
                 user_data = response.json()
@@ -106,8 +268,8 @@ class NotionService:
                 "error": f"Connection failed: {str(e)}"
             }
     
-    def search_pages(self, api_key: str, query: str = "") -> Dict[str, Any]:
-        """Search for pages in Notion workspace"""
+    async def search_pages(self, api_key: str, query: str = "") -> Dict[str, Any]:
+        """Search for pages in Notion workspace (every page of results)"""
         try:
             payload = {
                 "filter": {
@@ -119,42 +281,10 @@ class NotionService:
             if query:
                 payload["query"] = query
             
-            response = requests.post(
-                f"{self.base_url}/search",
-                headers=self._get_headers(api_key),
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"Search failed: {response.status_code} - {response.text}"
-                }
-            
-            data = response.json()
-            pages = data.get("results", [])
+            pages = await self._list_all("POST", "/search", api_key, "search results", payload)
             
             # Format pages for easy selection
-            formatted_pages = []
-            for page in pages:
-                title = "Untitled"
-                if page.get("properties"):
-                    # Try to get title from properties
-                    for prop_name, prop_value in page.get("properties", {}).items():
-                        if prop_value.get("type") == "title" and prop_value.get("title"):
-                            title_parts = prop_value.get("title", [])
-                            if title_parts:
-                                title = title_parts[0].get("plain_text", "Untitled")
-                            break
-                
-                formatted_pages.append({
-                    "id": page.get("id"),
-                    "title": title,
-                    "url": page.get("url"),
-                    "created_time": page.get("created_time"),
-                    "last_edited_time": page.get("last_edited_time")
-                })
+            formatted_pages = [self._page_summary(page) for page in pages]
             
             return {
                 "success": True,
@@ -162,14 +292,22 @@ class NotionService:
                 "total": len(formatted_pages)
             }
             
+        except NotionAPIError as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Error searching pages: {str(e)}"
             }
     
-    def get_page_content(self, api_key: str, page_id: str) -> Dict[str, Any]:
-        """Get full content of a Notion page"""
+    async def get_page_content(self, api_key: str, page_id: str, page: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Get full content of a Notion page, including nested blocks
+        page: the page's summary (see query_database) when already known, so its metadata isn't fetched again
+        """
         try:
             # Remove hyphens from page ID if present
             page_id = page_id.replace("-", "")
@@ -177,62 +315,42 @@ class NotionService:
             print(f"📖 Fetching Notion page: {page_id}")
             
             # Get page metadata
-            page_response = requests.get(
-                f"{self.base_url}/pages/{page_id}",
-                headers=self._get_headers(api_key),
-                timeout=30
-            )
-            
-            if page_response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"Failed to fetch page: {page_response.status_code} - {page_response.text}"
-                }
-            
-            page_data = page_response.json()
-            
-            # Get page title
-            title = "Untitled Page"
-            if page_data.get("properties"):
-                for prop_name, prop_value in page_data.get("properties", {}).items():
-                    if prop_value.get("type") == "title" and prop_value.get("title"):
-                        title_parts = prop_value.get("title", [])
-                        if title_parts:
-                            title = title_parts[0].get("plain_text", "Untitled Page")
-                        break
-            
-            # Get page blocks (content)
-            blocks_response = requests.get(
-                f"{self.base_url}/blocks/{page_id}/children",
-                headers=self._get_headers(api_key),
-                params={"page_size": 100},
-                timeout=30
-            )
-            
-            if blocks_response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"Failed to fetch blocks: {blocks_response.status_code}"
-                }
+            if page is None:
+                page_response = await self._request("GET", f"/pages/{page_id}", api_key)
+                
+                if page_response.status_code != 200:
+                    return {
+                        "success": False,
+                        "error": f"Failed to fetch page: {page_response.status_code} - {page_response.text}"
+                    }
+                
+                page = self._page_summary(page_response.json(), "Untitled Page")
             
-            blocks_data = blocks_response.json()
-            blocks = blocks_data.get("results", [])
+            # Get page blocks (content), every page of them and their children
+            blocks = await self._get_blocks(api_key, page_id)
             
             # Convert blocks to text
             content = self._blocks_to_text(blocks)
             
-            print(f"✅ Fetched Notion page: '{title}' ({len(content)} chars)")
+            print(f"✅ Fetched Notion page: '{page['title']}' ({len(content)} chars)")
             
             return {
                 "success": True,
-                "title": title,
+                "id": page.get("id") or page_id,
+                "title": page["title"],
                 "content": content,
-                "url": page_data.get("url"),
-                "created_time": page_data.get("created_time"),
-                "last_edited_time": page_data.get("last_edited_time"),
-                "blocks_count": len(blocks)
+                "url": page.get("url"),
+                "created_time": page.get("created_time"),
+                "last_edited_time": page.get("last_edited_time"),
+                "blocks_count": self._count_blocks(blocks)
             }
             
+        except NotionAPIError as e:
+            print(f"❌ Error fetching Notion page: {e}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
         except Exception as e:
             print(f"❌ Error fetching Notion page: {e}")
             return {
@@ -240,61 +358,71 @@ class NotionService:
                 "error": f"Error: {str(e)}"
             }
     
-    def get_database_content(self, api_key: str, database_id: str) -> Dict[str, Any]:
-        """Get all pages from a Notion database"""
+    async def get_pages_content(self, api_key: str, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """get_page_content for page summaries, NOTION_FETCH_CONCURRENCY at a time; results in the same order"""
+        semaphore = asyncio.Semaphore(max(1, NOTION_FETCH_CONCURRENCY))
+        
+        async def fetch(page: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.get_page_content(api_key, page["id"], page)
+        
+        return await asyncio.gather(*(fetch(page) for page in pages))
+    
+    async def query_database(self, api_key: str, database_id: str) -> Dict[str, Any]:
+        """Summaries (id, title, url, times) of every page in a Notion database"""
         try:
             database_id = database_id.replace("-", "")
             
-            print(f"📊 Fetching Notion database: {database_id}")
+            print(f"📊 Querying Notion database: {database_id}")
             
-            # Query database
-            response = requests.post(
-                f"{self.base_url}/databases/{database_id}/query",
-                headers=self._get_headers(api_key),
-                json={"page_size": 100},
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                return {
-                    "success": False,
-                    "error": f"Failed to fetch database: {response.status_code}"
-                }
-            
-            data = response.json()
-            pages = data.get("results", [])
-            
-            # Fetch content for each page
-            all_content = []
-            for page in pages:
-                page_id = page.get("id")
-                page_content = self.get_page_content(api_key, page_id)
-                
-                if page_content.get("success"):
-                    all_content.append(page_content)
-            
-            # Combine all content
-            combined_text = "\n\n".join([
-                f"# {item['title']}\n\n{item['content']}" 
-                for item in all_content
-            ])
+            rows = await self._list_all("POST", f"/databases/{database_id}/query", api_key, "database")
+            pages = [self._page_summary(row) for row in rows]
             
             return {
                 "success": True,
-                "pages": all_content,
-                "total_pages": len(all_content),
-                "combined_content": combined_text
+                "pages": pages,
+                "total_pages": len(pages)
             }
             
+        except NotionAPIError as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Error fetching database: {str(e)}"
             }
     
-    def _blocks_to_text(self, blocks: List[Dict]) -> str:
-        """Convert Notion blocks to plain text"""
+    async def get_database_content(self, api_key: str, database_id: str) -> Dict[str, Any]:
+        """Get all pages from a Notion database, with their content"""
+        database = await self.query_database(api_key, database_id)
+        if not database["success"]:
+            return database
+        
+        all_content = [
+            page_content for page_content in await self.get_pages_content(api_key, database["pages"])
+            if page_content.get("success")
+        ]
+        
+        # Combine all content
+        combined_text = "\n\n".join([
+            f"# {item['title']}\n\n{item['content']}" 
+            for item in all_content
+        ])
+        
+        return {
+            "success": True,
+            "pages": all_content,
+            "total_pages": len(all_content),
+            "combined_content": combined_text
+        }
+    
+    def _blocks_to_text(self, blocks: List[Dict], depth: int = 0) -> str:
+        """Convert Notion blocks to plain text, nested blocks ("children") after their parent"""
         text_parts = []
+        indent = "  " * depth  # nested list items
         
         for block in blocks:
             block_type = block.get("type")
@@ -322,12 +450,12 @@ class NotionService:
             elif block_type == "bulleted_list_item":
                 text = self._extract_rich_text(block.get("bulleted_list_item", {}).get("rich_text", []))
                 if text:
-                    text_parts.append(f"• {text}")
+                    text_parts.append(f"{indent}• {text}")
             
             elif block_type == "numbered_list_item":
                 text = self._extract_rich_text(block.get("numbered_list_item", {}).get("rich_text", []))
                 if text:
-                    text_parts.append(f"1. {text}")
+                    text_parts.append(f"{indent}1. {text}")
             
             elif block_type == "quote":
                 text = self._extract_rich_text(block.get("quote", {}).get("rich_text", []))
@@ -350,8 +478,25 @@ class NotionService:
                 if text:
                     text_parts.append(text)
             
+            elif block_type == "to_do":
+                text = self._extract_rich_text(block.get("to_do", {}).get("rich_text", []))
+                if text:
+                    checked = "x" if block.get("to_do", {}).get("checked") else " "
+                    text_parts.append(f"{indent}[{checked}] {text}")
+            
+            elif block_type == "table_row":
+                cells = [self._extract_rich_text(cell) for cell in block.get("table_row", {}).get("cells", [])]
+                if any(cells):
+                    text_parts.append("| " + " | ".join(cells) + " |")
+            
             elif block_type == "divider":
                 text_parts.append("---")
+            
+            # Toggles, columns, synced blocks and tables hold their text in children; list items nest
+            if block.get("children"):
+                child_text = self._blocks_to_text(block["children"], depth + 1 if block_type in _LIST_BLOCKS else depth)
+                if child_text:
+                    text_parts.append(child_text)
         
         return "\n".join(text_parts)
     
@@ -0,0 +1,82 @@
+"""
+Parallel, memory-bounded PDF text extraction
+PDFs are read from disk, never held in memory whole. Pages are extracted in ranges by the work executor's
+processes, with pdfplumber first and PyPDF2 as a fallback for each page that pdfplumber fails on or finds
+no text in. Text is yielded page by page, in order, with only a few page ranges in flight at a time.
+"""
+import logging
+from collections import deque
+from typing import Iterator, List, Tuple
+
+import pdfplumber
+import PyPDF2
+
+from app.config import PDF_PAGES_PER_TASK
+from app.services.work_executor import WorkExecutor, work_executor
+
+logger = logging.getLogger(__name__)
+
+
+def count_pages(path: str) -> int:
+    return len(PyPDF2.PdfReader(path).pages)
+
+
+def extract_page_range(path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    """
+    (page number, text) for pages first..last (1-based, inclusive); runs in a worker process
+    A page that pdfplumber cannot read, or finds no text in, is retried with PyPDF2
+    """
+    texts = {}
+    try:
+        with pdfplumber.open(path, pages=list(range(first, last + 1))) as pdf:
+            for page in pdf.pages:
+                try:
+                    texts[page.page_number] = page.extract_text() or ""
+                except Exception as e:
+                    logger.debug("pdfplumber failed on page %s: %s", page.page_number, e)
+                finally:
+                    page.close()  # drop the page's parsed objects
+    except Exception as e:
+        logger.debug("pdfplumber could not open pages %s-%s: %s", first, last, e)
+
+    reader = None
+    for number in range(first, last + 1):
+        if texts.get(number, "").strip():
+            continue
+        try:
+            reader = reader or PyPDF2.PdfReader(path)
+            texts[number] = reader.pages[number - 1].extract_text() or ""
+        except Exception as e:
+            logger.debug("PyPDF2 failed on page %s: %s", number, e)
+            texts.setdefault(number, "")
+    return sorted(texts.items())
+
+
+class PdfExtractor:
+    """Extracts PDF pages on the work executor's "pdf" queue"""
+
+    def __init__(self, executor: WorkExecutor = work_executor, pages_per_task: int = PDF_PAGES_PER_TASK):
+        self.executor = executor
+        self.pages_per_task = max(1, pages_per_task)
+
+    def iter_pages(self, path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page number, text) for every page of the PDF at path, in order (blocking)
+        At most two page ranges per allowed "pdf" task are queued, so memory does not grow with the page count
+        """
+        total = count_pages(path)
+        ranges = deque((first, min(first + self.pages_per_task - 1, total)) for first in range(1, total + 1, self.pages_per_task))
+        window = self.executor.limit("pdf") * 2
+        in_flight = deque()
+        try:
+            while ranges or in_flight:
+                while ranges and len(in_flight) < window:
+                    in_flight.append(self.executor.submit("pdf", extract_page_range, path, *ranges.popleft()))
+                yield from in_flight.popleft().result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+# Global extractor instance
+pdf_extractor = PdfExtractor()
@@ -2,9 +2,13 @@
 Qdrant vector database service
 """
 import io
+import json
+import logging
+import time
 import uuid
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Dict, Any, Optional, Tuple
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.models import (
     Distance,
     VectorParams,
@@ -12,6 +16,7 @@ from qdrant_client.models import (
     Filter,
     FieldCondition,
     MatchValue,
+    MatchAny,
     SearchRequest,
     SparseVector,
     SparseVectorParams,
@@ -21,85 +26,51 @@ from qdrant_client.models import (
     Prefetch,
     Query,
     FusionQuery,
-    Fusion
+    Fusion,
+    PointIdsList,
+    SetPayload,
+    SetPayloadOperation
 )
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 import PyPDF2
 import pdfplumber
 
-from app.config import QDRANT_URL, QDRANT_API_KEY, QDRANT_COLLECTION_NAME, OPENAI_API_KEY, VOYAGE_API_KEY
-from app.services.voyage_service import voyage_service
-import re
-from collections import Counter
-import math
-
+from app.config import (
+    QDRANT_URL, QDRANT_API_KEY, QDRANT_COLLECTION_NAME, OPENAI_API_KEY, VOYAGE_API_KEY,
+    QDRANT_UPLOAD_BATCH_BYTES, QDRANT_UPLOAD_BATCH_MAX_POINTS, QDRANT_UPLOAD_PARALLELISM, QDRANT_BULK_WINDOW_CHUNKS
+)
+from app.services.voyage_service import voyage_service, ProgressCallback
+from app.services.response_cache import response_cache
+from app.services.context_assembler import count_tokens
+from app.services.document_embedding_cache import document_embedding_cache, content_hash
+from app.services.metrics_service import SEARCH_LATENCY, DENSE_FALLBACKS, CACHE_HITS
+from app.services.tracing import tracer
+from app.services.work_executor import work_executor
+from app.services.text_processing import (
+    SPARSE_HASH_VERSION, CHUNK_SIZE, CHUNK_OVERLAP, split_text,
+    sparse_token_index, tokenize_for_bm42, generate_sparse_vector, generate_sparse_vectors
+)
 
-def tokenize_for_bm42(text: str) -> List[str]:
-    """
-    Tokenize text for BM42 sparse vectors
-    Simple but effective tokenization for keyword matching
-    """
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove special characters but keep important ones
-    text = re.sub(r'[^\w\s@._-]', ' ', text)
-    
-    # Split into tokens
-    tokens = text.split()
-    
-    # Filter out very short tokens and stopwords
-    stopwords = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                 'of', 'with', 'by', 'from', 'is', 'are', 'was', 'were', 'be', 'been',
-                 'has', 'have', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-                 'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those'}
-    
-    tokens = [t for t in tokens if len(t) > 1 and t not in stopwords]
-    
-    return tokens
-
-
-def generate_sparse_vector(text: str) -> SparseVector:
-    """
-    Generate BM42-style sparse vector for text
-    Uses token frequency with simple weighting
-    """
-    tokens = tokenize_for_bm42(text)
-    
-    if not tokens:
-        return SparseVector(indices=[], values=[])
-    
-    # Count token frequencies
-    token_counts = Counter(tokens)
-    
-    # Create sparse vector (indices = token hashes, values = TF scores)
-    indices = []
-    values = []
-    
-    total_tokens = len(tokens)
-    
-    for token, count in token_counts.items():
-        # Use hash of token as index (Qdrant will handle IDF internally)
-        token_hash = hash(token) % (2**31)  # Ensure positive 32-bit int
-        
-        # Simple TF (term frequency) score
-        # BM42 formula: tf / (tf + k1 * (1 - b + b * (doc_len / avg_doc_len)))
-        # Simplified: just use normalized term frequency
-        tf_score = count / total_tokens
-        
-        indices.append(token_hash)
-        values.append(tf_score)
-    
-    return SparseVector(
-        indices=indices,
-        values=values
-    )
+logger = logging.getLogger(__name__)
 
 
 class QdrantService:
+    # Semantic variations - _preprocess_query replaces a query containing one of these phrases with its expansion
+    SEMANTIC_EXPANSIONS = {
+        "business time": "business hours working hours schedule",
+        "business hours": "business hours working hours schedule office hours",
+        "working time": "working hours business hours schedule",
+        "office time": "office hours business hours working hours",
+        "price": "pricing cost price fees",
+        "cost": "pricing cost price fees",
+        "contact info": "contact information email phone address",
+        "reach you": "contact information email phone",
+        "location": "address location where find"
+    }
+    
     def __init__(self):
         self.qdrant_client = None
+        self.async_qdrant_client = None  # Used by the chat path (see asearch_knowledge_base)
         self.embeddings = None
         self.base_collection_name = QDRANT_COLLECTION_NAME
         # ALWAYS use Voyage AI collection and voyage-3-large model
@@ -113,7 +84,7 @@ class QdrantService:
         """Initialize Qdrant client (embeddings initialized on-demand)"""
         try:
             # Initialize Qdrant client
-            print(f"🔄 Connecting to Qdrant at {QDRANT_URL}...")
+            logger.info("🔄 Connecting to Qdrant at %s...", QDRANT_URL)
             self.qdrant_client = QdrantClient(
                 url=QDRANT_URL,
                 api_key=QDRANT_API_KEY,
@@ -122,7 +93,7 @@ class QdrantService:
             
             # Test connection
             collections = self.qdrant_client.get_collections()
-            print(f"✅ Connected to Qdrant! Found {len(collections.collections)} collections")
+            logger.info("✅ Connected to Qdrant! Found %s collections", len(collections.collections))
             
             # Check which embedding providers are available (don't initialize yet)
             available_providers = []
@@ -131,35 +102,48 @@ class QdrantService:
             if VOYAGE_API_KEY and VOYAGE_API_KEY != "your-voyage-api-key-here":
                 available_providers.append("Voyage AI")
             
-            print(f"📦 Available embedding providers: {', '.join(available_providers) if available_providers else 'None'}")
-            print(f"💡 Embeddings will be initialized on-demand when first needed")
+            logger.info("📦 Available embedding providers: %s", ', '.join(available_providers) if available_providers else 'None')
+            logger.info("💡 Embeddings will be initialized on-demand when first needed")
             
             # Note: We don't initialize embeddings here to save costs
             # They will be initialized on-demand via set_embedding_provider()
             self.embeddings = None
             
-            print("✅ Qdrant service initialized successfully")
+            logger.info("✅ Qdrant service initialized successfully")
             
         except Exception as e:
-            print(f"⚠️ Warning: Could not connect to Qdrant during startup: {e}")
-            print("🔄 Qdrant will be initialized on-demand when first used")
+            logger.warning("⚠️ Warning: Could not connect to Qdrant during startup: %s", e)
+            logger.info("🔄 Qdrant will be initialized on-demand when first used")
             self.qdrant_client = None
 
     def _ensure_client_connected(self):
         """Ensure Qdrant client is connected, reconnect if needed"""
         if self.qdrant_client is None:
             try:
-                print(f"🔄 Reconnecting to Qdrant at {QDRANT_URL}...")
+                logger.debug("🔄 Reconnecting to Qdrant at %s...", QDRANT_URL)
                 self.qdrant_client = QdrantClient(
                     url=QDRANT_URL,
                     api_key=QDRANT_API_KEY,
                     timeout=120  # 2 minutes timeout for large uploads
                 )
-                print("✅ Qdrant client reconnected")
+                logger.debug("✅ Qdrant client reconnected")
             except Exception as e:
-                print(f"❌ Failed to reconnect to Qdrant: {e}")
+                logger.error("❌ Failed to reconnect to Qdrant: %s", e)
                 raise Exception(f"Qdrant connection failed: {e}")
 
+    def _get_async_client(self) -> Optional[AsyncQdrantClient]:
+        """Get the async Qdrant client, creating it lazily (construction does no I/O); None if it can't be created"""
+        if self.async_qdrant_client is None:
+            try:
+                self.async_qdrant_client = AsyncQdrantClient(
+                    url=QDRANT_URL,
+                    api_key=QDRANT_API_KEY,
+                    timeout=120
+                )
+            except Exception as e:
+                logger.error("❌ Failed to create async Qdrant client: %s", e)
+        return self.async_qdrant_client
+
     def _ensure_collection_exists(self, vector_size: int):
         """Ensure the collection exists with both dense and sparse vectors for hybrid search"""
         self._ensure_client_connected()
@@ -169,9 +153,9 @@ class QdrantService:
             collection_names = [col.name for col in collections.collections]
             
             if self.collection_name not in collection_names:
-                print(f"📦 Creating new HYBRID collection: {self.collection_name}")
-                print(f"   Dense vector dimension: {vector_size}")
-                print(f"   Sparse vector: BM42 (Qdrant native)")
+                logger.debug("📦 Creating new HYBRID collection: %s", self.collection_name)
+                logger.debug("Dense vector dimension: %s", vector_size)
+                logger.debug("Sparse vector: BM42 (Qdrant native)")
                 
                 # Create collection with BOTH dense and sparse vectors
                 self.qdrant_client.create_collection(
@@ -188,11 +172,11 @@ class QdrantService:
                         )
                     }
                 )
-                print(f"✅ Hybrid collection '{self.collection_name}' created successfully")
-                print(f"   ✅ Dense vectors: Ready for semantic search")
-                print(f"   ✅ Sparse vectors: Ready for keyword search (BM42)")
+                logger.debug("✅ Hybrid collection '%s' created successfully", self.collection_name)
+                logger.debug("✅ Dense vectors: Ready for semantic search")
+                logger.debug("✅ Sparse vectors: Ready for keyword search (BM42)")
             else:
-                print(f"✅ Collection '{self.collection_name}' already exists")
+                logger.debug("✅ Collection '%s' already exists", self.collection_name)
                 
                 # Verify vector size matches
                 collection_info = self.qdrant_client.get_collection(self.collection_name)
@@ -205,33 +189,33 @@ class QdrantService:
                             existing_size = collection_info.config.params.vectors['dense'].size
                         else:
                             # Old collection format - needs migration
-                            print(f"⚠️ Collection uses old format (single vector)")
-                            print(f"💡 For hybrid search, recreate collection with dense+sparse vectors")
+                            logger.warning("⚠️ Collection uses old format (single vector)")
+                            logger.debug("💡 For hybrid search, recreate collection with dense+sparse vectors")
                             self._recreate_collection_with_hybrid_config(vector_size)
                             return
                     else:
                         # Single vector config (old format)
                         existing_size = collection_info.config.params.vectors.size
-                        print(f"⚠️ Collection uses old format (dimension: {existing_size})")
-                        print(f"💡 For hybrid search, recreate collection with dense+sparse vectors")
+                        logger.warning("⚠️ Collection uses old format (dimension: %s)", existing_size)
+                        logger.debug("💡 For hybrid search, recreate collection with dense+sparse vectors")
                         self._recreate_collection_with_hybrid_config(vector_size)
                         return
                     
                     if existing_size != vector_size:
-                        print(f"⚠️ Warning: Collection has dimension {existing_size}, but embeddings have dimension {vector_size}")
-                        print(f"💡 Recreating collection with correct dimensions...")
+                        logger.warning("⚠️ Warning: Collection has dimension %s, but embeddings have dimension %s", existing_size, vector_size)
+                        logger.debug("💡 Recreating collection with correct dimensions...")
                         self._recreate_collection_with_hybrid_config(vector_size)
                         return
                 
                 # Check if sparse vectors are configured
                 if not hasattr(collection_info.config.params, 'sparse_vectors') or not collection_info.config.params.sparse_vectors:
-                    print(f"⚠️ Collection missing sparse vector configuration")
-                    print(f"💡 Recreating collection with hybrid config...")
+                    logger.warning("⚠️ Collection missing sparse vector configuration")
+                    logger.debug("💡 Recreating collection with hybrid config...")
                     self._recreate_collection_with_hybrid_config(vector_size)
                     return
             
             # Create payload indexes for filtering (critical for search and deletion performance)
-            print(f"🔍 Creating payload indexes for widgetId, businessId, and itemId...")
+            logger.debug("🔍 Creating payload indexes for widgetId, businessId, and itemId...")
             try:
                 # Create index for widgetId (keyword type for exact matching)
                 self.qdrant_client.create_payload_index(
@@ -239,12 +223,12 @@ class QdrantService:
                     field_name="widgetId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'widgetId'")
+                logger.debug("✅ Created payload index for 'widgetId'")
             except Exception as idx_error:
                 if "already exists" in str(idx_error).lower():
-                    print(f"✅ Payload index for 'widgetId' already exists")
+                    logger.debug("✅ Payload index for 'widgetId' already exists")
                 else:
-                    print(f"⚠️ Could not create widgetId index: {idx_error}")
+                    logger.warning("⚠️ Could not create widgetId index: %s", idx_error)
             
             try:
                 # Create index for businessId (keyword type for exact matching)
@@ -253,12 +237,12 @@ class QdrantService:
                     field_name="businessId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'businessId'")
+                logger.debug("✅ Created payload index for 'businessId'")
             except Exception as idx_error:
                 if "already exists" in str(idx_error).lower():
-                    print(f"✅ Payload index for 'businessId' already exists")
+                    logger.debug("✅ Payload index for 'businessId' already exists")
                 else:
-                    print(f"⚠️ Could not create businessId index: {idx_error}")
+                    logger.warning("⚠️ Could not create businessId index: %s", idx_error)
             
             try:
                 # Create index for itemId (keyword type for fast deletion)
@@ -267,12 +251,12 @@ class QdrantService:
                     field_name="itemId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'itemId' (for fast deletion)")
+                logger.debug("✅ Created payload index for 'itemId' (for fast deletion)")
             except Exception as idx_error:
                 if "already exists" in str(idx_error).lower():
-                    print(f"✅ Payload index for 'itemId' already exists")
+                    logger.debug("✅ Payload index for 'itemId' already exists")
                 else:
-                    print(f"⚠️ Could not create itemId index: {idx_error}")
+                    logger.warning("⚠️ Could not create itemId index: %s", idx_error)
 
             try:
                 # Create index for agentId (keyword type for agent-scoped queries)
@@ -281,12 +265,12 @@ class QdrantService:
                     field_name="agentId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'agentId'")
+                logger.debug("✅ Created payload index for 'agentId'")
             except Exception as idx_error:
                 if "already exists" in str(idx_error).lower():
-                    print(f"✅ Payload index for 'agentId' already exists")
+                    logger.debug("✅ Payload index for 'agentId' already exists")
                 else:
-                    print(f"⚠️ Could not create agentId index: {idx_error}")
+                    logger.warning("⚠️ Could not create agentId index: %s", idx_error)
 
             try:
                 # Create index for workspaceId (keyword type for workspace-scoped queries)
@@ -295,28 +279,28 @@ class QdrantService:
                     field_name="workspaceId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'workspaceId'")
+                logger.debug("✅ Created payload index for 'workspaceId'")
             except Exception as idx_error:
                 if "already exists" in str(idx_error).lower():
-                    print(f"✅ Payload index for 'workspaceId' already exists")
+                    logger.debug("✅ Payload index for 'workspaceId' already exists")
                 else:
-                    print(f"⚠️ Could not create workspaceId index: {idx_error}")
+                    logger.warning("⚠️ Could not create workspaceId index: %s", idx_error)
 
         except Exception as e:
-            print(f"❌ Error ensuring collection exists: {e}")
+            logger.error("❌ Error ensuring collection exists: %s", e)
             raise
 
     def _recreate_collection_with_hybrid_config(self, vector_size: int):
         """Recreate collection with proper hybrid configuration"""
         try:
-            print(f"🔄 Recreating collection '{self.collection_name}' with hybrid config...")
+            logger.debug("🔄 Recreating collection '%s' with hybrid config...", self.collection_name)
             
             # Delete existing collection
             try:
                 self.qdrant_client.delete_collection(self.collection_name)
-                print(f"🗑️ Deleted old collection")
+                logger.debug("🗑️ Deleted old collection")
             except Exception as e:
-                print(f"⚠️ Could not delete old collection: {e}")
+                logger.warning("⚠️ Could not delete old collection: %s", e)
             
             # Create new collection with hybrid config
             self.qdrant_client.create_collection(
@@ -333,21 +317,21 @@ class QdrantService:
                     )
                 }
             )
-            print(f"✅ Hybrid collection '{self.collection_name}' recreated successfully")
-            print(f"   ✅ Dense vectors: Ready for semantic search")
-            print(f"   ✅ Sparse vectors: Ready for keyword search (BM42)")
+            logger.debug("✅ Hybrid collection '%s' recreated successfully", self.collection_name)
+            logger.debug("✅ Dense vectors: Ready for semantic search")
+            logger.debug("✅ Sparse vectors: Ready for keyword search (BM42)")
             
             # Recreate payload indexes
             self._create_payload_indexes()
             
         except Exception as e:
-            print(f"❌ Error recreating collection: {e}")
+            logger.error("❌ Error recreating collection: %s", e)
             raise
 
     def _create_payload_indexes(self):
         """Create payload indexes for filtering"""
         try:
-            print(f"🔍 Creating payload indexes...")
+            logger.debug("🔍 Creating payload indexes...")
             
             # Create index for widgetId
             try:
@@ -356,12 +340,12 @@ class QdrantService:
                     field_name="widgetId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'widgetId'")
+                logger.debug("✅ Created payload index for 'widgetId'")
             except Exception as e:
                 if "already exists" in str(e).lower():
-                    print(f"✅ Payload index for 'widgetId' already exists")
+                    logger.debug("✅ Payload index for 'widgetId' already exists")
                 else:
-                    print(f"⚠️ Could not create widgetId index: {e}")
+                    logger.warning("⚠️ Could not create widgetId index: %s", e)
             
             # Create index for businessId
             try:
@@ -370,12 +354,12 @@ class QdrantService:
                     field_name="businessId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'businessId'")
+                logger.debug("✅ Created payload index for 'businessId'")
             except Exception as e:
                 if "already exists" in str(e).lower():
-                    print(f"✅ Payload index for 'businessId' already exists")
+                    logger.debug("✅ Payload index for 'businessId' already exists")
                 else:
-                    print(f"⚠️ Could not create businessId index: {e}")
+                    logger.warning("⚠️ Could not create businessId index: %s", e)
             
             # Create index for itemId
             try:
@@ -384,12 +368,12 @@ class QdrantService:
                     field_name="itemId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'itemId'")
+                logger.debug("✅ Created payload index for 'itemId'")
             except Exception as e:
                 if "already exists" in str(e).lower():
-                    print(f"✅ Payload index for 'itemId' already exists")
+                    logger.debug("✅ Payload index for 'itemId' already exists")
                 else:
-                    print(f"⚠️ Could not create itemId index: {e}")
+                    logger.warning("⚠️ Could not create itemId index: %s", e)
 
             # Create index for agentId
             try:
@@ -398,12 +382,12 @@ class QdrantService:
                     field_name="agentId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'agentId'")
+                logger.debug("✅ Created payload index for 'agentId'")
             except Exception as e:
                 if "already exists" in str(e).lower():
-                    print(f"✅ Payload index for 'agentId' already exists")
+                    logger.debug("✅ Payload index for 'agentId' already exists")
                 else:
-                    print(f"⚠️ Could not create agentId index: {e}")
+                    logger.warning("⚠️ Could not create agentId index: %s", e)
 
             # Create index for workspaceId
             try:
@@ -412,15 +396,15 @@ class QdrantService:
                     field_name="workspaceId",
                     field_schema="keyword"
                 )
-                print(f"✅ Created payload index for 'workspaceId'")
+                logger.debug("✅ Created payload index for 'workspaceId'")
             except Exception as e:
                 if "already exists" in str(e).lower():
-                    print(f"✅ Payload index for 'workspaceId' already exists")
+                    logger.debug("✅ Payload index for 'workspaceId' already exists")
                 else:
-                    print(f"⚠️ Could not create workspaceId index: {e}")
+                    logger.warning("⚠️ Could not create workspaceId index: %s", e)
 
         except Exception as e:
-            print(f"❌ Error creating payload indexes: {e}")
+            logger.error("❌ Error creating payload indexes: %s", e)
             raise
     
     def get_embeddings(self, model: str = "text-embedding-3-large"):
@@ -434,7 +418,7 @@ class QdrantService:
                 model=model
             )
         except Exception as e:
-            print(f"Error getting embeddings: {e}")
+            logger.error("Error getting embeddings: %s", e)
             raise
     
     def _get_collection_name(self, provider: str) -> str:
@@ -460,39 +444,44 @@ class QdrantService:
                 needs_init = True
             
             if not needs_init:
-                print(f"✅ Already using {provider}/{model} (initialized)")
+                logger.debug("✅ Already using %s/%s (initialized)", provider, model)
                 return
             
-            print(f"🔄 Setting up embeddings: {provider}/{model}")
+            logger.debug("🔄 Setting up embeddings: %s/%s", provider, model)
             self.embedding_provider = provider
             self.embedding_model = model
             
             # ALWAYS use Voyage collection
             self.collection_name = f"{self.base_collection_name}-voyage"
-            print(f"   📦 Collection: {self.collection_name}")
+            logger.debug("📦 Collection: %s", self.collection_name)
             
             # Use Voyage AI (no other options allowed)
             if not self.voyage_service.client:
                 raise Exception("Voyage AI client not initialized - check VOYAGE_API_KEY in .env")
             
-            print(f"✅ Switched to Voyage AI embeddings (model: {model})")
-            print(f"   🚢 Voyage AI ready for use")
-            print(f"   📊 Dimension: {self.voyage_service.get_embedding_dimension(model)}")
+            logger.debug("✅ Switched to Voyage AI embeddings (model: %s)", model)
+            logger.debug("🚢 Voyage AI ready for use")
+            logger.debug("📊 Dimension: %s", self.voyage_service.get_embedding_dimension(model))
             
             # Ensure collection exists with correct dimensions (1024 for voyage-3-large)
             self._ensure_collection_exists(1024)
                 
         except Exception as e:
-            print(f"❌ Error setting embedding provider: {e}")
+            logger.error("❌ Error setting embedding provider: %s", e)
             raise
     
+    @staticmethod
+    def resolve_embedding_model(model: Optional[str]) -> Tuple[str, str]:
+        """(provider, model) that items requested with `model` are embedded with - FORCED to voyage-3-large"""
+        return "voyage", "voyage-3-large"
+
     def set_embedding_model(self, model: str):
         """Set the embedding model - FORCED to always use voyage-3-large"""
         try:
             # FORCE voyage-3-large usage - ignore any other model requests
-            self.set_embedding_provider("voyage", "voyage-3-large")
+            self.set_embedding_provider(*self.resolve_embedding_model(model))
         except Exception as e:
-            print(f"Error setting embedding model: {e}")
+            logger.error("Error setting embedding model: %s", e)
             raise
 
     def extract_text_from_pdf(self, file_content: bytes) -> str:
@@ -524,11 +513,201 @@ class QdrantService:
             return text_content.strip() if text_content.strip() else "No text could be extracted from this PDF"
             
         except Exception as e:
-            print(f"Error extracting text from PDF: {e}")
+            logger.error("Error extracting text from PDF: %s", e)
             return f"Error extracting text from PDF: {str(e)}"
 
-    def store_knowledge_item(self, item: Dict[str, Any], embedding_provider: str = None, embedding_model: str = None) -> Dict[str, Any]:
-        """Store a knowledge base item in Qdrant using specified embedding provider"""
+    def _check_embeddings_ready(self, provider: str):
+        """Raise if the embedding client for `provider` is not available"""
+        if provider == "voyage":
+            if not self.voyage_service.client:
+                raise Exception("Voyage AI embeddings not initialized")
+        else:
+            if not self.embeddings:
+                raise Exception("OpenAI embeddings not initialized")
+
+    def _split_into_chunks(self, content: str) -> List[str]:
+        """Split item content into the chunks that get embedded (in a work executor process)"""
+        return work_executor.call("chunking", split_text, content)
+
+    @staticmethod
+    def _point_id(item_id: str, chunk_hash: str, occurrence: int) -> str:
+        """Deterministic point id, so storing the same item twice overwrites instead of duplicating"""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{item_id}:{chunk_hash}:{occurrence}"))
+
+    def _chunk_payload(self, item: Dict[str, Any], text: str, chunk_index: int, total_chunks: int, chunk_hash: str) -> Dict[str, Any]:
+        """Payload stored with each chunk of a knowledge item"""
+        payload = {
+            "workspaceId": item.get("workspaceId") or item.get("businessId", "unknown"),
+            "itemId": item["id"],
+            "title": item["title"],
+            "type": item["type"],
+            "text": text,
+            "chunkIndex": chunk_index,
+            "totalChunks": total_chunks,
+            "tokenCount": count_tokens(text),
+            "contentHash": chunk_hash,
+            "sparseVersion": SPARSE_HASH_VERSION,
+        }
+        
+        # Add widgetId or agentId if available
+        if item.get("widgetId"):
+            payload["widgetId"] = item["widgetId"]
+        if item.get("agentId"):
+            payload["agentId"] = item["agentId"]
+        
+        # Add workspaceId (preferred) or businessId for backward compatibility
+        if item.get("workspaceId"):
+            payload["workspaceId"] = item["workspaceId"]
+        elif item.get("businessId"):
+            payload["businessId"] = item["businessId"]
+        
+        # Add file metadata if available
+        if item.get("fileName"):
+            payload["fileName"] = item["fileName"]
+        if item.get("fileUrl"):
+            payload["fileUrl"] = item["fileUrl"]
+        if item.get("fileSize"):
+            payload["fileSize"] = item["fileSize"]
+        
+        return payload
+
+    def _build_points(self, item: Dict[str, Any], chunks: List[Dict[str, Any]], total_chunks: int, provider: str, model: str,
+                      progress_callback: Optional[ProgressCallback] = None):
+        """
+        Embed chunks ({"text", "index", "hash", "occurrence"}) and build points with NAMED vectors (dense + sparse)
+        Returns (points, embedding cache hits)
+        """
+        return self._build_chunk_points([(item, chunk, total_chunks) for chunk in chunks], provider, model, progress_callback)
+
+    def _build_chunk_points(self, entries: List[tuple], provider: str, model: str,
+                            progress_callback: Optional[ProgressCallback] = None):
+        """
+        Embed (item, chunk, total_chunks) entries - possibly of many items - in one pass and build their points
+        Returns (points, embedding cache hits)
+        """
+        texts = [chunk["text"] for _, chunk, _ in entries]
+        hashes = [chunk["hash"] for _, chunk, _ in entries]
+        
+        # Generate dense embeddings based on provider (unchanged chunks come from the embedding cache)
+        dense_embeddings, cache_hits = self._embed_documents(texts, hashes, provider, model, progress_callback)
+        
+        # Generate sparse vectors (BM42) for all chunks
+        logger.debug("🔍 Generating BM42 sparse vectors for %s chunks...", len(texts))
+        sparse_vectors = work_executor.call("sparse", generate_sparse_vectors, texts)
+        
+        points = [
+            PointStruct(
+                id=self._point_id(item["id"], chunk["hash"], chunk["occurrence"]),
+                vector={
+                    "dense": dense_emb,  # Semantic search vector
+                    "sparse": sparse_vec  # Keyword search vector (BM42)
+                },
+                payload=self._chunk_payload(item, chunk["text"], chunk["index"], total_chunks, chunk["hash"])
+            )
+            for (item, chunk, total_chunks), dense_emb, sparse_vec in zip(entries, dense_embeddings, sparse_vectors)
+        ]
+        return points, cache_hits
+
+    @staticmethod
+    def _estimate_point_bytes(point: PointStruct) -> int:
+        """Rough serialized size of a point (JSON payload + float32 dense + sparse index/value pairs)"""
+        size = len(json.dumps(point.payload, default=str)) if point.payload else 0
+        for vector in (point.vector.values() if isinstance(point.vector, dict) else [point.vector]):
+            if isinstance(vector, SparseVector):
+                size += 8 * len(vector.indices)
+            elif vector is not None:
+                size += 4 * len(vector)
+        return size
+
+    @staticmethod
+    def _plan_upload_batches(points: List[PointStruct]) -> List[List[PointStruct]]:
+        """Group points into upserts bounded by QDRANT_UPLOAD_BATCH_BYTES and QDRANT_UPLOAD_BATCH_MAX_POINTS"""
+        batches = []
+        current: List[PointStruct] = []
+        current_bytes = 0
+        for point in points:
+            point_bytes = QdrantService._estimate_point_bytes(point)
+            if current and (current_bytes + point_bytes > QDRANT_UPLOAD_BATCH_BYTES or len(current) >= QDRANT_UPLOAD_BATCH_MAX_POINTS):
+                batches.append(current)
+                current = []
+                current_bytes = 0
+            current.append(point)
+            current_bytes += point_bytes
+        if current:
+            batches.append(current)
+        return batches
+
+    def _upsert_bisecting(self, batch: List[PointStruct], wait: bool) -> List[PointStruct]:
+        """Upsert a batch; on failure split it in half and retry each half. Returns the points stored"""
+        try:
+            self.qdrant_client.upsert(
+                collection_name=self.collection_name,
+                points=batch,
+                wait=wait
+            )
+            return batch
+        except Exception as batch_error:
+            if len(batch) == 1:
+                logger.error("❌ Failed to upload point %s: %s", batch[0].id, batch_error)
+                return []
+            logger.warning("⚠️ Upload of %s points failed, bisecting: %s", len(batch), batch_error)
+            middle = len(batch) // 2
+            return self._upsert_bisecting(batch[:middle], wait) + self._upsert_bisecting(batch[middle:], wait)
+
+    def _upload_points(self, points: List[PointStruct]) -> List[PointStruct]:
+        """
+        Upsert points in byte-sized batches with up to QDRANT_UPLOAD_PARALLELISM in flight
+        Every batch but the last is sent with wait=False; the last one is sent after they have been
+        acknowledged and waits, so the item is searchable when this returns. Returns the points stored.
+        """
+        if not points:
+            return []
+        
+        batches = self._plan_upload_batches(points)
+        start = time.perf_counter()
+        uploaded: List[PointStruct] = []
+        
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=min(QDRANT_UPLOAD_PARALLELISM, len(batches) - 1)) as executor:
+                for stored in executor.map(lambda batch: self._upsert_bisecting(batch, wait=False), batches[:-1]):
+                    uploaded.extend(stored)
+        uploaded.extend(self._upsert_bisecting(batches[-1], wait=True))
+        
+        elapsed = time.perf_counter() - start
+        logger.info(
+            "📤 Uploaded %s/%s points in %s batches (%.0f points/s)",
+            len(uploaded), len(points), len(batches), len(uploaded) / elapsed if elapsed > 0 else 0
+        )
+        return uploaded
+
+    @staticmethod
+    def _number_chunks(texts: List[str]) -> List[Dict[str, Any]]:
+        """Attach index, content hash and occurrence (for repeated identical chunks) to each chunk"""
+        seen: Dict[str, int] = {}
+        chunks = []
+        for index, text in enumerate(texts):
+            chunk_hash = content_hash(text)
+            occurrence = seen.get(chunk_hash, 0)
+            seen[chunk_hash] = occurrence + 1
+            chunks.append({"text": text, "index": index, "hash": chunk_hash, "occurrence": occurrence})
+        return chunks
+
+    @staticmethod
+    def _ingest_stats(chunks: int, embed_elapsed: float, uploaded: int, upload_elapsed: float) -> Dict[str, Any]:
+        """Embedding and upload throughput for ingestion responses"""
+        return {
+            "embedding_seconds": round(embed_elapsed, 3),
+            "chunks_per_second": round(chunks / embed_elapsed, 1) if embed_elapsed > 0 else None,
+            "upload_seconds": round(upload_elapsed, 3),
+            "points_per_second": round(uploaded / upload_elapsed, 1) if upload_elapsed > 0 else None
+        }
+
+    def store_knowledge_item(self, item: Dict[str, Any], embedding_provider: str = None, embedding_model: str = None,
+                             progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Store a knowledge base item in Qdrant using specified embedding provider
+        progress_callback(embedded_chunks, total_chunks, elapsed_seconds) is called as embedding batches complete
+        """
         try:
             if not self.qdrant_client:
                 raise Exception("Qdrant client not initialized")
@@ -537,126 +716,449 @@ class QdrantService:
             provider = embedding_provider or self.embedding_provider
             model = embedding_model or self.embedding_model
             
-            print(f"📦 Storing knowledge item with {provider}/{model}")
-            
-            # Check embeddings are available
-            if provider == "voyage":
-                if not self.voyage_service.client:
-                    raise Exception("Voyage AI embeddings not initialized")
-            else:
-                if not self.embeddings:
-                    raise Exception("OpenAI embeddings not initialized")
+            logger.debug("📦 Storing knowledge item with %s/%s", provider, model)
+            self._check_embeddings_ready(provider)
             
             # Split the content into chunks
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1500,
-                chunk_overlap=300,
-                length_function=len,
-            )
+            chunks = self._number_chunks(self._split_into_chunks(item["content"]))
             
-            # Split the content
-            texts = text_splitter.split_text(item["content"])
+            # Prepare points for Qdrant with BOTH dense and sparse vectors
+            embed_start = time.perf_counter()
+            points, cache_hits = self._build_points(item, chunks, len(chunks), provider, model, progress_callback)
+            embed_elapsed = time.perf_counter() - embed_start
             
-            # Generate dense embeddings based on provider
-            if provider == "voyage":
-                print(f"   🚢 Generating Voyage AI dense embeddings for {len(texts)} chunks...")
-                dense_embeddings = self.voyage_service.embed_documents(texts, model)
-            else:
-                print(f"   🤖 Generating OpenAI dense embeddings for {len(texts)} chunks...")
-                dense_embeddings = self.embeddings.embed_documents(texts)
+            # Upload points to Qdrant in parallel batches
+            upload_start = time.perf_counter()
+            uploaded = self._upload_points(points)
+            upload_elapsed = time.perf_counter() - upload_start
+            total_uploaded = len(uploaded)
             
-            # Generate sparse vectors (BM42) for all chunks
-            print(f"   🔍 Generating BM42 sparse vectors for {len(texts)} chunks...")
-            sparse_vectors = [generate_sparse_vector(text) for text in texts]
+            logger.info("🎉 Successfully uploaded %s/%s points to Qdrant", total_uploaded, len(points))
             
-            # Prepare points for Qdrant with BOTH dense and sparse vectors
-            points = []
-            for i, (text, dense_emb, sparse_vec) in enumerate(zip(texts, dense_embeddings, sparse_vectors)):
-                point_id = str(uuid.uuid4())
-                
-                payload = {
-                    "workspaceId": item.get("workspaceId") or item.get("businessId", "unknown"),
-                    "itemId": item["id"],
-                    "title": item["title"],
-                    "type": item["type"],
-                    "text": text,
-                    "chunkIndex": i,
-                    "totalChunks": len(texts),
-                }
-                
-                # Add widgetId or agentId if available
-                if item.get("widgetId"):
-                    payload["widgetId"] = item["widgetId"]
-                if item.get("agentId"):
-                    payload["agentId"] = item["agentId"]
-                
-                # Add workspaceId (preferred) or businessId for backward compatibility
-                if item.get("workspaceId"):
-                    payload["workspaceId"] = item["workspaceId"]
-                elif item.get("businessId"):
-                    payload["businessId"] = item["businessId"]
-                
-                # Add file metadata if available
-                if item.get("fileName"):
-                    payload["fileName"] = item["fileName"]
-                if item.get("fileUrl"):
-                    payload["fileUrl"] = item["fileUrl"]
-                if item.get("fileSize"):
-                    payload["fileSize"] = item["fileSize"]
-                
-                # Create point with NAMED vectors (dense + sparse)
-                points.append(PointStruct(
-                    id=point_id,
-                    vector={
-                        "dense": dense_emb,  # Semantic search vector
-                        "sparse": sparse_vec  # Keyword search vector (BM42)
-                    },
-                    payload=payload
-                ))
+            # Knowledge base changed - cached answers for this agent are stale
+            self._invalidate_response_cache(item)
+            
+            return {
+                "success": True,
+                "message": f"Successfully stored {total_uploaded} chunks for item {item['id']}",
+                "chunks_created": total_uploaded,
+                "embedding_cache_hits": cache_hits,
+                **self._ingest_stats(len(chunks), embed_elapsed, total_uploaded, upload_elapsed),
+                "point_ids": [point.id for point in uploaded]
+            }
             
-            # Upload points to Qdrant in batches to avoid timeout
-            batch_size = 10  # Process 10 points at a time
-            total_uploaded = 0
+        except Exception as e:
+            logger.error("Error storing knowledge item: %s", e)
+            raise Exception(str(e))
+
+    def _scroll_item_points(self, item_id: str) -> List[Any]:
+        """Every stored point of an item (payload only, no vectors)"""
+        return self._scroll_items_points([item_id])
+
+    def _scroll_items_points(self, item_ids: List[str]) -> List[Any]:
+        """Every stored point of several items (payload only, no vectors)"""
+        points = []
+        for start in range(0, len(item_ids), 256):
+            ids = item_ids[start:start + 256]
+            match = MatchValue(value=ids[0]) if len(ids) == 1 else MatchAny(any=ids)
+            item_filter = Filter(must=[FieldCondition(key="itemId", match=match)])
+            offset = None
+            while True:
+                batch, offset = self.qdrant_client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=item_filter,
+                    limit=1000,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=False
+                )
+                points.extend(batch)
+                if offset is None:
+                    break
+        return points
+
+    def sync_knowledge_item(self, item: Dict[str, Any], embedding_provider: str = None, embedding_model: str = None,
+                            progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Incrementally re-ingest a knowledge item that may already be stored under item["id"]
+        Chunks are matched by content hash against the stored payloads: only new chunks are embedded
+        and upserted, vanished chunks are deleted, and unchanged points keep their vectors
+        (their payload is updated in place if e.g. the chunk moved or the title changed).
+        """
+        try:
+            if not self.qdrant_client:
+                raise Exception("Qdrant client not initialized")
             
-            for i in range(0, len(points), batch_size):
-                batch = points[i:i + batch_size]
-                print(f"   📤 Uploading batch {i//batch_size + 1}/{(len(points) + batch_size - 1)//batch_size} ({len(batch)} points)...")
-                
-                try:
-                    self.qdrant_client.upsert(
+            provider = embedding_provider or self.embedding_provider
+            model = embedding_model or self.embedding_model
+            self._check_embeddings_ready(provider)
+            
+            chunks = self._number_chunks(self._split_into_chunks(item["content"]))
+            existing_points = self._scroll_item_points(item["id"])
+            
+            # content hash -> stored points (older points have no contentHash, but their text is the chunk)
+            stored_by_hash: Dict[str, List[Any]] = {}
+            for point in existing_points:
+                payload = point.payload or {}
+                chunk_hash = payload.get("contentHash") or content_hash(payload.get("text", ""))
+                stored_by_hash.setdefault(chunk_hash, []).append(point)
+            
+            new_chunks = []
+            payload_updates = []
+            kept = 0
+            for chunk in chunks:
+                candidates = stored_by_hash.get(chunk["hash"])
+                if not candidates:
+                    new_chunks.append(chunk)
+                    continue
+                point = candidates.pop(0)
+                kept += 1
+                payload = self._chunk_payload(item, chunk["text"], chunk["index"], len(chunks), chunk["hash"])
+                if any((point.payload or {}).get(key) != value for key, value in payload.items()):
+                    payload_updates.append(SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point.id])))
+            
+            removed_ids = [point.id for points in stored_by_hash.values() for point in points]
+            
+            embed_start = time.perf_counter()
+            points, cache_hits = self._build_points(item, new_chunks, len(chunks), provider, model, progress_callback) if new_chunks else ([], 0)
+            embed_elapsed = time.perf_counter() - embed_start
+            upload_start = time.perf_counter()
+            uploaded = self._upload_points(points)
+            upload_elapsed = time.perf_counter() - upload_start
+            added = len(uploaded)
+            
+            if payload_updates:
+                for start in range(0, len(payload_updates), 100):
+                    self.qdrant_client.batch_update_points(
                         collection_name=self.collection_name,
-                        points=batch,
-                        wait=True  # Wait for the operation to complete
+                        update_operations=payload_updates[start:start + 100],
+                        wait=True
                     )
-                    total_uploaded += len(batch)
-                    print(f"   ✅ Batch uploaded successfully ({total_uploaded}/{len(points)} total)")
-                except Exception as batch_error:
-                    print(f"   ⚠️ Batch upload failed, retrying: {batch_error}")
-                    # Retry once with smaller batch
-                    for point in batch:
-                        try:
-                            self.qdrant_client.upsert(
-                                collection_name=self.collection_name,
-                                points=[point],
-                                wait=True
-                            )
-                            total_uploaded += 1
-                        except Exception as point_error:
-                            print(f"   ❌ Failed to upload point {point.id}: {point_error}")
-            
-            print(f"   🎉 Successfully uploaded {total_uploaded}/{len(points)} points to Qdrant")
+            
+            if removed_ids:
+                self.qdrant_client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=PointIdsList(points=removed_ids),
+                    wait=True
+                )
+            
+            if added or removed_ids or payload_updates:
+                self._invalidate_response_cache(item)
+            
+            logger.info(
+                "🔁 Synced item %s: %s added, %s kept (%s updated), %s removed",
+                item["id"], added, kept, len(payload_updates), len(removed_ids)
+            )
             
             return {
                 "success": True,
-                "message": f"Successfully stored {total_uploaded} chunks for item {item['id']}",
-                "chunks_created": total_uploaded,
-                "point_ids": [point.id for point in points[:total_uploaded]]
+                "message": f"Synced item {item['id']}: {added} added, {kept} kept, {len(removed_ids)} removed",
+                "item_id": item["id"],
+                "added": added,
+                "kept": kept,
+                "removed": len(removed_ids),
+                "updated": len(payload_updates),
+                "total_chunks": len(chunks),
+                "chunks_created": added,
+                "embedding_cache_hits": cache_hits,
+                **self._ingest_stats(len(new_chunks), embed_elapsed, added, upload_elapsed),
+                "point_ids": [point.id for point in uploaded]
+            }
+            
+        except Exception as e:
+            logger.error("❌ Error syncing knowledge item: %s", e)
+            raise Exception(str(e))
+
+    def store_knowledge_items_bulk(self, items: List[Dict[str, Any]], embedding_provider: str = None, embedding_model: str = None,
+                                   progress_callback: Optional[ProgressCallback] = None, sync: bool = False) -> Dict[str, Any]:
+        """
+        Store many already-chunked knowledge items with a few large embedding batches and parallel upserts
+        Each item carries its pre-split texts in item["chunks"], which are stored as-is (items without them
+        have item["content"] split like store_knowledge_item does). The chunks of every item are embedded
+        together (cache misses only) and uploaded in byte-sized batches, QDRANT_BULK_WINDOW_CHUNKS at a time.
+        With sync=True the items may already be stored: points whose chunk is unchanged are kept (payload
+        updated in place if needed) and points of these items that match no chunk any more are deleted.
+        progress_callback(embedded_chunks, total_chunks, elapsed_seconds) covers all items.
+        """
+        try:
+            if not self.qdrant_client:
+                raise Exception("Qdrant client not initialized")
+            
+            provider = embedding_provider or self.embedding_provider
+            model = embedding_model or self.embedding_model
+            self._check_embeddings_ready(provider)
+            
+            entries = []
+            for item in items:
+                texts = item.get("chunks")
+                if texts is None:
+                    texts = self._split_into_chunks(item["content"])
+                texts = [text for text in texts if text and text.strip()]
+                entries.extend((item, chunk, len(texts)) for chunk in self._number_chunks(texts))
+            
+            existing: Dict[str, Any] = {}
+            if sync and items:
+                existing = {str(point.id): point for point in self._scroll_items_points([item["id"] for item in items])}
+            
+            new_entries = []
+            payload_updates = []
+            kept_ids = set()
+            for item, chunk, total_chunks in entries:
+                point_id = self._point_id(item["id"], chunk["hash"], chunk["occurrence"])
+                point = existing.get(point_id)
+                if point is None or point_id in kept_ids:
+                    new_entries.append((item, chunk, total_chunks))
+                    continue
+                kept_ids.add(point_id)
+                payload = self._chunk_payload(item, chunk["text"], chunk["index"], total_chunks, chunk["hash"])
+                if any((point.payload or {}).get(key) != value for key, value in payload.items()):
+                    payload_updates.append(SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point.id])))
+            removed_ids = [point.id for point_id, point in existing.items() if point_id not in kept_ids]
+            
+            logger.info(
+                "📦 Bulk storing %s items: %s chunks to embed, %s unchanged (%s/%s)",
+                len(items), len(new_entries), len(kept_ids), provider, model
+            )
+            
+            # Embed and upload a window at a time so memory stays bounded on very large imports
+            embed_elapsed = upload_elapsed = 0.0
+            cache_hits = 0
+            uploaded: List[PointStruct] = []
+            for start in range(0, len(new_entries), QDRANT_BULK_WINDOW_CHUNKS):
+                window = new_entries[start:start + QDRANT_BULK_WINDOW_CHUNKS]
+                window_progress = None
+                if progress_callback:
+                    window_progress = lambda embedded, total, elapsed, done=start: progress_callback(done + embedded, len(new_entries), embed_elapsed + elapsed)
+                embed_start = time.perf_counter()
+                points, hits = self._build_chunk_points(window, provider, model, window_progress)
+                embed_elapsed += time.perf_counter() - embed_start
+                cache_hits += hits
+                upload_start = time.perf_counter()
+                uploaded.extend(self._upload_points(points))
+                upload_elapsed += time.perf_counter() - upload_start
+            if progress_callback and not new_entries:
+                progress_callback(0, 0, 0.0)
+            
+            for start in range(0, len(payload_updates), 100):
+                self.qdrant_client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=payload_updates[start:start + 100],
+                    wait=True
+                )
+            
+            if removed_ids:
+                self.qdrant_client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=PointIdsList(points=removed_ids),
+                    wait=True
+                )
+            
+            # Points per item: stored now or kept from before; an item with a chunk that failed to upload is reported
+            uploaded_ids = {str(point.id) for point in uploaded}
+            item_point_ids: Dict[str, List[str]] = {item["id"]: [] for item in items}
+            failed_items = []
+            for item, chunk, _ in entries:
+                point_id = self._point_id(item["id"], chunk["hash"], chunk["occurrence"])
+                if point_id in uploaded_ids or point_id in kept_ids:
+                    item_point_ids[item["id"]].append(point_id)
+                elif item["id"] not in failed_items:
+                    failed_items.append(item["id"])
+            
+            if uploaded or removed_ids or payload_updates:
+                owners = {}
+                for item in items:
+                    owners.setdefault((item.get("agentId"), item.get("widgetId")), item)
+                for item in owners.values():
+                    self._invalidate_response_cache(item)
+            
+            logger.info(
+                "🎉 Bulk stored %s items: %s chunks added, %s kept (%s updated), %s removed, %s failed items",
+                len(items), len(uploaded), len(kept_ids), len(payload_updates), len(removed_ids), len(failed_items)
+            )
+            
+            return {
+                "success": True,
+                "message": f"Stored {len(items)} items: {len(uploaded)} chunks added, {len(kept_ids)} kept, {len(removed_ids)} removed",
+                "items_stored": len(items) - len(failed_items),
+                "added": len(uploaded),
+                "kept": len(kept_ids),
+                "removed": len(removed_ids),
+                "updated": len(payload_updates),
+                "total_chunks": len(entries),
+                "chunks_created": len(uploaded),
+                "embedding_cache_hits": cache_hits,
+                **self._ingest_stats(len(new_entries), embed_elapsed, len(uploaded), upload_elapsed),
+                "item_point_ids": item_point_ids,
+                "failed_items": failed_items
             }
             
         except Exception as e:
-            print(f"Error storing knowledge item: {e}")
+            logger.error("❌ Error bulk storing knowledge items: %s", e)
             raise Exception(str(e))
 
+    def store_knowledge_item_stream(self, item: Dict[str, Any], sections: Iterable[str], embedding_provider: str = None,
+                                    embedding_model: str = None, progress_callback: Optional[ProgressCallback] = None,
+                                    sync: bool = False) -> Dict[str, Any]:
+        """
+        Store a knowledge item whose text arrives in sections (e.g. PDF pages) without ever holding all of it
+        Sections are buffered until about QDRANT_BULK_WINDOW_CHUNKS chunks of text have arrived; the buffer is
+        split like store_knowledge_item does, and every chunk but the last (which may continue in the next
+        section) is embedded and uploaded. totalChunks is set on the points once the item is complete.
+        With sync=True the item may already be stored: unchanged points are kept and the rest are deleted.
+        Raises ValueError when the sections hold no text (nothing is deleted then).
+        progress_callback(chunks_stored, chunks_so_far, elapsed_seconds) is called after each window.
+        """
+        if not self.qdrant_client:
+            raise Exception("Qdrant client not initialized")
+        
+        provider = embedding_provider or self.embedding_provider
+        model = embedding_model or self.embedding_model
+        self._check_embeddings_ready(provider)
+        
+        existing = {str(point.id): point for point in self._scroll_item_points(item["id"])} if sync else {}
+        window_chars = QDRANT_BULK_WINDOW_CHUNKS * (CHUNK_SIZE - CHUNK_OVERLAP)
+        start = time.perf_counter()
+        
+        seen: Dict[str, int] = {}
+        kept_ids = set()
+        uploaded: List[PointStruct] = []
+        payload_updates = []
+        stats = {"chunks": 0, "new": 0, "cache_hits": 0, "embed": 0.0, "upload": 0.0}
+        
+        def store(texts: List[str]):
+            new_entries = []
+            for text in texts:
+                if not text.strip():
+                    continue
+                chunk_hash = content_hash(text)
+                occurrence = seen.get(chunk_hash, 0)
+                seen[chunk_hash] = occurrence + 1
+                chunk = {"text": text, "index": stats["chunks"], "hash": chunk_hash, "occurrence": occurrence}
+                stats["chunks"] += 1
+                point = existing.get(self._point_id(item["id"], chunk_hash, occurrence))
+                if point is None:
+                    new_entries.append((item, chunk, 0))
+                    continue
+                kept_ids.add(str(point.id))
+                payload = self._chunk_payload(item, text, chunk["index"], 0, chunk_hash)
+                payload.pop("totalChunks")
+                if any((point.payload or {}).get(key) != value for key, value in payload.items()):
+                    payload_updates.append(SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point.id])))
+            
+            if new_entries:
+                embed_start = time.perf_counter()
+                points, cache_hits = self._build_chunk_points(new_entries, provider, model)
+                stats["embed"] += time.perf_counter() - embed_start
+                stats["cache_hits"] += cache_hits
+                stats["new"] += len(new_entries)
+                upload_start = time.perf_counter()
+                uploaded.extend(self._upload_points(points))
+                stats["upload"] += time.perf_counter() - upload_start
+            if progress_callback:
+                progress_callback(len(uploaded) + len(kept_ids), stats["chunks"], time.perf_counter() - start)
+        
+        buffer = ""
+        for section in sections:
+            if section:
+                buffer += section + "\n"
+            if len(buffer) >= window_chars:
+                texts = self._split_into_chunks(buffer)
+                store(texts[:-1])
+                buffer = texts[-1] if texts else ""
+        store(self._split_into_chunks(buffer.strip()))
+        
+        if not stats["chunks"]:
+            raise ValueError("No text could be extracted")
+        
+        for offset in range(0, len(payload_updates), 100):
+            self.qdrant_client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=payload_updates[offset:offset + 100],
+                wait=True
+            )
+        removed_ids = [point.id for point_id, point in existing.items() if point_id not in kept_ids]
+        if removed_ids:
+            self.qdrant_client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=removed_ids),
+                wait=True
+            )
+        self.qdrant_client.set_payload(
+            collection_name=self.collection_name,
+            payload={"totalChunks": stats["chunks"]},
+            points=Filter(must=[FieldCondition(key="itemId", match=MatchValue(value=item["id"]))]),
+            wait=True
+        )
+        
+        self._invalidate_response_cache(item)
+        logger.info(
+            "🎉 Streamed item %s: %s chunks (%s added, %s kept, %s removed) in %.1fs",
+            item["id"], stats["chunks"], len(uploaded), len(kept_ids), len(removed_ids), time.perf_counter() - start
+        )
+        
+        return {
+            "success": True,
+            "message": f"Successfully stored {stats['chunks']} chunks for item {item['id']}",
+            "added": len(uploaded),
+            "kept": len(kept_ids),
+            "removed": len(removed_ids),
+            "updated": len(payload_updates),
+            "total_chunks": stats["chunks"],
+            "chunks_created": len(uploaded),
+            "embedding_cache_hits": stats["cache_hits"],
+            **self._ingest_stats(stats["new"], stats["embed"], len(uploaded), stats["upload"]),
+            "point_ids": [point.id for point in uploaded]
+        }
+
+    def _embed_documents(self, texts: List[str], chunk_hashes: List[str], provider: str, model: str,
+                         progress_callback: Optional[ProgressCallback] = None):
+        """
+        Dense embeddings for chunks, sending only cache misses to the provider
+        Returns (embeddings in input order, number of chunks that were not sent to the provider)
+        """
+        if provider != "voyage":
+            logger.debug("🤖 Generating OpenAI dense embeddings for %s chunks...", len(texts))
+            start = time.perf_counter()
+            embeddings = self.embeddings.embed_documents(texts)
+            if progress_callback:
+                progress_callback(len(texts), len(texts), time.perf_counter() - start)
+            return embeddings, 0
+
+        cached = document_embedding_cache.get_many(model, chunk_hashes)
+
+        # Identical chunks within one document are embedded once
+        missing = {}
+        for text, chunk_hash in zip(texts, chunk_hashes):
+            if chunk_hash not in cached and chunk_hash not in missing:
+                missing[chunk_hash] = text
+
+        if missing:
+            logger.debug("🚢 Generating Voyage AI dense embeddings for %s/%s chunks (%s cached)...", len(missing), len(texts), len(cached))
+            # Cached chunks count as already embedded in the reported progress
+            already_done = len(texts) - len(missing)
+            voyage_progress = None
+            if progress_callback:
+                voyage_progress = lambda embedded, total, elapsed: progress_callback(already_done + embedded, len(texts), elapsed)
+            new_embeddings = self.voyage_service.embed_documents(list(missing.values()), model, voyage_progress)
+            document_embedding_cache.put_many(model, list(missing), new_embeddings)
+            cached.update(zip(missing, new_embeddings))
+
+        elif progress_callback:
+            progress_callback(len(texts), len(texts), 0.0)
+
+        cache_hits = len(texts) - len(missing)
+        if cache_hits:
+            CACHE_HITS.inc(cache_hits, cache="document_embedding", model=model)
+        return [cached[chunk_hash] for chunk_hash in chunk_hashes], cache_hits
+
+    def _invalidate_response_cache(self, item: Dict[str, Any]):
+        """Invalidate cached chat answers for the agent (or widget) that owns a knowledge item"""
+        owner_ids = [owner_id for owner_id in (item.get("agentId"), item.get("widgetId")) if owner_id]
+        if not owner_ids:
+            response_cache.invalidate_all()
+        for owner_id in owner_ids:
+            response_cache.invalidate_agent(owner_id)
+
     def search_knowledge_base(self, query: str, agent_id: str, limit: int = 5, score_threshold: float = 0.05) -> Dict[str, Any]:
         """
         HYBRID SEARCH using Dense + BM42 Sparse with RRF Fusion
@@ -681,114 +1183,49 @@ class QdrantService:
             # Preprocess query to handle typos and variations
             preprocessed_query = self._preprocess_query(query)
             
-            print(f"\n{'='*70}")
-            print(f"🔍 HYBRID SEARCH (Dense + BM42 Sparse + RRF Fusion)")
-            print(f"{'='*70}")
-            print(f"   Original query: '{query}'")
+            logger.debug("🔍 HYBRID SEARCH (Dense + BM42 Sparse + RRF Fusion)")
+            logger.debug("Original query: '%s'", query)
             if preprocessed_query != query:
-                print(f"   Preprocessed: '{preprocessed_query}'")
-            print(f"   Agent ID: {agent_id}")
-            print(f"   Requested limit: {limit}")
-            print(f"   Embedding: {self.embedding_provider}/{self.embedding_model}")
+                logger.debug("Preprocessed: '%s'", preprocessed_query)
+            logger.debug("Agent ID: %s", agent_id)
+            logger.debug("Requested limit: %s", limit)
+            logger.debug("Embedding: %s/%s", self.embedding_provider, self.embedding_model)
             
             # Generate dense query embedding based on provider
             if self.embedding_provider == "voyage":
                 query_dense_vector = self.voyage_service.embed_query(preprocessed_query, self.embedding_model)
-                print(f"   🚢 Dense vector: Voyage AI ({len(query_dense_vector)} dims)")
+                logger.debug("🚢 Dense vector: Voyage AI (%s dims)", len(query_dense_vector))
             else:
                 query_dense_vector = self.embeddings.embed_query(preprocessed_query)
-                print(f"   🤖 Dense vector: OpenAI ({len(query_dense_vector)} dims)")
+                logger.debug("🤖 Dense vector: OpenAI (%s dims)", len(query_dense_vector))
             
             # Generate sparse query vector (BM42)
             query_sparse_vector = generate_sparse_vector(preprocessed_query)
-            print(f"   🔍 Sparse vector: BM42 ({len(query_sparse_vector.indices)} tokens)")
+            logger.debug("🔍 Sparse vector: BM42 (%s tokens)", len(query_sparse_vector.indices))
             
             # Create filter for agentId
-            agent_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="agentId",
-                        match=MatchValue(value=agent_id)
-                    )
-                ]
-            )
+            agent_filter = self._agent_filter(agent_id)
             
             # Perform HYBRID search with RRF (Reciprocal Rank Fusion)
             # This runs BOTH searches in PARALLEL inside Qdrant and fuses results
-            print(f"\n   🚀 Executing hybrid search (parallel dense + sparse)...")
+            logger.debug("🚀 Executing hybrid search (parallel dense + sparse)...")
             
             search_results = self.qdrant_client.query_points(
                 collection_name=self.collection_name,
-                prefetch=[
-                    # Prefetch from dense vector search (semantic)
-                    Prefetch(
-                        query=query_dense_vector,
-                        using="dense",
-                        limit=limit * 3,  # Get 3x more for better fusion
-                        filter=agent_filter
-                    ),
-                    # Prefetch from sparse vector search (keywords - BM42)
-                    Prefetch(
-                        query=query_sparse_vector,
-                        using="sparse",
-                        limit=limit * 3,  # Get 3x more for better fusion
-                        filter=agent_filter
-                    )
-                ],
-                query=FusionQuery(
-                    fusion=Fusion.RRF  # Reciprocal Rank Fusion combines both
-                ),
-                limit=limit * 3,  # Final limit after fusion (will be reranked)
-                with_payload=True
+                **self._hybrid_query_args(query_dense_vector, query_sparse_vector, agent_filter, limit)
             )
             
-            print(f"\n   📊 FUSION RESULTS:")
-            print(f"      Total fused results: {len(search_results.points)}")
-            
-            # Format results
-            results = []
-            for idx, result in enumerate(search_results.points):
-                score = float(result.score) if hasattr(result, 'score') else 1.0
-                
-                # Qdrant returns scored points
-                title = result.payload.get('title', 'Untitled')
-                content_preview = result.payload.get('text', '')[:100]
-                
-                print(f"      {idx+1}. '{title}' (fusion_score: {score:.4f})")
-                print(f"         Preview: {content_preview}...")
-                
-                # Apply threshold filter
-                if score >= score_threshold:
-                    results.append({
-                        "content": result.payload.get("text", ""),
-                        "metadata": result.payload,
-                        "score": score,
-                        "fusion_score": score  # This is the combined dense+sparse score
-                    })
-            
-            # Limit to requested number
-            results = results[:limit * 3]  # Return 3x for reranking
-            
-            print(f"\n   ✅ Returning {len(results)} results for reranking")
-            print(f"{'='*70}\n")
-            
-            return {
-                "success": True,
-                "results": results,
-                "query": preprocessed_query,
-                "total_results": len(results),
-                "search_type": "hybrid_rrf"  # Indicate this was hybrid search
-            }
+            return self._format_hybrid_results(search_results.points, preprocessed_query, limit, score_threshold)
             
         except Exception as e:
-            print(f"\n❌ Error in hybrid search: {e}")
-            print(f"   Falling back to dense-only search...")
+            logger.error("❌ Error in hybrid search: %s", e)
+            logger.debug("Falling back to dense-only search...")
             
             # Fallback to dense-only search if hybrid fails
             try:
                 return self._fallback_dense_search(query, agent_id, limit, score_threshold)
             except Exception as fallback_error:
-                print(f"❌ Fallback search also failed: {fallback_error}")
+                logger.error("❌ Fallback search also failed: %s", fallback_error)
                 raise Exception(str(e))
     
     def _fallback_dense_search(self, query: str, agent_id: str, limit: int, score_threshold: float) -> Dict[str, Any]:
@@ -796,7 +1233,7 @@ class QdrantService:
         Fallback to dense-only search for backward compatibility
         Used if hybrid search fails (e.g., old collection format)
         """
-        print(f"\n   ⚠️ Using DENSE-ONLY search (fallback mode)")
+        logger.warning("⚠️ Using DENSE-ONLY search (fallback mode)")
         
         # Preprocess query
         preprocessed_query = self._preprocess_query(query)
@@ -811,21 +1248,167 @@ class QdrantService:
         search_results = self.qdrant_client.search(
             collection_name=self.collection_name,
             query_vector=query_embedding,
-            query_filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="agentId",
-                        match=MatchValue(value=agent_id)
-                    )
-                ]
-            ),
+            query_filter=self._agent_filter(agent_id),
             limit=limit * 3,
             score_threshold=None
         )
         
-        # Format results
+        return self._format_dense_results(search_results, preprocessed_query, limit, score_threshold)
+    
+    async def asearch_knowledge_base(self, query: str, agent_id: str, limit: int = 5, score_threshold: float = 0.05) -> Dict[str, Any]:
+        """
+        Async HYBRID SEARCH (Dense + BM42 Sparse with RRF Fusion) for the chat path
+        Same behaviour and return shape as search_knowledge_base, but uses the async
+        Voyage AI and Qdrant clients so the event loop is never blocked
+        """
+        try:
+            async_client = self._get_async_client()
+            if not async_client:
+                raise Exception("Async Qdrant client not initialized")
+            
+            if not agent_id:
+                raise Exception("agent_id must be provided")
+            
+            if self.embedding_provider == "voyage":
+                if not self.voyage_service.async_client:
+                    raise Exception("Voyage AI embeddings not initialized")
+            else:
+                if not self.embeddings:
+                    raise Exception("OpenAI embeddings not initialized")
+            
+            preprocessed_query = self._preprocess_query(query)
+            
+            logger.debug("🔍 HYBRID SEARCH (async) - agent: %s, limit: %s, query: '%s'", agent_id, limit, preprocessed_query)
+            
+            with tracer.span("rag.embed", provider=self.embedding_provider, model=self.embedding_model):
+                if self.embedding_provider == "voyage":
+                    query_dense_vector = await self.voyage_service.aembed_query(preprocessed_query, self.embedding_model)
+                else:
+                    query_dense_vector = await self.embeddings.aembed_query(preprocessed_query)
+            
+            query_sparse_vector = generate_sparse_vector(preprocessed_query)
+            agent_filter = self._agent_filter(agent_id)
+            
+            with tracer.span("qdrant.query", search_type="hybrid_rrf") as query_span, SEARCH_LATENCY.time(search_type="hybrid_rrf"):
+                search_results = await async_client.query_points(
+                    collection_name=self.collection_name,
+                    **self._hybrid_query_args(query_dense_vector, query_sparse_vector, agent_filter, limit)
+                )
+                query_span.set(points=len(search_results.points))
+            
+            return self._format_hybrid_results(search_results.points, preprocessed_query, limit, score_threshold)
+            
+        except Exception as e:
+            logger.error("❌ Error in hybrid search, falling back to dense-only search: %s", e)
+            
+            DENSE_FALLBACKS.inc(model=self.embedding_model)
+            try:
+                return await self._afallback_dense_search(query, agent_id, limit, score_threshold)
+            except Exception as fallback_error:
+                logger.error("❌ Fallback search also failed: %s", fallback_error)
+                raise Exception(str(e))
+    
+    async def _afallback_dense_search(self, query: str, agent_id: str, limit: int, score_threshold: float) -> Dict[str, Any]:
+        """Async variant of _fallback_dense_search"""
+        logger.warning("⚠️ Using DENSE-ONLY search (fallback mode)")
+        
+        async_client = self._get_async_client()
+        if not async_client:
+            raise Exception("Async Qdrant client not initialized")
+        
+        preprocessed_query = self._preprocess_query(query)
+        
+        with tracer.span("rag.embed", provider=self.embedding_provider, model=self.embedding_model):
+            if self.embedding_provider == "voyage":
+                query_embedding = await self.voyage_service.aembed_query(preprocessed_query, self.embedding_model)
+            else:
+                query_embedding = await self.embeddings.aembed_query(preprocessed_query)
+        
+        with tracer.span("qdrant.query", search_type="dense_only"), SEARCH_LATENCY.time(search_type="dense_only"):
+            search_results = await async_client.search(
+                collection_name=self.collection_name,
+                query_vector=query_embedding,
+                query_filter=self._agent_filter(agent_id),
+                limit=limit * 3,
+                score_threshold=None
+            )
+        
+        return self._format_dense_results(search_results, preprocessed_query, limit, score_threshold)
+    
+    def _agent_filter(self, agent_id: str) -> Filter:
+        """Build the agentId filter used by every search"""
+        return Filter(
+            must=[
+                FieldCondition(
+                    key="agentId",
+                    match=MatchValue(value=agent_id)
+                )
+            ]
+        )
+    
+    def _hybrid_query_args(self, dense_vector: List[float], sparse_vector: SparseVector, agent_filter: Filter, limit: int) -> Dict[str, Any]:
+        """Build query_points arguments for hybrid (dense + sparse) search with RRF fusion"""
+        return {
+            "prefetch": [
+                # Prefetch from dense vector search (semantic)
+                Prefetch(
+                    query=dense_vector,
+                    using="dense",
+                    limit=limit * 3,  # Get 3x more for better fusion
+                    filter=agent_filter
+                ),
+                # Prefetch from sparse vector search (keywords - BM42)
+                Prefetch(
+                    query=sparse_vector,
+                    using="sparse",
+                    limit=limit * 3,  # Get 3x more for better fusion
+                    filter=agent_filter
+                )
+            ],
+            "query": FusionQuery(
+                fusion=Fusion.RRF  # Reciprocal Rank Fusion combines both
+            ),
+            "limit": limit * 3,  # Final limit after fusion (will be reranked)
+            "with_payload": True
+        }
+    
+    def _format_hybrid_results(self, points: List[Any], preprocessed_query: str, limit: int, score_threshold: float) -> Dict[str, Any]:
+        """Format fused hybrid search points into the search result dict"""
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        
+        results = []
+        for idx, result in enumerate(points):
+            score = float(result.score) if hasattr(result, 'score') else 1.0
+            
+            if debug_enabled:
+                logger.debug("%s. '%s' (fusion_score: %.4f)", idx+1, result.payload.get('title', 'Untitled'), score)
+            
+            # Apply threshold filter
+            if score >= score_threshold:
+                results.append({
+                    "content": result.payload.get("text", ""),
+                    "metadata": result.payload,
+                    "score": score,
+                    "fusion_score": score  # This is the combined dense+sparse score
+                })
+        
+        # Limit to requested number
+        results = results[:limit * 3]  # Return 3x for reranking
+        
+        logger.debug("✅ %s fused results, returning %s for reranking", len(points), len(results))
+        
+        return {
+            "success": True,
+            "results": results,
+            "query": preprocessed_query,
+            "total_results": len(results),
+            "search_type": "hybrid_rrf"  # Indicate this was hybrid search
+        }
+    
+    def _format_dense_results(self, points: List[Any], preprocessed_query: str, limit: int, score_threshold: float) -> Dict[str, Any]:
+        """Format dense-only search points into the search result dict"""
         results = []
-        for result in search_results:
+        for result in points:
             score = float(result.score)
             if score >= score_threshold:
                 results.append({
@@ -834,7 +1417,7 @@ class QdrantService:
                     "score": score
                 })
         
-        print(f"   ✅ Dense-only search returned {len(results)} results\n")
+        logger.debug("✅ Dense-only search returned %s results", len(results))
         
         return {
             "success": True,
@@ -844,6 +1427,11 @@ class QdrantService:
             "search_type": "dense_only"
         }
     
+    def is_expanded_query(self, query: str) -> bool:
+        """Whether _preprocess_query replaces the whole query with a fixed expansion (distinct questions collapse)"""
+        query_lower = query.lower()
+        return any(phrase in query_lower for phrase in self.SEMANTIC_EXPANSIONS)
+    
     def _preprocess_query(self, query: str) -> str:
         """Preprocess query to improve search quality with typo correction and semantic expansion"""
         # Common typo corrections
@@ -866,27 +1454,14 @@ class QdrantService:
             "questin": "question"
         }
         
-        # Semantic variations - expand common phrases to improve matching
-        semantic_expansions = {
-            "business time": "business hours working hours schedule",
-            "business hours": "business hours working hours schedule office hours",
-            "working time": "working hours business hours schedule",
-            "office time": "office hours business hours working hours",
-            "price": "pricing cost price fees",
-            "cost": "pricing cost price fees",
-            "contact info": "contact information email phone address",
-            "reach you": "contact information email phone",
-            "location": "address location where find"
-        }
-        
         query_lower = query.lower()
         
         # First, check for semantic expansions
         expanded_query = query_lower
-        for phrase, expansion in semantic_expansions.items():
+        for phrase, expansion in self.SEMANTIC_EXPANSIONS.items():
             if phrase in query_lower:
                 expanded_query = expansion
-                print(f"   🔄 Semantic expansion: '{phrase}' → '{expansion}'")
+                logger.debug("🔄 Semantic expansion: '%s' → '%s'", phrase, expansion)
                 break
         
         # Then apply typo corrections
@@ -905,7 +1480,7 @@ class QdrantService:
         corrected_query = ' '.join(corrected_words)
         
         if corrected_query != query.lower():
-            print(f"   ✏️ Final query: '{query}' → '{corrected_query}'")
+            logger.debug("✏️ Final query: '%s' → '%s'", query, corrected_query)
         
         return corrected_query
 
@@ -966,6 +1541,9 @@ class QdrantService:
                 points_selector=filter_condition
             )
             
+            # Affected agents aren't known from a business/widget filter - drop all cached answers
+            response_cache.invalidate_all()
+            
             return {
                 "success": True,
                 "message": f"Successfully deleted data for business {business_id}" + 
@@ -975,7 +1553,7 @@ class QdrantService:
             }
             
         except Exception as e:
-            print(f"Error deleting data: {e}")
+            logger.error("Error deleting data: %s", e)
             raise Exception(str(e))
 
     def delete_item_by_id(self, item_id: str) -> Dict[str, Any]:
@@ -987,7 +1565,7 @@ class QdrantService:
             if not self.qdrant_client:
                 raise Exception("Qdrant client not initialized")
             
-            print(f"\n🗑️ Deleting all chunks for itemId: {item_id}")
+            logger.debug("🗑️ Deleting all chunks for itemId: %s", item_id)
             
             # Create filter to match this specific itemId
             filter_condition = Filter(
@@ -999,12 +1577,12 @@ class QdrantService:
                 ]
             )
             
-            # Get count before deletion (for confirmation)
+            # Get count before deletion (for confirmation) and the owning agents (for cache invalidation)
             scroll_result = self.qdrant_client.scroll(
                 collection_name=self.collection_name,
                 scroll_filter=filter_condition,
                 limit=1000,
-                with_payload=False,
+                with_payload=["agentId", "widgetId"],
                 with_vectors=False
             )
             chunks_count = len(scroll_result[0])
@@ -1015,7 +1593,10 @@ class QdrantService:
                 points_selector=filter_condition
             )
             
-            print(f"✅ Successfully deleted {chunks_count} chunks for itemId: {item_id}")
+            for owner_id in {point.payload.get(key) for point in scroll_result[0] for key in ("agentId", "widgetId") if point.payload}:
+                response_cache.invalidate_agent(owner_id)
+            
+            logger.info("✅ Successfully deleted %s chunks for itemId: %s", chunks_count, item_id)
             
             return {
                 "success": True,
@@ -1025,7 +1606,7 @@ class QdrantService:
             }
             
         except Exception as e:
-            print(f"❌ Error deleting item by ID: {e}")
+            logger.error("❌ Error deleting item by ID: %s", e)
             return {
                 "success": False,
                 "message": f"Failed to delete item: {str(e)}",
@@ -1033,6 +1614,42 @@ class QdrantService:
                 "deleted_chunks": 0
             }
     
+    def delete_items_by_ids(self, item_ids: List[str]) -> Dict[str, Any]:
+        """Delete all chunks of several knowledge base items with one scroll and one delete"""
+        try:
+            if not self.qdrant_client:
+                raise Exception("Qdrant client not initialized")
+            
+            points = self._scroll_items_points(item_ids) if item_ids else []
+            if points:
+                self.qdrant_client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=PointIdsList(points=[point.id for point in points]),
+                    wait=True
+                )
+            
+            for owner_id in {point.payload.get(key) for point in points for key in ("agentId", "widgetId") if point.payload}:
+                response_cache.invalidate_agent(owner_id)
+            
+            logger.info("✅ Successfully deleted %s chunks of %s items", len(points), len(item_ids))
+            
+            return {
+                "success": True,
+                "message": f"Successfully deleted {len(points)} vector chunks for {len(item_ids)} items",
+                "deleted_chunks": len(points),
+                "deleted_items": len({(point.payload or {}).get("itemId") for point in points})
+            }
+            
+        except Exception as e:
+            logger.error("❌ Error deleting items by ID: %s", e)
+            return {
+                "success": False,
+                "message": f"Failed to delete items: {str(e)}",
+                "error": str(e),
+                "deleted_chunks": 0,
+                "deleted_items": 0
+            }
+    
     def clean_collection(self) -> Dict[str, Any]:
         """Clean entire Qdrant collection (dangerous!)"""
         try:
@@ -1045,7 +1662,7 @@ class QdrantService:
             
             # Delete the collection
             self.qdrant_client.delete_collection(self.collection_name)
-            print(f"🗑️ Deleted collection: {self.collection_name}")
+            logger.debug("🗑️ Deleted collection: %s", self.collection_name)
             
             # Recreate the collection
             vector_size = collection_info.config.params.vectors.size
@@ -1056,7 +1673,7 @@ class QdrantService:
                     distance=Distance.COSINE
                 )
             )
-            print(f"🔄 Recreated collection: {self.collection_name}")
+            logger.debug("🔄 Recreated collection: %s", self.collection_name)
             
             return {
                 "success": True,
@@ -1067,7 +1684,7 @@ class QdrantService:
             }
             
         except Exception as e:
-            print(f"Error cleaning collection: {e}")
+            logger.error("Error cleaning collection: %s", e)
             raise Exception(str(e))
 
     def store_dummy_data(self) -> Dict[str, Any]:
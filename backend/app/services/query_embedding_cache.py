@@ -0,0 +1,221 @@
+"""
+LRU + TTL cache for query embeddings
+Sits in front of VoyageService.embed_query so repeated (normalized) queries skip the network hop
+Optionally backed by a local SQLite file so the cache survives restarts; on the event loop (aget/put_nowait)
+the file is read on the work executor's "chat" queue and written behind the caller
+"""
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import QUERY_EMBEDDING_CACHE_SIZE, QUERY_EMBEDDING_CACHE_TTL, QUERY_EMBEDDING_CACHE_PATH
+from app.services.work_executor import work_executor
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query_text(text: str) -> str:
+    """Normalize query text for cache keys (case and whitespace insensitive)"""
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """Bounded in-process LRU cache with per-entry TTL and an optional on-disk store"""
+
+    def __init__(self, max_size: int = 2048, ttl_seconds: int = 86400, db_path: str = ""):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()  # in-memory entries and counters
+        self._db_lock = threading.Lock()  # the SQLite connection
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self._initialize_disk_store()
+
+    def _initialize_disk_store(self):
+        """Open the SQLite store if a path is configured"""
+        if not self.db_path:
+            return
+        try:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "model TEXT NOT NULL, input_type TEXT NOT NULL, text TEXT NOT NULL, "
+                "embedding BLOB NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (model, input_type, text))"
+            )
+            self._db.commit()
+            print(f"✅ Query embedding cache backed by {self.db_path}")
+        except Exception as e:
+            print(f"⚠️ Could not open query embedding cache store ({self.db_path}): {e}")
+            self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, model: str, input_type: str, text: str) -> Optional[List[float]]:
+        """Return a copy of the cached embedding or None (counts a hit or a miss; may read the disk store)"""
+        if not self.enabled:
+            return None
+
+        key = (model, input_type, normalize_query_text(text))
+        now = time.time()
+        embedding = self._memory_get(key, now)
+        return embedding if embedding is not None else self._disk_lookup(key, now)
+
+    async def aget(self, model: str, input_type: str, text: str) -> Optional[List[float]]:
+        """get for the event loop: memory hits return at once, the disk store is read on the "chat" queue"""
+        if not self.enabled:
+            return None
+
+        key = (model, input_type, normalize_query_text(text))
+        now = time.time()
+        embedding = self._memory_get(key, now)
+        if embedding is not None:
+            return embedding
+        if self._db is None:
+            return self._disk_lookup(key, now)  # no I/O, just counts the miss
+        return await work_executor.run("chat", self._disk_lookup, key, now)
+
+    def put(self, model: str, input_type: str, text: str, embedding: List[float]):
+        """Store an embedding in memory (and on disk when configured; blocking)"""
+        if not self.enabled:
+            return
+
+        key = (model, input_type, normalize_query_text(text))
+        now = time.time()
+
+        with self._lock:
+            self._memory_put(key, list(embedding), now)
+        self._disk_put(key, embedding, now)
+
+    def put_nowait(self, model: str, input_type: str, text: str, embedding: List[float]):
+        """Non-blocking put for the event loop: stored in memory now, written to disk behind the caller on the "chat" queue"""
+        if not self.enabled:
+            return
+
+        key = (model, input_type, normalize_query_text(text))
+        now = time.time()
+
+        with self._lock:
+            self._memory_put(key, list(embedding), now)
+        if self._db is not None:
+            try:
+                work_executor.submit("chat", self._disk_put, key, list(embedding), now)
+            except RuntimeError as e:  # executor shut down
+                print(f"⚠️ Query embedding cache write skipped: {e}")
+
+    def _memory_get(self, key: Tuple[str, str, str], now: float) -> Optional[List[float]]:
+        """A copy of the in-memory embedding (counts a hit), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, embedding = entry
+            if now - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(embedding)
+
+    def _disk_lookup(self, key: Tuple[str, str, str], now: float) -> Optional[List[float]]:
+        """Rest of a lookup after a memory miss: the disk store (blocking); counts the hit or the miss"""
+        embedding = self._disk_get(key, now)
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return None
+            self._memory_put(key, embedding, now)
+            self.hits += 1
+            self.disk_hits += 1
+        return list(embedding)
+
+    def _memory_put(self, key: Tuple[str, str, str], embedding: List[float], created_at: float):
+        self._entries[key] = (created_at, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: Tuple[str, str, str], now: float) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT embedding, created_at FROM query_embeddings WHERE model = ? AND input_type = ? AND text = ?",
+                    key
+                ).fetchone()
+                if row is None:
+                    return None
+                blob, created_at = row
+                if now - created_at > self.ttl_seconds:
+                    self._db.execute(
+                        "DELETE FROM query_embeddings WHERE model = ? AND input_type = ? AND text = ?",
+                        key
+                    )
+                    self._db.commit()
+                    return None
+            return array("f", blob).tolist()
+        except Exception as e:
+            print(f"⚠️ Query embedding cache read failed: {e}")
+            return None
+
+    def _disk_put(self, key: Tuple[str, str, str], embedding: List[float], created_at: float):
+        if self._db is None:
+            return
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (model, input_type, text, embedding, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (*key, array("f", embedding).tobytes(), created_at)
+                )
+                self._db.commit()
+        except Exception as e:
+            print(f"⚠️ Query embedding cache write failed: {e}")
+
+    def clear(self):
+        """Drop all cached embeddings (memory and disk)"""
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM query_embeddings")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizing info"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Global cache instance
+query_embedding_cache = QueryEmbeddingCache(
+    max_size=QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=QUERY_EMBEDDING_CACHE_TTL,
+    db_path=QUERY_EMBEDDING_CACHE_PATH
+)
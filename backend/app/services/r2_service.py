@@ -5,7 +5,7 @@ import boto3
 from botocore.client import Config
 from botocore.exceptions import ClientError
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO, Union
 import uuid
 from datetime import datetime
 
@@ -47,7 +47,7 @@ class R2Service:
     
     def upload_file(
         self,
-        file_content: bytes,
+        file_content: Union[bytes, BinaryIO],
         filename: str,
         content_type: str = "application/octet-stream",
         workspace_id: Optional[str] = None,
@@ -57,7 +57,7 @@ class R2Service:
         Upload file to R2 storage in documents folder
         
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes, or a file object (streamed, not read into memory)
             filename: Original filename
             content_type: MIME type of the file
             workspace_id: Optional workspace ID for organization
@@ -81,18 +81,20 @@ class R2Service:
             file_key = f"documents/{unique_filename}"
             
             # Upload to R2
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=file_key,
-                Body=file_content,
-                ContentType=content_type,
-                Metadata={
+            extra_args = {
+                'ContentType': content_type,
+                'Metadata': {
                     'original_filename': filename,
                     'workspace_id': workspace_id or '',
                     'agent_id': agent_id or '',
                     'uploaded_at': datetime.utcnow().isoformat()
                 }
-            )
+            }
+            if isinstance(file_content, bytes):
+                self.client.put_object(Bucket=self.bucket_name, Key=file_key, Body=file_content, **extra_args)
+            else:
+                # Multipart upload in parts, so large files are never held in memory
+                self.client.upload_fileobj(file_content, self.bucket_name, file_key, ExtraArgs=extra_args)
             
             # Generate public URL
             if self.public_url:
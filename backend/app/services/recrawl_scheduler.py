@@ -0,0 +1,171 @@
+"""
+Scheduled re-crawls of stored websites
+Each scraped_websites record keeps its pages' validators (ETag / Last-Modified), content hashes and
+chunk ids. A re-crawl revalidates known pages with conditional GETs, re-ingests only pages whose
+content hash changed (plus new pages), and deletes the chunks of pages that changed shape or are gone.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import (
+    RECRAWL_ENABLED, RECRAWL_POLL_SECONDS, RECRAWL_MAX_CONCURRENT_SITES, RECRAWL_DEFAULT_INTERVAL_HOURS
+)
+from app.services.firestore_service import firestore_service
+from app.services.ingestion_jobs import ingestion_jobs, IngestionJob
+from app.services.qdrant_service import qdrant_service
+from app.services.scraping_service import scraper, website_chunk_item, website_item_id, PAGE_RECORD_FIELDS
+from app.services.work_executor import work_executor
+
+logger = logging.getLogger(__name__)
+
+
+class RecrawlScheduler:
+    """Polls Firestore for websites due for a re-crawl and runs a few at a time"""
+
+    def __init__(self, max_concurrent_sites: int = RECRAWL_MAX_CONCURRENT_SITES, poll_seconds: int = RECRAWL_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.max_concurrent_sites = max(1, max_concurrent_sites)
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_sites)
+        self._loop_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._in_progress: Set[str] = set()
+
+    async def start(self):
+        if not RECRAWL_ENABLED or self._loop_task:
+            return
+        self._loop_task = asyncio.create_task(self._poll())
+        logger.info("🔁 Re-crawl scheduler started (every %ss, %s sites at a time)", self.poll_seconds, self.max_concurrent_sites)
+
+    async def stop(self):
+        tasks = [task for task in [self._loop_task, *self._tasks] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+        self._tasks.clear()
+
+    async def _poll(self):
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logger.error("❌ Re-crawl poll failed: %s", e)
+            await asyncio.sleep(self.poll_seconds)
+
+    async def run_due(self) -> int:
+        """Start re-crawls for websites that are due; returns how many were started"""
+        records = await work_executor.run("ingest", firestore_service.get_websites_due_for_recrawl, self.max_concurrent_sites * 4)
+        started = 0
+        for record in records:
+            if record["id"] in self._in_progress:
+                continue
+            task = asyncio.create_task(self.recrawl_website(record))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            started += 1
+        return started
+
+    async def recrawl_website(self, record: Dict[str, Any], job: Optional[IngestionJob] = None) -> Dict[str, Any]:
+        """Re-crawl one scraped_websites record, re-ingesting changed pages; returns the re-crawl stats"""
+        website_id = record["id"]
+        if website_id in self._in_progress:
+            return {"success": False, "error": f"Website {website_id} is already being re-crawled"}
+        self._in_progress.add(website_id)
+        try:
+            async with self._semaphore:
+                return await self._recrawl(record, job)
+        finally:
+            self._in_progress.discard(website_id)
+
+    async def _recrawl(self, record: Dict[str, Any], job: Optional[IngestionJob]) -> Dict[str, Any]:
+        start_time = time.time()
+        known = {page["url"]: page for page in record.get("pages") or [] if page.get("url")}
+        updated: Dict[str, Dict[str, Any]] = {}
+        stats = {"new_pages": 0, "changed_pages": 0, "unchanged_pages": 0, "chunks_stored": 0, "chunks_failed": 0, "chunks_removed": 0}
+
+        # Passed to every store call: re-crawls and scrapes run concurrently, so the service-wide model is not touched
+        embedding_provider, embedding_model = qdrant_service.resolve_embedding_model(record.get("embedding_model"))
+        if job:
+            ingestion_jobs.set_stage(job, "extract", known_pages=len(known))
+
+        async def delete_chunks(chunk_ids: List[str]):
+            if not chunk_ids:
+                return
+            item_ids = [website_item_id(record, chunk_id) for chunk_id in chunk_ids]
+            result = await work_executor.run("ingest", qdrant_service.delete_items_by_ids, item_ids)
+            stats["chunks_removed"] += result.get("deleted_items", 0)
+
+        async def handle_page(page: Dict[str, Any]):
+            previous = known.get(page["url"])
+            updated[page["url"]] = {key: page.get(key) for key in PAGE_RECORD_FIELDS}
+            if previous and previous.get("content_hash") == page["content_hash"]:
+                # Fetched again (no validators, or the server ignores them) but the text is the same
+                stats["unchanged_pages"] += 1
+                return
+
+            stats["changed_pages" if previous else "new_pages"] += 1
+            items = [website_chunk_item(record, chunk, i) for i, chunk in enumerate(page["chunks"], 1)]
+            try:
+                result = await work_executor.run(
+                    "ingest", qdrant_service.store_knowledge_items_bulk, items, embedding_provider, embedding_model, sync=True
+                )
+                failed = len(result.get("failed_items", []))
+            except Exception as e:
+                logger.warning("⚠️ Could not store %s chunks of %s: %s", len(items), page["url"], e)
+                failed = len(items)
+            stats["chunks_stored"] += len(items) - failed
+            stats["chunks_failed"] += failed
+            if previous:
+                await delete_chunks(sorted(set(previous.get("chunk_ids") or []) - set(page["chunk_ids"])))
+            if job:
+                ingestion_jobs.update_progress(job, pages_changed=stats["changed_pages"] + stats["new_pages"], chunks_stored=stats["chunks_stored"])
+
+        result = await scraper.scrape_website(
+            url=record["url"],
+            max_pages=record.get("max_pages") or max(50, len(known)),
+            title=record.get("title"),
+            on_page=handle_page,
+            known_pages=known
+        )
+
+        interval = record.get("recrawl_interval_hours", RECRAWL_DEFAULT_INTERVAL_HOURS)
+        if not result.get("success"):
+            logger.warning("⚠️ Re-crawl of %s failed: %s", record["url"], result.get("error"))
+            await work_executor.run("ingest", firestore_service.update_scraped_website, record["id"], {
+                "recrawl_interval_hours": interval,
+                "last_recrawl": {"success": False, "error": result.get("error"), "at": datetime.utcnow()}
+            })
+            return {"success": False, "error": result.get("error")}
+
+        await delete_chunks([chunk_id for url in result.get("gone_urls", []) for chunk_id in known.get(url, {}).get("chunk_ids") or []])
+        stats["unchanged_pages"] += len(result.get("not_modified_urls", []))
+        stats["removed_pages"] = len(result.get("gone_urls", []))
+
+        # Pages not revisited this time (crawl budget, robots) keep their old record
+        gone = set(result.get("gone_urls", []))
+        pages = [page for url, page in {**known, **updated}.items() if url not in gone]
+        stats["elapsed_time"] = round(time.time() - start_time, 2)
+        stats["pages_per_second"] = result.get("pages_per_second")
+
+        await work_executor.run("ingest", firestore_service.update_scraped_website, record["id"], {
+            "pages": pages,
+            "successful_pages": len(pages),
+            "chunks_created": sum(len(page.get("chunk_ids") or []) for page in pages),
+            "last_crawled_at": datetime.utcnow(),
+            "recrawl_interval_hours": interval,
+            "last_recrawl": {"success": True, "at": datetime.utcnow(), **stats}
+        })
+
+        logger.info(
+            "🔁 Re-crawled %s in %.1fs: %s new, %s changed, %s unchanged, %s removed pages (%s chunks stored, %s removed)",
+            record["url"], stats["elapsed_time"], stats["new_pages"], stats["changed_pages"], stats["unchanged_pages"],
+            stats["removed_pages"], stats["chunks_stored"], stats["chunks_removed"]
+        )
+        return {"success": True, "website_id": record["id"], "url": record["url"], **stats}
+
+
+# Global scheduler instance
+recrawl_scheduler = RecrawlScheduler()
@@ -1,15 +1,19 @@
 """
 Reranker service using Voyage AI rerank-2.5
 """
+import logging
 import voyageai
 from typing import List, Dict, Any
 from app.config import VOYAGE_API_KEY
 
+logger = logging.getLogger(__name__)
+
 
 class RerankerService:
     def __init__(self):
         self.api_key = VOYAGE_API_KEY
         self.client = None
+        self.async_client = None  # Used by the chat path so reranking never blocks the event loop
         self.model = "rerank-2.5-lite"  # FORCED: Always use rerank-2.5-lite
         self._initialize()
     
@@ -17,15 +21,47 @@ class RerankerService:
         """Initialize Voyage AI reranker"""
         try:
             if self.api_key and self.api_key != "your-voyage-api-key-here":
-                print(f"🔄 Initializing Voyage AI Reranker (model: {self.model})...")
+                logger.info("🔄 Initializing Voyage AI Reranker (model: %s)...", self.model)
                 self.client = voyageai.Client(api_key=self.api_key)
-                print(f"✅ Voyage AI Reranker initialized")
+                self.async_client = voyageai.AsyncClient(api_key=self.api_key)
+                logger.info("✅ Voyage AI Reranker initialized")
             else:
-                print("⚠️ Voyage AI API key not configured - reranker disabled")
+                logger.warning("⚠️ Voyage AI API key not configured - reranker disabled")
                 self.client = None
+                self.async_client = None
         except Exception as e:
-            print(f"❌ Error initializing Voyage AI Reranker: {e}")
+            logger.error("❌ Error initializing Voyage AI Reranker: %s", e)
             self.client = None
+            self.async_client = None
+    
+    def _original_order(self, documents: List[str], top_k: int) -> List[Dict[str, Any]]:
+        """Return documents in original order with a neutral score (used when reranking is unavailable)"""
+        return [
+            {
+                "index": i,
+                "relevance_score": 0.5,  # Neutral score
+                "document": doc
+            }
+            for i, doc in enumerate(documents[:top_k])
+        ]
+    
+    def _format_results(self, reranking, documents: List[str]) -> List[Dict[str, Any]]:
+        """Convert a Voyage AI rerank response into result dicts"""
+        results = [
+            {
+                "index": result.index,
+                "relevance_score": result.relevance_score,
+                "document": documents[result.index]
+            }
+            for result in reranking.results
+        ]
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            for result in results:
+                logger.debug("📊 Rank %s: relevance=%.4f | doc=%s...", result["index"] + 1, result["relevance_score"], result["document"][:80])
+            logger.debug("✅ Reranking complete - returned %s results", len(results))
+        
+        return results
     
     def rerank(
         self, 
@@ -51,28 +87,14 @@ class RerankerService:
             model = "rerank-2.5-lite"
             
             if not self.client:
-                print("⚠️ Reranker not available - returning original order")
+                logger.warning("⚠️ Reranker not available - returning original order")
                 # Return documents in original order if reranker unavailable
-                return [
-                    {
-                        "index": i,
-                        "relevance_score": 0.5,  # Neutral score
-                        "document": doc
-                    }
-                    for i, doc in enumerate(documents[:top_k])
-                ]
+                return self._original_order(documents, top_k)
             
             if len(documents) == 0:
                 return []
             
-            print(f"\n{'='*60}")
-            print(f"🔄 RERANKING WITH VOYAGE AI")
-            print(f"{'='*60}")
-            print(f"   Model: {model}")
-            print(f"   Query: '{query}'")
-            print(f"   Input documents: {len(documents)}")
-            print(f"   Returning top: {top_k}")
-            print(f"{'='*60}\n")
+            logger.debug("🔄 Reranking %s documents with %s, top %s - query: '%s'", len(documents), model, top_k, query)
             
             # Call Voyage AI rerank API
             reranking = self.client.rerank(
@@ -82,33 +104,50 @@ class RerankerService:
                 top_k=min(top_k, len(documents))
             )
             
-            # Format results
-            results = []
-            for result in reranking.results:
-                print(f"   📊 Rank {result.index + 1}: relevance={result.relevance_score:.4f} | doc={documents[result.index][:80]}...")
-                results.append({
-                    "index": result.index,
-                    "relevance_score": result.relevance_score,
-                    "document": documents[result.index]
-                })
+            return self._format_results(reranking, documents)
             
-            print(f"\n✅ Reranking complete - returned {len(results)} results")
-            print(f"   🏆 Top result: relevance={results[0]['relevance_score']:.4f}\n")
+        except Exception as e:
+            logger.error("❌ Reranking error: %s", e)
+            # Fallback to original order on error
+            logger.warning("⚠️ Falling back to original document order")
+            return self._original_order(documents, top_k)
+    
+    async def arerank(
+        self, 
+        query: str, 
+        documents: List[str], 
+        top_k: int = 3,
+        model: str = "rerank-2.5-lite"  # FORCED: Always use rerank-2.5-lite
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of rerank() for the chat path - same arguments and return shape
+        """
+        try:
+            # FORCE rerank-2.5-lite usage - ignore model parameter
+            model = "rerank-2.5-lite"
             
-            return results
+            if not self.async_client:
+                logger.warning("⚠️ Reranker not available - returning original order")
+                return self._original_order(documents, top_k)
+            
+            if len(documents) == 0:
+                return []
+            
+            logger.debug("🔄 Reranking %s documents with %s (async), top %s", len(documents), model, top_k)
+            
+            reranking = await self.async_client.rerank(
+                query=query,
+                documents=documents,
+                model=model,
+                top_k=min(top_k, len(documents))
+            )
+            
+            return self._format_results(reranking, documents)
             
         except Exception as e:
-            print(f"❌ Reranking error: {e}")
-            # Fallback to original order on error
-            print("⚠️ Falling back to original document order")
-            return [
-                {
-                    "index": i,
-                    "relevance_score": 0.5,
-                    "document": doc
-                }
-                for i, doc in enumerate(documents[:top_k])
-            ]
+            logger.error("❌ Reranking error: %s", e)
+            logger.warning("⚠️ Falling back to original document order")
+            return self._original_order(documents, top_k)
     
     def test_connection(self) -> Dict[str, Any]:
         """Test Voyage AI reranker connection"""
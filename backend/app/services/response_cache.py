@@ -0,0 +1,219 @@
+"""
+Per-agent semantic response cache
+Returns a previously generated answer when a new query for the same agent is close enough
+(cosine similarity of query embeddings) - skips retrieval, reranking and the LLM call
+"""
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import (
+    SEMANTIC_CACHE_ENABLED,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_AGENT
+)
+from app.services.query_embedding_cache import normalize_query_text
+
+
+class _AgentEntries:
+    """Cached answers for one agent, with embeddings kept as a normalized matrix"""
+
+    def __init__(self, dimension: int):
+        self.matrix = np.zeros((0, dimension), dtype=np.float32)
+        self.entries: List[Dict[str, Any]] = []
+
+
+class SemanticResponseCache:
+    """
+    Answer cache keyed by agentId
+
+    Each entry stores the final AIResponse (as a dict), the streamed token sequence
+    (if the answer came from the streaming path), the normalized query text and the
+    normalized query embedding. Entries are scoped by a config fingerprint so agents
+    answering with a different model or system prompt never share answers.
+    Exact entries (and exact lookups) only match the same normalized query text -
+    used for queries whose embeddings cannot tell distinct questions apart.
+    """
+
+    def __init__(self, enabled: bool = True, threshold: float = 0.95, ttl_seconds: int = 3600, max_entries_per_agent: int = 256):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_agent = max_entries_per_agent
+        self._agents: Dict[Tuple[str, str], _AgentEntries] = {}
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def config_fingerprint(ai_config) -> str:
+        """Fingerprint of the agent settings that change the generated answer"""
+        return "|".join(str(part) for part in (
+            getattr(ai_config, "model", ""),
+            getattr(ai_config, "systemPrompt", ""),
+            getattr(ai_config, "customSystemPrompt", ""),
+            getattr(ai_config, "maxRetrievalDocs", ""),
+            getattr(ai_config, "rerankerEnabled", "")
+        ))
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def generation(self, agent_id: str) -> Tuple[int, int]:
+        """
+        Current invalidation generation for an agent
+        Capture it before generating an answer and pass it to put() so an answer
+        computed while the knowledge base changed is not cached
+        """
+        with self._lock:
+            return (self._global_generation, self._generations.get(agent_id, 0))
+
+    def lookup(
+        self,
+        agent_id: str,
+        fingerprint: str,
+        query_embedding: List[float],
+        query: str = "",
+        exact: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Return {"response", "tokens", "similarity", "query"} for the best match above threshold, else None"""
+        if not self.enabled or not agent_id:
+            return None
+
+        query_vector = self._normalize(query_embedding)
+        normalized_query = normalize_query_text(query)
+        now = time.time()
+
+        with self._lock:
+            bucket = self._agents.get((agent_id, fingerprint))
+            if bucket is None or not bucket.entries or bucket.matrix.shape[1] != query_vector.shape[0]:
+                self.misses += 1
+                return None
+
+            self._evict_expired(bucket, now)
+            if not bucket.entries:
+                self.misses += 1
+                return None
+
+            similarities = bucket.matrix @ query_vector
+            for i, entry in enumerate(bucket.entries):
+                if (exact or entry["exact"]) and entry["normalized_query"] != normalized_query:
+                    similarities[i] = -1.0
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            entry = bucket.entries[best]
+            self.hits += 1
+            return {
+                "response": dict(entry["response"]),
+                "tokens": list(entry["tokens"]) if entry["tokens"] else None,
+                "similarity": similarity,
+                "query": entry["query"]
+            }
+
+    def put(
+        self,
+        agent_id: str,
+        fingerprint: str,
+        query: str,
+        query_embedding: List[float],
+        response: Dict[str, Any],
+        tokens: Optional[List[str]] = None,
+        generation: Optional[Tuple[int, int]] = None,
+        exact: bool = False
+    ):
+        """Cache an answer; skipped if the agent was invalidated since `generation` was captured"""
+        if not self.enabled or not agent_id:
+            return
+
+        query_vector = self._normalize(query_embedding)
+
+        with self._lock:
+            if generation is not None and generation != (self._global_generation, self._generations.get(agent_id, 0)):
+                return
+
+            key = (agent_id, fingerprint)
+            bucket = self._agents.get(key)
+            if bucket is None or bucket.matrix.shape[1] != query_vector.shape[0]:
+                bucket = _AgentEntries(query_vector.shape[0])
+                self._agents[key] = bucket
+
+            self._evict_expired(bucket, time.time())
+
+            bucket.entries.append({
+                "query": query,
+                "normalized_query": normalize_query_text(query),
+                "exact": exact,
+                "response": dict(response),
+                "tokens": list(tokens) if tokens else None,
+                "created_at": time.time()
+            })
+            bucket.matrix = np.vstack([bucket.matrix, query_vector[np.newaxis, :]])
+
+            # Oldest entries are first - drop them when over capacity
+            overflow = len(bucket.entries) - self.max_entries_per_agent
+            if overflow > 0:
+                bucket.entries = bucket.entries[overflow:]
+                bucket.matrix = bucket.matrix[overflow:]
+
+    def _evict_expired(self, bucket: _AgentEntries, now: float):
+        keep = [i for i, entry in enumerate(bucket.entries) if now - entry["created_at"] <= self.ttl_seconds]
+        if len(keep) != len(bucket.entries):
+            bucket.entries = [bucket.entries[i] for i in keep]
+            bucket.matrix = bucket.matrix[keep]
+
+    def invalidate_agent(self, agent_id: str):
+        """Drop all cached answers for an agent (its knowledge base changed)"""
+        if not agent_id:
+            return
+        with self._lock:
+            self._generations[agent_id] = self._generations.get(agent_id, 0) + 1
+            for key in [key for key in self._agents if key[0] == agent_id]:
+                del self._agents[key]
+            self.invalidations += 1
+        print(f"🧹 Semantic response cache invalidated for agent: {agent_id}")
+
+    def invalidate_all(self):
+        """Drop every cached answer (used when the affected agents are unknown)"""
+        with self._lock:
+            self._global_generation += 1
+            self._agents.clear()
+            self.invalidations += 1
+        print(f"🧹 Semantic response cache invalidated for all agents")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizing info"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "agents": len({key[0] for key in self._agents}),
+            "entries": sum(len(bucket.entries) for bucket in self._agents.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Global cache instance
+response_cache = SemanticResponseCache(
+    enabled=SEMANTIC_CACHE_ENABLED,
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl_seconds=SEMANTIC_CACHE_TTL,
+    max_entries_per_agent=SEMANTIC_CACHE_MAX_ENTRIES_PER_AGENT
+)
@@ -1,18 +1,38 @@
 """
-Clean and simple website scraping service using Crawl4AI
+Website scraping service: multi-page crawling over pooled HTTP, with Crawl4AI for pages that need JavaScript
 """
 import asyncio
+import hashlib
 import logging
+import re
 import time
 import sys
-import requests
-from typing import Dict, Any, List, Optional
-from bs4 import BeautifulSoup
-from markdownify import markdownify as md
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import httpx
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+from app.config import (
+    CRAWL_CONCURRENCY, CRAWL_PER_HOST_CONCURRENCY, CRAWL_PER_HOST_DELAY_MS, CRAWL_MAX_DEPTH,
+    CRAWL_PAGE_TIMEOUT, CRAWL_RESPECT_ROBOTS, CRAWL_JS_MIN_TEXT_CHARS, CRAWL_JS_HOST_ESCALATIONS,
+    CRAWL_HTTP_MAX_CONNECTIONS, CRAWL_HTTP_MAX_KEEPALIVE
+)
+from app.services.browser_pool import browser_pool, BrowserUnavailable
+from app.services.crawler import SiteCrawler, content_fingerprint, normalize_url
+from app.services.html_extraction import extract_page
+from app.services.text_processing import split_text
+from app.services.work_executor import work_executor
 
 logger = logging.getLogger(__name__)
 
+_CANONICAL_RE = re.compile(r'<link[^>]+rel=["\']canonical["\'][^>]*href=["\']([^"\']+)["\']', re.IGNORECASE)
+
+# Hosts whose fetch tier is remembered (least recently used are forgotten first)
+_MAX_REMEMBERED_HOSTS = 1000
+
+# Per-page fields kept with the scraped_websites record for re-crawls
+PAGE_RECORD_FIELDS = ('url', 'title', 'word_count', 'char_count', 'etag', 'last_modified', 'content_hash', 'chunk_ids')
+
 # Fix for Windows event loop issues with Playwright
 if sys.platform == 'win32':
     try:
@@ -21,26 +41,68 @@ if sys.platform == 'win32':
         pass  # Not available in older Python versions
 
 
+class HostTiers:
+    """
+    Remembers per host whether its pages need the browser
+    A host goes straight to the browser once `escalations` of its pages had to be re-rendered
+    and those outnumber the pages plain HTTP handled.
+    """
+
+    def __init__(self, escalations: int = CRAWL_JS_HOST_ESCALATIONS, max_hosts: int = _MAX_REMEMBERED_HOSTS):
+        self.escalations = max(1, escalations)
+        self.max_hosts = max_hosts
+        self._hosts: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def _needs_browser(self, counts: Optional[Dict[str, int]]) -> bool:
+        return bool(counts) and counts['browser'] >= self.escalations and counts['browser'] > counts['http']
+
+    def prefers_browser(self, host: str) -> bool:
+        return self._needs_browser(self._hosts.get(host))
+
+    def record(self, host: str, needed_browser: bool):
+        counts = self._hosts.pop(host, None) or {'http': 0, 'browser': 0}
+        before = self._needs_browser(counts)
+        counts['browser' if needed_browser else 'http'] += 1
+        self._hosts[host] = counts
+        if self._needs_browser(counts) != before:
+            logger.info(f"🧭 {host}: later pages go {'straight to the browser' if not before else 'over plain HTTP'}")
+        while len(self._hosts) > self.max_hosts:
+            self._hosts.popitem(last=False)
+
+
 class WebsiteScraper:
-    """Simple website scraper with Crawl4AI and fallback"""
+    """Multi-page website scraper: async HTTP + lxml extraction, escalating to Crawl4AI when needed"""
 
     def __init__(self):
         self.chunk_size = 800
         self.chunk_overlap = 200
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        }
+        # Created on first use and shared so crawl requests reuse connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tiers = HostTiers()
 
     async def scrape_website(
         self,
         url: str,
         max_pages: int = 50,
-        title: Optional[str] = None
+        title: Optional[str] = None,
+        on_page: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        known_pages: Optional[Dict[str, Dict[str, Any]]] = None
     ) -> Dict[str, Any]:
         """
-        Scrape a website using Crawl4AI with fallback to simple HTTP scraping
+        Crawl a website (same origin, breadth-first from the URL and its sitemap) and chunk every page
 
         Args:
-            url: Website URL to scrape
-            max_pages: Maximum number of pages (not used in simple mode, kept for compatibility)
+            url: Website URL to start from
+            max_pages: Maximum number of pages to fetch
             title: Optional title for the scraped content
+            on_page: Optional coroutine called with each page ({url, title, content, chunks, ...})
+                as soon as it is fetched, so callers can store chunks while the crawl continues
+            known_pages: Pages from an earlier crawl by URL ({etag, last_modified, ...}); they are
+                revalidated with conditional GETs and reported in not_modified_urls / gone_urls
+                instead of being handed to on_page when unchanged or removed
 
         Returns:
             Dictionary with scraping results including chunks ready for vector storage
@@ -52,65 +114,89 @@ class WebsiteScraper:
             logger.info(f"🚀 STARTING WEB SCRAPE")
             logger.info(f"   URL: {url}")
             logger.info(f"   Title: {title or 'Auto-detect'}")
+            logger.info(f"   Max pages: {max_pages}")
             logger.info("=" * 80)
 
-            # Try Crawl4AI first
-            try:
-                logger.info("🔍 Attempting scrape with Crawl4AI...")
-                from crawl4ai import AsyncWebCrawler
-
-                async with AsyncWebCrawler() as crawler:
-                    result = await crawler.arun(url=url)
-
-                    if not result or not result.markdown:
-                        raise Exception("No content extracted from URL")
-
-                    content = result.markdown
-                    page_title = title or result.metadata.get('title', 'Untitled')
-
-                    logger.info(f"✅ Crawl4AI extraction successful")
+            pages = []
+            chunks = []
 
-            except Exception as crawl_error:
-                logger.warning(f"⚠️  Crawl4AI failed: {str(crawl_error)}")
-                logger.info("🔄 Falling back to simple HTTP scraper...")
-
-                # Fallback to simple HTTP scraping
-                content, page_title = self._simple_http_scrape(url, title)
-
-            logger.info(f"✅ Content extracted successfully")
-            logger.info(f"   Title: {page_title}")
-            logger.info(f"   Content length: {len(content)} characters")
-            logger.info(f"   Word count: {len(content.split())} words")
-
-            # Split content into chunks
-            logger.info("📦 Creating chunks...")
-            chunks = self._create_chunks(
-                content=content,
-                url=url,
-                title=page_title
+            async def handle_page(page: Dict[str, Any]):
+                page_title = page.get('title') or title or 'Untitled'
+                page_chunks = await self._create_chunks(
+                    content=page['content'],
+                    url=page['url'],
+                    title=page_title
+                )
+                page_result = {
+                    'url': page['url'],
+                    'title': page_title,
+                    'content': page['content'],
+                    'word_count': len(page['content'].split()),
+                    'char_count': len(page['content']),
+                    'etag': page.get('etag'),
+                    'last_modified': page.get('last_modified'),
+                    'content_hash': content_fingerprint(page['content']),
+                    'chunks': page_chunks,
+                    'chunk_ids': [chunk['id'] for chunk in page_chunks]
+                }
+                pages.append(page_result)
+                chunks.extend(page_chunks)
+                logger.info(f"   📄 [{len(pages)}] {page['url']} ({page_result['word_count']} words, {len(page_chunks)} chunks)")
+                if on_page:
+                    await on_page(page_result)
+
+            known_pages = {
+                normalize_url(page_url) or page_url: page for page_url, page in (known_pages or {}).items()
+            }
+            tier_counts: Dict[str, int] = {}
+            crawler = SiteCrawler(
+                self._page_fetcher(known_pages, tier_counts),
+                self._fetch_text,
+                max_pages=max_pages,
+                concurrency=CRAWL_CONCURRENCY,
+                per_host_concurrency=CRAWL_PER_HOST_CONCURRENCY,
+                per_host_delay=CRAWL_PER_HOST_DELAY_MS / 1000,
+                max_depth=CRAWL_MAX_DEPTH,
+                respect_robots=CRAWL_RESPECT_ROBOTS
             )
+            crawl_stats = await crawler.crawl(url, handle_page, seed_urls=list(known_pages))
 
+            if not pages and not known_pages:
+                raise Exception("No content extracted from URL")
+
+            content = "\n\n".join(page['content'] for page in pages)
+            total_words = sum(page['word_count'] for page in pages)
             elapsed = time.time() - start_time
 
             logger.info("")
             logger.info("=" * 80)
             logger.info(f"✅ SCRAPING COMPLETED SUCCESSFULLY")
-            logger.info(f"   Total Pages: 1")
-            logger.info(f"   Total Words: {len(content.split()):,}")
+            logger.info(f"   Total Pages: {len(pages)}")
+            if known_pages:
+                logger.info(f"   Unchanged Pages: {crawl_stats['not_modified']} (removed: {crawl_stats['gone']})")
+            logger.info(f"   Total Words: {total_words:,}")
             logger.info(f"   Chunks Created: {len(chunks)}")
-            logger.info(f"   Time Taken: {elapsed:.1f}s")
+            logger.info(f"   Time Taken: {elapsed:.1f}s ({crawl_stats['pages_per_second']} pages/s)")
+            logger.info(f"   Fetched: {tier_counts.get('http', 0)} over HTTP, {tier_counts.get('browser', 0)} in the browser")
             logger.info("=" * 80)
 
             return {
                 'success': True,
                 'base_url': url,
-                'total_pages': 1,
-                'successful_pages': 1,
-                'total_word_count': len(content.split()),
+                'total_pages': len(pages) + crawl_stats['failed'],
+                'successful_pages': len(pages),
+                'failed_pages': crawl_stats['failed'],
+                'duplicate_pages': crawl_stats['duplicates'],
+                'pages_per_second': crawl_stats['pages_per_second'],
+                'fetch_tiers': tier_counts,
+                'not_modified_urls': crawl_stats['not_modified_urls'],
+                'gone_urls': crawl_stats['gone_urls'],
+                'total_word_count': total_words,
                 'total_char_count': len(content),
                 'content': content,
                 'chunks': chunks,
-                'title': page_title,
+                'pages': [{key: page[key] for key in PAGE_RECORD_FIELDS} for page in pages],
+                'title': title or (pages[0]['title'] if pages else None),
                 'elapsed_time': elapsed
             }
 
@@ -124,67 +210,180 @@ class WebsiteScraper:
                 'chunks': []
             }
 
-    def _simple_http_scrape(self, url: str, title: Optional[str] = None) -> tuple[str, str]:
+    def _page_fetcher(
+        self,
+        known_pages: Optional[Dict[str, Dict[str, Any]]] = None,
+        tier_counts: Optional[Dict[str, int]] = None
+    ) -> Callable[[str], Awaitable[Dict[str, Any]]]:
+        """
+        fetch_page(url) -> page dict for one crawl
+        Pages are fetched over plain HTTP first (a conditional GET for known pages) and only escalated
+        to a browser from the shared pool when they look client-side rendered or the request failed.
+        Hosts that keep needing the browser skip the HTTP attempt; see HostTiers.
         """
-        Simple HTTP-based scraping using requests and BeautifulSoup
+        tier_counts = tier_counts if tier_counts is not None else {}
+
+        def count(tier: str):
+            tier_counts[tier] = tier_counts.get(tier, 0) + 1
+
+        async def fetch_page(url: str) -> Dict[str, Any]:
+            use_browser = browser_pool.available
+            host = urlsplit(url).netloc
+            prefers_browser = use_browser and self._tiers.prefers_browser(host)
+            known = known_pages.get(url) if known_pages else None
+            http_page = None
+
+            # Known pages always get the conditional GET, even on browser hosts, so unchanged ones are skipped
+            if known is not None or not prefers_browser:
+                try:
+                    http_page = await self._http_scrape(url, None, known)
+                except Exception as http_error:
+                    if not use_browser:
+                        raise
+                    logger.info(f"   ↗️  HTTP fetch failed for {url} ({str(http_error)}), trying the browser")
+                else:
+                    if http_page.get('not_modified') or http_page.get('gone'):
+                        return http_page
+                    if not use_browser or not (prefers_browser or http_page.get('needs_javascript')):
+                        if use_browser:
+                            self._tiers.record(host, needed_browser=False)
+                        count('http')
+                        return http_page
+                    if not prefers_browser:
+                        logger.info(f"   ↗️  {url} looks client-side rendered ({http_page['needs_javascript']}), rendering in the browser")
+
+            try:
+                async with browser_pool.crawler() as crawler:
+                    result = await crawler.arun(url=url)
+                page = self._crawl4ai_page(url, result)
+                if http_page:
+                    if not prefers_browser:
+                        # The escalation paid off only if the browser found more text
+                        self._tiers.record(host, needed_browser=len(page['content']) > len(http_page['content']))
+                    page.update({key: http_page[key] for key in ('etag', 'last_modified') if http_page.get(key)})
+                count('browser')
+                return page
+            except BrowserUnavailable:
+                pass
+            except Exception as crawl_error:
+                logger.warning(f"⚠️  Crawl4AI failed for {url}: {str(crawl_error)}")
+
+            count('http')
+            return http_page or await self._http_scrape(url, None, known)
+
+        return fetch_page
+
+    @staticmethod
+    def _crawl4ai_page(url: str, result) -> Dict[str, Any]:
+        """Page dict from a Crawl4AI result"""
+        if not result or not result.success or not result.markdown:
+            raise Exception(getattr(result, 'error_message', None) or "No content extracted from URL")
+
+        links = [
+            link.get('href') for link in (result.links or {}).get('internal', [])
+            if isinstance(link, dict) and link.get('href')
+        ]
+        canonical = _CANONICAL_RE.search(result.html or "")
+        headers = {key.lower(): value for key, value in (getattr(result, 'response_headers', None) or {}).items()}
+        return {
+            'url': result.redirected_url or result.url or url,
+            'title': (result.metadata or {}).get('title'),
+            'content': str(result.markdown),
+            'links': links,
+            'canonical_url': canonical.group(1) if canonical else None,
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified')
+        }
+
+    def _http_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(CRAWL_PAGE_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(max_connections=CRAWL_HTTP_MAX_CONNECTIONS, max_keepalive_connections=CRAWL_HTTP_MAX_KEEPALIVE),
+                follow_redirects=True
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close pooled HTTP connections (app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _fetch_text(self, url: str) -> Optional[str]:
+        """Body of a small text resource (robots.txt, sitemap.xml), or None"""
+        try:
+            response = await self._http_client().get(url, timeout=10)
+        except httpx.HTTPError:
+            return None
+        return response.text if response.status_code == 200 else None
+
+    async def _http_scrape(
+        self,
+        url: str,
+        title: Optional[str] = None,
+        known: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Fetch a page over pooled HTTP connections and extract it with lxml (in a work executor process)
 
         Args:
             url: URL to scrape
             title: Optional title override
+            known: Stored record of a previously crawled page; makes this a conditional GET
+                (If-None-Match / If-Modified-Since) and reports 404/410 as gone
 
         Returns:
-            Tuple of (markdown_content, page_title)
+            Page dict with url, title, markdown content, links, canonical URL, validators and
+            needs_javascript (why the page looks client-side rendered, or None),
+            or {url, not_modified: True} / {url, gone: True} for known pages
         """
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-
-        response = requests.get(url, headers=headers, timeout=30)
+        headers = {}
+        if known:
+            if known.get('etag'):
+                headers['If-None-Match'] = known['etag']
+            if known.get('last_modified'):
+                headers['If-Modified-Since'] = known['last_modified']
+
+        response = await self._http_client().get(url, headers=headers)
+        if known is not None:
+            if response.status_code == 304:
+                return {'url': url, 'not_modified': True}
+            if response.status_code in (404, 410):
+                return {'url': url, 'gone': True}
         response.raise_for_status()
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript']):
-            element.decompose()
+        page = await work_executor.run("html", extract_page, response.content, title)
+        content = page['content']
 
-        # Extract title
-        if title:
-            page_title = title
+        # Little text, plus a client-side rendering hint (or hardly any text at all): the browser may get more
+        if len(content) < CRAWL_JS_MIN_TEXT_CHARS:
+            needs_javascript = page['javascript_hint'] or 'empty-content'
+        elif len(content) < CRAWL_JS_MIN_TEXT_CHARS * 5:
+            needs_javascript = page['javascript_hint']
         else:
-            title_tag = soup.find('title')
-            page_title = title_tag.get_text().strip() if title_tag else 'Untitled'
-
-        # Find main content
-        main_content = (
-            soup.find('main') or
-            soup.find('article') or
-            soup.find('div', class_=['content', 'main-content', 'post-content', 'article-content']) or
-            soup.find('body')
-        )
-
-        if not main_content:
-            raise Exception("Could not find main content on page")
-
-        # Convert to markdown
-        html_content = str(main_content)
-        markdown_content = md(html_content, heading_style="ATX")
-
-        # Clean up the markdown
-        lines = markdown_content.split('\n')
-        cleaned_lines = [line for line in lines if line.strip()]
-        markdown_content = '\n\n'.join(cleaned_lines)
-
-        return markdown_content, page_title
+            needs_javascript = None
+
+        return {
+            'url': str(response.url),
+            'title': page['title'],
+            'content': content,
+            'links': page['links'],
+            'canonical_url': page['canonical_url'],
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'needs_javascript': needs_javascript
+        }
 
-    def _create_chunks(
+    async def _create_chunks(
         self,
         content: str,
         url: str,
         title: str
     ) -> List[Dict[str, Any]]:
         """
-        Split content into chunks using LangChain's text splitter
+        Split content into chunks using LangChain's text splitter (in a work executor process)
 
         Args:
             content: The markdown content to chunk
@@ -196,16 +395,10 @@ class WebsiteScraper:
         """
         try:
             # Use LangChain's recursive character text splitter
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.chunk_size,
-                chunk_overlap=self.chunk_overlap,
-                length_function=len,
-                separators=["\n\n", "\n", ". ", " ", ""]
+            text_chunks = await work_executor.run(
+                "chunking", split_text, content, self.chunk_size, self.chunk_overlap, ["\n\n", "\n", ". ", " ", ""]
             )
 
-            # Split the content
-            text_chunks = text_splitter.split_text(content)
-
             # Create chunk objects with metadata
             chunks = []
             for i, chunk_text in enumerate(text_chunks):
@@ -233,5 +426,48 @@ class WebsiteScraper:
             return []
 
 
+def website_record_id(source: Dict[str, Any]) -> str:
+    """Stable scraped_websites document id per (owner, start URL), so re-scraping replaces the record"""
+    owner_id = source.get('workspace_id') or source.get('widget_id') or source.get('agent_id') or ''
+    key = f"{owner_id}|{normalize_url(source['url']) or source['url']}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def website_item_id(source: Dict[str, Any], chunk_id: str) -> str:
+    """Stable item ID per (owner, page chunk), so re-scraping updates instead of duplicating"""
+    return f"{source.get('workspace_id') or source.get('widget_id')}_{chunk_id}"
+
+
+def website_chunk_item(source: Dict[str, Any], chunk: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """
+    Knowledge item for one scraped chunk
+    source holds the website's url, title, agent_id, widget_id, workspace_id and metadata
+    """
+    metadata = source.get('metadata') or {}
+    return {
+        'id': website_item_id(source, chunk.get('id', index)),
+        'businessId': source.get('workspace_id') or metadata.get('business_id', ''),
+        'widgetId': source.get('widget_id') or '',
+        'agentId': source.get('agent_id') or '',
+        'workspaceId': source.get('workspace_id') or '',
+        'title': source.get('title'),
+        'content': chunk['text'],
+        'chunks': [chunk['text']],  # already chunked by the scraper
+        'type': 'website',
+        'agent_id': source.get('agent_id'),
+        'widget_id': source.get('widget_id'),
+        'workspace_id': source.get('workspace_id'),
+        'url': source.get('url'),
+        'source_url': chunk.get('source_url', source.get('url')),
+        'source_title': chunk.get('source_title', source.get('title')),
+        'chunk_index': chunk.get('chunk_index', index - 1),
+        'total_chunks': chunk.get('total_chunks'),
+        'char_count': chunk.get('char_count', len(chunk['text'])),
+        'word_count': chunk.get('word_count', len(chunk['text'].split())),
+        'scraped_at': str(int(time.time())),
+        **metadata
+    }
+
+
 # Global scraper instance
 scraper = WebsiteScraper()
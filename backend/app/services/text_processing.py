@@ -0,0 +1,157 @@
+"""
+Pure-CPU text processing for ingestion: chunk splitting and BM42 sparse vectors
+Kept free of clients and service singletons, so work_executor's worker processes import it cheaply.
+"""
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from qdrant_client.models import SparseVector
+
+
+# Version of the sparse token -> index mapping stored on each point as "sparseVersion".
+# v1 used Python's built-in hash(), which is salted per process (PYTHONHASHSEED), so indices
+# never matched across workers or deploys. v2 uses CRC32, which is stable everywhere.
+# Points still on v1 can be re-sparsified with migrate_sparse_vectors.py.
+SPARSE_HASH_VERSION = 2
+
+# Item content is split into chunks of up to CHUNK_SIZE characters, consecutive chunks sharing CHUNK_OVERLAP
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 300
+
+
+def split_text(text: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+               separators: Optional[Sequence[str]] = None) -> List[str]:
+    """Split text the way stored items are chunked (RecursiveCharacterTextSplitter, length in characters)"""
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=list(separators) if separators else None
+    ).split_text(text)
+
+
+def sparse_token_index(token: str) -> int:
+    """Deterministic, process-stable sparse vector index for a token (positive 31-bit int)"""
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+# Precompiled once - tokenization runs for every chunk at ingestion and every query
+_BM42_CLEAN_RE = re.compile(r'[^\w\s@._-]')
+
+_BM42_STOPWORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'is', 'are', 'was', 'were', 'be', 'been',
+    'has', 'have', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'can', 'this', 'that', 'these', 'those'
+})
+
+
+def tokenize_for_bm42(text: str) -> List[str]:
+    """
+    Tokenize text for BM42 sparse vectors
+    Simple but effective tokenization for keyword matching
+    """
+    # Lowercase, remove special characters (but keep important ones) and split into tokens
+    tokens = _BM42_CLEAN_RE.sub(' ', text.lower()).split()
+    
+    # Filter out very short tokens and stopwords
+    return [t for t in tokens if len(t) > 1 and t not in _BM42_STOPWORDS]
+
+
+def generate_sparse_vector(text: str) -> SparseVector:
+    """
+    Generate BM42-style sparse vector for text
+    Uses token frequency with simple weighting
+    """
+    tokens = tokenize_for_bm42(text)
+    
+    if not tokens:
+        return SparseVector(indices=[], values=[])
+    
+    # Count token frequencies
+    token_counts = Counter(tokens)
+    
+    # Create sparse vector (indices = token hashes, values = TF scores)
+    weights = {}
+    
+    total_tokens = len(tokens)
+    
+    for token, count in token_counts.items():
+        # Use a stable hash of the token as index (Qdrant will handle IDF internally)
+        token_hash = sparse_token_index(token)
+        
+        # Simple TF (term frequency) score
+        # BM42 formula: tf / (tf + k1 * (1 - b + b * (doc_len / avg_doc_len)))
+        # Simplified: just use normalized term frequency
+        tf_score = count / total_tokens
+        
+        # Qdrant rejects duplicate indices, so merge the (rare) hash collisions
+        weights[token_hash] = weights.get(token_hash, 0.0) + tf_score
+    
+    return SparseVector(
+        indices=list(weights.keys()),
+        values=list(weights.values())
+    )
+
+
+def generate_sparse_vectors(texts: List[str]) -> List[SparseVector]:
+    """
+    Batch version of generate_sparse_vector for ingestion
+    Filters and hashes each distinct token once per batch instead of once per chunk; tokenizing still runs per chunk.
+    Returns exactly what [generate_sparse_vector(t) for t in texts] would (same index order and values).
+    """
+    # token -> sparse index for the whole batch (-1 = stopword / too short)
+    token_index: Dict[str, int] = {}
+    index_owner: Dict[int, str] = {}
+    colliding_tokens = set()
+    
+    doc_indices: List[List[int]] = []
+    doc_counts: List[List[int]] = []
+    
+    for text in texts:
+        # Counter keeps first-occurrence order, so filtering afterwards preserves generate_sparse_vector's order
+        raw_counts = Counter(_BM42_CLEAN_RE.sub(' ', text.lower()).split())
+        indices = []
+        counts = []
+        for token, count in raw_counts.items():
+            index = token_index.get(token)
+            if index is None:
+                if len(token) > 1 and token not in _BM42_STOPWORDS:
+                    index = sparse_token_index(token)
+                    owner = index_owner.setdefault(index, token)
+                    if owner != token:
+                        colliding_tokens.update((owner, token))
+                else:
+                    index = -1
+                token_index[token] = index
+            if index >= 0:
+                indices.append(index)
+                counts.append(count)
+        doc_indices.append(indices)
+        doc_counts.append(counts)
+    
+    # TF = count / kept tokens in the chunk, for every (chunk, token) pair at once
+    sizes = np.fromiter((len(counts) for counts in doc_counts), dtype=np.int64, count=len(texts))
+    flat_counts = np.fromiter(
+        (count for counts in doc_counts for count in counts),
+        dtype=np.float64,
+        count=int(sizes.sum())
+    )
+    lengths = np.fromiter((sum(counts) for counts in doc_counts), dtype=np.float64, count=len(texts))
+    values_list = (flat_counts / np.repeat(lengths, sizes)).tolist()
+    bounds = np.concatenate(([0], np.cumsum(sizes))).tolist()
+    
+    sparse_vectors = []
+    for doc, text in enumerate(texts):
+        indices = doc_indices[doc]
+        # Qdrant rejects duplicate indices - let the per-text path merge the (rare) hash collisions
+        if colliding_tokens and len(set(indices)) != len(indices):
+            sparse_vectors.append(generate_sparse_vector(text))
+            continue
+        sparse_vectors.append(SparseVector(indices=indices, values=values_list[bounds[doc]:bounds[doc + 1]]))
+    
+    return sparse_vectors
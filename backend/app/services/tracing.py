@@ -0,0 +1,222 @@
+"""
+Request tracing and structured logging
+One root span per HTTP request and child spans per pipeline stage, emitted as JSON log lines
+Sampling is decided once per request from per-route rates; warnings and errors are always logged
+"""
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+from app.config import LOG_LEVEL, LOG_FORMAT, TRACE_SPAN_LEVEL, TRACE_SAMPLE_RATE, TRACE_ROUTE_SAMPLE_RATES
+
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """A timed unit of work; child spans share the trace id and sampling decision of their root"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "attributes", "start_time", "duration")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes if sampled else {}
+        self.start_time = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    def set(self, **attributes):
+        """Attach attributes to the span (dropped for unsampled traces)"""
+        if self.sampled:
+            self.attributes.update(attributes)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span, if any"""
+    return _current_span.get()
+
+
+def _parse_route_rates(spec: str) -> Dict[str, float]:
+    """Parse "/api/ai/chat=0.1,/api/ai/chat/stream=0.25" into {route prefix: rate}"""
+    rates = {}
+    for entry in spec.split(","):
+        if "=" not in entry:
+            continue
+        route, rate = entry.rsplit("=", 1)
+        try:
+            rates[route.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+class Tracer:
+    """Creates spans and emits finished, sampled spans as structured log records"""
+
+    def __init__(self, default_rate: float = 1.0, route_rates: Optional[Dict[str, float]] = None, span_level: int = logging.INFO):
+        self.default_rate = default_rate
+        self.route_rates = route_rates or {}
+        self.span_level = span_level
+        self.logger = logging.getLogger("app.trace")
+
+    def sample_rate(self, route: str) -> float:
+        """Rate for the longest configured route prefix matching `route`"""
+        best = None
+        for prefix in self.route_rates:
+            if route == prefix or route.startswith(prefix.rstrip("/") + "/"):
+                if best is None or len(prefix) > len(best):
+                    best = prefix
+        return self.route_rates[best] if best is not None else self.default_rate
+
+    def _should_sample(self, rate: float) -> bool:
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    @contextmanager
+    def request_span(self, name: str, route: str, **attributes):
+        """Root span for one request; the sampling decision applies to every child span and debug log"""
+        span = Span(name, uuid.uuid4().hex, None, self._should_sample(self.sample_rate(route)), {"route": route, **attributes})
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Child span of the current span (or a root span sampled at the default rate)"""
+        parent = _current_span.get()
+        if parent is None:
+            span = Span(name, uuid.uuid4().hex, None, self._should_sample(self.default_rate), attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def _activate(self, span: Span):
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start_time
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Streaming generators can be closed from another context; the span still finishes
+                pass
+            self._emit(span)
+
+    def _emit(self, span: Span):
+        if not span.sampled or not self.logger.isEnabledFor(self.span_level):
+            return
+        self.logger.log(
+            self.span_level,
+            "span %s finished in %.1fms",
+            span.name,
+            span.duration * 1000,
+            extra={
+                "fields": {
+                    "span": span.name,
+                    "parent_span_id": span.parent_id,
+                    "duration_ms": round(span.duration * 1000, 2),
+                    **span.attributes
+                },
+                "span_context": span
+            }
+        )
+
+
+class TraceContextFilter(logging.Filter):
+    """Adds trace/span ids to records and drops sub-warning records of unsampled requests"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = getattr(record, "span_context", None) or _current_span.get()
+        if span is None:
+            return True
+        if not span.sampled and record.levelno < logging.WARNING:
+            return False
+        record.trace_id = span.trace_id
+        record.span_id = span.span_id
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (severity/message keys are picked up by Cloud Logging)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "severity": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S")
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+            entry["span_id"] = record.span_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+_logging_configured = False
+
+
+def configure_logging():
+    """Install the structured handler on the "app" logger hierarchy (idempotent)"""
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.addFilter(TraceContextFilter())
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    app_logger = logging.getLogger("app")
+    app_logger.addHandler(handler)
+    app_logger.setLevel(logging.getLevelName(LOG_LEVEL.upper()))
+    app_logger.propagate = False
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span for each HTTP request (covers streamed bodies too)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with tracer.request_span("http.request", scope["path"], method=scope.get("method")) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set(status=message["status"])
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+# Global tracer instance
+tracer = Tracer(
+    default_rate=TRACE_SAMPLE_RATE,
+    route_rates=_parse_route_rates(TRACE_ROUTE_SAMPLE_RATES),
+    span_level=logging.getLevelName(TRACE_SPAN_LEVEL.upper())
+)
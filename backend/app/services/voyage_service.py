@@ -1,66 +1,222 @@
 """
 Voyage AI embeddings service
 """
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional
+
 import voyageai
-from typing import List
-from app.config import VOYAGE_API_KEY
+import voyageai.error
+from app.config import (
+    VOYAGE_API_KEY, VOYAGE_EMBED_CONCURRENCY, VOYAGE_EMBED_MAX_RETRIES,
+    VOYAGE_BATCH_MAX_ITEMS, VOYAGE_BATCH_TOKEN_RATIO
+)
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.context_assembler import count_tokens
+from app.services.metrics_service import EMBED_LATENCY, EMBED_BATCH_LATENCY, CACHE_HITS
+
+logger = logging.getLogger(__name__)
+
+# Total tokens allowed per embed request (https://docs.voyageai.com/reference/embeddings-api)
+BATCH_TOKEN_LIMITS = {
+    "voyage-3-large": 120_000,
+    "voyage-3.5": 320_000,
+    "voyage-3.5-lite": 1_000_000,
+    "voyage-3": 320_000,
+    "voyage-3-lite": 1_000_000,
+    "voyage-code-3": 120_000,
+    "voyage-finance-2": 120_000,
+    "voyage-law-2": 120_000,
+    "voyage-multilingual-2": 120_000
+}
+DEFAULT_BATCH_TOKEN_LIMIT = 120_000
+
+# 429s, 5xx and dropped connections are worth retrying; bad input or auth errors are not
+RETRYABLE_ERRORS = (
+    voyageai.error.RateLimitError,
+    voyageai.error.ServerError,
+    voyageai.error.ServiceUnavailableError,
+    voyageai.error.APIConnectionError,
+    voyageai.error.Timeout,  # request timeouts (not a subclass of the builtin TimeoutError)
+    TimeoutError
+)
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# progress_callback(embedded_chunks, total_chunks, elapsed_seconds)
+ProgressCallback = Callable[[int, int, float], None]
 
 
 class VoyageService:
     def __init__(self):
         self.api_key = VOYAGE_API_KEY
         self.client = None
+        self.async_client = None  # Used by the chat path so embedding never blocks the event loop
         self.model = "voyage-3"  # Default model
+        self.query_cache = query_embedding_cache
         self._initialize()
     
     def _initialize(self):
         """Initialize Voyage AI client"""
         try:
             if self.api_key and self.api_key != "your-voyage-api-key-here":
-                print(f"🔄 Initializing Voyage AI client...")
+                logger.info("🔄 Initializing Voyage AI client...")
                 self.client = voyageai.Client(api_key=self.api_key)
-                print(f"✅ Voyage AI client initialized")
+                self.async_client = voyageai.AsyncClient(api_key=self.api_key)
+                logger.info("✅ Voyage AI client initialized")
             else:
-                print("⚠️ Voyage AI API key not configured")
+                logger.warning("⚠️ Voyage AI API key not configured")
                 self.client = None
+                self.async_client = None
         except Exception as e:
-            print(f"❌ Error initializing Voyage AI: {e}")
+            logger.error("❌ Error initializing Voyage AI: %s", e)
             self.client = None
+            self.async_client = None
     
     def embed_query(self, text: str, model: str = "voyage-3") -> List[float]:
-        """Generate embedding for a single query"""
+        """Generate embedding for a single query (served from the query cache when possible)"""
         try:
+            cached = self.query_cache.get(model, "query", text)
+            if cached is not None:
+                CACHE_HITS.inc(cache="query_embedding", model=model)
+                return cached
+            
             if not self.client:
                 raise Exception("Voyage AI client not initialized")
             
-            result = self.client.embed(
-                texts=[text],
-                model=model,
-                input_type="query"  # For search queries
-            )
+            with EMBED_LATENCY.time(model=model):
+                result = self.client.embed(
+                    texts=[text],
+                    model=model,
+                    input_type="query"  # For search queries
+                )
             
-            return result.embeddings[0]
+            embedding = result.embeddings[0]
+            self.query_cache.put(model, "query", text, embedding)
+            return embedding
             
         except Exception as e:
-            print(f"❌ Error generating Voyage AI query embedding: {e}")
+            logger.error("❌ Error generating Voyage AI query embedding: %s", e)
             raise
     
-    def embed_documents(self, texts: List[str], model: str = "voyage-3") -> List[List[float]]:
-        """Generate embeddings for multiple documents"""
+    async def aembed_query(self, text: str, model: str = "voyage-3") -> List[float]:
+        """Generate embedding for a single query without blocking the event loop (cached)"""
+        try:
+            cached = await self.query_cache.aget(model, "query", text)
+            if cached is not None:
+                CACHE_HITS.inc(cache="query_embedding", model=model)
+                return cached
+            
+            if not self.async_client:
+                raise Exception("Voyage AI async client not initialized")
+            
+            with EMBED_LATENCY.time(model=model):
+                result = await self.async_client.embed(
+                    texts=[text],
+                    model=model,
+                    input_type="query"  # For search queries
+                )
+            
+            embedding = result.embeddings[0]
+            self.query_cache.put_nowait(model, "query", text, embedding)
+            return embedding
+            
+        except Exception as e:
+            logger.error("❌ Error generating Voyage AI query embedding (async): %s", e)
+            raise
+    
+    def plan_batches(self, texts: List[str], model: str) -> List[List[int]]:
+        """
+        Group text indices into requests that stay under the model's token limit and the item limit
+        Token counts are estimates (cl100k), so only a fraction of the limit is used
+        """
+        token_budget = int(BATCH_TOKEN_LIMITS.get(model, DEFAULT_BATCH_TOKEN_LIMIT) * VOYAGE_BATCH_TOKEN_RATIO)
+        batches = []
+        current: List[int] = []
+        current_tokens = 0
+        for index, text in enumerate(texts):
+            tokens = count_tokens(text)
+            if current and (current_tokens + tokens > token_budget or len(current) >= VOYAGE_BATCH_MAX_ITEMS):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            # A single oversized text still gets its own request (the API truncates it)
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _backoff_delay(attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+    def _embed_batch(self, texts: List[str], model: str) -> List[List[float]]:
+        """One embed request, retried on rate limits and transient server errors"""
+        for attempt in range(VOYAGE_EMBED_MAX_RETRIES + 1):
+            try:
+                with EMBED_BATCH_LATENCY.time(model=model):
+                    result = self.client.embed(
+                        texts=texts,
+                        model=model,
+                        input_type="document"  # For documents to be indexed
+                    )
+                return result.embeddings
+            except RETRYABLE_ERRORS as e:
+                if attempt == VOYAGE_EMBED_MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+                logger.warning(
+                    "⚠️ Voyage AI embed batch failed (%s), retry %s/%s in %.1fs",
+                    type(e).__name__, attempt + 1, VOYAGE_EMBED_MAX_RETRIES, delay
+                )
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str], model: str = "voyage-3", progress_callback: Optional[ProgressCallback] = None) -> List[List[float]]:
+        """
+        Generate embeddings for multiple documents
+        Texts are split into token-sized batches, up to VOYAGE_EMBED_CONCURRENCY of which are in flight
+        at once; embeddings are returned in input order.
+        """
         try:
             if not self.client:
                 raise Exception("Voyage AI client not initialized")
+            if not texts:
+                return []
+            
+            batches = self.plan_batches(texts, model)
+            embeddings: List[Optional[List[float]]] = [None] * len(texts)
+            start_time = time.perf_counter()
+            embedded = 0
+            
+            if len(batches) == 1:
+                embeddings = self._embed_batch(texts, model)
+                if progress_callback:
+                    progress_callback(len(texts), len(texts), time.perf_counter() - start_time)
+                return embeddings
             
-            result = self.client.embed(
-                texts=texts,
-                model=model,
-                input_type="document"  # For documents to be indexed
-            )
+            with ThreadPoolExecutor(max_workers=min(VOYAGE_EMBED_CONCURRENCY, len(batches))) as executor:
+                futures = {
+                    executor.submit(self._embed_batch, [texts[index] for index in batch], model): batch
+                    for batch in batches
+                }
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    for index, embedding in zip(batch, future.result()):
+                        embeddings[index] = embedding
+                    embedded += len(batch)
+                    if progress_callback:
+                        progress_callback(embedded, len(texts), time.perf_counter() - start_time)
             
-            return result.embeddings
+            elapsed = time.perf_counter() - start_time
+            logger.info("🚢 Embedded %s chunks in %s batches (%.1f chunks/s)", len(texts), len(batches), len(texts) / elapsed)
+            return embeddings
             
         except Exception as e:
-            print(f"❌ Error generating Voyage AI document embeddings: {e}")
+            logger.error("❌ Error generating Voyage AI document embeddings: %s", e)
             raise
     
     def get_embedding_dimension(self, model: str = "voyage-3") -> int:
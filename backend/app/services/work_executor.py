@@ -0,0 +1,266 @@
+"""
+Shared executor for CPU-bound work and blocking calls
+HTML parsing, chunk splitting, BM42 tokenisation, PDF extraction and sheet formatting run in a pool of worker
+processes, so they never hold the GIL the event loop needs; blocking SDK calls (Qdrant, Firestore, Notion,
+Google) run in a thread pool. Work is submitted to a named queue with a concurrency limit and a priority:
+whenever a worker frees up, the waiting task with the best priority starts, so chat work overtakes queued
+ingestion work, and ingestion can only ever occupy part of the thread pool.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import WORK_PROCESS_WORKERS, WORK_THREAD_WORKERS, WORK_QUEUE_LIMITS, PDF_EXTRACT_WORKERS
+from app.services.metrics_service import (
+    WORK_TASKS, WORK_BUSY_SECONDS, WORK_ACTIVE, WORK_WAITING, WORK_QUEUE_WAIT, WORK_RUN_TIME
+)
+
+logger = logging.getLogger(__name__)
+
+PROCESS = "process"
+THREAD = "thread"
+
+
+def _default_queues(process_workers: int, thread_workers: int) -> Dict[str, tuple]:
+    """name -> (pool, concurrency limit, priority); lower priorities start first"""
+    return {
+        "chat": (THREAD, thread_workers, 0),  # blocking calls on the chat path
+        "html": (PROCESS, process_workers, 10),  # scraped page parsing and markdown
+        "chunking": (PROCESS, process_workers, 10),  # chunk splitting
+        "sparse": (PROCESS, process_workers, 10),  # BM42 tokenisation
+        "sheets": (PROCESS, process_workers, 10),  # Google Sheets formatting
+        "pdf": (PROCESS, PDF_EXTRACT_WORKERS, 20),  # PDF page ranges (bulk, so behind the rest)
+        "ingest": (THREAD, max(1, thread_workers // 2), 10),  # blocking SDK calls of imports and uploads
+    }
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip().isdigit():
+            limits[name.strip()] = int(value)
+    return limits
+
+
+class _WorkQueue:
+    def __init__(self, name: str, pool: str, limit: int, priority: int):
+        self.name = name
+        self.pool = pool
+        self.limit = max(1, limit)
+        self.priority = priority
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+
+
+class _Task:
+    __slots__ = ("queue", "fn", "args", "kwargs", "future", "submitted")
+
+    def __init__(self, queue: _WorkQueue, fn: Callable, args: tuple, kwargs: dict):
+        self.queue = queue
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+
+
+class WorkExecutor:
+    """Process and thread pools shared by the whole app, fed from prioritised named queues"""
+
+    def __init__(self, process_workers: int = WORK_PROCESS_WORKERS, thread_workers: int = WORK_THREAD_WORKERS,
+                 queue_limits: str = WORK_QUEUE_LIMITS):
+        self.process_workers = max(0, process_workers)
+        self.thread_workers = max(2, thread_workers)
+        # Without worker processes CPU work gets its own threads, so it never waits behind blocking calls
+        cpu_workers = self.process_workers or (os.cpu_count() or 1)
+
+        overrides = _parse_limits(queue_limits)
+        self._queues = {
+            name: _WorkQueue(name, pool, overrides.get(name, limit), priority)
+            for name, (pool, limit, priority) in _default_queues(cpu_workers, self.thread_workers).items()
+        }
+        self._capacity = {PROCESS: cpu_workers, THREAD: self.thread_workers}
+        self._free = dict(self._capacity)
+        self._pending: Dict[str, list] = {PROCESS: [], THREAD: []}  # heaps of (priority, sequence, task)
+        self._pools: Dict[str, Any] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        self._started_at = time.monotonic()
+        self._closed = False
+
+    def _pool(self, kind: str):
+        with self._pool_lock:
+            pool = self._pools.get(kind)
+            if pool is None:
+                if kind == PROCESS and self.process_workers:
+                    # spawn: forking a process that runs event loop and client threads can deadlock the child
+                    pool = ProcessPoolExecutor(max_workers=self.process_workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    pool = ThreadPoolExecutor(max_workers=self._capacity[kind], thread_name_prefix=f"work-{kind}")
+                self._pools[kind] = pool
+            return pool
+
+    def submit(self, queue: str, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue fn(*args, **kwargs) on a named queue; returns a concurrent.futures.Future
+        Process queues need a picklable module-level fn and arguments. A task cancelled while waiting never runs.
+        """
+        work_queue = self._queues[queue]
+        task = _Task(work_queue, fn, args, kwargs)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Work executor is shut down")
+            work_queue.waiting += 1
+            WORK_WAITING.inc(queue=queue)
+            heapq.heappush(self._pending[work_queue.pool], (work_queue.priority, next(self._sequence), task))
+            ready = self._take_ready(work_queue.pool)
+        self._start_all(work_queue.pool, ready)
+        return task.future
+
+    def call(self, queue: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on a queue and wait for the result - for code already running in a worker thread"""
+        return self.submit(queue, fn, *args, **kwargs).result()
+
+    async def run(self, queue: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on a queue and await the result - the event loop's replacement for asyncio.to_thread"""
+        return await asyncio.wrap_future(self.submit(queue, fn, *args, **kwargs))
+
+    def limit(self, queue: str) -> int:
+        return self._queues[queue].limit
+
+    def _take_ready(self, kind: str) -> List[_Task]:
+        """Claim workers for the best waiting tasks whose queue is under its limit (caller holds the lock)"""
+        heap = self._pending[kind]
+        ready, deferred = [], []
+        while heap and self._free[kind]:
+            entry = heapq.heappop(heap)
+            task = entry[2]
+            queue = task.queue
+            if queue.active >= queue.limit:
+                deferred.append(entry)
+                continue
+            queue.waiting -= 1
+            WORK_WAITING.dec(queue=queue.name)
+            if not task.future.set_running_or_notify_cancel():
+                WORK_TASKS.inc(queue=queue.name, status="cancelled")
+                continue
+            queue.active += 1
+            WORK_ACTIVE.inc(queue=queue.name)
+            self._free[kind] -= 1
+            ready.append(task)
+        for entry in deferred:
+            heapq.heappush(heap, entry)
+        return ready
+
+    def _start_all(self, kind: str, tasks: List[_Task]):
+        for task in tasks:
+            WORK_QUEUE_WAIT.observe(time.perf_counter() - task.submitted, queue=task.queue.name)
+            started = time.perf_counter()
+            try:
+                pool = self._pool(kind)
+                inner = pool.submit(task.fn, *task.args, **task.kwargs)
+            except Exception as e:  # pool broken or shut down
+                self._finish(kind, task, started, None, None, e)
+                continue
+            inner.add_done_callback(lambda inner, task=task, started=started, pool=pool: self._finish(kind, task, started, pool, inner))
+
+    def _finish(self, kind: str, task: _Task, started: float, pool, inner: Optional[Future], error: Optional[BaseException] = None):
+        elapsed = time.perf_counter() - started
+        if inner is not None:
+            error = inner.exception() if not inner.cancelled() else RuntimeError("Work executor is shut down")
+        queue = task.queue
+        if isinstance(error, BrokenProcessPool) and pool is not None:
+            self._discard_pool(kind, pool, queue.name)
+        with self._lock:
+            queue.active -= 1
+            queue.busy_seconds += elapsed
+            if error is None:
+                queue.completed += 1
+            else:
+                queue.failed += 1
+            self._free[kind] += 1
+            ready = [] if self._closed else self._take_ready(kind)
+        WORK_ACTIVE.dec(queue=queue.name)
+        WORK_BUSY_SECONDS.inc(elapsed, queue=queue.name)
+        WORK_RUN_TIME.observe(elapsed, queue=queue.name)
+        WORK_TASKS.inc(queue=queue.name, status="ok" if error is None else "error")
+
+        if error is None:
+            task.future.set_result(inner.result())
+        else:
+            task.future.set_exception(error)
+        self._start_all(kind, ready)
+
+    def _discard_pool(self, kind: str, pool, queue_name: str):
+        """A worker died (e.g. killed on a pathological PDF): later tasks get a fresh pool"""
+        with self._pool_lock:
+            if self._pools.get(kind) is not pool:
+                return  # already replaced
+            del self._pools[kind]
+        logger.error("❌ Work executor process died while running a %s task; restarting the pool", queue_name)
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Start the worker processes now, so the first scrape or upload doesn't wait for them to spawn"""
+        with self._lock:
+            self._closed = False
+        if self.process_workers:
+            for _ in range(self.process_workers):
+                self._pool(PROCESS).submit(os.getpid)
+            logger.info("⚙️ Work executor ready: %s processes, %s threads", self.process_workers, self.thread_workers)
+
+    def shutdown(self):
+        """Cancel waiting tasks and stop the pools (running tasks are not waited for)"""
+        with self._lock:
+            self._closed = True
+            waiting = [entry[2] for heap in self._pending.values() for entry in heap]
+            for heap in self._pending.values():
+                heap.clear()
+            for task in waiting:
+                task.queue.waiting -= 1
+        with self._pool_lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for task in waiting:
+            WORK_WAITING.dec(queue=task.queue.name)
+            task.future.cancel()
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        uptime = max(time.monotonic() - self._started_at, 1e-9)
+        return {
+            "process_workers": self.process_workers,
+            "thread_workers": self.thread_workers,
+            "queues": {
+                queue.name: {
+                    "pool": queue.pool,
+                    "limit": queue.limit,
+                    "priority": queue.priority,
+                    "active": queue.active,
+                    "waiting": queue.waiting,
+                    "completed": queue.completed,
+                    "failed": queue.failed,
+                    "busy_seconds": round(queue.busy_seconds, 2),
+                    # share of the queue's limit kept busy since startup
+                    "utilisation": round(queue.busy_seconds / (queue.limit * uptime), 4)
+                }
+                for queue in self._queues.values()
+            }
+        }
+
+
+# Global work executor instance
+work_executor = WorkExecutor()
@@ -0,0 +1,186 @@
+"""
+Benchmark: HTML to markdown extraction for scraped pages
+Compares the previous extraction (BeautifulSoup html.parser + markdownify, kept here as
+legacy_extract) with app.services.html_extraction.extract_page (lxml) on a corpus of saved HTML pages.
+Each implementation runs in its own process so peak memory is measured separately.
+
+The corpus is either a directory of saved pages (*.html, searched recursively) or a deterministic
+synthetic one shaped like docs / marketing pages (scripts, navigation, cookie banner, article, sidebar,
+footer); --save-corpus writes the synthetic pages out for reuse.
+
+Usage (from backend/):
+    python benchmarks/bench_html_extraction.py [--corpus DIR] [--pages 300] [--repeat 3] [--save-corpus DIR]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import gc
+import json
+import random
+import resource
+import subprocess
+import time
+from typing import List
+
+from benchmarks.corpus import TOPICS
+
+
+def build_corpus(pages: int, seed: int = 42) -> List[bytes]:
+    """Deterministic synthetic pages of 30-150 KB with realistic boilerplate around the article"""
+    rng = random.Random(seed)
+    corpus = []
+    for index in range(pages):
+        topic, other = rng.sample(TOPICS, 2)
+        nav = "".join(f'<li><a href="/{t}/{i}">{t.title()} {i}</a></li>' for i, t in enumerate(rng.choices(TOPICS, k=40)))
+        scripts = "".join(
+            f"<script>window.__data{i} = {json.dumps({t: rng.randint(0, 10**6) for t in TOPICS})};"
+            f"function f{i}(a){{return a*{i}+{rng.randint(0, 99)};}}</script>"
+            for i in range(rng.randint(5, 40))
+        )
+        sections = []
+        for section in range(rng.randint(4, 14)):
+            paragraphs = "".join(
+                f"<p>Our {topic} policy covers {' '.join(rng.choices(TOPICS, k=25))}. "
+                f"See the <a href=\"/{other}/{section}\">{other} guide</a> and <strong>{rng.choice(TOPICS)}</strong> "
+                f"rules, which apply to <em>every</em> {rng.choice(TOPICS)} plan.</p>"
+                for _ in range(rng.randint(2, 5))
+            )
+            listing = "<ul>" + "".join(f"<li>{t} detail {rng.randint(0, 999)}</li>" for t in rng.choices(TOPICS, k=6)) + "</ul>"
+            table = "<table><tr><th>Plan</th><th>Price</th></tr>" + "".join(
+                f"<tr><td>{t}</td><td>${rng.randint(5, 500)}</td></tr>" for t in rng.choices(TOPICS, k=4)
+            ) + "</table>" if section % 3 == 0 else ""
+            code = f"<pre><code>curl https://api.example.com/{topic}/{section}\n  -H 'Authorization: Bearer KEY'</code></pre>" if section % 4 == 1 else ""
+            sections.append(f"<section><h2>{topic.title()} section {section + 1}</h2>{paragraphs}{listing}{table}{code}</section>")
+        sidebar = "<div class=\"sidebar\">" + "".join(f'<a href="/related/{t}">{t}</a>' for t in rng.choices(TOPICS, k=20)) + "</div>"
+        html = (
+            f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{topic.title()} guide {index}</title>"
+            f"<link rel=\"canonical\" href=\"https://example.com/{topic}/{index}\"><style>body{{margin:0}} .nav a{{color:red}}</style>"
+            f"{scripts}</head><body><header><nav class=\"nav\"><ul>{nav}</ul></nav></header>"
+            f"<div class=\"cookie-banner\">We use cookies to improve your experience. <button>Accept</button></div>"
+            f"<div class=\"layout\">{sidebar}<main><article><h1>{topic.title()} and {other} guide {index}</h1>"
+            f"{''.join(sections)}</article></main></div>"
+            f"<footer><ul>{nav}</ul><p>Copyright Example Inc.</p></footer></body></html>"
+        )
+        corpus.append(html.encode("utf-8"))
+    return corpus
+
+
+def load_corpus(directory: str) -> List[bytes]:
+    pages = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith((".html", ".htm")):
+                with open(os.path.join(root, name), "rb") as f:
+                    pages.append(f.read())
+    return pages
+
+
+def legacy_extract(html: bytes) -> str:
+    """The previous WebsiteScraper._simple_http_scrape extraction"""
+    from bs4 import BeautifulSoup
+    from markdownify import markdownify as md
+
+    soup = BeautifulSoup(html, 'html.parser')
+    [anchor['href'] for anchor in soup.find_all('a', href=True)]
+    soup.find('link', rel='canonical', href=True)
+    for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript']):
+        element.decompose()
+    soup.find('title')
+    main_content = (
+        soup.find('main') or
+        soup.find('article') or
+        soup.find('div', class_=['content', 'main-content', 'post-content', 'article-content']) or
+        soup.find('body')
+    )
+    markdown_content = md(str(main_content), heading_style="ATX")
+    return '\n\n'.join(line for line in markdown_content.split('\n') if line.strip())
+
+
+def lxml_extract(html: bytes) -> str:
+    from app.services.html_extraction import extract_page
+    return extract_page(html)['content']
+
+
+IMPLEMENTATIONS = {"legacy": legacy_extract, "lxml": lxml_extract}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(implementation: str, args):
+    """Child process: extract the corpus `repeat` times, print one JSON line of results"""
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(args.pages)
+    extract = IMPLEMENTATIONS[implementation]
+    extract(corpus[0])  # imports and first-call setup outside the measurement
+    gc.collect()
+    baseline_mb = peak_rss_mb()
+
+    timings = []
+    outputs: List[str] = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        outputs = [extract(html) for html in corpus]
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(json.dumps({
+        "implementation": implementation,
+        "pages": len(corpus),
+        "input_mb": round(sum(len(html) for html in corpus) / (1024 * 1024), 2),
+        "seconds": round(best, 3),
+        "pages_per_second": round(len(corpus) / best, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "extra_peak_rss_mb": round(peak_rss_mb() - baseline_mb, 1),
+        "output_chars": sum(len(output) for output in outputs),
+        "output_words": [len(set(output.split())) for output in outputs]
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML to markdown extraction")
+    parser.add_argument("--corpus", help="Directory of saved HTML pages (default: synthetic corpus)")
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic corpus size")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save-corpus", help="Write the synthetic corpus to this directory and exit")
+    parser.add_argument("--worker", choices=sorted(IMPLEMENTATIONS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args)
+        return
+
+    if args.save_corpus:
+        os.makedirs(args.save_corpus, exist_ok=True)
+        for index, html in enumerate(build_corpus(args.pages)):
+            with open(os.path.join(args.save_corpus, f"page{index:05d}.html"), "wb") as f:
+                f.write(html)
+        print(f"Wrote {args.pages} pages to {args.save_corpus}")
+        return
+
+    results = {}
+    for implementation in ("legacy", "lxml"):
+        command = [sys.executable, os.path.abspath(__file__), "--worker", implementation, "--repeat", str(args.repeat), "--pages", str(args.pages)]
+        if args.corpus:
+            command += ["--corpus", args.corpus]
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+        results[implementation] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    legacy, fast = results["legacy"], results["lxml"]
+    print(f"Corpus: {legacy['pages']} pages, {legacy['input_mb']} MB")
+    for result in (legacy, fast):
+        print(
+            f"{result['implementation']:>7}: {result['seconds']:.3f}s ({result['pages_per_second']:,.1f} pages/s), "
+            f"peak RSS {result['peak_rss_mb']} MB (+{result['extra_peak_rss_mb']} MB while extracting), "
+            f"{result['output_chars']:,} chars of markdown"
+        )
+    print(f"Speedup: {legacy['seconds'] / fast['seconds']:.2f}x")
+    # Content kept: distinct words per page in the new output relative to the legacy output
+    print(f"Distinct words per page, lxml / legacy: {sum(fast['output_words']) / max(1, sum(legacy['output_words'])):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: fetching a Notion database's pages for import
+Runs against a simulated Notion API (httpx.MockTransport with a fixed latency per request; pages of nested
+blocks, returned 100 per cursor like the real API) and compares:
+  - sequential: one page at a time, each page's metadata fetched again before its blocks (the previous import)
+  - concurrent: NotionService.get_pages_content on the summaries from query_database,
+    NOTION_FETCH_CONCURRENCY pages at a time under the token's rate limit
+Both go through the same rate limiter, so --rate bounds both; the real API allows about 3 requests/s.
+
+Usage (from backend/):
+    python benchmarks/bench_notion_fetch.py [--pages 30] [--latency-ms 300] [--rate 3] [--concurrency 4]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import asyncio
+import time
+
+
+def build_workspace(pages: int, blocks_per_page: int):
+    """Page id -> top-level blocks; every fifth block is a list item with two nested items"""
+    def text(kind: str, value: str, block_id: str, children: bool = False) -> dict:
+        return {"id": block_id, "type": kind, "has_children": children, kind: {"rich_text": [{"plain_text": value}]}}
+
+    blocks = {}
+    for page in range(pages):
+        page_id = f"page{page}"
+        blocks[page_id] = [
+            text("bulleted_list_item", f"item {index}", f"{page_id}-{index}", True) if index % 5 == 0
+            else text("paragraph", f"Paragraph {index} of page {page}", f"{page_id}-{index}")
+            for index in range(blocks_per_page)
+        ]
+        for index in range(0, blocks_per_page, 5):
+            blocks[f"{page_id}-{index}"] = [text("bulleted_list_item", f"nested {n}", f"{page_id}-{index}-{n}") for n in range(2)]
+    return blocks
+
+
+def mock_api(blocks: dict, latency: float, counters: dict):
+    import httpx
+
+    def listing(items: list, cursor: str) -> dict:
+        start = int(cursor or 0)
+        more = start + 100 < len(items)
+        return {"results": items[start:start + 100], "has_more": more, "next_cursor": str(start + 100) if more else None}
+
+    def page_object(page_id: str) -> dict:
+        return {"id": page_id, "url": f"https://www.notion.so/{page_id}",
+                "properties": {"Name": {"type": "title", "title": [{"plain_text": page_id.title()}]}}}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        counters["requests"] += 1
+        await asyncio.sleep(latency)
+        parts = request.url.path.split("/")
+        if parts[2] == "databases":
+            import json
+            rows = [page_object(page_id) for page_id in blocks if "-" not in page_id]
+            return httpx.Response(200, json=listing(rows, json.loads(request.content).get("start_cursor")))
+        if parts[2] == "pages":
+            return httpx.Response(200, json=page_object(parts[3]))
+        return httpx.Response(200, json=listing(blocks.get(parts[3], []), request.url.params.get("start_cursor")))
+
+    return httpx.MockTransport(handler)
+
+
+async def run_mode(mode: str, args, blocks: dict) -> dict:
+    import httpx
+    from app.services.notion_service import NotionService
+
+    counters = {"requests": 0}
+    service = NotionService()
+    service._client = httpx.AsyncClient(transport=mock_api(blocks, args.latency_ms / 1000, counters))
+    start = time.perf_counter()
+    try:
+        pages = (await service.query_database("key", "database"))["pages"]
+        if mode == "sequential":
+            results = [await service.get_page_content("key", page["id"]) for page in pages]
+        else:
+            results = await service.get_pages_content("key", pages)
+    finally:
+        await service.aclose()
+    return {
+        "seconds": time.perf_counter() - start,
+        "requests": counters["requests"],
+        "pages": sum(1 for result in results if result.get("success")),
+        "characters": sum(len(result.get("content", "")) for result in results)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fetching a Notion database's pages")
+    parser.add_argument("--pages", type=int, default=30, help="Pages in the simulated database")
+    parser.add_argument("--blocks", type=int, default=40, help="Top-level blocks per page")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Simulated latency of each API request")
+    parser.add_argument("--rate", type=float, default=3, help="NOTION_REQUESTS_PER_SECOND")
+    parser.add_argument("--concurrency", type=int, default=4, help="NOTION_FETCH_CONCURRENCY")
+    args = parser.parse_args()
+
+    # Read by app.config when notion_service is first imported
+    os.environ["NOTION_REQUESTS_PER_SECOND"] = str(args.rate)
+    os.environ["NOTION_FETCH_CONCURRENCY"] = str(args.concurrency)
+
+    blocks = build_workspace(args.pages, args.blocks)
+    results = {mode: asyncio.run(run_mode(mode, args, blocks)) for mode in ("sequential", "concurrent")}
+
+    print(f"Database: {args.pages} pages of {args.blocks} blocks, {args.latency_ms:.0f} ms per request, "
+          f"{args.rate:g} requests/s, {args.concurrency} pages at a time")
+    for mode, result in results.items():
+        print(
+            f"{mode:>10}: {result['seconds']:.2f}s ({result['pages'] / result['seconds']:.2f} pages/s), "
+            f"{result['requests']} API requests, {result['characters']:,} chars"
+        )
+    print(f"Speedup: {results['sequential']['seconds'] / results['concurrent']['seconds']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
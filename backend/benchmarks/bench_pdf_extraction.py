@@ -0,0 +1,170 @@
+"""
+Benchmark: PDF text extraction for uploads
+Compares the previous extraction (whole file in memory, pdfplumber page by page on one thread, PyPDF2 re-parse
+of the whole document if that found nothing - kept here as legacy_extract) with
+app.services.pdf_extraction.PdfExtractor (pages extracted in work executor processes, streamed in order).
+Each implementation runs in its own process so peak memory is measured separately; for the pool the peak
+RSS of the worker processes is reported too.
+
+The input is either a PDF file or a deterministic synthetic one (text pages in Helvetica, written by
+build_pdf); --save-pdf writes the synthetic PDF out for reuse, e.g. as an upload.
+
+Usage (from backend/):
+    python benchmarks/bench_pdf_extraction.py [--pdf FILE] [--pages 300] [--workers N] [--save-pdf FILE]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import io
+import json
+import random
+import resource
+import subprocess
+import tempfile
+import time
+
+from benchmarks.corpus import TOPICS
+
+
+def build_pdf(pages: int, seed: int = 42) -> bytes:
+    """Deterministic PDF of `pages` text pages (about 45 lines of prose each)"""
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for index in range(pages):
+        lines = [f"Section {index + 1}: {rng.choice(TOPICS).title()} guide"]
+        lines += [" ".join(rng.choices(TOPICS, k=12)) + "." for _ in range(44)]
+        text = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {text}ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % len(objects)
+        )
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def legacy_extract(path: str) -> str:
+    """The previous QdrantService.extract_text_from_pdf, fed the whole upload as bytes"""
+    import pdfplumber
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        file_content = f.read()
+    pdf_file = io.BytesIO(file_content)
+    text_content = ""
+    with pdfplumber.open(pdf_file) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text_content += page_text + "\n"
+    if text_content.strip():
+        return text_content.strip()
+    pdf_file.seek(0)
+    for page in PyPDF2.PdfReader(pdf_file).pages:
+        page_text = page.extract_text()
+        if page_text:
+            text_content += page_text + "\n"
+    return text_content.strip()
+
+
+def pool_extract(extractor, path: str) -> int:
+    """Consumes the page stream the way the upload pipeline does; returns the characters extracted"""
+    return sum(len(text) for _, text in extractor.iter_pages(path))
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(implementation: str, args):
+    """Child process: extract the PDF once, print one JSON line of results"""
+    if implementation == "pool":
+        from app.services.pdf_extraction import PdfExtractor
+        from app.services.work_executor import WorkExecutor, work_executor
+        executor = WorkExecutor(process_workers=args.workers, queue_limits=f"pdf={args.workers}") if args.workers else work_executor
+        extractor = PdfExtractor(executor)
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    characters = len(legacy_extract(args.pdf)) if implementation == "legacy" else pool_extract(extractor, args.pdf)
+    elapsed = time.perf_counter() - start
+    if implementation == "pool":
+        executor.shutdown()
+        time.sleep(0.5)  # let the workers exit so RUSAGE_CHILDREN includes them
+    print(json.dumps({
+        "implementation": implementation,
+        "seconds": round(elapsed, 2),
+        "characters": characters,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "extra_peak_rss_mb": round(peak_rss_mb() - baseline_mb, 1),
+        "worker_peak_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1) if implementation == "pool" else None
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction")
+    parser.add_argument("--pdf", help="PDF file to extract (default: synthetic PDF)")
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic PDF page count")
+    parser.add_argument("--workers", type=int, default=0, help="Extraction processes (default: WORK_PROCESS_WORKERS, PDF_EXTRACT_WORKERS at once)")
+    parser.add_argument("--save-pdf", help="Write the synthetic PDF to this file and exit")
+    parser.add_argument("--worker", choices=["legacy", "pool"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args)
+        return
+
+    if args.save_pdf:
+        with open(args.save_pdf, "wb") as f:
+            f.write(build_pdf(args.pages))
+        print(f"Wrote a {args.pages}-page PDF to {args.save_pdf}")
+        return
+
+    temporary = None
+    description = args.pdf
+    if not args.pdf:
+        description = f"synthetic, {args.pages} pages"
+        temporary = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+        temporary.write(build_pdf(args.pages))
+        temporary.close()
+        args.pdf = temporary.name
+
+    size_mb = os.path.getsize(args.pdf) / (1024 * 1024)
+    try:
+        results = {}
+        for implementation in ("legacy", "pool"):
+            command = [sys.executable, os.path.abspath(__file__), "--worker", implementation, "--pdf", args.pdf, "--workers", str(args.workers)]
+            completed = subprocess.run(command, capture_output=True, text=True, check=True)
+            results[implementation] = json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        if temporary:
+            os.remove(temporary.name)
+
+    legacy, pool = results["legacy"], results["pool"]
+    print(f"PDF: {description} ({size_mb:.1f} MB)")
+    print(f"legacy: {legacy['seconds']:.2f}s, peak RSS {legacy['peak_rss_mb']} MB (+{legacy['extra_peak_rss_mb']} MB while extracting), {legacy['characters']:,} chars")
+    print(
+        f"  pool: {pool['seconds']:.2f}s, peak RSS {pool['peak_rss_mb']} MB (+{pool['extra_peak_rss_mb']} MB while extracting), "
+        f"largest worker {pool['worker_peak_rss_mb']} MB, {pool['characters']:,} chars"
+    )
+    print(f"Speedup: {legacy['seconds'] / pool['seconds']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Offline benchmark for the RAG chat pipeline
+Runs AIService.generate_ai_response and generate_ai_response_stream against the deterministic
+stand-ins in benchmarks/standins.py (fake Voyage embedder/reranker, Qdrant :memory: with the real
+hybrid collection, fake streaming LLM) and reports per-stage and end-to-end p50/p95/p99 and
+throughput at each concurrency level. Stage timings come from the tracing spans.
+
+Usage (from backend/):
+    python benchmarks/bench_rag_pipeline.py [--requests 200] [--concurrency 1,8,32]
+        [--mode generate,stream] [--documents 200] [--llm-ttft-ms 400] [--output results.json]
+        [--baseline previous.json]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List
+
+from benchmarks.corpus import build_queries
+from benchmarks.report import summarize, git_revision
+from benchmarks.standins import BENCH_AGENT_ID, StandinConfig, install_standins, seed_knowledge_base
+from app.models import AIConfig
+from app.services.ai_service import ai_service
+from app.services.query_embedding_cache import query_embedding_cache
+from app.services.tracing import tracer
+
+
+class SpanCollector(logging.Handler):
+    """Collects finished span durations from the app.trace logger"""
+
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.durations: Dict[str, List[float]] = {}
+
+    def emit(self, record: logging.LogRecord):
+        fields = getattr(record, "fields", None)
+        if fields and "span" in fields:
+            self.durations.setdefault(fields["span"], []).append(fields["duration_ms"])
+
+    def reset(self):
+        self.durations = {}
+
+
+async def run_generate(message: str, ai_config: AIConfig) -> Dict[str, Any]:
+    start = time.perf_counter()
+    response = await ai_service.generate_ai_response(message, BENCH_AGENT_ID, ai_config, "bench-business")
+    return {
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "ok": response.success,
+        "sources": len(response.sources)
+    }
+
+
+async def run_stream(message: str, ai_config: AIConfig) -> Dict[str, Any]:
+    start = time.perf_counter()
+    first_content = None
+    ok = True
+    sources = 0
+    async for event in ai_service.generate_ai_response_stream(message, BENCH_AGENT_ID, ai_config, "bench-business"):
+        if event["type"] == "content" and first_content is None:
+            first_content = time.perf_counter()
+        elif event["type"] == "error":
+            ok = False
+        elif event["type"] == "complete":
+            sources = len(event.get("sources", []))
+    return {
+        "latency_ms": (time.perf_counter() - start) * 1000,
+        "ttft_ms": (first_content - start) * 1000 if first_content else None,
+        "ok": ok,
+        "sources": sources
+    }
+
+
+async def run_level(mode: str, concurrency: int, queries: List[str], ai_config: AIConfig, collector: SpanCollector) -> Dict[str, Any]:
+    """Run every query once with at most `concurrency` requests in flight"""
+    runner = run_stream if mode == "stream" else run_generate
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(message: str):
+        async with semaphore:
+            return await runner(message, ai_config)
+
+    # Every level starts with a cold query embedding cache so levels are comparable
+    query_embedding_cache.clear()
+    collector.reset()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(message) for message in queries))
+    wall_time = time.perf_counter() - start
+
+    level = {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": sum(1 for result in results if not result["ok"]),
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(len(results) / wall_time, 2),
+        "end_to_end_ms": summarize([result["latency_ms"] for result in results]),
+        "sources_mean": round(sum(result["sources"] for result in results) / len(results), 2),
+        "stages_ms": {name: summarize(values) for name, values in sorted(collector.durations.items())}
+    }
+    if mode == "stream":
+        level["ttft_ms"] = summarize([result["ttft_ms"] for result in results if result["ttft_ms"] is not None])
+    return level
+
+
+def print_level(level: Dict[str, Any], baseline: Dict[Any, Dict[str, Any]]):
+    e2e = level["end_to_end_ms"]
+    line = (
+        f"{level['mode']:<8} c={level['concurrency']:<4} {level['throughput_rps']:>8.2f} req/s  "
+        f"p50 {e2e['p50']:>8.1f}ms  p95 {e2e['p95']:>8.1f}ms  p99 {e2e['p99']:>8.1f}ms  errors {level['errors']}"
+    )
+    previous = baseline.get((level["mode"], level["concurrency"]))
+    if previous:
+        before = previous["end_to_end_ms"]["p95"]
+        line += f"  (p95 {e2e['p95'] - before:+.1f}ms vs baseline)"
+    print(line)
+    if "ttft_ms" in level and level["ttft_ms"]["count"]:
+        ttft = level["ttft_ms"]
+        print(f"{'':<15} ttft p50 {ttft['p50']:>8.1f}ms  p95 {ttft['p95']:>8.1f}ms  p99 {ttft['p99']:>8.1f}ms")
+    for name, stats in level["stages_ms"].items():
+        if name == "chat":
+            continue
+        print(f"{'':<15} {name:<18} n={stats['count']:<5} p50 {stats['p50']:>8.1f}ms  p95 {stats['p95']:>8.1f}ms  p99 {stats['p99']:>8.1f}ms")
+
+
+async def main_async(args) -> Dict[str, Any]:
+    config = StandinConfig(
+        embed_latency_ms=args.embed_ms,
+        search_latency_ms=args.search_ms,
+        rerank_latency_ms=args.rerank_ms,
+        llm_ttft_ms=args.llm_ttft_ms,
+        llm_token_ms=args.llm_token_ms,
+        llm_tokens=args.llm_tokens,
+        jitter=args.jitter,
+        seed=args.seed
+    )
+    install_standins(config, response_cache_enabled=args.response_cache)
+
+    print(f"Seeding {args.documents} documents into Qdrant :memory:...")
+    start = time.perf_counter()
+    chunks = await asyncio.to_thread(seed_knowledge_base, BENCH_AGENT_ID, args.documents, args.seed)
+    print(f"Stored {chunks} chunks in {time.perf_counter() - start:.1f}s")
+
+    # Every request is traced; spans go to the collector only
+    collector = SpanCollector()
+    trace_logger = logging.getLogger("app.trace")
+    trace_logger.handlers = [collector]
+    trace_logger.setLevel(logging.DEBUG)
+    trace_logger.propagate = False
+    tracer.default_rate = 1.0
+    tracer.route_rates = {}
+
+    ai_config = AIConfig(
+        enabled=True,
+        ragEnabled=True,
+        model=args.model,
+        maxRetrievalDocs=args.max_docs,
+        maxTokens=500
+    )
+    queries = build_queries(args.requests, seed=args.seed)
+
+    # Warm-up pass so one-off costs (collection checks, tokenizer load) don't skew the first level
+    await asyncio.gather(*(run_generate(message, ai_config) for message in queries[:min(5, len(queries))]))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {(level["mode"], level["concurrency"]): level for level in json.load(f)["results"]}
+
+    results = []
+    for mode in args.mode.split(","):
+        for concurrency in (int(value) for value in args.concurrency.split(",")):
+            level = await run_level(mode.strip(), concurrency, queries, ai_config, collector)
+            print_level(level, baseline)
+            results.append(level)
+
+    return {
+        "meta": {
+            "benchmark": "rag_pipeline",
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "chunks": chunks,
+            "args": vars(args)
+        },
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RAG chat pipeline against offline stand-ins")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--mode", default="generate,stream", help="generate, stream or both")
+    parser.add_argument("--documents", type=int, default=200, help="Synthetic knowledge items to ingest")
+    parser.add_argument("--model", default="gpt-5-mini")
+    parser.add_argument("--max-docs", type=int, default=5)
+    parser.add_argument("--embed-ms", type=float, default=60.0)
+    parser.add_argument("--search-ms", type=float, default=25.0)
+    parser.add_argument("--rerank-ms", type=float, default=80.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=400.0)
+    parser.add_argument("--llm-token-ms", type=float, default=15.0)
+    parser.add_argument("--llm-tokens", type=int, default=60)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--response-cache", action="store_true", help="Keep the semantic response cache enabled")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare p95 against")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: per-chunk generate_sparse_vector vs batch generate_sparse_vectors
+Builds a deterministic synthetic corpus (default 10k chunks of ~1500 chars, like store_knowledge_item),
+checks both paths return identical vectors and reports the speedup.
+
+Usage (from backend/):
+    python benchmarks/bench_sparse_vectors.py [--chunks 10000] [--chunk-chars 1500] [--repeat 3]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import itertools
+import random
+import time
+
+from app.services.qdrant_service import generate_sparse_vector, generate_sparse_vectors
+
+
+def build_corpus(chunks: int, chunk_chars: int, seed: int = 42):
+    """Deterministic synthetic chunks with a Zipf-like vocabulary, punctuation and emails"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20000)] + [
+        "the", "and", "pricing", "business", "hours", "support@example.com", "v2.1", "plan-pro", "a", "is"
+    ]
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    words_per_chunk = chunk_chars // 8  # average word length incl. separator
+    corpus = []
+    for _ in range(chunks):
+        words = rng.choices(vocabulary, cum_weights=cum_weights, k=words_per_chunk)
+        for i, word in enumerate(words):
+            roll = rng.random()
+            if roll < 0.05:
+                words[i] = word + rng.choice([",", ".", "!", "?", ":", ")"])
+            elif roll < 0.15:
+                words[i] = word.capitalize()
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def best_of(repeat: int, fn):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM42 sparse vector generation")
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--chunk-chars", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Building corpus: {args.chunks} chunks x ~{args.chunk_chars} chars...")
+    corpus = build_corpus(args.chunks, args.chunk_chars)
+
+    per_chunk_time, per_chunk = best_of(args.repeat, lambda: [generate_sparse_vector(text) for text in corpus])
+    batch_time, batch = best_of(args.repeat, lambda: generate_sparse_vectors(corpus))
+
+    identical = all(
+        a.indices == b.indices and a.values == b.values
+        for a, b in zip(per_chunk, batch)
+    ) and len(per_chunk) == len(batch)
+
+    print(f"Per-chunk generate_sparse_vector: {per_chunk_time:.3f}s ({args.chunks / per_chunk_time:,.0f} chunks/s)")
+    print(f"Batch generate_sparse_vectors:    {batch_time:.3f}s ({args.chunks / batch_time:,.0f} chunks/s)")
+    print(f"Speedup: {per_chunk_time / batch_time:.2f}x")
+    print(f"Identical results: {identical}")
+
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
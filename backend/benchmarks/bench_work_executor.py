@@ -0,0 +1,130 @@
+"""
+Benchmark: event loop responsiveness while scraped pages are parsed
+Parses a synthetic HTML corpus (benchmarks/bench_html_extraction.build_corpus) with a fixed number of pages in
+flight, the way a crawl does, while two probes run on the same event loop:
+  - loop lag: how late a 10 ms asyncio.sleep wakes up (what every request on the loop feels)
+  - chat call: latency of a short blocking call sent off the loop (what ai_service's off-loop calls feel)
+"threads" is the previous setup (asyncio.to_thread for both); "executor" sends parsing to the work executor's
+"html" queue and the probe call to its "chat" queue.
+
+Usage (from backend/):
+    python benchmarks/bench_work_executor.py [--pages 300] [--concurrency 8] [--workers N]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from benchmarks.bench_html_extraction import build_corpus
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def chat_call() -> float:
+    """Stand-in for a short blocking SDK call on the chat path"""
+    time.sleep(0.002)
+    return time.perf_counter()
+
+
+async def run_mode(mode: str, corpus: List[bytes], concurrency: int, executor) -> dict:
+    from app.services.html_extraction import extract_page
+
+    async def parse(html: bytes):
+        if mode == "threads":
+            return await asyncio.to_thread(extract_page, html)
+        return await executor.run("html", extract_page, html)
+
+    async def call():
+        if mode == "threads":
+            return await asyncio.to_thread(chat_call)
+        return await executor.run("chat", chat_call)
+
+    done = asyncio.Event()
+    lags: List[float] = []
+    calls: List[float] = []
+
+    async def lag_probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - start - 0.01)
+
+    async def chat_probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await call()
+            calls.append(time.perf_counter() - start)
+            await asyncio.sleep(0.02)
+
+    pages = iter(corpus)
+
+    async def crawler():
+        for html in pages:
+            await parse(html)
+
+    probes = [asyncio.create_task(lag_probe()), asyncio.create_task(chat_probe())]
+    start = time.perf_counter()
+    await asyncio.gather(*(crawler() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await asyncio.gather(*probes)
+
+    return {
+        "seconds": elapsed,
+        "lag_p50_ms": statistics.median(lags) * 1000,
+        "lag_p99_ms": percentile(lags, 0.99) * 1000,
+        "lag_max_ms": max(lags) * 1000,
+        "call_p50_ms": statistics.median(calls) * 1000,
+        "call_p99_ms": percentile(calls, 0.99) * 1000
+    }
+
+
+async def main_async(args):
+    from app.services.work_executor import WorkExecutor
+
+    corpus = build_corpus(args.pages)
+    executor = WorkExecutor(process_workers=args.workers) if args.workers else WorkExecutor()
+    executor.start()
+    # Let the worker processes finish spawning and importing before measuring
+    await asyncio.gather(*(executor.run("html", len, b"") for _ in range(executor.process_workers or 1)))
+    from app.services.html_extraction import extract_page
+    await executor.run("html", extract_page, corpus[0])
+
+    results = {}
+    try:
+        for mode in ("threads", "executor"):
+            results[mode] = await run_mode(mode, corpus, args.concurrency, executor)
+    finally:
+        stats = executor.get_stats()["queues"]
+        executor.shutdown()
+
+    print(f"Corpus: {len(corpus)} pages, {args.concurrency} in flight, {os.cpu_count()} CPUs, {executor.process_workers} executor processes")
+    for mode, result in results.items():
+        print(
+            f"{mode:>9}: {result['seconds']:.2f}s ({len(corpus) / result['seconds']:.1f} pages/s), "
+            f"loop lag p50 {result['lag_p50_ms']:.1f} ms / p99 {result['lag_p99_ms']:.1f} ms / max {result['lag_max_ms']:.1f} ms, "
+            f"chat call p50 {result['call_p50_ms']:.1f} ms / p99 {result['call_p99_ms']:.1f} ms"
+        )
+    for name in ("html", "chat"):
+        print(f"  {name} queue: {stats[name]['completed']} tasks, {stats[name]['busy_seconds']}s busy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event loop responsiveness while pages are parsed")
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic corpus size")
+    parser.add_argument("--concurrency", type=int, default=8, help="Pages parsed at once (CRAWL_CONCURRENCY)")
+    parser.add_argument("--workers", type=int, default=0, help="Executor processes (default: WORK_PROCESS_WORKERS)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Deterministic synthetic knowledge items and chat questions for the benchmarks
+Pure Python (no app imports) so load generators can build payloads without the backend installed
+"""
+import random
+from typing import Dict, Any, List
+
+
+TOPICS = [
+    "pricing", "billing", "refund", "shipping", "delivery", "warranty", "returns", "account",
+    "password", "login", "integration", "webhook", "api", "export", "import", "calendar",
+    "booking", "appointment", "support", "hours", "location", "subscription", "invoice", "discount"
+]
+
+
+def build_document(index: int, rng: random.Random, paragraphs: int = 6) -> Dict[str, Any]:
+    """Synthetic knowledge item about two topics, long enough to span several chunks"""
+    primary, secondary = rng.sample(TOPICS, 2)
+    sentences = []
+    for paragraph in range(paragraphs):
+        topic = primary if paragraph % 2 == 0 else secondary
+        words = rng.choices(TOPICS, k=12)
+        sentences.append(
+            f"Section {paragraph + 1} of the {topic} guide number {index}. "
+            f"Our {topic} policy covers {' '.join(words)}. "
+            f"Customers asking about {topic} should read this {primary} and {secondary} article carefully. "
+            + " ".join(f"{topic} detail {rng.randint(0, 9999)} applies to the {rng.choice(TOPICS)} plan." for _ in range(6))
+        )
+    return {
+        "id": f"bench-item-{index}",
+        "title": f"{primary.title()} and {secondary} guide {index}",
+        "type": "text",
+        "content": "\n\n".join(sentences)
+    }
+
+
+def build_queries(count: int, seed: int = 7) -> List[str]:
+    """Deterministic mix of short, medium and long questions about the seeded topics"""
+    rng = random.Random(seed)
+    templates = [
+        "what is your {a} policy?",
+        "how much does {a} cost",
+        "can you tell me how {a} works with {b} for my account?",
+        "explain in detail the difference between {a} and {b} and when each {c} rule applies",
+        "where do I find {a} information",
+        "does the {a} plan include {b}?"
+    ]
+    return [
+        rng.choice(templates).format(a=rng.choice(TOPICS), b=rng.choice(TOPICS), c=rng.choice(TOPICS))
+        for _ in range(count)
+    ]
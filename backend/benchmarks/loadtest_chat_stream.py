@@ -0,0 +1,225 @@
+"""
+Concurrent SSE load test for POST /api/ai/chat/stream
+Opens N concurrent streaming clients per level, replays a corpus of ChatRequest payloads and
+records time to the first `content` event, inter-token gaps, completion time and error rate.
+Use it to size Cloud Run concurrency and worker counts.
+
+Start a local target wired to the stand-in providers first:
+    python benchmarks/serve_standins.py --port 8001
+
+Usage (from backend/):
+    python benchmarks/loadtest_chat_stream.py [--url http://127.0.0.1:8001] [--concurrency 1,10,50,100]
+        [--requests 200] [--payloads requests.jsonl] [--output results.json] [--baseline previous.json]
+
+--payloads takes a JSONL file of ChatRequest bodies; without it a synthetic corpus is generated
+for the agent seeded by serve_standins.py.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from benchmarks.corpus import build_queries
+from benchmarks.report import summarize, git_revision
+
+
+STREAM_PATH = "/api/ai/chat/stream"
+
+
+def load_payloads(path: Optional[str], count: int, agent_id: str, model: str, seed: int) -> List[Dict[str, Any]]:
+    """ChatRequest bodies from a JSONL file, or a synthetic corpus for the stand-in agent"""
+    if path:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    return [
+        {
+            "message": message,
+            "agentId": agent_id,
+            "businessId": "bench-business",
+            "conversationId": f"loadtest-{index}",
+            "aiConfig": {
+                "enabled": True,
+                "model": model,
+                "ragEnabled": True,
+                "maxRetrievalDocs": 5,
+                "maxTokens": 500
+            }
+        }
+        for index, message in enumerate(build_queries(count, seed=seed))
+    ]
+
+
+async def stream_one(client: httpx.AsyncClient, url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """POST one chat request and time its SSE events"""
+    start = time.perf_counter()
+    result = {
+        "ttft_ms": None,
+        "completion_ms": None,
+        "gaps_ms": [],
+        "content_events": 0,
+        "error": None
+    }
+    last_content = None
+
+    try:
+        async with client.stream("POST", url, json=payload, timeout=timeout) as response:
+            if response.status_code != 200:
+                result["error"] = f"http_{response.status_code}"
+                await response.aread()
+                return result
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:].strip())
+                now = time.perf_counter()
+
+                if event.get("type") == "content":
+                    if last_content is None:
+                        result["ttft_ms"] = (now - start) * 1000
+                    else:
+                        result["gaps_ms"].append((now - last_content) * 1000)
+                    last_content = now
+                    result["content_events"] += 1
+                elif event.get("type") == "error" or event.get("error"):
+                    result["error"] = result["error"] or "stream_error"
+
+                if event.get("done"):
+                    result["completion_ms"] = (now - start) * 1000
+                    break
+
+        if result["completion_ms"] is None and result["error"] is None:
+            result["error"] = "incomplete_stream"
+    except httpx.TimeoutException:
+        result["error"] = "timeout"
+    except httpx.HTTPError as e:
+        result["error"] = type(e).__name__
+    except json.JSONDecodeError:
+        result["error"] = "bad_event"
+
+    if result["error"] is None and result["content_events"] == 0:
+        result["error"] = "no_content"
+    return result
+
+
+async def run_level(url: str, concurrency: int, payloads: List[Dict[str, Any]], requests: int, timeout: float) -> Dict[str, Any]:
+    """`concurrency` clients each replay payloads back to back until `requests` streams are done"""
+    queue = itertools.islice(itertools.cycle(payloads), requests)
+    results = []
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def worker():
+            for payload in queue:
+                results.append(await stream_one(client, url, payload, timeout))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall_time = time.perf_counter() - start
+
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result["error"]:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+
+    completed = [result for result in results if result["error"] is None]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "completed": len(completed),
+        "error_rate": round(1 - len(completed) / len(results), 4) if results else 0.0,
+        "errors": errors,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(len(completed) / wall_time, 2),
+        "ttft_ms": summarize([result["ttft_ms"] for result in results if result["ttft_ms"] is not None]),
+        "inter_token_gap_ms": summarize([gap for result in completed for gap in result["gaps_ms"]]),
+        "completion_ms": summarize([result["completion_ms"] for result in completed]),
+        "content_events_mean": round(sum(result["content_events"] for result in completed) / len(completed), 1) if completed else 0
+    }
+
+
+def print_level(level: Dict[str, Any], baseline: Dict[int, Dict[str, Any]]):
+    ttft = level["ttft_ms"]
+    completion = level["completion_ms"]
+    gaps = level["inter_token_gap_ms"]
+    line = f"c={level['concurrency']:<5} {level['throughput_rps']:>7.2f} streams/s  errors {level['error_rate'] * 100:5.1f}%"
+    if ttft["count"]:
+        line += f"  ttft p50 {ttft['p50']:>7.1f} p95 {ttft['p95']:>7.1f} p99 {ttft['p99']:>7.1f}ms"
+    if gaps["count"]:
+        line += f"  gap p95 {gaps['p95']:>6.1f}ms"
+    if completion["count"]:
+        line += f"  done p95 {completion['p95']:>7.1f}ms"
+    previous = baseline.get(level["concurrency"])
+    if previous and ttft["count"] and previous["ttft_ms"].get("count"):
+        line += f"  (ttft p95 {ttft['p95'] - previous['ttft_ms']['p95']:+.1f}ms vs baseline)"
+    print(line)
+    if level["errors"]:
+        print(f"{'':<7}errors: {level['errors']}")
+
+
+async def main_async(args) -> Dict[str, Any]:
+    url = args.url.rstrip("/") + STREAM_PATH
+    payloads = load_payloads(args.payloads, max(args.requests, 1), args.agent_id, args.model, args.seed)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = {level["concurrency"]: level for level in json.load(f)["results"]}
+
+    print(f"Target {url} - {len(payloads)} payloads, {args.requests} streams per level")
+    results = []
+    for concurrency in (int(value) for value in args.concurrency.split(",")):
+        level = await run_level(url, concurrency, payloads, args.requests, args.timeout)
+        print_level(level, baseline)
+        results.append(level)
+        if args.pause:
+            await asyncio.sleep(args.pause)
+
+    return {
+        "meta": {
+            "benchmark": "chat_stream_load",
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "args": vars(args)
+        },
+        "results": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SSE load test for /api/ai/chat/stream")
+    parser.add_argument("--url", default="http://127.0.0.1:8001", help="Backend base URL")
+    parser.add_argument("--concurrency", default="1,10,50,100", help="Comma-separated concurrent client counts")
+    parser.add_argument("--requests", type=int, default=200, help="Streams per concurrency level")
+    parser.add_argument("--payloads", help="JSONL file of ChatRequest bodies to replay")
+    parser.add_argument("--agent-id", default="bench-agent", help="Agent for the synthetic corpus")
+    parser.add_argument("--model", default="gpt-5-mini", help="Model for the synthetic corpus")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-stream timeout in seconds")
+    parser.add_argument("--pause", type=float, default=1.0, help="Seconds to idle between levels")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare TTFT p95 against")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
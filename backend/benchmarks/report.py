@@ -0,0 +1,33 @@
+"""
+Shared helpers for benchmark reports (latency summaries and run metadata)
+"""
+import subprocess
+from typing import Dict, List
+
+import numpy as np
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """count/mean/p50/p95/p99/max in milliseconds"""
+    if not values:
+        return {"count": 0}
+    array = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(array, [50, 95, 99])
+    return {
+        "count": int(array.size),
+        "mean": round(float(array.mean()), 2),
+        "p50": round(float(p50), 2),
+        "p95": round(float(p95), 2),
+        "p99": round(float(p99), 2),
+        "max": round(float(array.max()), 2)
+    }
+
+
+def git_revision() -> str:
+    """Short hash of the checked-out commit (results are diffed between commits)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
@@ -0,0 +1,67 @@
+"""
+Run the real FastAPI app on the offline stand-ins (see benchmarks/standins.py)
+Target for benchmarks/loadtest_chat_stream.py: the chat routes behave as in production,
+but Voyage AI, Qdrant and the LLM providers are replaced by deterministic fakes.
+
+Usage (from backend/):
+    python benchmarks/serve_standins.py [--port 8001] [--documents 200] [--llm-ttft-ms 400]
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# No provider pre-warming: there is nothing to connect to
+os.environ["LLM_PREWARM_MODELS"] = ""
+
+import argparse
+import time
+
+import uvicorn
+
+from benchmarks.standins import BENCH_AGENT_ID, StandinConfig, install_standins, seed_knowledge_base
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the backend against offline stand-in providers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--documents", type=int, default=200, help="Synthetic knowledge items to ingest")
+    parser.add_argument("--agent-id", default=BENCH_AGENT_ID)
+    parser.add_argument("--embed-ms", type=float, default=60.0)
+    parser.add_argument("--search-ms", type=float, default=25.0)
+    parser.add_argument("--rerank-ms", type=float, default=80.0)
+    parser.add_argument("--llm-ttft-ms", type=float, default=400.0)
+    parser.add_argument("--llm-token-ms", type=float, default=15.0)
+    parser.add_argument("--llm-tokens", type=int, default=60)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--response-cache", action="store_true", help="Keep the semantic response cache enabled")
+    args = parser.parse_args()
+
+    from app.main import app
+
+    install_standins(
+        StandinConfig(
+            embed_latency_ms=args.embed_ms,
+            search_latency_ms=args.search_ms,
+            rerank_latency_ms=args.rerank_ms,
+            llm_ttft_ms=args.llm_ttft_ms,
+            llm_token_ms=args.llm_token_ms,
+            llm_tokens=args.llm_tokens,
+            jitter=args.jitter,
+            seed=args.seed
+        ),
+        response_cache_enabled=args.response_cache
+    )
+
+    print(f"Seeding {args.documents} documents for agent '{args.agent_id}'...")
+    start = time.perf_counter()
+    chunks = seed_knowledge_base(args.agent_id, args.documents, args.seed)
+    print(f"Stored {chunks} chunks in {time.perf_counter() - start:.1f}s")
+
+    # Single process on purpose: the stand-in Qdrant store lives in this process's memory
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Deterministic in-process stand-ins for the external services on the chat path
+Replaces Voyage AI (embeddings + reranking), Qdrant Cloud and the OpenRouter/Gemini LLMs
+so the real AIService pipeline can run offline with configurable latencies.
+
+    from benchmarks.standins import StandinConfig, install_standins, seed_knowledge_base
+    install_standins(StandinConfig(llm_ttft_ms=300))
+    seed_knowledge_base("bench-agent", documents=200)
+
+Only the network clients are swapped out: query embedding cache, hybrid collection config,
+BM42 sparse vectors, RRF fusion, context assembly and prompt building all run unchanged.
+"""
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Never reach for the real Qdrant cluster while the services are imported
+os.environ["QDRANT_URL"] = os.environ.get("BENCH_QDRANT_URL", "http://127.0.0.1:1")
+# Ingestion must hit the (fake) embedder every run, not a cache file left by a previous one
+os.environ["DOCUMENT_EMBEDDING_CACHE_PATH"] = ""
+
+import asyncio
+import itertools
+import random
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.services.qdrant_service import qdrant_service
+from app.services.reranker_service import reranker_service
+from app.services.llm_service import llm_service
+from app.services.response_cache import response_cache
+from benchmarks.corpus import build_document
+
+
+BENCH_AGENT_ID = "bench-agent"
+EMBEDDING_DIMENSION = 1024
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+@dataclass
+class StandinConfig:
+    """Latencies (milliseconds) and sizes for the fake services"""
+    embed_latency_ms: float = 60.0
+    search_latency_ms: float = 25.0
+    rerank_latency_ms: float = 80.0
+    llm_ttft_ms: float = 400.0
+    llm_token_ms: float = 15.0
+    llm_tokens: int = 60
+    jitter: float = 0.1  # +/- fraction applied to every simulated latency
+    seed: int = 42
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class _Latency:
+    """Seeded latency source shared by the stand-ins"""
+
+    def __init__(self, config: StandinConfig):
+        self.jitter = config.jitter
+        self.rng = random.Random(config.seed)
+
+    def seconds(self, milliseconds: float) -> float:
+        if milliseconds <= 0:
+            return 0.0
+        return milliseconds * (1 + self.rng.uniform(-self.jitter, self.jitter)) / 1000
+
+    async def sleep(self, milliseconds: float):
+        await asyncio.sleep(self.seconds(milliseconds))
+
+    def block(self, milliseconds: float):
+        time.sleep(self.seconds(milliseconds))
+
+
+def fake_embedding(text: str, dimension: int = EMBEDDING_DIMENSION) -> List[float]:
+    """Hashed bag-of-words vector: texts sharing words get a high cosine similarity"""
+    vector = np.zeros(dimension, dtype=np.float32)
+    for token in _tokens(text):
+        digest = zlib.crc32(token.encode("utf-8"))
+        vector[digest % dimension] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        norm = 1.0
+    return (vector / norm).tolist()
+
+
+class FakeVoyageClient:
+    """Stands in for voyageai.Client / AsyncClient (embed + rerank)"""
+
+    def __init__(self, latency: _Latency, config: StandinConfig, is_async: bool):
+        self.latency = latency
+        self.config = config
+        self.is_async = is_async
+        self.embed_calls = 0
+        self.rerank_calls = 0
+
+    def _embed(self, texts: List[str]):
+        self.embed_calls += 1
+        return SimpleNamespace(embeddings=[fake_embedding(text) for text in texts], total_tokens=sum(len(_tokens(text)) for text in texts))
+
+    def _rerank(self, query: str, documents: List[str], top_k: Optional[int]):
+        self.rerank_calls += 1
+        query_tokens = set(_tokens(query))
+        scored = []
+        for index, document in enumerate(documents):
+            document_tokens = set(_tokens(document))
+            overlap = len(query_tokens & document_tokens) / len(query_tokens) if query_tokens else 0.0
+            scored.append(SimpleNamespace(index=index, relevance_score=round(overlap, 4), document=document))
+        scored.sort(key=lambda result: (-result.relevance_score, result.index))
+        return SimpleNamespace(results=scored[:top_k] if top_k else scored)
+
+    def embed(self, texts: List[str], model: str = None, input_type: str = None, **kwargs):
+        if self.is_async:
+            return self._aembed(texts)
+        self.latency.block(self.config.embed_latency_ms)
+        return self._embed(texts)
+
+    async def _aembed(self, texts: List[str]):
+        await self.latency.sleep(self.config.embed_latency_ms)
+        return self._embed(texts)
+
+    def rerank(self, query: str, documents: List[str], model: str = None, top_k: Optional[int] = None, **kwargs):
+        if self.is_async:
+            return self._arerank(query, documents, top_k)
+        self.latency.block(self.config.rerank_latency_ms)
+        return self._rerank(query, documents, top_k)
+
+    async def _arerank(self, query: str, documents: List[str], top_k: Optional[int]):
+        await self.latency.sleep(self.config.rerank_latency_ms)
+        return self._rerank(query, documents, top_k)
+
+
+class LockedLocalQdrant:
+    """
+    Serializes calls into a local QdrantClient(":memory:")
+    The local client is not thread-safe, while ingestion upserts batches from several threads.
+    """
+
+    def __init__(self, client: QdrantClient):
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return method(*args, **kwargs)
+
+        return call
+
+
+class AsyncLocalQdrant:
+    """
+    Async facade over a local QdrantClient(":memory:")
+    The sync and async local clients keep separate stores, so both the ingestion (sync)
+    and chat (async) paths are pointed at one store; the simulated network latency is awaited.
+    """
+
+    def __init__(self, client: LockedLocalQdrant, latency: _Latency, config: StandinConfig):
+        self._client = client
+        self._latency = latency
+        self._config = config
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            await self._latency.sleep(self._config.search_latency_ms)
+            return method(*args, **kwargs)
+
+        return call
+
+
+class FakeChatModel:
+    """Stands in for a bound ChatOpenAI / ChatGoogleGenerativeAI (ainvoke + astream)"""
+
+    def __init__(self, latency: _Latency, config: StandinConfig):
+        self.latency = latency
+        self.config = config
+
+    def _answer_tokens(self, messages) -> List[str]:
+        # Echo words from the prompt so answers depend on the retrieved context
+        words = _tokens(" ".join(str(getattr(message, "content", "")) for message in messages)) or ["ok"]
+        return [f"{word} " for word in itertools.islice(itertools.cycle(words), self.config.llm_tokens)]
+
+    async def ainvoke(self, messages):
+        tokens = self._answer_tokens(messages)
+        await self.latency.sleep(self.config.llm_ttft_ms + self.config.llm_token_ms * len(tokens))
+        return SimpleNamespace(content="".join(tokens))
+
+    async def astream(self, messages):
+        tokens = self._answer_tokens(messages)
+        await self.latency.sleep(self.config.llm_ttft_ms)
+        for index, token in enumerate(tokens):
+            if index:
+                await self.latency.sleep(self.config.llm_token_ms)
+            yield SimpleNamespace(content=token)
+
+
+def install_standins(config: Optional[StandinConfig] = None, response_cache_enabled: bool = False) -> Dict[str, Any]:
+    """
+    Point the global services at the stand-ins
+    Returns the fake clients so callers can read call counts.
+    """
+    config = config or StandinConfig()
+    latency = _Latency(config)
+
+    voyage = qdrant_service.voyage_service
+    voyage.client = FakeVoyageClient(latency, config, is_async=False)
+    voyage.async_client = FakeVoyageClient(latency, config, is_async=True)
+    reranker_service.client = FakeVoyageClient(latency, config, is_async=False)
+    reranker_service.async_client = FakeVoyageClient(latency, config, is_async=True)
+
+    local_qdrant = LockedLocalQdrant(QdrantClient(location=":memory:"))
+    qdrant_service.qdrant_client = local_qdrant
+    qdrant_service.async_qdrant_client = AsyncLocalQdrant(local_qdrant, latency, config)
+    # Creates the real hybrid (dense + BM42 sparse) collection and payload indexes
+    qdrant_service._ensure_collection_exists(voyage.get_embedding_dimension(qdrant_service.embedding_model))
+
+    chat_model = FakeChatModel(latency, config)
+    llm_service._get_llm_instance = lambda model, temperature=0.7, max_tokens=500, streaming=False: chat_model
+
+    response_cache.enabled = response_cache_enabled
+
+    return {
+        "voyage_async": voyage.async_client,
+        "reranker_async": reranker_service.async_client,
+        "qdrant": local_qdrant,
+        "chat_model": chat_model
+    }
+
+
+def seed_knowledge_base(agent_id: str = BENCH_AGENT_ID, documents: int = 200, seed: int = 42) -> int:
+    """Ingest synthetic documents through the real store_knowledge_item path; returns chunks stored"""
+    rng = random.Random(seed)
+    chunks = 0
+    for index in range(documents):
+        item = build_document(index, rng)
+        item["agentId"] = agent_id
+        item["businessId"] = "bench-business"
+        chunks += qdrant_service.store_knowledge_item(item)["chunks_created"]
+    return chunks
@@ -0,0 +1,137 @@
+"""
+Script to re-sparsify existing Qdrant points with the stable BM42 token hashing
+Older points were written with Python's salted hash(), so their sparse indices never
+match query vectors from another process. This rebuilds only the "sparse" named vector
+from each point's stored `text` payload - dense vectors are left untouched (no re-embedding).
+
+The migration is resumable: migrated points are tagged with `sparseVersion`, and every run
+only scrolls points that don't carry the current version yet. Stop it at any time and re-run.
+
+Usage:
+    python migrate_sparse_vectors.py [--batch-size 256] [--collection NAME] [--dry-run]
+"""
+import sys
+sys.path.insert(0, '.')
+
+import argparse
+import time
+
+from qdrant_client.models import Filter, FieldCondition, MatchValue, PointVectors, PayloadSchemaType
+
+from app.services.qdrant_service import qdrant_service, generate_sparse_vectors, SPARSE_HASH_VERSION
+
+
+def migrate_sparse_vectors(collection_name: str, batch_size: int = 256, dry_run: bool = False):
+    """Re-sparsify every point that isn't on SPARSE_HASH_VERSION yet"""
+    qdrant_service._ensure_client_connected()
+    client = qdrant_service.qdrant_client
+
+    print(f"[*] Collection: {collection_name}")
+    print(f"[*] Target sparse hash version: {SPARSE_HASH_VERSION}")
+
+    # Index the version field so the "not migrated yet" filter stays cheap on large collections
+    try:
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name="sparseVersion",
+            field_schema=PayloadSchemaType.INTEGER
+        )
+        print(f"[+] Created payload index for 'sparseVersion'")
+    except Exception as e:
+        if "already exists" in str(e).lower():
+            print(f"[i] Payload index for 'sparseVersion' already exists")
+        else:
+            print(f"[!] Could not create sparseVersion index (continuing): {e}")
+
+    pending_filter = Filter(
+        must_not=[
+            FieldCondition(
+                key="sparseVersion",
+                match=MatchValue(value=SPARSE_HASH_VERSION)
+            )
+        ]
+    )
+
+    total_pending = client.count(
+        collection_name=collection_name,
+        count_filter=pending_filter,
+        exact=True
+    ).count
+    print(f"[*] Points to migrate: {total_pending}")
+
+    if total_pending == 0 or dry_run:
+        print(f"[+] Nothing to do" if total_pending == 0 else f"[i] Dry run - no changes made")
+        return
+
+    migrated = 0
+    skipped = 0
+    offset = None
+    start_time = time.time()
+
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=pending_filter,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["text"],
+            with_vectors=False
+        )
+
+        if not points:
+            break
+
+        migrated_ids = []
+        texts = []
+        for point in points:
+            text = (point.payload or {}).get("text")
+            if not text:
+                skipped += 1
+                continue
+            migrated_ids.append(point.id)
+            texts.append(text)
+
+        updates = [
+            PointVectors(id=point_id, vector={"sparse": sparse_vector})
+            for point_id, sparse_vector in zip(migrated_ids, generate_sparse_vectors(texts))
+        ]
+
+        if updates:
+            # Vectors first, then the version tag: a crash in between just re-processes the batch
+            client.update_vectors(
+                collection_name=collection_name,
+                points=updates,
+                wait=True
+            )
+            client.set_payload(
+                collection_name=collection_name,
+                payload={"sparseVersion": SPARSE_HASH_VERSION},
+                points=migrated_ids,
+                wait=True
+            )
+            migrated += len(migrated_ids)
+
+        elapsed = time.time() - start_time
+        rate = migrated / elapsed if elapsed > 0 else 0.0
+        print(f"    [+] {migrated}/{total_pending} migrated ({skipped} without text) - {rate:.0f} points/s")
+
+        if offset is None:
+            break
+
+    print(f"\n[+] Migration complete: {migrated} points re-sparsified, {skipped} skipped (no text payload)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-sparsify Qdrant points with stable BM42 token hashing")
+    parser.add_argument("--collection", default=qdrant_service.collection_name, help="Collection to migrate")
+    parser.add_argument("--batch-size", type=int, default=256, help="Points per scroll/update batch")
+    parser.add_argument("--dry-run", action="store_true", help="Only count points that need migration")
+    args = parser.parse_args()
+
+    try:
+        migrate_sparse_vectors(args.collection, args.batch_size, args.dry_run)
+    except Exception as e:
+        print(f"[-] Migration failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,75 @@
+"""
+Regression check for the semantic response cache
+Runs the real AIService chat path against the offline stand-ins (benchmarks/standins.py) and checks that two
+different questions which hybrid search expands to the same query ("price" -> 'pricing cost price fees')
+never share a cached answer, while repeating a question still hits the cache.
+
+Usage (from backend/):
+    python test_semantic_cache.py
+"""
+import asyncio
+
+from benchmarks.standins import StandinConfig, install_standins, seed_knowledge_base, BENCH_AGENT_ID
+from app.models import AIConfig
+from app.services.ai_service import ai_service
+from app.services.qdrant_service import qdrant_service
+from app.services.response_cache import SemanticResponseCache, response_cache
+
+
+PRICING_QUESTION = "What is the price of the Pro plan?"
+OTHER_PRICING_QUESTION = "How much does shipping to Canada cost?"
+
+
+def test_exact_entries_need_same_text():
+    """Identical embeddings (what the expansion used to produce) only match the same normalized question"""
+    print("\n" + "="*80)
+    print("TEST: EXACT CACHE ENTRIES")
+    print("="*80 + "\n")
+
+    cache = SemanticResponseCache(enabled=True, threshold=0.95)
+    embedding = [1.0, 0.0, 0.0]
+    cache.put("agent", "config", PRICING_QUESTION, embedding, {"response": "The Pro plan is $49/month"}, exact=True)
+
+    assert cache.lookup("agent", "config", embedding, query=OTHER_PRICING_QUESTION, exact=True) is None
+    # A non-exact lookup must not reach into an exact entry either
+    assert cache.lookup("agent", "config", embedding, query=OTHER_PRICING_QUESTION) is None
+    hit = cache.lookup("agent", "config", embedding, query="  what is the PRICE of the pro plan? ", exact=True)
+    assert hit is not None and hit["query"] == PRICING_QUESTION
+    print("✅ Exact entries only match the same normalized question")
+
+
+async def ask(message: str, ai_config: AIConfig) -> bool:
+    """Ask the chat path; returns whether the answer came from the semantic cache"""
+    response = await ai_service.generate_ai_response(message, BENCH_AGENT_ID, ai_config, "bench-business")
+    assert response.success, response.response
+    return bool(response.metadata.get("cache_hit"))
+
+
+def test_pricing_questions_do_not_share_answers():
+    """Two distinct pricing questions through AIService: the second is not served the first one's answer"""
+    print("\n" + "="*80)
+    print("TEST: DISTINCT PRICING QUESTIONS")
+    print("="*80 + "\n")
+
+    assert qdrant_service._preprocess_query(PRICING_QUESTION) == qdrant_service._preprocess_query(OTHER_PRICING_QUESTION)
+
+    install_standins(StandinConfig(
+        embed_latency_ms=0, search_latency_ms=0, rerank_latency_ms=0, llm_ttft_ms=0, llm_token_ms=0
+    ), response_cache_enabled=True)
+    seed_knowledge_base(documents=20)
+    # Cache every grounded answer so a wrong hit cannot hide behind the confidence gate
+    ai_config = AIConfig(enabled=True, ragEnabled=True, model="gpt-5-mini", fallbackToHuman=False, maxTokens=500)
+
+    async def run():
+        assert not await ask(PRICING_QUESTION, ai_config)
+        assert await ask(PRICING_QUESTION, ai_config), "repeating a question should hit the cache"
+        assert not await ask(OTHER_PRICING_QUESTION, ai_config), "a different pricing question reused a cached answer"
+
+    asyncio.run(run())
+    print(f"✅ '{OTHER_PRICING_QUESTION}' was not answered from '{PRICING_QUESTION}'")
+    print(f"   Cache stats: {response_cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    test_exact_entries_need_same_text()
+    test_pricing_questions_do_not_share_answers()